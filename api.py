@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+A local HTTP/JSON API serving the dashboard's measures, for tools that need
+the numbers without opening Power BI or re-reading data_unpivoted.csv.
+
+The long table is loaded once into vectorized.py's dictionary-encoded
+columns plus row indexes by コード, 都道府県 and 手続名.  A request selects
+its rows through the indexes and evaluates the model.bim measures
+(vectorized.evaluate) over those rows only, in the event loop's default
+executor so that a slow grouping does not hold up the other connections.
+Encoded responses are kept in an LRU cache.  The data file is polled: once a changed file has settled
+(the same size and mtime on two polls) it is loaded in a thread and swapped
+in whole, and the cache is dropped.  A file that fails to load leaves the
+previous data in service.
+
+    GET /health
+    GET /measures?by=都道府県&measure=子育て介護26手続完了率&サブカテゴリ=ア.子育て関係
+    GET /prefectures                    every measure per 都道府県
+    GET /prefectures/{都道府県}          its measures, and per municipality
+    GET /municipalities/{コード}         its measures and the status of each procedure
+    GET /unfinished?都道府県=北海道&limit=100
+    GET /search?q=さっぽ&limit=10      municipalities by a prefix of name, reading or romaji
+
+Any other query parameter named after a column of the long table filters
+it (repeat it for several values).  BLANK is null.
+
+    python api.py                       # http://127.0.0.1:8765
+    python api.py --port 9000 --data data_unpivoted.parquet
+    python api.py --check               # answers vs full-table evaluation, and a hot reload
+
+Requires NumPy.  Standard library asyncio only; binds to localhost unless
+--host says otherwise.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.parse
+
+import muni_search
+import vectorized as vz
+
+np = vz.np
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_POLL = 2.0
+DEFAULT_LIMIT = 1000
+
+INDEXED = ("コード", "都道府県", "手続名")
+RESERVED = ("by", "measure", "limit")
+STATUS = {404: "Not Found", 400: "Bad Request", 405: "Method Not Allowed", 200: "OK"}
+
+# ============================================================
+# Indexes
+# ============================================================
+
+class Indexes:
+    """One load of the long table: the vectorized.Table and its row indexes by INDEXED column."""
+
+    def __init__(self, t, path, signature):
+        self.t = t
+        self.path = path
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.positions = {}     # column -> {value: category code}
+        self.rows = {}          # column -> (row numbers ordered by category, offset of each category)
+        for column in INDEXED:
+            codes, cats = t.columns[column]
+            counts = np.bincount(codes, minlength=len(cats))
+            self.positions[column] = {c: i for i, c in enumerate(cats)}
+            self.rows[column] = (np.argsort(codes, kind="stable"), np.concatenate(([0], np.cumsum(counts))))
+        self.search = muni_search.from_table(t)
+
+    def lookup(self, column, values):
+        """Ascending row numbers where column is one of values."""
+        order, offsets = self.rows[column]
+        pos = self.positions[column]
+        parts = [order[offsets[i]:offsets[i + 1]] for i in (pos.get(v) for v in values) if i is not None]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def select(self, filters):
+        """(table of the rows the indexed filters allow, the other filters)."""
+        rows = None
+        rest = {}
+        for column, values in filters.items():
+            if column in self.positions:
+                r = self.lookup(column, values)
+                rows = r if rows is None else np.intersect1d(rows, r, assume_unique=True)
+            else:
+                rest[column] = values
+        if rows is None:
+            return self.t, rest
+        return self.t.take(rows), rest
+
+
+def file_signature(path):
+    """(mtime, size) of path, or None while it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_indexes(path, signature=None):
+    return Indexes(vz.load(path), path, signature or file_signature(path))
+
+# ============================================================
+# Queries
+# ============================================================
+
+class BadRequest(ValueError):
+    pass
+
+
+class NotFound(LookupError):
+    pass
+
+
+def parse_query(index, query):
+    """(filters, by, measures, limit) from parsed query parameters."""
+    columns = index.t.columns
+    filters = {}
+    for name, values in query.items():
+        if name in RESERVED:
+            continue
+        if name not in columns:
+            raise BadRequest(f"unknown column '{name}'")
+        filters[name] = set(values)
+    by = tuple(c for v in query.get("by", []) for c in v.split(",") if c)
+    for c in by:
+        if c not in columns:
+            raise BadRequest(f"unknown column '{c}' in by")
+    measures = [m for v in query.get("measure", []) for m in v.split(",") if m] or vz.MEASURES
+    for m in measures:
+        if m not in vz.MEASURES:
+            raise BadRequest(f"unknown measure '{m}'")
+    try:
+        limit = int(query.get("limit", [DEFAULT_LIMIT])[-1])
+    except ValueError:
+        raise BadRequest("limit must be an integer") from None
+    return filters, by, measures, limit
+
+
+def measure_rows(index, filters, by=(), measures=vz.MEASURES):
+    """[{"keys": {column: value}, measure: value}] per group of by, as vectorized.evaluate."""
+    t, rest = index.select(filters)
+    result = vz.evaluate(t, by, rest)
+    # Whole columns to Python values at once (vz.value per cell costs more than the evaluation)
+    columns = []
+    for m in measures:
+        v = result[m]
+        if isinstance(v, np.ndarray):
+            nan = v.dtype.kind == "f"
+            v = v.tolist()
+            if nan:
+                v = [None if x != x else x for x in v]
+        columns.append(v)
+    return [
+        {"keys": dict(zip(by, key)), **dict(zip(measures, values))}
+        for key, values in zip(result["keys"], zip(*columns))
+    ]
+
+
+def row_values(t, columns, rows):
+    """{column: value} of each row number."""
+    cats = {c: t.categories(c) for c in columns}
+    codes = {c: t.codes(c)[rows].tolist() for c in columns}
+    return [{c: cats[c][codes[c][k]] for c in columns} for k in range(len(rows))]
+
+
+def get_measures(index, query):
+    filters, by, measures, _ = parse_query(index, query)
+    return {"by": list(by), "filters": {c: sorted(v) for c, v in filters.items()},
+            "rows": measure_rows(index, filters, by, measures)}
+
+
+def get_prefectures(index, query, pref=None):
+    filters, _, measures, _ = parse_query(index, query)
+    if pref is None:
+        return {"rows": measure_rows(index, filters, ("都道府県",), measures)}
+    if pref not in index.positions["都道府県"]:
+        raise NotFound(f"no prefecture '{pref}'")
+    filters["都道府県"] = {pref}
+    total = measure_rows(index, filters, (), measures)
+    return {
+        "都道府県": pref,
+        "measures": total[0] if total else None,
+        "municipalities": measure_rows(index, filters, ("コード", "団体名"), measures),
+    }
+
+
+def get_municipality(index, query, code):
+    filters, _, measures, _ = parse_query(index, query)
+    rows = index.lookup("コード", [code])
+    if not len(rows):
+        raise NotFound(f"no municipality with コード '{code}'")
+    t = index.t
+    first = row_values(t, ("都道府県", "団体名"), rows[:1])[0]
+    procedures = row_values(t, ("サブカテゴリ", "手続名", "オンライン化状況"), rows)
+    for p, s in zip(procedures, t.status[rows].tolist()):
+        p["状況コード"] = s
+    filters["コード"] = {code}
+    total = measure_rows(index, filters, (), measures)
+    return {"コード": code, **first, "measures": total[0] if total else None, "procedures": procedures}
+
+
+def get_unfinished(index, query):
+    """Procedures not online (状況コード -1) in order of the long table, at most limit of them."""
+    filters, _, _, limit = parse_query(index, query)
+    t, rest = index.select(filters)
+    rows = np.flatnonzero(t.mask(rest) & (t.status == -1))
+    return {
+        "count": int(len(rows)),
+        "rows": row_values(t, ("コード", "都道府県", "団体名", "サブカテゴリ", "手続名"), rows[:max(limit, 0)]),
+    }
+
+
+def get_search(index, query):
+    """Municipalities with a name, reading or コード starting with q (muni_search.py)."""
+    text = query.get("q", [""])[-1]
+    if not text.strip():
+        raise BadRequest("q is required")
+    try:
+        limit = int(query.get("limit", [muni_search.DEFAULT_LIMIT])[-1])
+    except ValueError:
+        raise BadRequest("limit must be an integer") from None
+    hits = index.search.search(text, max(limit, 0))
+    return {"q": text, "rows": [dict(zip(("コード", "都道府県", "団体名", "団体名フリガナ"), e)) for e in hits]}
+
+
+def route(index, path, query):
+    """The JSON data answering a GET of path with parsed query parameters."""
+    parts = [urllib.parse.unquote(p) for p in path.strip("/").split("/")]
+    if parts == ["measures"]:
+        return get_measures(index, query)
+    if parts[0] == "prefectures" and len(parts) <= 2:
+        return get_prefectures(index, query, parts[1] if len(parts) == 2 else None)
+    if parts[0] == "municipalities" and len(parts) == 2:
+        return get_municipality(index, query, parts[1])
+    if parts == ["unfinished"]:
+        return get_unfinished(index, query)
+    if parts == ["search"]:
+        return get_search(index, query)
+    raise NotFound(f"no route for /{'/'.join(parts)}")
+
+# ============================================================
+# Service
+# ============================================================
+
+class LRU:
+    """Encoded responses by request target; the least recently used go first."""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        if self.size <= 0:
+            return
+        self.entries[key] = body
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def answer(index, url):
+    """Encoded answer to a GET of url over index (runs in an executor thread)."""
+    return encode(route(index, url.path, urllib.parse.parse_qs(url.query)))
+
+
+class Service:
+    """The current Indexes, the response cache and the HTTP handler."""
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE, poll=DEFAULT_POLL, quiet=False):
+        self.path = path
+        self.poll = poll
+        self.quiet = quiet
+        self.cache = LRU(cache_size)
+        self.index = load_indexes(path)
+        self.reloads = 0
+        self.requests = 0
+
+    def log(self, message):
+        if not self.quiet:
+            print(message, flush=True)
+
+    def health(self):
+        index = self.index
+        return {
+            "data": index.path,
+            "rows": index.t.n,
+            "municipalities": len(index.positions["コード"]),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(index.loaded_at)),
+            "reloads": self.reloads,
+            "requests": self.requests,
+            "cache": {"entries": len(self.cache.entries), "hits": self.cache.hits, "misses": self.cache.misses},
+        }
+
+    async def respond(self, method, target):
+        """(status, body) for a request. Cached answers and /health are served
+        inline; the rest are computed in the default executor."""
+        self.requests += 1
+        if method != "GET":
+            return 405, encode({"error": f"{method} is not supported"})
+        url = urllib.parse.urlsplit(target)
+        if url.path.rstrip("/") == "/health":
+            return 200, encode(self.health())
+        body = self.cache.get(target)
+        if body is not None:
+            return 200, body
+        index = self.index
+        try:
+            body = await asyncio.get_running_loop().run_in_executor(None, answer, index, url)
+        except BadRequest as e:
+            return 400, encode({"error": str(e)})
+        except NotFound as e:
+            return 404, encode({"error": str(e)})
+        if index is self.index:   # a reload meanwhile cleared the cache for the new data
+            self.cache.put(target, body)
+        return 200, body
+
+    async def handle(self, reader, writer):
+        """One connection: requests until the client closes it or asks to (keep-alive otherwise)."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    # Clients may send the target's Japanese unescaped, as UTF-8
+                    method, target, version = line.decode("utf-8", "replace").split()
+                except ValueError:
+                    writer.write(response(400, encode({"error": "bad request line"}), False))
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+                if "content-length" in headers:
+                    await reader.readexactly(int(headers["content-length"]))
+                connection = headers.get("connection", "")
+                keep = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                status, body = await self.respond(method, target)
+                writer.write(response(status, body, keep))
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch(self):
+        """Reload the data file once a change has settled."""
+        loop = asyncio.get_running_loop()
+        pending = None
+        while True:
+            await asyncio.sleep(self.poll)
+            sig = file_signature(self.path)
+            if sig is None or sig == self.index.signature:
+                pending = None
+                continue
+            if sig != pending:
+                pending = sig     # changed since the last poll: wait for it to settle
+                continue
+            try:
+                index = await loop.run_in_executor(None, load_indexes, self.path, sig)
+            except Exception as e:  # a bad file must not take the service down
+                self.log(f"  ERROR: reloading {self.path}: {e}")
+                pending = None
+                continue
+            self.index = index
+            self.cache.clear()
+            self.reloads += 1
+            pending = None
+            self.log(f"OK: reloaded {self.path} ({index.t.n:,} rows)")
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Serve until cancelled. ready(port) is called once listening (port 0 picks a free one)."""
+        server = await asyncio.start_server(self.handle, host, port, limit=1 << 16)
+        port = server.sockets[0].getsockname()[1]
+        watcher = asyncio.create_task(self.watch())
+        if ready is not None:
+            ready(port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def response(status, body, keep):
+    head = (f"HTTP/1.1 {status} {STATUS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+# ============================================================
+# Check
+# ============================================================
+
+async def fetch(port, target, host=DEFAULT_HOST):
+    """(status, JSON data) of one GET, on its own connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b""):
+                break
+            name, _, value = h.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await reader.readexactly(length))
+    finally:
+        writer.close()
+
+
+def quote(target):
+    return urllib.parse.quote(target, safe="/?=&,")
+
+
+def same(a, b):
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) < 1e-9
+    return a == b
+
+
+async def self_check(path):
+    """API answers against vectorized.evaluate over the whole table, then a hot reload. Returns (errors, n)."""
+    errors = []
+    n = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, os.path.basename(path))
+        shutil.copy(path, data)
+        service = Service(data, poll=0.05, quiet=True)
+        t = service.index.t
+        listening = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(service.serve(port=0, ready=listening.set_result))
+        port = await listening
+        try:
+            def compare(label, got, by, filters):
+                nonlocal n
+                ref = vz.evaluate(t, by, filters)
+                if len(got) != len(ref["keys"]):
+                    errors.append(f"{label}: {len(got)} groups, expected {len(ref['keys'])}")
+                    return
+                for i, row in enumerate(got):
+                    for m in vz.MEASURES:
+                        n += 1
+                        if not same(row[m], vz.value(ref, m, i)):
+                            errors.append(f"{label} {row['keys']}: {m} {row[m]!r} != {vz.value(ref, m, i)!r}")
+
+            care = "サブカテゴリ=ア.子育て関係&サブカテゴリ=イ.介護関係"
+            _, got = await fetch(port, quote("/prefectures"))
+            compare("/prefectures", got["rows"], ("都道府県",), {})
+            _, got = await fetch(port, quote(f"/measures?by=都道府県&{care}"))
+            compare("/measures care", got["rows"], ("都道府県",), {"サブカテゴリ": {"ア.子育て関係", "イ.介護関係"}})
+            procs = t.categories("手続名")[:3]
+            _, got = await fetch(port, quote("/measures?by=都道府県&" + "&".join(f"手続名={p}" for p in procs)))
+            compare("/measures 手続名", got["rows"], ("都道府県",), {"手続名": set(procs)})
+            for pref in t.categories("都道府県")[::6]:
+                _, got = await fetch(port, quote(f"/prefectures/{pref}"))
+                compare(f"/prefectures/{pref}", got["municipalities"], ("コード", "団体名"), {"都道府県": {pref}})
+            for code in t.categories("コード")[::97]:
+                _, got = await fetch(port, quote(f"/municipalities/{code}"))
+                compare(f"/municipalities/{code}", [got["measures"]], (), {"コード": {code}})
+                n_rows = int((t.codes("コード") == t.categories("コード").index(code)).sum())
+                if len(got["procedures"]) != n_rows:
+                    errors.append(f"/municipalities/{code}: {len(got['procedures'])} procedures, expected {n_rows}")
+            _, got = await fetch(port, quote("/unfinished?limit=0"))
+            n += 1
+            if got["count"] != int((t.status == -1).sum()):
+                errors.append(f"/unfinished: count {got['count']}, expected {int((t.status == -1).sum())}")
+            for text, code in (("ｴﾘﾓ", "016098"), ("sapporo", "011002")):
+                _, got = await fetch(port, quote(f"/search?q={text}"))
+                n += 1
+                if [r["コード"] for r in got["rows"]][:1] != [code]:
+                    errors.append(f"/search?q={text}: {got['rows'][:1]}, expected {code}")
+            for target, expected in (("/nowhere", 404), ("/measures?by=nowhere", 400), ("/search", 400),
+                                     ("/municipalities/000000", 404), ("/measures?measure=nowhere", 400)):
+                status, _ = await fetch(port, quote(target))
+                n += 1
+                if status != expected:
+                    errors.append(f"{target}: status {status}, expected {expected}")
+
+            # Hot reload: a copy with the first municipality's rows dropped replaces the file
+            first = t.categories("コード")[0]
+            before = (await fetch(port, quote(f"/municipalities/{first}")))[0]
+            with open(path, encoding="utf-8", newline="") as f:
+                lines = f.readlines()
+            tmp_data = data + ".tmp"
+            with open(tmp_data, "w", encoding="utf-8", newline="") as f:
+                f.writelines([lines[0]] + [line for line in lines[1:] if not line.startswith(first + ",")])
+            os.replace(tmp_data, data)
+            for _ in range(200):
+                await asyncio.sleep(0.05)
+                if service.reloads:
+                    break
+            after = (await fetch(port, quote(f"/municipalities/{first}")))[0]
+            n += 1
+            if (before, after, service.reloads) != (200, 404, 1):
+                errors.append(f"hot reload: {first} answered {before} then {after} after {service.reloads} reloads")
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    return errors, n
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve the dashboard's measures as JSON over HTTP")
+    ap.add_argument("--data", default=None, help="data_unpivoted.parquet or .csv (default: whichever exists)")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help="0: any free port")
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="responses kept (0: no cache)")
+    ap.add_argument("--poll", type=float, default=DEFAULT_POLL, help="seconds between checks of the data file")
+    ap.add_argument("--quiet", action="store_true", help="no reload messages")
+    ap.add_argument("--check", action="store_true", help="compare answers with full-table evaluation and test a reload")
+    args = ap.parse_args(argv)
+
+    if np is None:
+        print("  ERROR: api.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    path = args.data
+    if path is None:
+        path = vz.DEFAULT_PARQUET if vz.pq is not None and os.path.exists(vz.DEFAULT_PARQUET) else vz.DEFAULT_CSV
+    if not os.path.exists(path):
+        print(f"  ERROR: {path} not found (run ingest.py first)")
+        sys.exit(1)
+
+    if args.check:
+        if not path.endswith(".csv"):
+            print("  ERROR: --check needs the CSV long table (--data data_unpivoted.csv)")
+            sys.exit(1)
+        errors, n = asyncio.run(self_check(path))
+        if errors:
+            for e in errors[:50]:
+                print(f"  ERROR: {e}")
+            sys.exit(1)
+        print(f"OK: {n:,} answers match full-table evaluation; hot reload served the new file")
+        return
+
+    t0 = time.perf_counter()
+    service = Service(path, args.cache_size, args.poll, args.quiet)
+    t_load = time.perf_counter() - t0
+
+    def ready(port):
+        print(f"OK: http://{args.host}:{port}/ ({service.index.t.n:,} rows of {path}, loaded in {t_load:.2f}s)",
+              flush=True)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
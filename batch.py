@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Build every report of a spec file (specs.py) in one run, in parallel.
+
+For each report the run writes, under --out-dir:
+
+    <id>.pbip
+    <id>.Report/            report.json (or --format pbir definition/), the
+                            theme and definition.pbir pointing at the model
+    <id>.SemanticModel/     model.bim with the spec's measure variants
+    data_municipality_summary_<id>.csv
+                            自治体別集計 over the spec's procedures, which the
+                            model's completion measures and the tile pages read
+
+Each distinct data_dir is parsed once, in this process, from the file
+--source names (data_unpivoted.csv or .parquet) into a compact survey
+(procedures in survey order and one status string per municipality).  The surveys are handed to the worker processes once, by the
+pool initializer; a report then only slices its procedures out of them, so
+20 reports of one survey cost one parse, not 20.  Reports are built in
+--workers processes, each page build going through that report's own
+build cache (<id>.Report/.pbi/build_cache.json).
+
+    python batch.py reports.json -o reports
+    python batch.py reports.json -o reports --workers 8 --format pbir --stats
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+import generate_model as gm
+import generate_report as gr
+import ingest
+import specs
+from measures import STATUS_CHARS, STATUS_NONE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT_DIR = os.path.join(HERE, "reports")
+
+ABSENT = " "    # 状況 character of a procedure a municipality was not asked
+UUID_NAMESPACE = uuid.UUID("3c1e4a52-26a0-4b8e-9d53-5f0d6c2a1b7e")
+
+# ============================================================
+# Shared survey data
+# ============================================================
+
+SURVEY_COLUMNS = ("コード", "都道府県", "団体名", "サブカテゴリ", "手続名", "オンライン化状況")
+
+
+class Survey:
+    """One data_unpivoted.csv (or .parquet), parsed once for every report reading it.
+
+    procedures: (サブカテゴリ, 手続名) in survey order; municipalities:
+    (コード, 都道府県, 団体名, 状況一覧 of every procedure, ABSENT where the
+    municipality has no row).
+    """
+    __slots__ = ("path", "procedures", "municipalities")
+
+    def __init__(self, path, procedures, municipalities):
+        self.path = path
+        self.procedures = procedures
+        self.municipalities = municipalities
+
+
+def survey_path(data_dir, source="csv"):
+    """The ingestion output of data_dir that source reads."""
+    return os.path.join(data_dir, os.path.basename(ingest.DEFAULT_CSV if source == "csv" else ingest.DEFAULT_PARQUET))
+
+
+def column_values(array):
+    """Python values of a Parquet column chunk; dictionary columns decode
+    through their dictionary (a few hundred strings, not one per row)."""
+    if ingest.pa.types.is_dictionary(array.type):
+        values = array.dictionary.to_pylist()
+        return [values[i] for i in array.indices.to_pylist()]
+    return array.to_pylist()
+
+
+def survey_rows(path):
+    """SURVEY_COLUMNS of every long row of a data_unpivoted.csv or .parquet."""
+    if path.endswith(".parquet"):
+        table = ingest.pq.read_table(path, columns=list(SURVEY_COLUMNS))
+        for batch in table.to_batches():
+            yield from zip(*(column_values(batch.column(c)) for c in SURVEY_COLUMNS))
+        return
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        idx = [header.index(c) for c in SURVEY_COLUMNS]
+        for row in reader:
+            yield tuple(row[i] for i in idx)
+
+
+def load_survey(data_dir, source="csv"):
+    path = survey_path(data_dir, source)
+    procedures, index, munis = [], {}, {}
+    for code, pref, name, sub, proc, status in survey_rows(path):
+        key = (sub, proc)
+        i = index.get(key)
+        if i is None:
+            i = index[key] = len(procedures)
+            procedures.append(key)
+        m = munis.get(code)
+        if m is None:
+            m = munis[code] = (pref, name, {})
+        m[2][i] = STATUS_CHARS[status]
+    municipalities = [(code, pref, name, "".join(chars.get(i, ABSENT) for i in range(len(procedures))))
+                      for code, (pref, name, chars) in munis.items()]
+    return Survey(path, procedures, municipalities)
+
+
+def summarize(survey, spec):
+    """(spec with the data's procedure counts, 自治体別集計 in ingest.write_summary's form)."""
+    idx = [i for i, (sub, name) in enumerate(survey.procedures) if spec.includes(sub, name)]
+    counts = [(s, sum(1 for i in idx if survey.procedures[i][0] == s)) for s in spec.subcategories]
+    summary = {}
+    for code, pref, name, statuses in survey.municipalities:
+        chars = [statuses[i] for i in idx if statuses[i] != ABSENT]
+        summary[code] = [code, pref, chars.count(STATUS_CHARS[STATUS_NONE]), name, chars]
+    return spec.with_counts(counts), summary
+
+# ============================================================
+# One report
+# ============================================================
+
+SURVEYS = {}    # data_dir -> Survey, in this process and in each worker
+
+
+def init_batch_worker(surveys):
+    SURVEYS.update(surveys)
+
+
+def report_paths(out_dir, spec_id):
+    return {
+        "pbip": os.path.join(out_dir, f"{spec_id}.pbip"),
+        "report": os.path.join(out_dir, f"{spec_id}.Report"),
+        "model": os.path.join(out_dir, f"{spec_id}.SemanticModel"),
+        "summary": os.path.join(out_dir, f"data_municipality_summary_{spec_id}.csv"),
+    }
+
+
+def write_json(path, data):
+    return gr.write_if_changed(path, (json.dumps(data, ensure_ascii=False, indent=2) + "\n").encode("utf-8"))
+
+
+def write_project(paths, spec):
+    """The .pbip, item files, theme and dataset reference around report.json and model.bim."""
+    display = f"{spec.measure_prefix}{spec.n}手続オンライン化状況"
+    report_id = os.path.basename(paths["report"])
+    model_id = os.path.basename(paths["model"])
+    write_json(paths["pbip"], {"version": "1.0", "artifacts": [{"report": {"path": report_id}}],
+                               "settings": {"enableAutoRecovery": True}})
+    write_json(os.path.join(paths["report"], "definition.pbir"),
+               {"version": "4.0", "datasetReference": {"byPath": {"path": f"../{model_id}"}}})
+    write_json(os.path.join(paths["model"], "definition.pbism"), {"version": "4.0", "settings": {}})
+    for folder, kind, name in ((paths["report"], "report", display), (paths["model"], "semanticModel", model_id)):
+        write_json(os.path.join(folder, "item.metadata.json"),
+                   {"version": "1.0", "logicalId": str(uuid.uuid5(UUID_NAMESPACE, f"{kind}/{spec.id}"))})
+        write_json(os.path.join(folder, "item.config.json"), {"type": kind, "displayName": name})
+    resources = os.path.join(paths["report"], "StaticResources")
+    if not os.path.isdir(resources):
+        shutil.copytree(os.path.join(gr.DEFAULT_REPORT_DIR, "StaticResources"), resources)
+
+
+def build_variant(job):
+    """Build and write one report and its model. Returns a result dict (errors: [] on success)."""
+    spec, out_dir, fmt, source, use_cache = job
+    t0 = time.perf_counter()
+    paths = report_paths(out_dir, spec.id)
+    spec, summary = summarize(SURVEYS[spec.data_dir], spec)
+    result = {"id": spec.id, "procedures": spec.n, "errors": []}
+    if spec.n == 0:
+        result["errors"] = [f"no procedure of {', '.join(spec.subcategories)} in {SURVEYS[spec.data_dir].path}"]
+        return result
+    os.makedirs(out_dir, exist_ok=True)
+    summary_parquet = ingest.summary_parquet_path(paths["summary"]) if source == "parquet" else None
+    ingest.write_summary(summary, paths["summary"], summary_parquet)
+
+    cache = os.path.join(paths["report"], ".pbi", "build_cache.json") if use_cache else None
+    gr.init_page_worker(cache, spec=spec)
+    tiles = gr.muni_tiles(paths["summary"]) if spec.muni_pages else None
+    jobs = gr.page_jobs(spec.page1, spec.pref_pages, spec.page2, gr.CELL_BUDGET, False, tiles)
+    sections, _, errors = gr.build_pages(jobs)
+    report = gr.build_report(sections)
+    errors += gr.validate(report)
+    if errors:
+        result["errors"] = errors
+        return result
+    if fmt == "pbir":
+        _, written, size = gr.write_pbir(report, paths["report"])
+        changed = written > 0
+    else:
+        size, changed = gr.write_report(report, os.path.join(paths["report"], "report.json"))
+    gr.remove_other_format(paths["report"], fmt)
+    if gr.BUILD_CACHE is not None:
+        gr.BUILD_CACHE.save()
+
+    model = gm.build_model(source, spec=spec,
+                           fact_basename=os.path.splitext(SURVEYS[spec.data_dir].path)[0],
+                           summary_basename=os.path.splitext(os.path.abspath(paths["summary"]))[0])
+    model_changed = gr.write_if_changed(os.path.join(paths["model"], "model.bim"),
+                                        gm.serialize(model).encode("utf-8")) > 0
+    write_project(paths, spec)
+    result.update(
+        label=spec.label, pages=len(sections), visuals=sum(len(s["visualContainers"]) for s in sections),
+        bytes=size, changed=changed or model_changed, seconds=time.perf_counter() - t0,
+        measures=sum(len(t.get("measures", [])) for t in model["model"]["tables"]),
+    )
+    return result
+
+
+def build_all(spec_list, out_dir, workers=1, fmt="legacy", source="csv", use_cache=True):
+    """Build every spec's report. Returns (results in spec order, seconds parsing data)."""
+    t0 = time.perf_counter()
+    surveys = {d: load_survey(d, source) for d in dict.fromkeys(s.data_dir for s in spec_list)}
+    t_parse = time.perf_counter() - t0
+    jobs = [(spec, out_dir, fmt, source, use_cache) for spec in spec_list]
+    if workers <= 1:
+        init_batch_worker(surveys)
+        return [build_variant(job) for job in jobs], t_parse
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=init_batch_worker, initargs=(surveys,),
+    ) as pool:
+        return list(pool.map(build_variant, jobs)), t_parse
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build the report and model of every spec in a spec file")
+    ap.add_argument("spec", help="spec file (JSON, see specs.py)")
+    ap.add_argument("-o", "--out-dir", default=DEFAULT_OUT_DIR, help="folder the report projects are written into")
+    ap.add_argument("--only", default=None, metavar="ID[,ID...]", help="build these reports of the spec file only")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="processes building reports (1: build in this process)")
+    ap.add_argument("--format", choices=("legacy", "pbir"), default="legacy",
+                    help="legacy: one report.json; pbir: definition/ with one file per page and visual")
+    ap.add_argument("--source", choices=gm.SOURCES, default="csv",
+                    help="ingestion output the オンライン化状況 partition reads")
+    ap.add_argument("--no-cache", action="store_true", help="rebuild every visual; leave the caches untouched")
+    ap.add_argument("--stats", action="store_true", help="print per-report timings")
+    args = ap.parse_args(argv)
+
+    try:
+        spec_list = specs.load(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"  ERROR: {e}")
+        sys.exit(1)
+    if args.only:
+        wanted = args.only.split(",")
+        unknown = sorted(set(wanted) - {s.id for s in spec_list})
+        if unknown:
+            ap.error(f"--only: no report {', '.join(unknown)} in {args.spec}")
+        spec_list = [s for s in spec_list if s.id in wanted]
+    if args.source == "parquet" and ingest.pa is None:
+        print("  ERROR: --source parquet requires pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    for d in dict.fromkeys(s.data_dir for s in spec_list):
+        path = survey_path(d, args.source)
+        if not os.path.exists(path):
+            print(f"  ERROR: {path} not found (run ingest.py{' --parquet' if args.source == 'parquet' else ''} first)")
+            sys.exit(1)
+
+    workers = max(1, min(args.workers, len(spec_list)))
+    t0 = time.perf_counter()
+    results, t_parse = build_all(spec_list, args.out_dir, workers, args.format, args.source, not args.no_cache)
+    elapsed = time.perf_counter() - t0
+
+    failed = [r for r in results if r["errors"]]
+    for r in failed:
+        for e in r["errors"][:10]:
+            print(f"  ERROR: {r['id']}: {e}")
+    if failed:
+        sys.exit(1)
+    for r in results:
+        state = "OK" if r["changed"] else "OK (unchanged)"
+        print(f"{state}: {r['id']}  {r['label']} {r['procedures']}手続, {r['pages']} pages, "
+              f"{r['visuals']:,} visuals, {r['measures']} measures, {r['bytes']:,} bytes")
+    print(f"  {len(results)} reports in {args.out_dir}, {workers} worker(s), "
+          f"data parsed once ({t_parse * 1000:.0f} ms), total {elapsed:.2f}s")
+    if args.stats:
+        for r in results:
+            print(f"    {r['id']}: {r['seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Load test of api.py: --clients concurrent keep-alive connections (default
+100) send --requests GETs in total to a server started on a free local
+port, once with the response cache off and once with the LRU cache.
+
+The request mix is what the dashboard's tools ask: every prefecture's
+measures, one prefecture with its municipalities, one municipality's
+procedures, the unfinished procedures of a prefecture, and measures by
+都道府県 under a サブカテゴリ filter; targets are drawn with a fixed seed.
+Reported: requests per second, p50 / p99 / max latency, and the cache hit
+rate the server saw.  Runs offline (localhost only).  Every response must
+be 200 or the run stops.
+
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --clients 100 --requests 50000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import api  # noqa: E402
+import vectorized as vz  # noqa: E402
+
+
+def targets(t, n, seed=0):
+    """n request targets of the mix."""
+    rnd = random.Random(seed)
+    prefs = t.categories("都道府県")
+    codes = t.categories("コード")
+    subcats = [c for c in t.categories("サブカテゴリ") if c]
+    kinds = [
+        lambda: "/prefectures",
+        lambda: f"/prefectures/{rnd.choice(prefs)}",
+        lambda: f"/municipalities/{rnd.choice(codes)}",
+        lambda: f"/unfinished?都道府県={rnd.choice(prefs)}&limit=50",
+        lambda: f"/measures?by=都道府県&サブカテゴリ={rnd.choice(subcats)}&measure=オンライン化率",
+    ]
+    weights = [1, 3, 10, 3, 3]
+    return [urllib.parse.quote(rnd.choices(kinds, weights)[0](), safe="/?=&,") for _ in range(n)]
+
+
+async def client(port, todo, latencies):
+    reader, writer = await asyncio.open_connection(api.DEFAULT_HOST, port)
+    try:
+        while todo:
+            target = todo.pop()
+            t0 = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b""):
+                    break
+                name, _, value = h.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                raise SystemExit(f"  ERROR: {target}: status {status}")
+    finally:
+        writer.close()
+
+
+async def load_test(port, requests, clients):
+    todo = list(reversed(requests))
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(port, todo, latencies) for _ in range(clients)))
+    return time.perf_counter() - t0, sorted(latencies)
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def start_server(data, cache_size):
+    """(process, port) of api.py serving data on a free port."""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "api.py"), "--data", data, "--port", "0", "--quiet",
+         "--cache-size", str(cache_size)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = proc.stdout.readline()
+    if not line.startswith("OK: "):
+        proc.kill()
+        raise SystemExit(f"  ERROR: api.py did not start: {line.strip()}")
+    return proc, int(line.split()[1].rstrip("/").rsplit(":", 1)[1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="api.py requests/sec and latency under concurrent clients")
+    ap.add_argument("--data", default=vz.DEFAULT_CSV)
+    ap.add_argument("--clients", type=int, default=100)
+    ap.add_argument("--requests", type=int, default=20_000)
+    ap.add_argument("--cache-size", type=int, default=api.DEFAULT_CACHE_SIZE)
+    args = ap.parse_args()
+
+    if vz.np is None:
+        print("  ERROR: bench_api.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    requests = targets(vz.load(args.data), args.requests)
+    print(f"{args.requests:,} requests from {args.clients} clients, {len(set(requests)):,} distinct targets")
+    print(f"{'cache':<12} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'hit rate':>9}")
+    for label, size in (("off", 0), (f"LRU {args.cache_size}", args.cache_size)):
+        proc, port = start_server(args.data, size)
+        try:
+            asyncio.run(load_test(port, requests[:args.clients], args.clients))     # warm up connections
+            seconds, latencies = asyncio.run(load_test(port, requests, args.clients))
+            health = asyncio.run(api.fetch(port, "/health"))[1]["cache"]
+        finally:
+            proc.terminate()
+            proc.wait()
+        lookups = health["hits"] + health["misses"]
+        print(f"{label:<12} {len(requests) / seconds:>9,.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.2f} {latencies[-1] * 1000:>8.2f} "
+              f"{health['hits'] / lookups if lookups else 0:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
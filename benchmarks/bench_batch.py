@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+20 report variants from one spec file (batch.py) against 20 sequential runs.
+
+The variants are every non-empty combination of the 4 サブカテゴリ of b)
+(15), plus 5 more of the 子育て・介護 pair with other as-of dates and
+legend thresholds; each is the full dashboard with --pref-pages unless
+--no-pref-pages.  Timed, cold (no build cache), best of --repeat:
+
+    sequential  one `python batch.py <one-spec file> --workers 1` process per
+                variant, as 20 runs of the tool would be: 20 interpreter
+                starts, 20 parses of data_unpivoted.csv
+    in-process  batch.build_all with 1 worker: one parse, reports one by one
+    batch       `python batch.py <20-spec file> --workers N`
+
+Every run's report.json and model.bim bytes are compared with the others.
+
+    python benchmarks/bench_batch.py
+    python benchmarks/bench_batch.py --workers 8 --repeat 3
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import batch  # noqa: E402
+import specs  # noqa: E402
+
+SUBCATEGORIES = ("ア.子育て関係", "イ.介護関係", "ウ.被災者支援関係", "エ.転出・転入手続関係")
+VARIANTS = 20
+
+
+def variant_specs(pref_pages):
+    """VARIANTS spec file entries."""
+    reports = []
+    for k in range(1, len(SUBCATEGORIES) + 1):
+        for subs in itertools.combinations(SUBCATEGORIES, k):
+            reports.append({"id": f"v{len(reports) + 1:02d}", "subcategories": list(subs)})
+    for year, low in zip(range(3, 8), (0.5, 0.6, 0.7, 0.8, 0.9)):
+        reports.append({"id": f"v{len(reports) + 1:02d}", "as_of": f"令和{year}年度末時点",
+                        "thresholds": [low, 1.0]})
+    return {"defaults": {"pref_pages": pref_pages, "data_dir": ROOT}, "reports": reports[:VARIANTS]}
+
+
+def digest(out_dir, ids):
+    """Hash of every variant's report.json and model.bim."""
+    h = hashlib.sha1()
+    for spec_id in ids:
+        paths = batch.report_paths(out_dir, spec_id)
+        for path in (os.path.join(paths["report"], "report.json"), os.path.join(paths["model"], "model.bim")):
+            with open(path, "rb") as f:
+                data = f.read()
+            # partitions name the absolute output folder; digest the rest
+            h.update(data.replace(os.path.abspath(out_dir).encode("utf-8"), b""))
+    return h.hexdigest()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(cmd):
+    subprocess.run([sys.executable, os.path.join(ROOT, "batch.py"), *cmd], check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="batch report generation vs sequential runs")
+    ap.add_argument("--workers", type=int, default=max(os.cpu_count() or 1, 4))
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--no-pref-pages", action="store_true", help="page 1 and 2 only per variant")
+    args = ap.parse_args()
+
+    data = variant_specs(not args.no_pref_pages)
+    ids = [r["id"] for r in data["reports"]]
+    with tempfile.TemporaryDirectory() as tmp:
+        spec_path = os.path.join(tmp, "reports.json")
+        with open(spec_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        single = []
+        for entry in data["reports"]:
+            path = os.path.join(tmp, f"{entry['id']}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"defaults": data["defaults"], "reports": [entry]}, f, ensure_ascii=False)
+            single.append(path)
+        spec_list = specs.load(spec_path)
+
+        outs = {k: os.path.join(tmp, k) for k in ("sequential", "in-process", "batch")}
+        times = {
+            "sequential": timed(lambda: [run([p, "-o", outs["sequential"], "--workers", "1", "--no-cache"])
+                                         for p in single], args.repeat),
+            "in-process": timed(lambda: batch.build_all(spec_list, outs["in-process"], 1, use_cache=False),
+                                args.repeat),
+            "batch": timed(lambda: run([spec_path, "-o", outs["batch"], "--workers", str(args.workers),
+                                        "--no-cache"]), args.repeat),
+        }
+        digests = {k: digest(out, ids) for k, out in outs.items()}
+        if len(set(digests.values())) != 1:
+            raise SystemExit(f"  ERROR: outputs differ: {digests}")
+
+    pages = "pages 1-2 + 47 prefecture pages" if not args.no_pref_pages else "pages 1-2"
+    print(f"{os.cpu_count()} CPUs, {len(ids)} variants ({pages}), outputs identical")
+    print(f"{'run':<12} {'workers':>8} {'s':>8} {'ms/report':>10} {'speedup':>8}")
+    base = times["sequential"]
+    for label, workers in (("sequential", 1), ("in-process", 1), ("batch", args.workers)):
+        t = times[label]
+        print(f"{label:<12} {workers:>8} {t:>8.2f} {t / len(ids) * 1000:>10.1f} {base / t:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+bitsets.py set queries against the same questions asked of the long table
+with pandas filters, on the real data and tiled --scale times (as many times
+as many municipalities).  Each pair of answers is compared before timing.
+
+    python benchmarks/bench_bitsets.py
+    python benchmarks/bench_bitsets.py --scale 10 --repeat 5 --pref 東京都
+"""
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import bitsets  # noqa: E402
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def tile_frame(df, k):
+    parts = [df] + [df.assign(コード=df["コード"] + f"#{i}") for i in range(1, k)]
+    return pd.concat(parts, ignore_index=True)
+
+
+def pandas_queries(df, procedure, pref, subset):
+    """The bitsets queries as pandas filters on the long table."""
+    none = df["オンライン化状況"] == ""
+
+    def lacking():
+        return sorted(df.loc[none & (df["手続名"] == procedure), "コード"])
+
+    def missing_in():
+        counts = df[none & (df["都道府県"] == pref)].groupby("手続名").size()
+        return {p: int(c) for p, c in counts.items()}
+
+    def completed():
+        codes = df["コード"].drop_duplicates()
+        unfinished = df.loc[none & df["手続名"].isin(subset), "コード"].unique()
+        return sorted(codes[~codes.isin(unfinished)])
+
+    return {"lacking": lacking, "missing_in": missing_in, "completed": completed}
+
+
+def bitset_queries(bits, procedure, pref, subset):
+    return {
+        "lacking": lambda: sorted(bits.lacking(procedure)),
+        "missing_in": lambda: bits.missing_in(pref),
+        "completed": lambda: sorted(bits.completed(subset)),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="bitset set queries vs pandas filters on the long table")
+    ap.add_argument("--csv", default=bitsets.DEFAULT_CSV)
+    ap.add_argument("--scale", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--procedure", default="妊娠の届出")
+    ap.add_argument("--pref", default="北海道")
+    args = ap.parse_args()
+
+    if bitsets.np is None or pd is None:
+        print("  ERROR: bench_bitsets.py requires numpy and pandas (pip install numpy pandas)")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    t_pandas = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    bits = bitsets.from_csv(args.csv)
+    t_bits = time.perf_counter() - t0
+    print(f"loaded {len(df):,} rows: pandas {t_pandas:.2f}s, bitsets (encode from CSV) {t_bits:.2f}s")
+    subset = bits.care_procedures()
+
+    data = [("x1", df, bits)]
+    if args.scale > 1:
+        data.append((f"x{args.scale}", tile_frame(df, args.scale), bits.tile(args.scale)))
+    print(f"{'data':<6} {'munis':>8} {'query':<11} {'pandas ms':>10} {'bitsets ms':>11} {'speedup':>8}")
+    for label, frame, b in data:
+        pq = pandas_queries(frame, args.procedure, args.pref, subset)
+        bq = bitset_queries(b, args.procedure, args.pref, subset)
+        for name in pq:
+            if pq[name]() != bq[name]():
+                raise SystemExit(f"  ERROR: {label} {name}: answers differ")
+            tp = best_of(args.repeat, pq[name])
+            tb = best_of(args.repeat, bq[name])
+            print(f"{label:<6} {len(b):>8,} {name:<11} {tp * 1000:>10.2f} {tb * 1000:>11.3f} {tp / tb:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
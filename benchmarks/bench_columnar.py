@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare data_unpivoted.csv and data_unpivoted.parquet: bytes on disk and
+parse time, at the current municipality count and 10x.
+
+Parse time is measured three ways: the stdlib csv module (with the
+Int64 conversions the partition applies), pyarrow's CSV reader
+with explicit column types, and pyarrow's Parquet reader.  Each figure is
+the best of --repeat runs.
+
+    python benchmarks/bench_columnar.py
+    python benchmarks/bench_columnar.py --scales 1 10 20 --repeat 5
+
+Requires pyarrow.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import ingest  # noqa: E402
+from bench_ingest import write_synthetic_workbook  # noqa: E402
+
+if ingest.pa is None:
+    sys.exit("  ERROR: bench_columnar requires pyarrow (pip install pyarrow)")
+
+import pyarrow as pa  # noqa: E402
+import pyarrow.csv as pacsv  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def parse_csv_stdlib(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = csv.reader(f)
+        next(rows)
+        ints = [i for i, name in enumerate(ingest.COLUMNS) if name in ingest.INT_COLUMNS]
+        for row in rows:
+            for i in ints:
+                row[i] = int(row[i]) if row[i] else None
+
+
+def parse_csv_arrow(path):
+    types = {name: (pa.int64() if name in ingest.INT_COLUMNS else pa.string()) for name in ingest.COLUMNS}
+    pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(column_types=types, strings_can_be_null=False))
+
+
+def parse_parquet(path):
+    pq.read_table(path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="CSV vs Parquet size and parse time")
+    ap.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'scale':>6} {'rows':>10} {'csv MB':>8} {'parquet MB':>11} {'ratio':>7} "
+          f"{'csv (stdlib) s':>15} {'csv (arrow) s':>14} {'parquet s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            xlsx = os.path.join(tmp, f"synthetic_{scale:g}x.xlsx")
+            csv_out = os.path.join(tmp, f"synthetic_{scale:g}x.csv")
+            pq_out = os.path.join(tmp, f"synthetic_{scale:g}x.parquet")
+            write_synthetic_workbook(xlsx, scale)
+            n = ingest.ingest(xlsx, csv_out, parquet_out=pq_out)
+
+            csv_bytes = os.path.getsize(csv_out)
+            pq_bytes = os.path.getsize(pq_out)
+            t_std = best_of(args.repeat, lambda: parse_csv_stdlib(csv_out))
+            t_arrow = best_of(args.repeat, lambda: parse_csv_arrow(csv_out))
+            t_pq = best_of(args.repeat, lambda: parse_parquet(pq_out))
+            print(f"{scale:>5g}x {n:>10,} {csv_bytes / 1e6:>8.1f} {pq_bytes / 1e6:>11.2f} "
+                  f"{csv_bytes / pq_bytes:>6.0f}x {t_std:>15.3f} {t_arrow:>14.3f} {t_pq:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Memory of building and encoding a large synthetic report with the interned
+fragment helpers of generate_report.py against the same helpers unmemoized.
+
+The synthetic report is every page generate_report.py can build (page 1,
+page 2, 47 prefecture pages and the trend page) with the prefecture pages
+repeated --copies times.  Measured with tracemalloc: memory the built pages
+hold and the peak while building them, plus the live Lit / Solid nodes.
+Encoding report.json allocates the same with either (the output text
+dominates) and is not measured.  Both reports are compared before the
+numbers are printed.
+
+    python benchmarks/bench_fragments.py
+    python benchmarks/bench_fragments.py --copies 10
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import generate_report as gr  # noqa: E402
+
+INTERNED_HELPERS = ("lit", "solid_color", "panel_title")
+
+
+def jobs(copies):
+    base = gr.page_jobs("cards", True, "matrix", gr.CELL_BUDGET, True)
+    pref = [(fn, args) for fn, args in base if fn is gr.build_pref_page]
+    return base + pref * (copies - 1)
+
+
+def measure(copies):
+    """(report.json text, held bytes, build peak, live nodes, build seconds)."""
+    for table in gr.INTERNED:
+        table.clear()
+    gc.collect()
+    t0 = time.perf_counter()
+    tracemalloc.start()
+    sections = [fn(*args) for fn, args in jobs(copies)]
+    held, build_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = time.perf_counter() - t0
+    nodes = sum(isinstance(o, (gr.Lit, gr.Solid)) for o in gc.get_objects())
+    return gr.encode_report(gr.build_report(sections)), held, build_peak, nodes, seconds
+
+
+def main():
+    ap = argparse.ArgumentParser(description="interned vs unmemoized fragment helpers: memory of a large report")
+    ap.add_argument("--copies", type=int, default=5, help="times the 47 prefecture pages are repeated")
+    args = ap.parse_args()
+
+    interned = measure(args.copies)
+    saved = {name: getattr(gr, name) for name in INTERNED_HELPERS}
+    try:
+        for name, fn in saved.items():
+            setattr(gr, name, fn.__wrapped__)
+        plain = measure(args.copies)
+    finally:
+        for name, fn in saved.items():
+            setattr(gr, name, fn)
+    if interned[0] != plain[0]:
+        raise SystemExit("  ERROR: the interned helpers changed report.json")
+
+    pages = len(jobs(args.copies))
+    print(f"{pages} pages, {len(interned[0]):,} bytes of report.json (tracemalloc on)")
+    print(f"{'helpers':<10} {'held KB':>9} {'build peak KB':>14} {'Lit/Solid':>10} {'build s':>8}")
+    for label, (_, held, build_peak, nodes, seconds) in (("plain", plain), ("interned", interned)):
+        print(f"{label:<10} {held / 1024:>9,.0f} {build_peak / 1024:>14,.0f} {nodes:>10,} {seconds:>8.2f}")
+    print(f"{'saved':<10} {1 - interned[1] / plain[1]:>9.0%} {1 - interned[2] / plain[2]:>14.0%} "
+          f"{1 - interned[3] / plain[3]:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+history.py as releases accumulate: --releases synthetic monthly releases
+(each completing --step more municipalities) are appended to a temporary
+store one by one.
+
+Timed per checkpoint: the append of one release, reading the whole
+都道府県別推移 table back, and the 完了率 of one release point (the
+measure of the trend visuals, dax.py, filtered to the latest 公表日).  The
+append and the point stay flat; only the full read grows, by 47 rows per
+release.  Earlier partitions are checked to be untouched by later appends.
+
+    python benchmarks/bench_history.py
+    python benchmarks/bench_history.py --releases 120 --step 5
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import bitsets  # noqa: E402
+import dax  # noqa: E402
+import generate_model  # noqa: E402
+import history  # noqa: E402
+from bench_snapshots import next_bits  # noqa: E402
+
+
+def monthly(start, n):
+    """n release ids a month apart from start ('YYYYMMDD')."""
+    d = history.release_date(start)
+    out = []
+    for i in range(n):
+        y, m = divmod(d.month - 1 + i, 12)
+        out.append(datetime.date(d.year + y, m + 1, d.day).strftime("%Y%m%d"))
+    return out
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def snapshot(folder):
+    """{path: mtime_ns} of every partition file."""
+    out = {}
+    for release in history.releases(folder):
+        d = history.partition_dir(release, folder)
+        for name in os.listdir(d):
+            out[os.path.join(d, name)] = os.stat(os.path.join(d, name)).st_mtime_ns
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="history store append / read / query cost as releases accumulate")
+    ap.add_argument("--csv", default=bitsets.DEFAULT_CSV)
+    ap.add_argument("--releases", type=int, default=60)
+    ap.add_argument("--step", type=int, default=10, help="municipalities completed per release")
+    args = ap.parse_args()
+
+    if bitsets.np is None or history.pa is None:
+        print("  ERROR: bench_history.py requires numpy and pyarrow (pip install numpy pyarrow)")
+        sys.exit(1)
+    bits = bitsets.from_csv(args.csv)
+    bim = generate_model.build_model("csv", history=True)
+    trend = next(t for t in bim["model"]["tables"] if t["name"] == generate_model.TREND)
+    checkpoints = {1, 2, 5} | {n for n in range(10, args.releases + 1, 10)} | {args.releases}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, generate_model.HISTORY_DIR)
+        print(f"{'releases':>8} {'rows':>7} {'append ms':>10} {'read ms':>8} {'point ms':>9} {'完了率':>7}")
+        before = {}
+        for n, release in enumerate(monthly("20260120", args.releases), 1):
+            _, t_append = timed(lambda: history.append(next_bits(bits, (n - 1) * args.step), release, folder))
+            after = snapshot(folder)
+            if any(after.get(p) != m for p, m in before.items()):
+                raise SystemExit(f"  ERROR: appending {release} rewrote an earlier partition")
+            before = after
+            if n not in checkpoints:
+                continue
+            model, t_read = timed(lambda: dax.Model({"model": {"tables": [trend]}}, tmp))
+            rows = len(model.tables[generate_model.TREND])
+            latest = {(generate_model.TREND, "公表日"): [history.release_date(release)]}
+            model.evaluate("子育て介護26手続完了率_推移", latest)  # builds the column index
+            rate, t_point = timed(lambda: model.evaluate("子育て介護26手続完了率_推移", latest))
+            print(f"{n:>8,} {rows:>7,} {t_append * 1000:>10.2f} {t_read * 1000:>8.1f} "
+                  f"{t_point * 1000:>9.3f} {rate:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Time the static HTML export: rendering every page (1 + 47 prefectures + one
+per municipality), a full write to an empty folder and a rewrite with
+nothing changed, for each page 1 layout.  Also reports the bundle size and
+the largest page, which bounds what a browser has to load for one view.
+
+    python benchmarks/bench_html.py
+    python benchmarks/bench_html.py --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import export_html  # noqa: E402
+import generate_report as gr  # noqa: E402
+import vectorized as vz  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="static HTML export timings")
+    ap.add_argument("--data", default=None)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if vz.np is None:
+        print("  ERROR: bench_html.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    t_load, t = best_of(1, lambda: vz.load(args.data))
+    print(f"loaded {t.n:,} rows in {t_load:.2f}s")
+    print(f"{'page1':<8} {'pages':>6} {'bytes':>12} {'largest':>9} {'render s':>9} {'write s':>8} {'unchanged s':>12}")
+    for layout in gr.PAGE1_LAYOUTS:
+        t_render, files = best_of(args.repeat, lambda: export_html.bundle_files(t, layout))
+        sizes = [len(text.encode("utf-8")) for _, text in files]
+        with tempfile.TemporaryDirectory() as tmp:
+            t_write, _ = best_of(1, lambda: export_html.write_bundle(files, tmp))
+            t_same, (n_written, _) = best_of(args.repeat, lambda: export_html.write_bundle(files, tmp))
+        if n_written:
+            raise SystemExit(f"  ERROR: {layout}: {n_written} unchanged files rewritten")
+        print(f"{layout:<8} {len(files) - 1:>6,} {sum(sizes):>12,} {max(sizes):>9,} "
+              f"{t_render:>9.3f} {t_write:>8.3f} {t_same:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark ingest.py on synthetic workbooks.
+
+Builds workbooks with the same header layout as the real survey file, scaled
+to N x its municipality count (data rows are resampled from the real sheet with
+fresh codes and seeded status shuffles), then runs the ingestion in a child
+process and reports rows/s and the child's peak RSS.
+
+    python benchmarks/bench_ingest.py            # 1x and 10x
+    python benchmarks/bench_ingest.py --scales 1 5 10 20
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import ingest  # noqa: E402
+
+HEADER_ROWS = 11  # title rows 1-6 + header rows 7-11
+
+# ============================================================
+# Synthetic workbook
+# ============================================================
+
+def col_letter(idx):
+    s = ""
+    idx += 1
+    while idx:
+        idx, r = divmod(idx - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def load_template(path):
+    """Header rows and municipality rows of the real workbook."""
+    header, data = [], []
+    for r, values in ingest.iter_sheet_rows(path):
+        (header if r <= HEADER_ROWS else data).append(values)
+    return header, [v for v in data if v and v[0].strip()]
+
+
+def write_synthetic_workbook(path, scale, seed=0, template=ingest.DEFAULT_XLSX):
+    """Write a workbook with scale x the template's municipalities. Returns the count."""
+    rng = random.Random(seed)
+    header, data = load_template(template)
+    statuses = ["○", "ー", ""]
+    first_col = ingest.COLUMNS.index("大カテゴリ")
+    n_target = int(len(data) * scale)
+
+    shared, index = [], {}
+
+    def sst(s):
+        i = index.get(s)
+        if i is None:
+            i = index[s] = len(shared)
+            shared.append(s)
+        return i
+
+    def row_xml(r, values):
+        cells = []
+        for c, v in enumerate(values):
+            if v == "":
+                continue
+            ref = f"{col_letter(c)}{r}"
+            if v.isdigit():
+                cells.append(f'<c r="{ref}"><v>{v}</v></c>')
+            else:
+                cells.append(f'<c r="{ref}" t="s"><v>{sst(v)}</v></c>')
+        return f'<row r="{r}">{"".join(cells)}</row>'
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        with zf.open("xl/worksheets/sheet1.xml", "w") as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            for r, values in enumerate(header, 1):
+                f.write(row_xml(r, values).encode("utf-8"))
+            for k in range(n_target):
+                src = list(data[k % len(data)])
+                rep = k // len(data)
+                if rep:
+                    src[0] = str(100000 + k)
+                    src[3] = f"{src[3]}{rep}"
+                    for c in range(first_col, len(src) - 1):
+                        src[c] = rng.choice(statuses) if rng.random() < 0.3 else src[c]
+                f.write(row_xml(HEADER_ROWS + 1 + k, src).encode("utf-8"))
+            f.write(b"</sheetData></worksheet>")
+
+        sst_xml = "".join(f"<si><t>{escape(s)}</t></si>" for s in shared)
+        zf.writestr("xl/sharedStrings.xml",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    f'count="{len(shared)}" uniqueCount="{len(shared)}">{sst_xml}</sst>')
+        zf.writestr("xl/workbook.xml",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    '<sheets><sheet name="synthetic" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        zf.writestr("xl/_rels/workbook.xml.rels",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                    'Target="worksheets/sheet1.xml"/></Relationships>')
+    return n_target
+
+# ============================================================
+# Measurement
+# ============================================================
+
+# ru_maxrss is in kilobytes on Linux but in bytes on macOS
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+import ingest
+t0 = time.perf_counter()
+n = ingest.ingest({xlsx!r}, {out!r})
+maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"rows": n, "seconds": time.perf_counter() - t0,
+                  "maxrss_kb": maxrss // 1024 if sys.platform == "darwin" else maxrss}}))
+"""
+
+
+def run_ingest(xlsx, out):
+    """Ingest in a fresh interpreter so peak RSS belongs to this run only."""
+    code = CHILD.format(root=ROOT, xlsx=xlsx, out=out)
+    res = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return json.loads(res.stdout)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"{'scale':>6} {'municipalities':>15} {'rows':>12} {'xlsx MB':>8} "
+          f"{'seconds':>8} {'rows/s':>10} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            xlsx = os.path.join(tmp, f"synthetic_{scale:g}x.xlsx")
+            out = os.path.join(tmp, f"synthetic_{scale:g}x.csv")
+            t0 = time.perf_counter()
+            n_muni = write_synthetic_workbook(xlsx, scale, args.seed)
+            gen = time.perf_counter() - t0
+            r = run_ingest(xlsx, out)
+            print(f"{scale:>5g}x {n_muni:>15,} {r['rows']:>12,} {os.path.getsize(xlsx) / 1e6:>8.1f} "
+                  f"{r['seconds']:>8.2f} {r['rows'] / r['seconds']:>10,.0f} {r['maxrss_kb'] / 1024:>12.1f}"
+                  f"   (workbook generated in {gen:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
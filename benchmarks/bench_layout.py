@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+layout.py as the tile count grows: grid() into one box, paginate() across
+pages, layout.check() of the result, and the municipality tile pages of
+generate_report.py (--muni-pages) built from synthetic tiles.  Time per
+tile should stay flat (linear time).  Every layout is checked for bounds
+and overlap before it is timed.  Page builds are also timed with the
+garbage collector paused: its full collections grow with the live objects
+of a large report, not with the layout.
+
+    python benchmarks/bench_layout.py
+    python benchmarks/bench_layout.py --tiles 1000 --tiles 100000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import generate_report as gr  # noqa: E402
+import layout  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def tile_report(tiles):
+    jobs = [job for job in gr.page_jobs(tiles=tiles) if job[0] is gr.build_tile_page]
+    return [fn(*args) for fn, args in jobs]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="layout engine cost as the tile count grows")
+    ap.add_argument("--tiles", type=int, action="append", default=[], help="tile counts (repeatable)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    big = layout.Box(0, 0, 200_000, 200_000)
+    print(f"{'tiles':>8} {'grid ms':>9} {'paginate ms':>12} {'check ms':>9} {'pages':>6} "
+          f"{'build ms':>9} {'us/tile':>8} {'no-gc us/tile':>14}")
+    for n in args.tiles or [1_741, 17_410, 100_000]:
+        cells = layout.grid(big, n, gap=6, aspect=180 / 64)
+        page_cells, pages = layout.paginate(gr.BODY, n, gr.TILE_W, gr.TILE_H, gr.TILE_GAP)
+        for boxes, bounds in ((cells, big), (page_cells, gr.BODY)):
+            errors = layout.check(boxes, bounds)
+            if errors:
+                raise SystemExit(f"  ERROR: {n} tiles: {errors[0]}")
+        t_grid = best_of(args.repeat, lambda: layout.grid(big, n, gap=6, aspect=180 / 64))
+        t_pages = best_of(args.repeat, lambda: layout.paginate(gr.BODY, n, gr.TILE_W, gr.TILE_H, gr.TILE_GAP))
+        t_check = best_of(args.repeat, lambda: layout.check(cells, big))
+
+        tiles = [(f"{i:06d}", f"自治体 {i}") for i in range(n)]
+        built = tile_report(tiles)
+        errors = gr.validate(gr.build_report(built))
+        if errors:
+            raise SystemExit(f"  ERROR: {n} tiles: {errors[0]}")
+        del built
+        t_build = best_of(1, lambda: tile_report(tiles))
+        gc.disable()
+        try:
+            t_nogc = best_of(1, lambda: tile_report(tiles))
+        finally:
+            gc.enable()
+        print(f"{n:>8,} {t_grid * 1000:>9.2f} {t_pages * 1000:>12.2f} {t_check * 1000:>9.2f} "
+              f"{len(pages):>6,} {t_build * 1000:>9.1f} {t_build / n * 1e6:>8.1f} {t_nogc / n * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare the legacy (one report.json) and PBIR (one file per page/visual)
+output formats: wall time and bytes written for a full write, a rewrite with
+nothing changed, and a rewrite after moving one visual by one pixel.
+
+Each step is timed as a whole generator run (build cache load, build,
+validate, write, cache save), as main() does it.  Scenarios: the current
+two pages, and the synthetic --pages/--visuals report from bench_report.
+
+    python benchmarks/bench_output.py
+    python benchmarks/bench_output.py --pages 50 --visuals 5000 --workers 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import generate_report as gr  # noqa: E402
+from bench_report import synthetic_report  # noqa: E402
+
+
+def nudge_one_visual(report):
+    """Move the first visual of the first page one pixel to the right."""
+    vcs = report["sections"][0]["visualContainers"]
+    vc = dict(vcs[0])
+    cfg = vc["config"].data
+    cfg["layouts"][0]["position"]["x"] += 1
+    vc["config"] = gr.JsonString(cfg)
+    vc["x"] += 1
+    vcs[0] = vc
+
+
+def run(fmt, build, report_dir, workers, nudge=False):
+    """One generator run as main() does it: (seconds, bytes written, files written)."""
+    t0 = time.perf_counter()
+    gr.BUILD_CACHE = gr.BuildCache(os.path.join(report_dir, ".pbi", "build_cache.json"))
+    report = build()
+    if nudge:
+        nudge_one_visual(report)
+    errs = gr.validate(report)
+    if errs:
+        raise SystemExit(f"  ERROR: {errs[0]}")
+    if fmt == "pbir":
+        _, n_files, n_bytes = gr.write_pbir(report, report_dir, workers)
+    else:
+        out = os.path.join(report_dir, "report.json")
+        _, changed = gr.write_report(report, out)
+        n_files, n_bytes = (1, os.path.getsize(out)) if changed else (0, 0)
+    gr.BUILD_CACHE.save()
+    gr.BUILD_CACHE = None
+    return time.perf_counter() - t0, n_bytes, n_files
+
+
+def main():
+    ap = argparse.ArgumentParser(description="legacy vs PBIR output: time and bytes written")
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--visuals", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    scenarios = [
+        ("current", gr.build_report),
+        (f"synthetic {args.pages}p", lambda: synthetic_report(args.pages, args.visuals)),
+    ]
+    print(f"{'scenario':<15} {'format':<7} {'step':<10} {'s':>8} {'bytes written':>14} {'files written':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, build in scenarios:
+            for fmt in ("legacy", "pbir"):
+                report_dir = os.path.join(tmp, f"{label}_{fmt}.Report".replace(" ", "_"))
+                os.makedirs(report_dir)
+                for step, nudge in (("full", False), ("unchanged", False), ("1 visual", True)):
+                    t, n_bytes, n_files = run(fmt, build, report_dir, args.workers, nudge)
+                    print(f"{label:<15} {fmt:<7} {step:<10} {t:>8.3f} {n_bytes:>14,} {n_files:>14,}")
+
+
+if __name__ == "__main__":
+    main()
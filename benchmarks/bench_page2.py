@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cells and query time of page 2 in the matrix and list layouts.
+
+Builds page 2 in each layout (the list at several --budget values) and runs
+its visuals through query_cost against the ingestion output, with no
+slicer selection and with the 都道府県 slicer on one prefecture.  Page
+cells are the sum over every visual of the page, slicers and cards
+included; a list page above its budget is an error.
+
+    python benchmarks/bench_page2.py
+    python benchmarks/bench_page2.py --budget 1000 --budget 5000 --pref 東京都
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import dax  # noqa: E402
+import generate_report as gr  # noqa: E402
+import query_cost  # noqa: E402
+
+
+def page2_report(layout, budget, pref=None):
+    """report.json data holding page 2 only, optionally filtered like the 都道府県 slicer."""
+    report = gr.build_report([gr.build_page2(layout, budget)])
+    if pref is not None:
+        report["filters"] = gr.JsonString([gr.Filter("slicer_pref", gr.column_field("都道府県"), [pref])])
+    return json.loads(gr.encode_report(report))
+
+
+def measure(model, report):
+    """(largest visual, its cells, page cells, page seconds)."""
+    biggest, most, cells, seconds = None, 0, 0, 0.0
+    for _, name, _, projections, pq, ctx in query_cost.iter_queries(report, model):
+        t0 = time.perf_counter()
+        _, n = query_cost.run_query(model, pq, projections, ctx)
+        seconds += time.perf_counter() - t0
+        cells += n
+        if n > most:
+            biggest, most = name, n
+    return biggest, most, cells, seconds
+
+
+def main():
+    ap = argparse.ArgumentParser(description="page 2 cells: matrix vs list layout")
+    ap.add_argument("--data-dir", default=os.path.dirname(HERE))
+    ap.add_argument("--budget", type=int, action="append", default=[], help="list cell budgets (repeatable)")
+    ap.add_argument("--pref", default="北海道", help="prefecture for the filtered scenario")
+    args = ap.parse_args()
+
+    try:
+        model = dax.load_model(dax.DEFAULT_MODEL, args.data_dir)
+    except FileNotFoundError as e:
+        print(f"  ERROR: {e.filename} not found (run ingest.py first)")
+        sys.exit(1)
+    gr.BUILD_CACHE = None
+    modes = [("matrix", gr.CELL_BUDGET)] + [("list", b) for b in args.budget or [500, gr.CELL_BUDGET, 10000]]
+    print(f"{'layout':<14} {'selection':<10} {'largest visual':<14} {'cells':>8} {'page cells':>11} {'ms':>9}")
+    over = []
+    for layout, budget in modes:
+        label = layout if layout == "matrix" else f"list {budget:,}"
+        for pref in (None, args.pref):
+            name, most, cells, seconds = measure(model, page2_report(layout, budget, pref))
+            print(f"{label:<14} {pref or '(all)':<10} {name:<14} {most:>8,} {cells:>11,} {seconds * 1000:>9.1f}")
+            if layout == "list" and cells > budget:
+                over.append(f"{label} {pref or '(all)'}: {cells:,} cells")
+    if over:
+        raise SystemExit("  ERROR: over budget: " + "; ".join(over))
+
+
+if __name__ == "__main__":
+    main()
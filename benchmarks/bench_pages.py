@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Scaling of page construction with the number of page worker processes.
+
+For each worker count, builds every page (generate_report.build_pages),
+wraps them in the report and encodes report.json; with workers the pages
+are built, validated and encoded in the pool, so encoding is counted on
+both sides.  Scenarios: the report with --pref-pages (49 pages), and
+--pages synthetic pages of --per-page visuals from bench_report.
+
+    python benchmarks/bench_pages.py
+    python benchmarks/bench_pages.py --max-workers 8 --pages 200 --per-page 100
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import generate_report as gr  # noqa: E402
+from bench_report import synthetic_page  # noqa: E402
+
+
+def run(jobs, workers):
+    """(seconds, report.json digest) for one build + encode."""
+    t0 = time.perf_counter()
+    pages, _, errors = gr.build_pages(jobs, workers)
+    report = gr.build_report(pages)
+    errors += gr.validate(report)
+    if errors:
+        raise SystemExit(f"  ERROR: {errors[0]}")
+    text = gr.encode_report(report)
+    return time.perf_counter() - t0, hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="page build time vs page workers")
+    ap.add_argument("--max-workers", type=int, default=max(os.cpu_count() or 1, 4))
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--per-page", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    scenarios = [
+        ("prefecture pages", gr.page_jobs(pref_pages=True)),
+        (f"synthetic {args.pages}p", [(synthetic_page, (p, args.per_page)) for p in range(args.pages)]),
+    ]
+    counts = sorted({1, *range(2, args.max_workers + 1, 2), args.max_workers})
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'scenario':<18} {'pages':>6} {'workers':>8} {'s':>8} {'speedup':>8}")
+    for label, jobs in scenarios:
+        base = digest = None
+        for workers in counts:
+            best = float("inf")
+            for _ in range(args.repeat):
+                t, d = run(jobs, workers)
+                best = min(best, t)
+            if digest is None:
+                base, digest = best, d
+            elif d != digest:
+                raise SystemExit(f"  ERROR: {label}: output differs with {workers} workers")
+            print(f"{label:<18} {len(jobs):>6,} {workers:>8} {best:>8.3f} {base / best:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Time report generation: build, validate, serialize and write report.json.
+
+Two pipelines are compared on the same built report:
+  legacy       - every embedded config/filters string encoded eagerly,
+                 validate() re-parsing each with json.loads, the whole report
+                 dumped with indent=2 and parsed again as a round-trip check
+  single-pass  - validate() on the Python objects, then one streaming
+                 encode to disk (generate_report.write_report)
+
+Scenarios: the current two pages, and a synthetic report of --pages pages
+with --visuals visuals in total built from the same visual builders.
+
+    python benchmarks/bench_report.py
+    python benchmarks/bench_report.py --pages 50 --visuals 5000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import generate_report as gr  # noqa: E402
+
+# ============================================================
+# Synthetic report
+# ============================================================
+
+def synthetic_page(p, n_visuals):
+    """One 1920x1080 page of n_visuals visuals cycling through the builders."""
+    v = []
+    for i in range(n_visuals):
+        name = f"s{p:03d}_v{i:04d}"
+        x, y = 20 + (i % 8) * 236, 80 + (i // 8 % 7) * 140
+        kind = i % 5
+        if kind == 0:
+            v.append(gr.pref_card(name, x, y, 228, 125, 0, gr.PREFECTURES[i % len(gr.PREFECTURES)]))
+        elif kind == 1:
+            v.append(gr.card(name, x, y, 228, 55, 1, "子育て介護26手続完了自治体数", font_size=28))
+        elif kind == 2:
+            v.append(gr.textbox(name, x, y, 228, 24, 1, {"paragraphs": [{"textRuns": [{
+                "value": f"テキスト {p}-{i}",
+                "textStyle": {"fontSize": "12px", "color": gr.TEXT_SECONDARY, "fontFamily": "Arial"}}]}]}))
+        elif kind == 3:
+            v.append(gr.shape_bg(name, x, y, 228, 125, 0))
+        else:
+            v.append(gr.slicer(name, x, y, 228, 55, 1, "都道府県", "都道府県で絞り込む"))
+    return gr.page(f"ReportSection_s{p:03d}", f"ページ {p + 1}", p, v)
+
+
+def synthetic_report(pages, visuals):
+    per_page, extra = divmod(visuals, pages)
+    return gr.build_report([synthetic_page(p, per_page + (p < extra)) for p in range(pages)])
+
+# ============================================================
+# Pipelines
+# ============================================================
+
+def materialize(o):
+    """Replace JsonString values by their encoded text, as the builders used to."""
+    if isinstance(o, gr.JsonString):
+        return o.encode()
+    if isinstance(o, dict):
+        return {k: materialize(v) for k, v in o.items()}
+    if isinstance(o, list):
+        return [materialize(v) for v in o]
+    return o
+
+
+def legacy(build, out):
+    report = materialize(build())
+    json.loads(report["config"])
+    for sec in report["sections"]:
+        json.loads(sec["config"])
+        json.loads(sec["filters"])
+        for vc in sec["visualContainers"]:
+            json.loads(vc["config"])
+            json.loads(vc["filters"])
+    s = json.dumps(report, ensure_ascii=False, indent=2)
+    json.loads(s)
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(s)
+    return len(s.encode("utf-8"))
+
+
+def single_pass(build, out):
+    report = build()
+    errs = gr.validate(report)
+    if errs:
+        raise SystemExit(f"  ERROR: {errs[0]}")
+    return gr.write_report(report, out)[0]
+
+
+def best_of(repeat, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="report.json generation timings")
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--visuals", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    scenarios = [
+        ("current (2 pages)", gr.build_report),
+        (f"synthetic ({args.pages} pages)", lambda: synthetic_report(args.pages, args.visuals)),
+    ]
+    print(f"{'scenario':<22} {'visuals':>8} {'bytes':>12} {'legacy s':>9} {'single-pass s':>14} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        out_a, out_b = os.path.join(tmp, "a.json"), os.path.join(tmp, "b.json")
+        for label, build in scenarios:
+            t_old, size = best_of(args.repeat, lambda: legacy(build, out_a))
+            t_new, _ = best_of(args.repeat, lambda: single_pass(build, out_b))
+            with open(out_a, "rb") as fa, open(out_b, "rb") as fb:
+                if fa.read() != fb.read():
+                    raise SystemExit(f"  ERROR: {label}: outputs differ")
+            n_visuals = sum(len(s["visualContainers"]) for s in build()["sections"])
+            print(f"{label:<22} {n_visuals:>8,} {size:>12,} {t_old:>9.3f} {t_new:>14.3f} {t_old / t_new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+The whole pipeline at several scales of synthetic data (synthetic.py),
+with the results written as JSON for regression comparison.
+
+Each --scales entry is MUNICIPALITIES x PROCEDURES.  Per scale, timed:
+
+    generate    synthetic rows through ingest.ingest_rows: data_unpivoted.csv,
+                the 自治体別集計 summary and the status bitsets
+    load        vectorized.load of the CSV
+    evaluate    every measure by 都道府県 and by コード (vectorized.evaluate)
+    bitsets     bitsets.load and the 子育て・介護 completion query
+    search      muni_search index of every municipality
+    build       generate_report pages: page 1, page 2, the 47 prefecture pages
+                and the municipality tile pages of the summary
+    validate    validate() of the report
+    serialize   encode_report() of the report
+    html        export_html bundle_files (with --html; one page per municipality)
+
+Stages needing NumPy are skipped without it.  Each stage is timed once
+(best of --repeat for the report stages, which are cheap).  The JSON has
+the row, page and visual counts and the report bytes with every timing, so
+that two runs can be compared: --baseline prints each stage's time against
+an earlier result file for the same scales.
+
+    python benchmarks/bench_scale.py
+    python benchmarks/bench_scale.py --scales 1741x50,17410x50,1741x100 -o scale.json
+    python benchmarks/bench_scale.py --baseline scale.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import bitsets  # noqa: E402
+import generate_report as gr  # noqa: E402
+import muni_search  # noqa: E402
+import synthetic  # noqa: E402
+import vectorized as vz  # noqa: E402
+
+RESULT_VERSION = 1
+DEFAULT_SCALES = "500x50,1741x50,1741x100,17410x50"
+DEFAULT_OUT = "bench_scale.json"
+
+
+def parse_scales(text):
+    scales = []
+    for part in text.split(","):
+        m, _, p = part.strip().lower().partition("x")
+        scales.append((int(m), int(p or synthetic.DEFAULT_PROCEDURES)))
+    return scales
+
+
+class Timer:
+    """Stage timings in ms, in run order."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, name, fn, repeat=1):
+        best, result = float("inf"), None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        self.stages[name] = round(best * 1000, 3)
+        return result
+
+
+def run_scale(n_munis, n_procs, args, tmp):
+    timer = Timer()
+    out_dir = os.path.join(tmp, f"{n_munis}x{n_procs}")
+    paths = timer("generate", lambda: synthetic.generate(out_dir, n_munis, n_procs, args.seed,
+                                                         bitsets=vz.np is not None))
+    result = {"municipalities": n_munis, "procedures": n_procs, "rows": paths["rows"],
+              "csv_bytes": os.path.getsize(paths["csv"])}
+    t = None
+    if vz.np is not None:
+        t = timer("load", lambda: vz.load(paths["csv"]))
+        timer("evaluate", lambda: [vz.evaluate(t, by) for by in (("都道府県",), ("コード",))])
+        timer("bitsets", lambda: bitsets.load(paths["bitsets"]).completed())
+        timer("search", lambda: muni_search.from_table(t))
+
+    tiles = gr.muni_tiles(paths["summary"])
+    jobs = gr.page_jobs("cards", True, "matrix", gr.CELL_BUDGET, False, tiles)
+    sections = timer("build", lambda: gr.build_pages(jobs)[0], args.repeat)
+    report = gr.build_report(sections)
+    errors = timer("validate", lambda: gr.validate(report), args.repeat)
+    if errors:
+        raise SystemExit(f"  ERROR: {n_munis}x{n_procs}: {errors[0]}")
+    text = timer("serialize", lambda: gr.encode_report(report), args.repeat)
+    result.update(pages=len(sections), visuals=sum(len(s["visualContainers"]) for s in sections),
+                  report_bytes=len(text.encode("utf-8")))
+    if args.html and t is not None:
+        import export_html
+        files = timer("html", lambda: export_html.bundle_files(t))
+        result["html_files"] = len(files)
+    result["stages_ms"] = timer.stages
+    return result
+
+
+def compare(results, baseline):
+    """Lines of each stage's time against the baseline's result for the same scale."""
+    old = {(r["municipalities"], r["procedures"]): r for r in baseline["results"]}
+    lines = []
+    for r in results:
+        b = old.get((r["municipalities"], r["procedures"]))
+        if b is None:
+            continue
+        cells = [f"{stage} {ms / b['stages_ms'][stage]:.2f}x" for stage, ms in r["stages_ms"].items()
+                 if b["stages_ms"].get(stage)]
+        lines.append(f"  {r['municipalities']:,}x{r['procedures']}: " + ", ".join(cells))
+    return lines
+
+
+def main():
+    ap = argparse.ArgumentParser(description="pipeline stages at several synthetic data scales, as JSON")
+    ap.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated MUNICIPALITIESxPROCEDURES")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3, help="runs of the report stages (best is kept)")
+    ap.add_argument("--html", action="store_true", help="also time the static HTML bundle")
+    ap.add_argument("-o", "--out", default=DEFAULT_OUT, help="JSON results file")
+    ap.add_argument("--baseline", default=None, metavar="JSON", help="an earlier results file to compare with")
+    args = ap.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if vz.np is None:
+        print("  numpy not installed: load / evaluate / bitsets / search / html skipped")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_munis, n_procs in parse_scales(args.scales):
+            r = run_scale(n_munis, n_procs, args, tmp)
+            results.append(r)
+            stages = ", ".join(f"{k} {v:,.0f}" for k, v in r["stages_ms"].items())
+            print(f"{n_munis:>7,} x {n_procs:<4} {r['rows']:>10,} rows {r['pages']:>4} pages "
+                  f"{r['visuals']:>7,} visuals | ms: {stages}")
+
+    data = {
+        "version": RESULT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": vz.np.__version__ if vz.np is not None else None,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"OK: {args.out}")
+    if baseline is not None:
+        print(f"against {args.baseline}:")
+        for line in compare(results, baseline) or ["  no scale in common"]:
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
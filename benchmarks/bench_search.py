@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+muni_search.py lookups per second: the sorted-key index (binary search,
+then a walk over the keys sharing the prefix) against a linear scan of
+every municipality's keys.
+
+Queries are prefixes of 1 to 4 characters of a random municipality's
+団体名, reading (katakana, as typed with an IME), Hepburn romaji and
+kunrei romaji, drawn with a fixed seed; both sides answer the same
+queries with the same limit and must return the same municipalities.
+Also reported: the time to build the index from data_unpivoted.csv and to
+load the prebuilt data_muni_search.json.
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --queries 20000 --limit 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import unicodedata
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import muni_search as ms  # noqa: E402
+
+KUNREI = (("shi", "si"), ("chi", "ti"), ("tsu", "tu"), ("fu", "hu"), ("ji", "zi"), ("sh", "sy"), ("ch", "ty"))
+
+
+def kunrei(r):
+    for hepburn, k in KUNREI:
+        r = r.replace(hepburn, k)
+    return r
+
+
+def queries(index, n, seed=0):
+    """{kind: n queries} of the mix."""
+    rnd = random.Random(seed)
+    forms = {
+        "団体名": lambda e: e[2],
+        "カナ": lambda e: unicodedata.normalize("NFKC", e[3]),
+        "romaji": lambda e: ms.romaji(ms.to_hiragana(unicodedata.normalize("NFKC", e[3]))),
+        "kunrei": lambda e: kunrei(ms.romaji(ms.to_hiragana(unicodedata.normalize("NFKC", e[3])))),
+    }
+    out = {}
+    for kind, form in forms.items():
+        out[kind] = []
+        for _ in range(n):
+            text = form(rnd.choice(index.entries))
+            out[kind].append(text[:rnd.randint(1, min(4, len(text)))])
+    return out
+
+
+def rate(fn, qs, limit):
+    t0 = time.perf_counter()
+    results = [fn(q, limit) for q in qs]
+    return time.perf_counter() - t0, results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="muni_search.py index vs linear scan: lookups/sec")
+    ap.add_argument("--csv", default=ms.DEFAULT_CSV)
+    ap.add_argument("--queries", type=int, default=2_000, help="queries per kind")
+    ap.add_argument("--limit", type=int, default=ms.DEFAULT_LIMIT)
+    args = ap.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"  ERROR: {args.csv} not found (run ingest.py first)")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    index = ms.from_csv(args.csv)
+    t_build = time.perf_counter() - t0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.json")
+        ms.save(index, path)
+        t0 = time.perf_counter()
+        ms.load(path)
+        t_load = time.perf_counter() - t0
+    index.scan("あ")    # groups the keys per entry for scan(), outside the timings
+
+    print(f"{len(index):,} municipalities, {len(index.keys):,} keys; "
+          f"build {t_build * 1000:.0f} ms, load {t_load * 1000:.1f} ms")
+    print(f"{'query':<8} {'index /s':>11} {'µs':>7} {'scan /s':>9} {'µs':>9} {'speedup':>8}")
+    for kind, qs in queries(index, args.queries).items():
+        t_index, got = rate(index.search, qs, args.limit)
+        t_scan, ref = rate(index.scan, qs, args.limit)
+        for q, a, b in zip(qs, got, ref):
+            if a != b:
+                raise SystemExit(f"  ERROR: {q!r}: index and scan disagree")
+        print(f"{kind:<8} {len(qs) / t_index:>11,.0f} {t_index / len(qs) * 1e6:>7.1f} "
+              f"{len(qs) / t_scan:>9,.0f} {t_scan / len(qs) * 1e6:>9.1f} {t_scan / t_index:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
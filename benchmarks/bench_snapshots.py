@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Delta rebuild (snapshots.py) against a full rebuild of the derived outputs,
+for a synthetic next release in which --changed municipalities put every
+unfinished 子育て・介護 procedure online.
+
+Timed per step: diff of the two snapshots (delta only), 自治体別集計 (the
+same full recompute from the snapshot on both sides: 表示順 ranks every
+municipality) and the HTML bundle (render + write every page vs index.html
+and the changed prefectures' and municipalities' pages).  After each delta
+the HTML bundle is compared with the full rebuild's.  Ingesting the long
+table is common to both and not timed here.
+
+    python benchmarks/bench_snapshots.py
+    python benchmarks/bench_snapshots.py --changed 10 --changed 500
+"""
+
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import bitsets  # noqa: E402
+import export_html  # noqa: E402
+import ingest  # noqa: E402
+import snapshots  # noqa: E402
+import vectorized as vz  # noqa: E402
+
+np = bitsets.np
+
+
+def next_bits(bits, n):
+    """bits with the first n municipalities having unfinished care procedures completed."""
+    care = bits.mask(bits.care_procedures())
+    unfinished = ~(bits.online | bits.na) & care
+    rows = np.flatnonzero(unfinished.any(axis=1))[:n]
+    online = bits.online.copy()
+    online[rows] |= unfinished[rows]
+    return bitsets.StatusBits(bits.codes, bits.prefectures, bits.names, bits.procedures,
+                              bits.subcategories, online, bits.na)
+
+
+def next_release(bits, t, n):
+    """(bits, table) of next_bits(bits, n), the long table changed to match."""
+    new_bits = next_bits(bits, n)
+    changed = ((new_bits.online ^ bits.online).any(axis=1))
+    codes = set(bits.codes[changed].tolist())
+    muni, cats = t.codes("コード"), t.categories("コード")
+    hit = np.array([c in codes for c in cats], dtype=bool)[muni] & t.care & (t.status == -1)
+    status = t.status.copy()
+    status[hit] = 1
+    columns = dict(t.columns)
+    s_codes, s_cats = columns["オンライン化状況"]
+    s_codes = s_codes.copy()
+    s_codes[hit] = s_cats.index(bitsets.STATUS_ONLINE)
+    columns["オンライン化状況"] = (s_codes, s_cats)
+    return new_bits, vz.Table(columns, status)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def same_tree(a, b):
+    cmp = filecmp.dircmp(a, b)
+    stack = [cmp]
+    while stack:
+        c = stack.pop()
+        if c.left_only or c.right_only or filecmp.cmpfiles(c.left, c.right, c.common_files, shallow=False)[1]:
+            return False
+        stack.extend(c.subdirs.values())
+    return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="delta vs full rebuild of the derived outputs")
+    ap.add_argument("--csv", default=bitsets.DEFAULT_CSV)
+    ap.add_argument("--changed", type=int, action="append", default=[],
+                    help="municipalities changed in the next release (repeatable)")
+    ap.add_argument("--scale", type=int, default=10, help="also time the diff on snapshots tiled this many times")
+    args = ap.parse_args()
+
+    if np is None:
+        print("  ERROR: bench_snapshots.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    old_bits = bitsets.from_csv(args.csv)
+    old_t = vz.load(args.csv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_html = os.path.join(tmp, "old_html")
+        export_html.write_bundle(export_html.bundle_files(old_t), old_html)
+
+        print(f"{'changed':>8} {'cells':>7} {'pages':>6} {'step':<10} {'full s':>8} {'delta s':>8} {'speedup':>8}")
+        for n in args.changed or [10, 100, 580]:
+            new_bits, new_t = next_release(old_bits, old_t, n)
+
+            tracemalloc.start()
+            delta, t_diff = timed(lambda: snapshots.diff(old_bits, new_bits))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            summary = os.path.join(tmp, "summary.csv")
+            _, t_summary = timed(lambda: ingest.write_summary(snapshots.summary_entries(new_bits), summary))
+
+            full_html = os.path.join(tmp, "full_html")
+            delta_html = os.path.join(tmp, "delta_html")
+            for d in (full_html, delta_html):
+                shutil.rmtree(d, ignore_errors=True)
+                shutil.copytree(old_html, d)
+            _, h_full = timed(lambda: export_html.write_bundle(export_html.bundle_files(new_t), full_html))
+            _, h_delta = timed(lambda: export_html.write_bundle(
+                export_html.bundle_files(new_t, prefectures=delta.prefectures, codes=delta.codes()), delta_html, remove=[]))
+            if not same_tree(full_html, delta_html):
+                raise SystemExit(f"  ERROR: {n} changed: delta HTML bundle differs from the full rebuild")
+            pages = 1 + len(delta.prefectures) + len(delta.codes())
+
+            cells = len(delta.changes)
+            for step, full, part in (("diff", None, t_diff), ("summary", t_summary, t_summary), ("html", h_full, h_delta)):
+                speedup = f"{full / part:>7.1f}x" if full else f"{peak / 1024:>5.0f} KB"
+                print(f"{n:>8,} {cells:>7,} {pages:>6,} {step:<10} {full or 0:>8.3f} {part:>8.3f} {speedup:>8}")
+            total_full, total_delta = t_summary + h_full, t_diff + t_summary + h_delta
+            print(f"{n:>8,} {cells:>7,} {pages:>6,} {'total':<10} {total_full:>8.3f} {total_delta:>8.3f} "
+                  f"{total_full / total_delta:>7.1f}x")
+
+    # The diff alone as the snapshots grow: linear time, memory of a few masks
+    print(f"{'munis':>8} {'changed':>8} {'diff ms':>8} {'peak KB':>8}")
+    for k in sorted({1, args.scale}):
+        old = old_bits.tile(k)
+        new = next_bits(old, len(old) // 3)
+        tracemalloc.start()
+        delta, t_diff = timed(lambda: snapshots.diff(old, new))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{len(old):>8,} {len(delta.codes()):>8,} {t_diff * 1000:>8.1f} {peak / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
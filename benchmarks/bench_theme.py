@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+report.json with every visual's full formatting against the same report
+written against the theme's visualStyles (generate_report.py --theme-styles).
+
+The report is every page generate_report.py can build: page 1 and page 2,
+the 47 prefecture pages and the trend page, plus the municipality tile
+pages with --muni-pages.  Measured per --page1 layout: bytes of report.json
+and of the theme file, and the time to load the report as Power BI reads
+it: report.json parsed, then the config and filters strings embedded in
+every page and visual.  Every visual is checked to render as with its full
+formatting (theme_check) before the numbers are printed.
+
+    python benchmarks/bench_theme.py
+    python benchmarks/bench_theme.py --muni-pages --repeat 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import generate_report as gr  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def load(text):
+    """report.json text parsed the way Power BI reads it, embedded strings included."""
+    report = json.loads(text)
+    json.loads(report["config"])
+    for sec in report["sections"]:
+        json.loads(sec["config"])
+        json.loads(sec["filters"])
+        for vc in sec["visualContainers"]:
+            json.loads(vc["config"])
+            json.loads(vc["filters"])
+
+
+def build(jobs, defaults):
+    gr.set_theme(defaults)
+    try:
+        return [fn(*args) for fn, args in jobs]
+    finally:
+        gr.set_theme(None)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="full per-visual formatting vs theme visualStyles: size and load time")
+    ap.add_argument("--muni-pages", action="store_true", help="add the municipality tile pages")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    base = gr.load_theme(os.path.join(gr.DEFAULT_REPORT_DIR, gr.THEME_REL))
+    theme = gr.theme_with_styles(base)
+    base_text, theme_text = gr.encode_theme(base).encode(), gr.encode_theme(theme).encode()
+    tiles = gr.muni_tiles() if args.muni_pages else None
+
+    print(f"theme file: {len(base_text):,} -> {len(theme_text):,} bytes ({len(theme_text) - len(base_text):+,})")
+    print(f"{'page1':<8} {'visuals':>8} {'full KB':>9} {'themed KB':>10} {'saved':>6} "
+          f"{'full load ms':>13} {'themed load ms':>15} {'saved':>6}")
+    for layout in gr.PAGE1_LAYOUTS:
+        jobs = gr.page_jobs(layout, True, "matrix", gr.CELL_BUDGET, True, tiles)
+        full = build(jobs, None)
+        themed = build(jobs, gr.theme_defaults(theme))
+        errors = gr.theme_check(full, themed, gr.theme_defaults(base), gr.theme_defaults(theme))
+        if errors:
+            raise SystemExit(f"  ERROR: {layout}: {errors[0]}")
+        texts = [gr.encode_report(gr.build_report(sections)) for sections in (full, themed)]
+        sizes = [len(t.encode()) for t in texts]
+        loads = [best_of(args.repeat, lambda: load(t)) for t in texts]
+        visuals = sum(len(sec["visualContainers"]) for sec in full)
+        print(f"{layout:<8} {visuals:>8,} {sizes[0] / 1024:>9,.1f} {sizes[1] / 1024:>10,.1f} "
+              f"{1 - sizes[1] / sizes[0]:>6.0%} {loads[0] * 1000:>13.2f} {loads[1] * 1000:>15.2f} "
+              f"{1 - loads[1] / loads[0]:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Time vectorized.evaluate() for every grouping on the real table and on the
+table tiled --scale times (as many times as many municipalities), with and
+without the page-2 サブカテゴリ filter.
+
+    python benchmarks/bench_vectorized.py
+    python benchmarks/bench_vectorized.py --scale 10 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import vectorized as vz  # noqa: E402
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="vectorized measure evaluation timings")
+    ap.add_argument("--data", default=None)
+    ap.add_argument("--scale", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if vz.np is None:
+        print("  ERROR: bench_vectorized.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    base = vz.load(args.data)
+    print(f"loaded {base.n:,} rows in {time.perf_counter() - t0:.2f}s")
+
+    tables = [("x1", base)]
+    if args.scale > 1:
+        tables.append((f"x{args.scale}", base.tile(args.scale)))
+    care = {"サブカテゴリ": set(vz.CARE_SUBCATEGORIES)}
+    print(f"{'data':<6} {'rows':>10} {'grouping':<12} {'filter':<10} {'groups':>8} {'ms':>9}")
+    for label, t in tables:
+        for grouping, by in vz.GROUPINGS.items():
+            for fname, filters in (("none", {}), ("care", care)):
+                n_groups = len(vz.evaluate(t, by, filters)["keys"])
+                s = best_of(args.repeat, lambda: vz.evaluate(t, by, filters))
+                print(f"{label:<6} {t.n:>10,} {grouping:<12} {fname:<10} {n_groups:>8,} {s * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Per-municipality procedure status as packed bitmasks, with set queries.
+
+ingest.py --bitsets writes data_status_bits.npz: for every municipality two
+bitmasks over a fixed procedure index (the 手続名 in survey order), one bit
+set per procedure that is online (○) and one per procedure that does not
+apply (ー).  A procedure in neither mask is not online yet.  The masks are
+rows of uint64 words, so the queries below are a few bitwise operations
+over NumPy arrays instead of scans of the long table:
+
+    python bitsets.py --lacking 妊娠の届出 [--pref 北海道]   # who has not put X online
+    python bitsets.py --missing-in 北海道                  # procedures missing per prefecture
+    python bitsets.py --complete 妊娠の届出 --complete 支給認定の申請
+                                                           # completion under a procedure subset
+    python bitsets.py --check                              # compare with data_unpivoted.csv
+
+--complete without procedures uses the 子育て・介護 procedures, which is the
+完了フラグ of 自治体別集計.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # the bitsets are optional; ingest.py needs them only for --bitsets
+    np = None
+
+from measures import CARE_SUBCATEGORIES, STATUS_NA, STATUS_ONLINE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BITS = os.path.join(HERE, "data_status_bits.npz")
+DEFAULT_CSV = os.path.join(HERE, "data_unpivoted.csv")
+
+# ============================================================
+# Encoding
+# ============================================================
+
+class Collector:
+    """Gathers long rows into per-municipality statuses, in first-seen order."""
+
+    def __init__(self):
+        self.municipalities = {}    # コード -> (都道府県, 団体名, {手続名: status})
+        self.procedures = {}        # 手続名 -> サブカテゴリ
+
+    def add(self, code, prefecture, name, subcategory, procedure, status):
+        m = self.municipalities.get(code)
+        if m is None:
+            m = self.municipalities[code] = (prefecture, name, {})
+        m[2][procedure] = status
+        self.procedures.setdefault(procedure, subcategory)
+
+    def build(self):
+        procedures = list(self.procedures)
+        index = {p: i for i, p in enumerate(procedures)}
+        n, p = len(self.municipalities), len(procedures)
+        online = np.zeros((n, p), dtype=bool)
+        na = np.zeros((n, p), dtype=bool)
+        for i, (_, _, statuses) in enumerate(self.municipalities.values()):
+            for procedure, status in statuses.items():
+                if status == STATUS_ONLINE:
+                    online[i, index[procedure]] = True
+                elif status == STATUS_NA:
+                    na[i, index[procedure]] = True
+        return StatusBits(
+            np.array(list(self.municipalities)),
+            np.array([m[0] for m in self.municipalities.values()]),
+            np.array([m[1] for m in self.municipalities.values()]),
+            np.array(procedures),
+            np.array(list(self.procedures.values())),
+            pack(online),
+            pack(na),
+        )
+
+
+def pack(flags):
+    """(n, p) bool -> (n, words) uint64, procedure j at bit j % 64 of word j // 64."""
+    n, p = flags.shape
+    words = np.zeros((n, (p + 63) // 64), dtype=np.uint64)
+    for j in range(p):
+        words[:, j // 64] |= flags[:, j].astype(np.uint64) << np.uint64(j % 64)
+    return words
+
+
+def unpack(words, p):
+    """(n, words) uint64 -> (n, p) bool."""
+    as_bytes = np.ascontiguousarray(words, dtype="<u8").view(np.uint8)
+    return np.unpackbits(as_bytes, axis=1, bitorder="little")[:, :p].astype(bool)
+
+# ============================================================
+# Queries
+# ============================================================
+
+class StatusBits:
+    """online / not-applicable bitmasks per municipality over a fixed procedure index."""
+
+    def __init__(self, codes, prefectures, names, procedures, subcategories, online, na):
+        self.codes = codes                  # コード per row
+        self.prefectures = prefectures      # 都道府県 per row
+        self.names = names                  # 団体名 per row
+        self.procedures = procedures        # 手続名 per bit
+        self.subcategories = subcategories  # サブカテゴリ per bit
+        self.online = online                # (municipalities, words) uint64
+        self.na = na
+        self.index = {p: i for i, p in enumerate(procedures.tolist())}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def mask(self, procedures):
+        """One row of words with the bits of procedures set."""
+        flags = np.zeros((1, len(self.procedures)), dtype=bool)
+        for p in procedures:
+            if p not in self.index:
+                raise KeyError(f"unknown 手続名 {p!r}")
+            flags[0, self.index[p]] = True
+        return pack(flags)[0]
+
+    def care_procedures(self):
+        return [p for p, s in zip(self.procedures.tolist(), self.subcategories.tolist()) if s in CARE_SUBCATEGORIES]
+
+    def unfinished(self, procedures):
+        """Per municipality, the bits of procedures neither online nor not applicable."""
+        return ~(self.online | self.na) & self.mask(procedures)
+
+    def rows(self, prefecture=None):
+        """Row selection (a slice for all municipalities)."""
+        return slice(None) if prefecture is None else self.prefectures == prefecture
+
+    def lacking(self, procedure, prefecture=None):
+        """コード of the municipalities where procedure is not online yet."""
+        sel = self.rows(prefecture)
+        unfinished = self.unfinished([procedure])[sel]
+        return self.codes[sel][unfinished.any(axis=1)].tolist()
+
+    def missing_in(self, prefecture, procedures=None):
+        """{手続名: municipalities of prefecture without it online}, nonzero counts only."""
+        procedures = self.procedures.tolist() if procedures is None else procedures
+        unfinished = self.unfinished(procedures)[self.rows(prefecture)]
+        counts = unpack(unfinished, len(self.procedures)).sum(axis=0)
+        return {p: int(c) for p, c in zip(self.procedures.tolist(), counts) if c}
+
+    def completed(self, procedures=None, prefecture=None):
+        """コード of the municipalities with every procedure (default: 子育て・介護)
+        online or not applicable."""
+        procedures = self.care_procedures() if procedures is None else procedures
+        sel = self.rows(prefecture)
+        unfinished = self.unfinished(procedures)[sel]
+        return self.codes[sel][~unfinished.any(axis=1)].tolist()
+
+    def tile(self, k):
+        """The bitsets repeated k times as k times as many municipalities (for benchmarks)."""
+        codes = np.concatenate([self.codes] + [np.char.add(self.codes, f"#{i}") for i in range(1, k)])
+        return StatusBits(
+            codes, np.tile(self.prefectures, k), np.tile(self.names, k), self.procedures,
+            self.subcategories, np.tile(self.online, (k, 1)), np.tile(self.na, (k, 1)),
+        )
+
+# ============================================================
+# Loading / saving
+# ============================================================
+
+def save(bits, path):
+    np.savez(
+        path, codes=bits.codes, prefectures=bits.prefectures, names=bits.names,
+        procedures=bits.procedures, subcategories=bits.subcategories, online=bits.online, na=bits.na,
+    )
+
+
+def load(path=DEFAULT_BITS):
+    with np.load(path) as f:
+        return StatusBits(
+            f["codes"], f["prefectures"], f["names"], f["procedures"], f["subcategories"], f["online"], f["na"],
+        )
+
+
+def from_csv(path=DEFAULT_CSV):
+    """StatusBits straight from data_unpivoted.csv."""
+    c = Collector()
+    with open(path, encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            c.add(r["コード"], r["都道府県"], r["団体名"], r["サブカテゴリ"], r["手続名"], r["オンライン化状況"])
+    return c.build()
+
+# ============================================================
+# Checks
+# ============================================================
+
+def check(bits, rows):
+    """Compare the queries with row scans of the long table. Returns (errors, n)."""
+    import measures
+
+    errors = []
+    n = 0
+    lacking = {}
+    for r in rows:
+        if r["オンライン化状況"] == measures.STATUS_NONE:
+            lacking.setdefault(r["手続名"], set()).add(r["コード"])
+    for p in bits.procedures.tolist():
+        n += 1
+        got = set(bits.lacking(p))
+        if got != lacking.get(p, set()):
+            errors.append(f"lacking {p}: {len(got ^ lacking.get(p, set()))} codes differ")
+
+    summary = measures.summarize(rows)
+    expected = {code for code, s in summary.items() if s["完了フラグ"]}
+    n += 1
+    if set(bits.completed()) != expected:
+        errors.append(f"completed: {len(set(bits.completed()) ^ expected)} codes differ from 完了フラグ")
+
+    for pref in sorted(set(bits.prefectures.tolist())):
+        expected = {}
+        for r in rows:
+            if r["都道府県"] == pref and r["オンライン化状況"] == measures.STATUS_NONE:
+                expected[r["手続名"]] = expected.get(r["手続名"], 0) + 1
+        n += 1
+        if bits.missing_in(pref) != expected:
+            errors.append(f"missing_in {pref}: counts differ")
+    return errors, n
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Set queries over per-municipality status bitmasks")
+    ap.add_argument("--bits", default=DEFAULT_BITS, help="bitsets written by ingest.py --bitsets")
+    ap.add_argument("--lacking", metavar="手続名", help="municipalities where this procedure is not online")
+    ap.add_argument("--missing-in", metavar="都道府県", help="procedures not online in this prefecture")
+    ap.add_argument("--complete", action="append", metavar="手続名", nargs="?", const=None,
+                    help="municipalities with these procedures online (repeatable; bare: 子育て・介護)")
+    ap.add_argument("--pref", default=None, help="restrict --lacking / --complete to one prefecture")
+    ap.add_argument("--check", action="store_true", help="compare with row scans of data_unpivoted.csv")
+    args = ap.parse_args(argv)
+
+    if np is None:
+        print("  ERROR: bitsets.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    if not os.path.exists(args.bits):
+        print(f"  ERROR: {args.bits} not found (run ingest.py --bitsets first)")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    bits = load(args.bits)
+    print(f"{len(bits):,} municipalities x {len(bits.procedures)} procedures, "
+          f"{bits.online.nbytes + bits.na.nbytes:,} bytes of masks, loaded in {time.perf_counter() - t0:.2f}s")
+
+    if args.check:
+        import measures
+        errs, n = check(bits, measures.load_rows(DEFAULT_CSV))
+        if errs:
+            for e in errs[:50]:
+                print(f"  ERROR: {e}")
+            sys.exit(1)
+        print(f"OK: {n} queries match data_unpivoted.csv")
+        return
+
+    if not (args.lacking or args.missing_in or args.complete is not None):
+        ap.error("one of --lacking, --missing-in, --complete or --check is required")
+    procedures = [p for p in args.complete or () if p] or None
+    try:
+        t0 = time.perf_counter()
+        if args.lacking:
+            result = bits.lacking(args.lacking, args.pref)
+        elif args.missing_in:
+            result = bits.missing_in(args.missing_in)
+        else:
+            result = bits.completed(procedures, args.pref)
+        t_query = time.perf_counter() - t0
+    except KeyError as e:
+        print(f"  ERROR: {e.args[0]}")
+        sys.exit(1)
+
+    if args.missing_in:
+        for p, count in sorted(result.items(), key=lambda kv: -kv[1]):
+            print(f"  {count:>5,} {p}")
+    else:
+        label = args.lacking or f"{len(procedures or bits.care_procedures())} procedures complete"
+        print(f"{label}: {len(result):,} municipalities")
+        names = dict(zip(bits.codes.tolist(), zip(bits.prefectures.tolist(), bits.names.tolist())))
+        for code in result[:50]:
+            print(f"  {code} {names[code][0]} {names[code][1]}")
+    print(f"  query {t_query * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
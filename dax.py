@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Evaluate the DAX that generate_model.py emits against the ingestion output.
+
+Covers the subset the generator uses: VAR/RETURN, measure references,
+CALCULATE with column predicates and KEEPFILTERS, COUNTROWS, SUM,
+DISTINCTCOUNT, SELECTEDVALUE, DIVIDE, IF, SWITCH, ISBLANK, BLANK, NOT,
+ROW/UNION for calculated tables, and the arithmetic, comparison, IN and &
+operators.  Anything else raises NotImplementedError rather than guessing.
+
+A filter context is a dict {(table, column): conditions}, where conditions is
+a tuple of ("in", frozenset) / ("cmp", op, literal) entries ANDed together.
+Relationships from model.bim propagate filters one hop, in both directions
+when crossFilteringBehavior is bothDirections.
+
+    python dax.py "オンライン化率" --filter 都道府県=北海道
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL = os.path.join(HERE, "26_administrative_procedures_online.SemanticModel", "model.bim")
+FACT_TABLE_DEFAULT = "オンライン化状況"
+
+# ============================================================
+# Parser
+# ============================================================
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+|--[^\n]*|//[^\n]*)
+  | (?P<str>"(?:[^"]|"")*")
+  | (?P<table>'(?:[^']|'')*')
+  | (?P<col>\[[^\]]*\])
+  | (?P<num>\d+(?:\.\d+)?)
+  | (?P<op><>|<=|>=|==|&&|\|\||[-+*/=<>&(),{}])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+""", re.X)
+
+COMPARISONS = ("=", "==", "<>", "<", ">", "<=", ">=")
+
+
+def tokenize(text):
+    pos, out = 0, []
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m:
+            raise SyntaxError(f"unexpected {text[pos:pos + 20]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        val = m.group()
+        if kind == "str":
+            val = val[1:-1].replace('""', '"')
+        elif kind == "table":
+            val = val[1:-1].replace("''", "'")
+        elif kind == "col":
+            val = val[1:-1]
+        elif kind == "num":
+            val = float(val) if "." in val else int(val)
+        elif kind == "name":
+            val = val.upper() if val.upper() in ("VAR", "RETURN", "IN", "NOT") else val
+        out.append((kind, val))
+    out.append(("eof", None))
+    return out
+
+
+class Parser:
+    """Recursive descent parser producing tuple ASTs."""
+
+    def __init__(self, text):
+        self.toks = tokenize(text)
+        self.i = 0
+
+    def peek(self, k=0):
+        return self.toks[self.i + k]
+
+    def take(self, kind=None, val=None):
+        tok = self.toks[self.i]
+        if (kind and tok[0] != kind) or (val is not None and tok[1] != val):
+            raise SyntaxError(f"expected {val or kind}, got {tok[1]!r}")
+        self.i += 1
+        return tok
+
+    def at(self, kind, val=None):
+        tok = self.toks[self.i]
+        return tok[0] == kind and (val is None or tok[1] == val)
+
+    def parse(self):
+        node = self.expr()
+        self.take("eof")
+        return node
+
+    def expr(self):
+        if self.at("name", "VAR"):
+            binds = []
+            while self.at("name", "VAR"):
+                self.take()
+                name = self.take("name")[1]
+                self.take("op", "=")
+                binds.append((name, self.expr()))
+            self.take("name", "RETURN")
+            return ("let", tuple(binds), self.expr())
+        return self.logical()
+
+    def logical(self):
+        node = self.negation()
+        while self.at("op", "&&") or self.at("op", "||"):
+            op = self.take()[1]
+            node = ("binop", op, node, self.negation())
+        return node
+
+    def negation(self):
+        if self.at("name", "NOT"):
+            self.take()
+            return ("not", self.negation())
+        return self.comparison()
+
+    def comparison(self):
+        node = self.concat()
+        while True:
+            if self.peek()[0] == "op" and self.peek()[1] in COMPARISONS:
+                op = self.take()[1]
+                node = ("binop", op, node, self.concat())
+            elif self.at("name", "IN"):
+                self.take()
+                node = ("in", node, self.primary())
+            else:
+                return node
+
+    def concat(self):
+        node = self.additive()
+        while self.at("op", "&"):
+            self.take()
+            node = ("binop", "&", node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.term()
+        while self.at("op", "+") or self.at("op", "-"):
+            op = self.take()[1]
+            node = ("binop", op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.at("op", "*") or self.at("op", "/"):
+            op = self.take()[1]
+            node = ("binop", op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.at("op", "-"):
+            self.take()
+            return ("neg", self.unary())
+        if self.at("op", "+"):
+            self.take()
+        return self.primary()
+
+    def args(self, close=")"):
+        out = []
+        if not self.at("op", close):
+            out.append(self.expr())
+            while self.at("op", ","):
+                self.take()
+                out.append(self.expr())
+        self.take("op", close)
+        return tuple(out)
+
+    def primary(self):
+        kind, val = self.take()
+        if kind in ("num", "str"):
+            return ("lit", val)
+        if kind == "op" and val == "(":
+            node = self.expr()
+            self.take("op", ")")
+            return node
+        if kind == "op" and val == "{":
+            return ("set", self.args("}"))
+        if kind == "table":
+            if self.at("col"):
+                return ("col", val, self.take()[1])
+            return ("table", val)
+        if kind == "col":
+            return ("measure", val)
+        if kind == "name":
+            if self.at("op", "("):
+                self.take()
+                return ("call", val.upper(), self.args())
+            return ("var", val)
+        raise SyntaxError(f"unexpected {val!r}")
+
+
+def parse(expression):
+    if isinstance(expression, list):
+        expression = "\n".join(expression)
+    return Parser(expression).parse()
+
+# ============================================================
+# Values
+# ============================================================
+
+def _num(v):
+    return 0 if v is None else v
+
+
+def _text(v):
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def compare(op, a, b):
+    """DAX comparison: BLANK equals 0 and "" except under ==."""
+    if op == "==":
+        return a == b
+    if a is None and b is None:
+        a = b = 0
+    elif a is None:
+        a = "" if isinstance(b, str) else 0
+    elif b is None:
+        b = "" if isinstance(a, str) else 0
+    if isinstance(a, str) != isinstance(b, str):
+        a, b = _text(a), _text(b)
+    if op == "=":
+        return a == b
+    if op == "<>":
+        return a != b
+    if op == "<":
+        return a < b
+    if op == ">":
+        return a > b
+    if op == "<=":
+        return a <= b
+    if op == ">=":
+        return a >= b
+    raise NotImplementedError(op)
+
+
+def _test(cond, v):
+    if cond[0] == "in":
+        return v in cond[1]
+    return compare(cond[1], v, cond[2])
+
+# ============================================================
+# Model
+# ============================================================
+
+class Model:
+    """Tables, measures and relationships of a model.bim, with data loaded."""
+
+    def __init__(self, bim, data_dir):
+        self.tables = {}        # name -> list of row dicts
+        self.measures = {}      # name -> AST
+        self.measure_table = {}
+        self.relationships = [
+            (r["fromTable"], r["fromColumn"], r["toTable"], r["toColumn"],
+             r.get("crossFilteringBehavior") == "bothDirections")
+            for r in bim["model"].get("relationships", [])
+        ]
+        self._index = {}
+        for t in bim["model"]["tables"]:
+            for m in t.get("measures", []):
+                self.measures[m["name"]] = parse(m["expression"])
+                self.measure_table[m["name"]] = t["name"]
+        for t in bim["model"]["tables"]:
+            self.tables[t["name"]] = self._load(t, data_dir)
+
+    def _load(self, table, data_dir):
+        source = table["partitions"][0]["source"]
+        if source["type"] == "calculated":
+            return self.evaluate_table(parse(source["expression"]))
+        expr = "\n".join(source["expression"]) if isinstance(source["expression"], list) else source["expression"]
+        ints = {c["name"] for c in table["columns"] if c["dataType"] == "int64"}
+        folder = re.search(r'Folder\.Files\("([^"]+)"\)', expr)
+        if folder:
+            # Every partition's file of that name (history.py), oldest first
+            import pyarrow.parquet as pq
+            name = re.search(r'\[Name\] = "([^"]+)"', expr).group(1)
+            paths = sorted(glob.glob(os.path.join(data_dir, folder.group(1), "*", name)))
+            if not paths:
+                raise FileNotFoundError(2, "no partitions", os.path.join(data_dir, folder.group(1)))
+            rows = [r for p in paths for r in pq.read_table(p).to_pylist()]
+            return [{k: ("" if v is None and k not in ints else v) for k, v in r.items()} for r in rows]
+        path = os.path.join(data_dir, re.search(r'File\.Contents\("([^"]+)"\)', expr).group(1))
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            rows = pq.read_table(path).to_pylist()
+            return [{k: ("" if v is None and k not in ints else v) for k, v in r.items()} for r in rows]
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        for r in rows:
+            for c in ints:
+                r[c] = int(r[c]) if r[c] != "" else None
+        return rows
+
+    def index(self, table, column):
+        """{value: set of row ids} for table[column], built on first use."""
+        key = (table, column)
+        idx = self._index.get(key)
+        if idx is None:
+            idx = {}
+            for i, r in enumerate(self.tables[table]):
+                idx.setdefault(r[column], set()).add(i)
+            self._index[key] = idx
+        return idx
+
+    # --------------------------------------------------------
+    # Filter context
+    # --------------------------------------------------------
+
+    def _own_ids(self, table, ctx):
+        filters = [(column, conds) for (t, column), conds in ctx.items() if t == table]
+        if not filters:
+            return None
+        data = self.tables[table]
+
+        def size(item):
+            column, conds = item
+            members = [c[1] for c in conds if c[0] == "in"]
+            if not members:
+                return len(data)
+            idx = self.index(table, column)
+            return sum(len(idx.get(v, ())) for v in min(members, key=len))
+
+        # Resolve the most selective filter through the index, then test the
+        # surviving rows against the rest directly
+        filters.sort(key=size)
+        column, conds = filters[0]
+        idx = self.index(table, column)
+        members = [c[1] for c in conds if c[0] == "in"]
+        ids = set()
+        for v in (min(members, key=len) if members else idx.keys()):
+            rows = idx.get(v)
+            if rows and all(_test(c, v) for c in conds):
+                ids |= rows
+        for column, conds in filters[1:]:
+            ids = {i for i in ids if all(_test(c, data[i][column]) for c in conds)}
+        return ids
+
+    def row_ids(self, table, ctx):
+        """Row ids of table visible under ctx (None means all rows)."""
+        ids = self._own_ids(table, ctx)
+        for from_t, from_c, to_t, to_c, both in self.relationships:
+            if table == from_t:
+                other, other_col, col, ok = to_t, to_c, from_c, True
+            elif table == to_t:
+                other, other_col, col, ok = from_t, from_c, to_c, both
+            else:
+                continue
+            if not ok:
+                continue
+            other_ids = self._own_ids(other, ctx)
+            if other_ids is None:
+                continue
+            rows = self.tables[other]
+            keys = {rows[i][other_col] for i in other_ids}
+            idx = self.index(table, col)
+            match = set().union(*(idx.get(k, ()) for k in keys)) if keys else set()
+            ids = match if ids is None else ids & match
+        return ids
+
+    def rows(self, table, ctx):
+        ids = self.row_ids(table, ctx)
+        rows = self.tables[table]
+        return rows if ids is None else [rows[i] for i in ids]
+
+    # --------------------------------------------------------
+    # Evaluation
+    # --------------------------------------------------------
+
+    def evaluate(self, measure, filters=None):
+        """Value of measure under filters ({(table, column): values or conditions})."""
+        return self.eval(("measure", measure), make_context(filters), {})
+
+    def eval(self, node, ctx, env):
+        kind = node[0]
+        if kind == "lit":
+            return node[1]
+        if kind == "var":
+            return env[node[1]]
+        if kind == "let":
+            env = dict(env)
+            for name, expr in node[1]:
+                env[name] = self.eval(expr, ctx, env)
+            return self.eval(node[2], ctx, env)
+        if kind == "measure":
+            return self.eval(self.measures[node[1]], ctx, {})
+        if kind == "neg":
+            v = self.eval(node[1], ctx, env)
+            return None if v is None else -v
+        if kind == "not":
+            return not self.eval(node[1], ctx, env)
+        if kind == "binop":
+            return self._binop(node, ctx, env)
+        if kind == "in":
+            v = self.eval(node[1], ctx, env)
+            return any(compare("=", v, self.eval(x, ctx, env)) for x in node[2][1])
+        if kind == "call":
+            return self._call(node[1], node[2], ctx, env)
+        raise NotImplementedError(f"cannot evaluate {kind} as a scalar")
+
+    def _binop(self, node, ctx, env):
+        _, op, left, right = node
+        a, b = self.eval(left, ctx, env), self.eval(right, ctx, env)
+        if op in COMPARISONS:
+            return compare(op, a, b)
+        if op == "&":
+            return _text(a) + _text(b)
+        if op == "&&":
+            return bool(a) and bool(b)
+        if op == "||":
+            return bool(a) or bool(b)
+        if a is None and b is None:
+            return None
+        if op == "+":
+            return _num(a) + _num(b)
+        if op == "-":
+            return _num(a) - _num(b)
+        if op == "*":
+            return _num(a) * _num(b)
+        if op == "/":
+            return _num(a) / _num(b)
+        raise NotImplementedError(op)
+
+    def _column_values(self, node, ctx):
+        if node[0] != "col":
+            raise NotImplementedError(f"expected a column reference, got {node[0]}")
+        return [r[node[2]] for r in self.rows(node[1], ctx)]
+
+    def _call(self, fn, args, ctx, env):
+        if fn == "BLANK":
+            return None
+        if fn == "ISBLANK":
+            return self.eval(args[0], ctx, env) is None
+        if fn == "NOT":
+            return not self.eval(args[0], ctx, env)
+        if fn == "IF":
+            if self.eval(args[0], ctx, env):
+                return self.eval(args[1], ctx, env)
+            return self.eval(args[2], ctx, env) if len(args) > 2 else None
+        if fn == "SWITCH":
+            v = self.eval(args[0], ctx, env)
+            for k in range(1, len(args) - 1, 2):
+                if compare("=", v, self.eval(args[k], ctx, env)):
+                    return self.eval(args[k + 1], ctx, env)
+            return self.eval(args[-1], ctx, env) if len(args) % 2 == 0 else None
+        if fn == "DIVIDE":
+            a, b = self.eval(args[0], ctx, env), self.eval(args[1], ctx, env)
+            if not b:
+                return self.eval(args[2], ctx, env) if len(args) > 2 else None
+            return None if a is None else a / b
+        if fn == "COUNTROWS":
+            if args[0][0] != "table":
+                raise NotImplementedError("COUNTROWS over a table expression")
+            n = len(self.rows(args[0][1], ctx))
+            return n or None
+        if fn == "SUM":
+            vals = [v for v in self._column_values(args[0], ctx) if v is not None]
+            return sum(vals) if vals else None
+        if fn == "DISTINCTCOUNT":
+            n = len(set(self._column_values(args[0], ctx)))
+            return n or None
+        if fn == "SELECTEDVALUE":
+            vals = set(self._column_values(args[0], ctx))
+            if len(vals) == 1:
+                return vals.pop()
+            return self.eval(args[1], ctx, env) if len(args) > 1 else None
+        if fn == "CALCULATE":
+            inner = dict(ctx)
+            for arg in args[1:]:
+                keep = arg[0] == "call" and arg[1] == "KEEPFILTERS"
+                col, cond = _predicate(arg[2][0] if keep else arg, self, ctx, env)
+                inner[col] = inner.get(col, ()) + (cond,) if keep else (cond,)
+            return self.eval(args[0], inner, env)
+        raise NotImplementedError(f"DAX function {fn}")
+
+    def evaluate_table(self, node):
+        """Calculated tables: UNION of ROW(...) only."""
+        if node[0] == "call" and node[1] == "ROW":
+            a = node[2]
+            return [{a[k][1]: a[k + 1][1] for k in range(0, len(a), 2)}]
+        if node[0] == "call" and node[1] == "UNION":
+            return [r for arg in node[2] for r in self.evaluate_table(arg)]
+        raise NotImplementedError("calculated table expression")
+
+
+def _predicate(node, model, ctx, env):
+    """CALCULATE filter argument 'T'[c] <op> value / 'T'[c] IN {...} -> (column, condition)."""
+    if node[0] == "binop" and node[1] in COMPARISONS and node[2][0] == "col":
+        return (node[2][1], node[2][2]), ("cmp", node[1], model.eval(node[3], ctx, env))
+    if node[0] == "in" and node[1][0] == "col":
+        values = frozenset(model.eval(x, ctx, env) for x in node[2][1])
+        return (node[1][1], node[1][2]), ("in", values)
+    raise NotImplementedError("CALCULATE filter must be a simple column predicate")
+
+
+def make_context(filters):
+    """Normalize {(table, column): values | conditions} into a filter context."""
+    ctx = {}
+    for key, spec in (filters or {}).items():
+        if isinstance(spec, tuple) and spec and isinstance(spec[0], tuple):
+            ctx[key] = spec
+        else:
+            ctx[key] = (("in", frozenset(spec)),)
+    return ctx
+
+
+def load_model(bim_path=DEFAULT_MODEL, data_dir=HERE):
+    import json
+    with open(bim_path, encoding="utf-8") as f:
+        return Model(json.load(f), data_dir)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Evaluate a model.bim measure against the ingestion output")
+    ap.add_argument("measure")
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--data-dir", default=HERE)
+    ap.add_argument("--table", default=FACT_TABLE_DEFAULT, help="table the --filter columns belong to")
+    ap.add_argument("--filter", action="append", default=[], metavar="COLUMN=VALUE")
+    args = ap.parse_args(argv)
+
+    model = load_model(args.model, args.data_dir)
+    if args.measure not in model.measures:
+        print(f"  ERROR: unknown measure {args.measure!r}")
+        sys.exit(1)
+    filters = {}
+    for f in args.filter:
+        col, _, val = f.partition("=")
+        filters.setdefault((args.table, col), set()).add(val)
+    print(model.evaluate(args.measure, filters))
+
+
+if __name__ == "__main__":
+    main()
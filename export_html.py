@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""
+Export the dashboard as a static HTML+SVG bundle, with no query engine.
+
+The pages are the ones generate_report.py builds: every visual's position,
+colors, texts and query are read from build_page1()/build_page2(), and the
+measures they select are filled in from vectorized.py (one evaluate() per
+query shape, shared by every page).  Page 2 is rendered once per
+prefecture and once per municipality, as if its 都道府県 / 団体名 slicers
+were set:
+
+    index.html          page 1 (national); prefecture cards link to
+    pref/01.html ...    page 2 for one prefecture (JIS order); the matrix
+                        column headers link to
+    muni/<コード>.html  page 2 for one municipality
+    muni_index.html     every municipality by the 50音 row of its reading
+                        (muni_search.py), linking to its page
+    style.css
+
+Files whose bytes did not change are not rewritten, so the bundle can be
+served with long cache lifetimes and re-synced cheaply.
+
+    python export_html.py
+    python export_html.py -o site --page1 grouped
+
+Requires NumPy (vectorized.py).
+"""
+
+import argparse
+import html
+import json
+import math
+import os
+import sys
+import time
+
+import dax
+import generate_report as gr
+import muni_search
+import query_cost
+import vectorized as vz
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(HERE, "html")
+
+STYLE = f"""\
+body {{ margin: 0; background: {gr.BG_PAGE}; color: {gr.TEXT_PRIMARY}; font-family: Arial, sans-serif; }}
+.page {{ position: relative; overflow: hidden; }}
+.v {{ position: absolute; box-sizing: border-box; overflow: hidden; }}
+.v p {{ margin: 0; }}
+a {{ color: inherit; text-decoration: none; }}
+a:hover {{ text-decoration: underline; }}
+.title {{ margin-bottom: 4px; }}
+.card, .slicer {{ display: flex; flex-direction: column; justify-content: center; }}
+.card .value {{ text-align: center; }}
+.slicer .box {{ border: 1px solid {gr.NEUTRAL_GRAY}; border-radius: 4px; padding: 6px; }}
+.pivotTable {{ overflow: auto; }}
+.pivotTable table {{ border-collapse: collapse; white-space: nowrap; }}
+.pivotTable th, .pivotTable td {{ padding: 2px 8px; text-align: left; border-bottom: 1px solid {gr.NEUTRAL_GRAY}; }}
+.pivotTable thead th {{ position: sticky; top: 0; background: {gr.BG_VISUAL}; color: {gr.TEXT_SECONDARY}; }}
+.pivotTable td {{ text-align: center; }}
+.index {{ max-width: 960px; margin: 0 auto; padding: 16px; }}
+.index nav a {{ margin-right: 12px; font-size: 18px; }}
+.index h2 {{ border-bottom: 1px solid {gr.NEUTRAL_GRAY}; color: {gr.TEXT_SECONDARY}; }}
+.index ul {{ columns: 4; list-style: none; padding: 0; }}
+.index li {{ margin: 2px 0; }}
+.index .pref {{ color: {gr.TEXT_SECONDARY}; font-size: 12px; margin-left: 4px; }}
+"""
+
+# ============================================================
+# Reading the builders' output
+# ============================================================
+
+def literal(v):
+    """A lit()/solid_color() property as a Python value."""
+    if "solid" in v:
+        v = v["solid"]["color"]
+    value = v["expr"]["Literal"]["Value"]
+    if value.startswith(("{", "[")):    # embedded JSON (textbox paragraphs)
+        return json.loads(value)
+    return query_cost.literal(value)
+
+
+def prop(objects, name, key, default=None):
+    """Property key of the first objects[name] entry, or default."""
+    try:
+        v = objects[name][0]["properties"][key]
+    except (KeyError, IndexError):
+        return default
+    return literal(v)
+
+
+def split_filters(filters):
+    """(base, keys) of filter definitions: multi-value filters as {column: values},
+    single-value ones as {column: value} (the slicer-like selections)."""
+    base, keys = {}, {}
+    for (_, column), conds in query_cost.filter_context(filters).items():
+        for c in conds:
+            if c[0] != "in":
+                raise NotImplementedError(f"{column}: {c[1]} comparison")
+            if len(c[1]) == 1:
+                keys[column] = next(iter(c[1]))
+            else:
+                base[column] = set(c[1])
+    return base, keys
+
+
+def load_formats(path=dax.DEFAULT_MODEL):
+    """{measure: formatString} from model.bim."""
+    with open(path, encoding="utf-8") as f:
+        model = json.load(f)
+    return {
+        m["name"]: m.get("formatString")
+        for t in model["model"]["tables"] for m in t.get("measures", [])
+    }
+
+
+def format_value(v, fmt):
+    """A measure value with its model.bim format string (#,##0 / 0 / 0% / 0.0%); BLANK as ''."""
+    if v is None:
+        return ""
+    if isinstance(v, str) or not fmt:
+        return str(v)
+    if fmt.endswith("%"):
+        decimals = len(fmt[:-1].partition(".")[2])
+        return f"{v * 100:.{decimals}f}%"
+    return f"{v:,.0f}" if "," in fmt else f"{v:.0f}"
+
+# ============================================================
+# Measure values
+# ============================================================
+
+class Cubes:
+    """evaluate() results keyed on (base filters, key columns, group columns).
+
+    Every page asks for the same few query shapes with different key values
+    (one per prefecture or municipality), so each shape is evaluated once for
+    all key values and indexed by them.
+    """
+
+    def __init__(self, t):
+        self.t = t
+        self.cubes = {}
+
+    def query(self, base, keys, columns):
+        """(result, [(column values, group index)]) visible under base and keys."""
+        kcols = tuple(sorted(keys))
+        ck = (tuple(sorted((c, frozenset(v)) for c, v in base.items())), kcols, tuple(columns))
+        n = len(kcols)
+        if ck not in self.cubes:
+            result = vz.evaluate(self.t, kcols + tuple(columns), base)
+            index = {}
+            for i, key in enumerate(result["keys"]):
+                index.setdefault(key[:n], []).append(i)
+            self.cubes[ck] = result, index
+        result, index = self.cubes[ck]
+        groups = index.get(tuple(keys[c] for c in kcols), [])
+        return result, [(result["keys"][i][n:], i) for i in groups]
+
+
+class Site:
+    """File names of the bundle's pages, relative to the bundle root."""
+
+    def __init__(self, t):
+        _, _, keys = vz.group_index(t, ("都道府県", "団体名", "コード"))
+        self.codes = {(pref, name): code for pref, name, code in keys}
+
+    def pref_file(self, pref):
+        return f"pref/{gr.PREFECTURES.index(pref) + 1:02d}.html"
+
+    def muni_file(self, pref, name):
+        return f"muni/{self.codes[pref, name]}.html"
+
+    def file_for(self, column, value, known):
+        """The page for a 都道府県 / 団体名 value (known: other column values), or None."""
+        if column == "都道府県" and value in gr.PREFECTURES:
+            return self.pref_file(value)
+        if column == "団体名" and (known.get("都道府県"), value) in self.codes:
+            return self.muni_file(known["都道府県"], value)
+        return None
+
+
+class Scope:
+    """The filter context of one visual on one page."""
+
+    def __init__(self, ctx, base, keys, own_keys, root):
+        self.ctx = ctx
+        self.base = base
+        self.keys = keys
+        self.own_keys = own_keys    # selected by the visual's own filters
+        self.root = root
+
+    def value(self, measure):
+        result, groups = self.ctx.cubes.query(self.base, self.keys, ())
+        return vz.value(result, measure, groups[0][1]) if groups else None
+
+    def groups(self, columns, measures):
+        """[(column values, {measure: value})] for the groups of columns."""
+        result, groups = self.ctx.cubes.query(self.base, self.keys, columns)
+        return [(key, {m: vz.value(result, m, i) for m in measures}) for key, i in groups]
+
+    def format(self, measure, v):
+        return format_value(v, self.ctx.formats.get(measure))
+
+    def href(self, column, value, known=None):
+        f = self.ctx.site.file_for(column, value, dict(self.keys, **(known or {})))
+        return self.root + f if f else None
+
+
+def link(text, href):
+    text = html.escape(str(text))
+    return f'<a href="{html.escape(href)}">{text}</a>' if href else text
+
+# ============================================================
+# Visuals
+# ============================================================
+
+def box_style(vco):
+    """CSS for the vcObjects background / border / padding of a visual."""
+    css = []
+    if prop(vco, "background", "show"):
+        css.append(f"background:{prop(vco, 'background', 'color', gr.BG_VISUAL)}")
+    if prop(vco, "border", "show"):
+        css.append(f"border:1px solid {prop(vco, 'border', 'color', gr.BORDER_VISUAL)}")
+        css.append(f"border-radius:{prop(vco, 'border', 'radius', 0)}px")
+    if "padding" in vco:
+        css.append("padding:" + " ".join(f"{prop(vco, 'padding', s, 0):g}px" for s in ("top", "right", "bottom", "left")))
+    return css
+
+
+def title_html(vco):
+    if not prop(vco, "title", "show"):
+        return ""
+    weight = "bold" if prop(vco, "title", "bold") else "normal"
+    return (f'<div class="title" style="font-size:{prop(vco, "title", "fontSize", 12):g}pt;'
+            f'color:{prop(vco, "title", "fontColor", gr.TEXT_PRIMARY)};font-weight:{weight}">'
+            f'{html.escape(str(prop(vco, "title", "text", "")))}</div>')
+
+
+def render_textbox(sv, scope):
+    paragraphs = prop(sv["objects"], "general", "paragraphs")
+    out = []
+    for p in paragraphs["paragraphs"]:
+        runs = []
+        for r in p["textRuns"]:
+            st = r.get("textStyle", {})
+            css = ";".join(f"{k}:{st[s]}" for s, k in (
+                ("fontSize", "font-size"), ("color", "color"),
+                ("fontWeight", "font-weight"), ("fontFamily", "font-family")) if s in st)
+            runs.append(f'<span style="{css}">{html.escape(r["value"]) or "&nbsp;"}</span>')
+        align = p.get("horizontalTextAlignment", "left")
+        out.append(f'<p style="text-align:{align}">{"".join(runs)}</p>')
+    return [], "".join(out)
+
+
+def render_shape(sv, scope):
+    o = sv["objects"]
+    css = [
+        f"background:{prop(o, 'fill', 'fillColor', gr.BG_VISUAL)}",
+        f"border:{prop(o, 'line', 'weight', 1):g}px solid {prop(o, 'line', 'lineColor', gr.BORDER_VISUAL)}",
+        f"border-radius:{prop(o, 'line', 'roundEdge', 0)}px",
+    ]
+    return css, ""
+
+
+def render_action_button(sv, scope):
+    o = sv["objects"]
+    dest = scope.ctx.page_files.get(prop(o, "action", "destination"))
+    text = (f'<div style="font-size:{prop(o, "text", "fontSize", 12):g}pt;color:{prop(o, "text", "fontColor", gr.TEXT_PRIMARY)};'
+            f'text-align:{prop(o, "text", "alignment", "Left").lower()}">'
+            f'{link(prop(o, "text", "text", ""), scope.root + dest if dest else None)}</div>')
+    return [], text
+
+
+def render_card(sv, scope):
+    measure = sv["prototypeQuery"]["Select"][0]["Measure"]["Property"]
+    o, vco = sv.get("objects", {}), sv.get("vcObjects", {})
+    text = scope.format(measure, scope.value(measure))
+    pref = scope.own_keys.get("都道府県")
+    value = (f'<div class="value" style="font-size:{prop(o, "labels", "fontSize", 27):g}pt;'
+             f'color:{prop(o, "labels", "color", gr.TEXT_PRIMARY)}">{html.escape(text) or "&nbsp;"}</div>')
+    body = title_html(vco) + value
+    href = scope.href("都道府県", pref) if pref is not None else None
+    if href:
+        body = f'<a href="{html.escape(href)}">{body}</a>'
+    return box_style(vco), body
+
+
+def render_slicer(sv, scope):
+    column = sv["prototypeQuery"]["Select"][0]["Column"]["Property"]
+    selected = scope.keys.get(column)
+    text = link(selected, scope.href(column, selected)) if selected is not None else "すべて"
+    size = prop(sv.get("objects", {}), "items", "textSize", 12)
+    return box_style(sv.get("vcObjects", {})), (
+        f'{title_html(sv.get("vcObjects", {}))}<div class="box" style="font-size:{size:g}pt">{text}</div>')
+
+
+def render_donut(sv, scope, w, h):
+    """The ring with one arc per category and the first category's share in the middle."""
+    q, o = sv["prototypeQuery"], sv.get("objects", {})
+    measure = next(s["Measure"]["Property"] for s in q["Select"] if "Measure" in s)
+    fills = {}
+    for dp in o.get("dataPoint", []):
+        cmp = dp["selector"]["data"][0]["scopeId"]["Comparison"]
+        fills[query_cost.literal(cmp["Right"]["Literal"]["Value"])] = literal(dp["properties"]["fill"])
+    # 完了状況 is a disconnected table; vectorized.py evaluates 完了状況値 per row of it
+    values = [(s, scope.value(f"{measure}[{s}]") or 0) for s in vz.COMPLETION_STATUSES]
+    total = sum(v for _, v in values)
+    size = min(w, h)
+    ratio = prop(o, "slices", "innerRadiusRatio", 50) / 100
+    r = size / 2 * (1 + ratio) / 2
+    stroke = size / 2 * (1 - ratio)
+    circ = 2 * math.pi * r
+    arcs, offset = [], 0.0
+    for s, v in values:
+        length = circ * v / total if total else 0
+        arcs.append(f'<circle cx="{size / 2:g}" cy="{size / 2:g}" r="{r:.2f}" fill="none" '
+                    f'stroke="{fills.get(s, gr.NEUTRAL_GRAY)}" stroke-width="{stroke:.2f}" '
+                    f'stroke-dasharray="{length:.2f} {circ - length:.2f}" stroke-dashoffset="{-offset:.2f}" '
+                    f'transform="rotate(-90 {size / 2:g} {size / 2:g})"/>')
+        offset += length
+    share = f"{values[0][1] / total:.0%}" if total else ""
+    label = (f'<text x="50%" y="50%" text-anchor="middle" dominant-baseline="central" '
+             f'font-size="{prop(o, "labels", "fontSize", 12):g}pt" fill="{prop(o, "labels", "color", gr.TEXT_PRIMARY)}">{share}</text>')
+    return [], (f'<svg width="{size:g}" height="{size:g}" viewBox="0 0 {size:g} {size:g}" role="img">'
+                f'{"".join(arcs)}{label}</svg>')
+
+
+def render_pivot(sv, scope):
+    """A table: Rows down, Columns across (one cell per row x column), else one column per value."""
+    q, o = sv["prototypeQuery"], sv.get("objects", {})
+    select = {s["Name"]: s for s in q["Select"]}
+    proj = sv["projections"]
+
+    def refs(role, kind):
+        return [select[p["queryRef"]][kind]["Property"] for p in proj.get(role, [])]
+
+    rows, cols, values = refs("Rows", "Column"), refs("Columns", "Column"), refs("Values", "Measure")
+    groups = scope.groups(rows + cols, values)
+    order = q.get("OrderBy")
+    if order and "Measure" in order[0]["Expression"]:
+        m = order[0]["Expression"]["Measure"]["Property"]
+        groups.sort(key=lambda g: -math.inf if g[1][m] is None else g[1][m], reverse=order[0]["Direction"] == 2)
+    else:
+        groups.sort(key=lambda g: g[0])
+
+    cell = f'font-size:{prop(o, "values", "fontSize", 10):g}pt;color:{prop(o, "values", "fontColor", gr.TEXT_PRIMARY)}'
+    head = f'font-size:{prop(o, "columnHeaders", "fontSize", 10):g}pt;color:{prop(o, "columnHeaders", "fontColor", gr.TEXT_SECONDARY)}'
+
+    def row_headers(key, prev):
+        out = []
+        for j, (c, v) in enumerate(zip(rows, key)):
+            shown = "" if prev is not None and prev[:j + 1] == key[:j + 1] else link(v, scope.href(c, v))
+            out.append(f"<th>{shown}</th>")
+        return "".join(out)
+
+    n = len(rows)
+    if cols:
+        col_keys = sorted({g[0][n:] for g in groups})
+        grid = {g[0]: g[1][values[0]] for g in groups}
+        row_keys = list(dict.fromkeys(g[0][:n] for g in groups))
+        header = "".join(f"<th>{html.escape(c)}</th>" for c in rows) + "".join(
+            f"<th>{link(' '.join(k), scope.href(cols[-1], k[-1]))}</th>" for k in col_keys)
+        body, prev = [], None
+        for rk in row_keys:
+            tds = "".join(f"<td>{html.escape(scope.format(values[0], grid.get(rk + ck)))}</td>" for ck in col_keys)
+            body.append(f"<tr>{row_headers(rk, prev)}{tds}</tr>")
+            prev = rk
+    else:
+        header = "".join(f"<th>{html.escape(c)}</th>" for c in rows + values)
+        body, prev = [], None
+        for key, vals in groups:
+            tds = "".join(f"<td>{html.escape(scope.format(m, vals[m]))}</td>" for m in values)
+            body.append(f"<tr>{row_headers(key, prev)}{tds}</tr>")
+            prev = key
+    return box_style(sv.get("vcObjects", {})), (
+        f'<table><thead><tr style="{head}">{header}</tr></thead>'
+        f'<tbody style="{cell}">{"".join(body)}</tbody></table>')
+
+
+RENDERERS = {
+    "textbox": render_textbox,
+    "shape": render_shape,
+    "actionButton": render_action_button,
+    "card": render_card,
+    "slicer": render_slicer,
+    "donutChart": render_donut,
+    "pivotTable": render_pivot,
+}
+
+# Rendered once per page, whatever the scope
+STATIC_VISUALS = {"textbox", "shape", "actionButton"}
+
+# ============================================================
+# Pages
+# ============================================================
+
+class Context:
+    def __init__(self, t, report, formats):
+        self.cubes = Cubes(t)
+        self.site = Site(t)
+        self.formats = formats
+        self.page_files = {report["sections"][0]["name"]: "index.html"}
+
+
+def prepare(ctx, section, root):
+    """A section's visuals decoded once, with the scope-independent ones pre-rendered."""
+    base, keys = split_filters(section["filters"].data)
+    visuals = []
+    for vc in sorted(section["visualContainers"], key=lambda vc: vc["z"]):
+        cfg = vc["config"].data
+        sv = cfg["singleVisual"]
+        vbase, vkeys = split_filters(vc["filters"].data)
+        pos = cfg["layouts"][0]["position"]
+        v = {
+            "type": sv["visualType"], "sv": sv, "pos": pos,
+            "base": dict(base, **vbase), "keys": dict(keys, **vkeys), "own_keys": vkeys, "html": None,
+        }
+        if v["type"] in STATIC_VISUALS:
+            v["html"] = render_visual(ctx, v, {}, root)
+        visuals.append(v)
+    return {
+        "title": section["displayName"],
+        "background": prop(section["config"].data.get("objects", {}), "background", "color", gr.BG_PAGE),
+        "width": section["width"],
+        "height": section["height"],
+        "visuals": visuals,
+        "root": root,
+    }
+
+
+def render_visual(ctx, v, keys, root):
+    pos = v["pos"]
+    render = RENDERERS.get(v["type"])
+    if render is None:
+        raise NotImplementedError(f"visual type {v['type']}")
+    scope = Scope(ctx, v["base"], dict(keys, **v["keys"]), v["own_keys"], root)
+    if v["type"] == "donutChart":
+        css, body = render(v["sv"], scope, pos["width"], pos["height"])
+    else:
+        css, body = render(v["sv"], scope)
+    style = ";".join([f"left:{pos['x']:g}px", f"top:{pos['y']:g}px",
+                      f"width:{pos['width']:g}px", f"height:{pos['height']:g}px"] + css)
+    return f'<div class="v {v["type"]}" style="{style}">{body}</div>'
+
+
+def render_page(ctx, page, keys, subtitle=None):
+    """One page's HTML with the slicer-like selections keys ({column: value})."""
+    root = page["root"]
+    body = "\n".join(v["html"] or render_visual(ctx, v, keys, root) for v in page["visuals"])
+    title = page["title"] + (f" - {subtitle}" if subtitle else "")
+    return (
+        '<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{html.escape(title)}</title>\n"
+        f'<link rel="stylesheet" href="{root}style.css">\n</head>\n<body>\n'
+        f'<div class="page" style="width:{page["width"]:g}px;height:{page["height"]:g}px;background:{page["background"]}">\n'
+        f"{body}\n</div>\n</body>\n</html>\n"
+    )
+
+
+def render_muni_index(index, site):
+    """muni_index.html: every municipality of index by the 50音 row of its reading."""
+    rows = index.by_row()
+    nav = " ".join(f'<a href="#{row}">{row}</a>' for row in rows)
+    sections = []
+    for row, entries in rows.items():
+        items = "\n".join(
+            f'<li>{link(name, site.muni_file(pref, name))}<span class="pref">{html.escape(pref)}</span></li>'
+            for code, pref, name, reading in entries
+        )
+        sections.append(f'<h2 id="{row}">{row}</h2>\n<ul>\n{items}\n</ul>')
+    body = "\n".join(sections)
+    return (
+        '<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="utf-8">\n'
+        "<title>団体名索引</title>\n"
+        '<link rel="stylesheet" href="style.css">\n</head>\n<body>\n'
+        f'<div class="index">\n<p>{link("全国", "index.html")}</p>\n<nav>{nav}</nav>\n{body}\n</div>\n</body>\n</html>\n'
+    )
+
+
+def bundle_files(t, page1="cards", prefectures=None, codes=None):
+    """(path relative to the bundle, text) for every file of the bundle.
+
+    With prefectures / codes, only index.html, muni_index.html and the
+    pages of those prefectures and municipality コード (a delta rebuild).
+    A prefecture's and its municipalities' pages depend on the prefecture's
+    rows only, so they are then evaluated on those rows alone.
+    """
+    report = gr.build_report(page1=page1)
+    ctx = Context(t, report, load_formats())
+    home = prepare(ctx, report["sections"][0], "")
+    files = [("style.css", STYLE), ("index.html", render_page(ctx, home, {})),
+             ("muni_index.html", render_muni_index(muni_search.from_table(t), ctx.site))]
+    if prefectures is not None:
+        ctx = Context(t.take(t.mask({"都道府県": set(prefectures)})), report, ctx.formats)
+    detail = prepare(ctx, report["sections"][1], "../")
+    for pref in gr.PREFECTURES:
+        if prefectures is None or pref in prefectures:
+            files.append((ctx.site.pref_file(pref), render_page(ctx, detail, {"都道府県": pref}, pref)))
+    for (pref, name), code in ctx.site.codes.items():
+        if codes is None or code in codes:
+            files.append((ctx.site.muni_file(pref, name),
+                          render_page(ctx, detail, {"都道府県": pref, "団体名": name}, f"{pref} {name}")))
+    return files
+
+
+def write_bundle(files, out_dir, remove=None):
+    """Write the bundle. Returns (files written, bytes written).
+
+    Stale pages from earlier runs are removed; for a partial bundle, pass
+    the pages to remove (paths relative to the bundle) instead.
+    """
+    written = [gr.write_if_changed(os.path.join(out_dir, rel), text.encode("utf-8")) for rel, text in files]
+    if remove is not None:
+        for rel in remove:
+            path = os.path.join(out_dir, rel)
+            if os.path.exists(path):
+                os.remove(path)
+        return sum(1 for n in written if n), sum(written)
+    keep = {os.path.normpath(os.path.join(out_dir, rel)) for rel, _ in files}
+    for sub in ("pref", "muni"):
+        folder = os.path.join(out_dir, sub)
+        for n in os.listdir(folder):
+            path = os.path.normpath(os.path.join(folder, n))
+            if path not in keep:
+                os.remove(path)
+    return sum(1 for n in written if n), sum(written)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export the dashboard as static HTML+SVG pages")
+    ap.add_argument("-o", "--out-dir", default=DEFAULT_OUT)
+    ap.add_argument("--data", default=None, help="data_unpivoted.parquet or .csv (default: whichever exists)")
+    ap.add_argument("--page1", choices=gr.PAGE1_LAYOUTS, default="cards")
+    args = ap.parse_args(argv)
+
+    if vz.np is None:
+        print("  ERROR: export_html.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    try:
+        t = vz.load(args.data)
+    except FileNotFoundError as e:
+        print(f"  ERROR: {e.filename} not found (run ingest.py first)")
+        sys.exit(1)
+    t1 = time.perf_counter()
+    files = bundle_files(t, args.page1)
+    t2 = time.perf_counter()
+    n_written, n_bytes = write_bundle(files, args.out_dir)
+    t3 = time.perf_counter()
+
+    size = sum(len(text.encode("utf-8")) for _, text in files)
+    print(f"OK: {args.out_dir}")
+    print(f"  {len(files) - 1} pages (1 + index + {len(gr.PREFECTURES)} prefectures + {len(files) - 3 - len(gr.PREFECTURES):,} municipalities), "
+          f"{size:,} bytes; {n_written} files / {n_bytes:,} bytes written")
+    print(f"  load {t1 - t0:.2f}s, render {t2 - t1:.2f}s, write {t3 - t2:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Generate model.bim for the オンライン化状況 semantic model.
+
+Tables:
+  オンライン化状況 - long table (municipality x procedure) loaded from the
+                     ingestion output (data_unpivoted.csv or .parquet)
+  自治体別集計     - one row per municipality, precomputed by ingest.py, with
+                     the unfinished childcare/care procedure count, a
+                     completed flag, the 26 statuses as one string (状況一覧)
+                     and an unfinished-first rank (表示順); related to
+                     オンライン化状況 on コード
+  完了状況         - calculated 2-row table driving the donut charts
+  都道府県別推移   - (--history) per prefecture per release, combined from
+                     the history store's prefectures.parquet partitions
+                     (history.py); not related to the other tables
+
+The completion measures cover the procedure subset of a report spec
+(specs.py), by default the 26 子育て・介護 procedures; batch.py builds the
+model of every report of a spec file, each with its own 自治体別集計.
+"""
+
+import argparse
+import json
+import os
+
+import specs
+from measures import STATUS_CODES, STATUS_NA, STATUS_NONE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(HERE, "26_administrative_procedures_online.SemanticModel", "model.bim")
+
+FACT = "オンライン化状況"
+SUMMARY = "自治体別集計"
+TREND = "都道府県別推移"
+SOURCES = ("csv", "parquet")
+HISTORY_DIR = "history"
+
+# ============================================================
+# Helper functions
+# ============================================================
+
+def tag(prefix, n):
+    return f"{prefix}-0001-0001-0001-{n:012x}"
+
+
+def column(name, n, data_type="string", *, format_string=None, summarize_by="none", prefix="a1000001"):
+    c = {"name": name, "dataType": data_type}
+    if format_string is not None:
+        c["formatString"] = format_string
+    c["lineageTag"] = tag(prefix, n)
+    c["sourceColumn"] = name
+    c["summarizeBy"] = summarize_by
+    return c
+
+
+def measure(name, prefix, n, expression, format_string=None):
+    m = {"name": name, "expression": expression}
+    if format_string is not None:
+        m["formatString"] = format_string
+    m["lineageTag"] = tag(prefix, n)
+    return m
+
+# ============================================================
+# Partition source (M)
+# ============================================================
+
+# (column, M type) in data_unpivoted.csv order
+FACT_COLUMNS = [
+    ("コード", "type text"),
+    ("地域ブロック", "type text"),
+    ("都道府県", "type text"),
+    ("団体名", "type text"),
+    ("団体名フリガナ", "type text"),
+    ("団体区分", "type text"),
+    ("大カテゴリ", "type text"),
+    ("サブカテゴリ", "type text"),
+    ("手続名", "type text"),
+    ("重点手続", "type text"),
+    ("オンライン化状況", "type text"),
+    ("その他手続数", "Int64.Type"),
+    ("状況コード", "Int64.Type"),
+]
+
+
+# (column, M type) in data_municipality_summary.csv order
+SUMMARY_COLUMNS = [
+    ("コード", "type text"),
+    ("都道府県", "type text"),
+    ("未完了手続数", "Int64.Type"),
+    ("完了フラグ", "Int64.Type"),
+    ("団体名", "type text"),
+    ("状況一覧", "type text"),
+    ("表示順", "Int64.Type"),
+]
+
+
+# (column, M type) of the history store's prefectures.parquet
+TREND_COLUMNS = [
+    ("公表日", "type date"),
+    ("都道府県", "type text"),
+    ("自治体数", "Int64.Type"),
+    ("完了自治体数", "Int64.Type"),
+    ("未完了手続数", "Int64.Type"),
+]
+
+
+def history_expression(folder, name):
+    """Every release partition's name file under folder, combined."""
+    return [
+        "let",
+        f"    Source = Folder.Files(\"{folder}\"),",
+        f"    Partitions = Table.SelectRows(Source, each [Name] = \"{name}\"),",
+        "    Tables = Table.AddColumn(Partitions, \"Data\", each Parquet.Document([Content])),",
+        "    Combined = Table.Combine(Tables[Data])",
+        "in",
+        "    Combined",
+    ]
+
+
+def partition_expression(basename, columns, source="csv"):
+    if source == "parquet":
+        # Parquet carries its own (dictionary-encoded) column types
+        return [
+            "let",
+            f"    Source = Parquet.Document(File.Contents(\"{basename}.parquet\"))",
+            "in",
+            "    Source",
+        ]
+    types = [f"        {{\"{name}\", {m_type}}}" for name, m_type in columns]
+    return [
+        "let",
+        f"    Source = Csv.Document(File.Contents(\"{basename}.csv\"), [Delimiter=\",\", Columns={len(columns)}, Encoding=65001, QuoteStyle=QuoteStyle.Csv]),",
+        "    PromotedHeaders = Table.PromoteHeaders(Source, [PromoteAllScalars=true]),",
+        "    ChangedTypes = Table.TransformColumnTypes(PromotedHeaders, {",
+        *[line + ("," if i < len(types) - 1 else "") for i, line in enumerate(types)],
+        "    })",
+        "in",
+        "    ChangedTypes",
+    ]
+
+# ============================================================
+# Measures
+# ============================================================
+
+CODE_NA = STATUS_CODES[STATUS_NA]
+CODE_NONE = STATUS_CODES[STATUS_NONE]
+
+
+def count_where(column, op, value):
+    """COUNTROWS over the fact table restricted by one column predicate.
+
+    KEEPFILTERS intersects with any outer filter on the column, exactly like the
+    FILTER ( table, ... ) it replaces, but without iterating the whole table.
+    """
+    return f"CALCULATE ( COUNTROWS ( '{FACT}' ), KEEPFILTERS ( '{FACT}'[{column}] {op} {value} ) )"
+
+
+def value_set(values):
+    """A DAX table constructor: { "a", "b" }."""
+    return "{ " + ", ".join(f'"{v}"' for v in values) + " }"
+
+
+def subset_predicates(spec):
+    """CALCULATE filter arguments restricting the fact table to the spec's procedures."""
+    preds = [f"'{FACT}'[サブカテゴリ] IN {value_set(spec.subcategories)}"]
+    if spec.procedures:
+        preds.append(f"'{FACT}'[手続名] IN {value_set(spec.procedures)}")
+    return preds
+
+
+def fact_measures(spec=specs.DEFAULT):
+    subset = subset_predicates(spec)
+    return [
+        measure("オンライン対応数", "b1000001", 1, [
+            "-- オンライン化状況が空でない（対応済み or 該当なし）行数を返す",
+            "-- 状況コード（取り込み時に付与: ○→1, ー→0, 空→-1）の列述語で数える",
+            count_where("状況コード", ">=", CODE_NA),
+        ], "#,##0"),
+        measure("該当なし数", "b1000001", 2, [
+            "-- ステータスが「ー」（該当なし）の行数を返す",
+            count_where("状況コード", "=", CODE_NA),
+        ], "#,##0"),
+        measure("未対応数", "b1000001", 3, [
+            "-- ステータスが空文字（未オンライン化）の行数を返す",
+            count_where("状況コード", "=", CODE_NONE),
+        ], "#,##0"),
+        measure("オンライン化率", "b1000001", 4, [
+            "-- オンライン対応数 / (対応数 + 未対応数) の割合を返す",
+            "VAR _Online = [オンライン対応数]",
+            "VAR _Total = _Online + [未対応数]",
+            "RETURN",
+            "DIVIDE ( _Online, _Total )",
+        ], "0.0%"),
+        measure("手続数", "b1000001", 5, [
+            "-- 現在のフィルタコンテキスト内の手続行数を返す",
+            f"COUNTROWS ( '{FACT}' )",
+        ], "#,##0"),
+        measure("自治体数", "b1000001", 6, [
+            "-- 現在のフィルタコンテキスト内の一意な自治体数を返す",
+            f"-- {SUMMARY}は1自治体1行で、{FACT}のフィルタが双方向リレーションで伝わる",
+            f"COUNTROWS ( '{SUMMARY}' )",
+        ], "#,##0"),
+        measure(spec.completed_measure, "b1000001", 7, [
+            f"-- {spec.label}{spec.n}手続すべてオンライン化済みの自治体数を返す",
+            f"-- 未対応数が0の自治体を「完了」として取り込み時に{SUMMARY}[完了フラグ]へ集計済み",
+            f"SUM ( '{SUMMARY}'[完了フラグ] )",
+        ], "#,##0"),
+        measure(spec.completion_measure, "b1000001", 8, [
+            f"-- {spec.n}手続完了自治体数 / 全自治体数 の割合を返す",
+            f"DIVIDE ( [{spec.completed_measure}], [自治体数] )",
+        ], "0.0%"),
+        measure(spec.online_rate_measure, "b1000001", 9, [
+            f"-- {spec.label}カテゴリに限定した自治体別オンライン化率を返す",
+            "VAR _Online =",
+            "    CALCULATE (",
+            f"        COUNTROWS ( '{FACT}' ),",
+            *[f"        {p}," for p in subset],
+            f"        '{FACT}'[状況コード] >= {CODE_NA}",
+            "    )",
+            "VAR _Total =",
+            "    CALCULATE (",
+            f"        COUNTROWS ( '{FACT}' ),",
+            *[f"        {p}" + ("," if i < len(subset) - 1 else "") for i, p in enumerate(subset)],
+            "    )",
+            "RETURN",
+            "DIVIDE ( _Online, _Total )",
+        ], "0%"),
+        measure("都道府県ラベル", "b1000001", 10, [
+            "-- 「都道府県名(完了数 / 全自治体数)」形式のラベル文字列を返す",
+            f"VAR _Pref = SELECTEDVALUE ( '{FACT}'[都道府県] )",
+            f"VAR _Completed = [{spec.completed_measure}]",
+            "VAR _Total = [自治体数]",
+            "RETURN",
+            "_Pref & \"(\" & _Completed & \" / \" & _Total & \")\"",
+        ]),
+        measure("ステータス表示", "b1000001", 11, [
+            "-- 選択された行のオンライン化状況テキストを返す（複数行の場合は空文字）",
+            f"SELECTEDVALUE ( '{FACT}'[オンライン化状況], \"\" )",
+        ]),
+        measure("ステータスコード", "b1000001", 12, [
+            "-- ステータスを数値コードに変換する（○/ー→1, 空→-1）",
+            "-- 条件付き書式でのアイコン表示に使用。取り込み時に付与した状況コードから求める",
+            "-- 状況が1つに決まらない（複数・なし）ときも -1：SWITCH ( SELECTEDVALUE ( 状況 ), ..., \"\", -1 ) で",
+            "-- BLANK () = \"\" が真となる従来の結果に合わせる",
+            f"VAR _Code = SELECTEDVALUE ( '{FACT}'[状況コード] )",
+            "RETURN",
+            f"IF ( ISBLANK ( _Code ), -1, IF ( _Code = {CODE_NONE}, -1, 1 ) )",
+        ], "0"),
+    ]
+
+# ============================================================
+# Tables
+# ============================================================
+
+def fact_table(source="csv", spec=specs.DEFAULT, basename="data_unpivoted"):
+    columns = []
+    for i, (name, m_type) in enumerate(FACT_COLUMNS, 1):
+        if m_type == "Int64.Type":
+            summarize_by = "sum" if name == "その他手続数" else "none"
+            columns.append(column(name, i, "int64", format_string="0", summarize_by=summarize_by))
+        else:
+            columns.append(column(name, i))
+    return {
+        "name": FACT,
+        "annotations": [{"name": "PBI_ResultType", "value": "Table"}],
+        "columns": columns,
+        "lineageTag": tag("a1000001", 0),
+        "measures": fact_measures(spec),
+        "partitions": [{
+            "name": FACT,
+            "mode": "import",
+            "source": {"expression": partition_expression(basename, FACT_COLUMNS, source), "type": "m"},
+        }],
+    }
+
+
+def summary_table(source="csv", basename="data_municipality_summary"):
+    return {
+        "name": SUMMARY,
+        "annotations": [{"name": "PBI_ResultType", "value": "Table"}],
+        "columns": [
+            column("コード", 1, prefix="e1000001"),
+            column("都道府県", 2, prefix="e1000001"),
+            column("未完了手続数", 3, "int64", format_string="0", summarize_by="sum", prefix="e1000001"),
+            column("完了フラグ", 4, "int64", format_string="0", summarize_by="sum", prefix="e1000001"),
+            column("団体名", 5, prefix="e1000001"),
+            column("状況一覧", 6, prefix="e1000001"),
+            column("表示順", 7, "int64", format_string="0", prefix="e1000001"),
+        ],
+        "lineageTag": tag("e1000001", 0),
+        "partitions": [{
+            "name": SUMMARY,
+            "mode": "import",
+            "source": {"expression": partition_expression(basename, SUMMARY_COLUMNS, source), "type": "m"},
+        }],
+    }
+
+
+def trend_table(spec=specs.DEFAULT):
+    columns = []
+    for i, (name, m_type) in enumerate(TREND_COLUMNS, 1):
+        if m_type == "type date":
+            columns.append(column(name, i, "dateTime", format_string="yyyy/mm/dd", prefix="a2000001"))
+        elif m_type == "Int64.Type":
+            columns.append(column(name, i, "int64", format_string="0", summarize_by="sum", prefix="a2000001"))
+        else:
+            columns.append(column(name, i, prefix="a2000001"))
+    return {
+        "name": TREND,
+        "annotations": [{"name": "PBI_ResultType", "value": "Table"}],
+        "columns": columns,
+        "lineageTag": tag("a2000001", 0),
+        "measures": [
+            measure(spec.trend_measure, "b2000001", 1, [
+                f"-- 公表日ごとの{spec.n}手続完了自治体数 / 自治体数 の割合を返す",
+                "-- 都道府県×公表日に集計済みの行を合計するだけなので、公表日が増えても1時点あたりの計算量は一定",
+                f"DIVIDE ( SUM ( '{TREND}'[完了自治体数] ), SUM ( '{TREND}'[自治体数] ) )",
+            ], "0.0%"),
+        ],
+        "partitions": [{
+            "name": TREND,
+            "mode": "import",
+            "source": {"expression": history_expression(HISTORY_DIR, "prefectures.parquet"), "type": "m"},
+        }],
+    }
+
+
+def status_table(spec=specs.DEFAULT):
+    def calc_column(name, n, data_type, *, format_string=None, sort_by=None):
+        c = {"name": name, "dataType": data_type}
+        if format_string is not None:
+            c["formatString"] = format_string
+        c["isDataTypeInferred"] = True
+        c["isNameInferred"] = True
+        c["lineageTag"] = tag("c1000001", n)
+        c["sourceColumn"] = f"[{name}]"
+        if sort_by is not None:
+            c["sortByColumn"] = sort_by
+        c["summarizeBy"] = "none"
+        c["type"] = "calculatedTableColumn"
+        return c
+
+    return {
+        "name": "完了状況",
+        "columns": [
+            calc_column("ステータス", 1, "string", sort_by="順序"),
+            calc_column("順序", 2, "int64", format_string="0"),
+        ],
+        "lineageTag": tag("c1000001", 0),
+        "measures": [
+            measure("完了状況値", "d1000001", 1, [
+                "-- ドーナツチャート用: 「完了」なら完了自治体数、「未完了」なら残り自治体数を返す",
+                "VAR _Status = SELECTEDVALUE ( '完了状況'[ステータス] )",
+                f"VAR _Completed = [{spec.completed_measure}]",
+                "VAR _Total = [自治体数]",
+                "RETURN",
+                "SWITCH (",
+                "    _Status,",
+                "    \"完了\", _Completed,",
+                "    \"未完了\", _Total - _Completed",
+                ")",
+            ], "#,##0"),
+        ],
+        "partitions": [{
+            "name": "完了状況",
+            "mode": "import",
+            "source": {
+                "expression": "UNION ( ROW ( \"ステータス\", \"完了\", \"順序\", 1 ), ROW ( \"ステータス\", \"未完了\", \"順序\", 2 ) )",
+                "type": "calculated",
+            },
+        }],
+    }
+
+# ============================================================
+# Build model
+# ============================================================
+
+def build_model(source="csv", history=False, spec=specs.DEFAULT, fact_basename="data_unpivoted",
+                summary_basename="data_municipality_summary"):
+    """model.bim of spec, its partitions reading fact_basename and summary_basename (.csv / .parquet).
+
+    The history store is summarized for the default subset only.
+    """
+    query_order = [FACT, SUMMARY] + ([TREND] if history else [])
+    tables = [fact_table(source, spec, fact_basename), summary_table(source, summary_basename), status_table(spec)]
+    if history:
+        tables.append(trend_table(spec))
+    return {
+        "compatibilityLevel": 1601,
+        "model": {
+            "annotations": [
+                {"name": "__PBI_TimeIntelligenceEnabled", "value": "0"},
+                {"name": "PBI_QueryOrder", "value": json.dumps(query_order, ensure_ascii=False, separators=(",", ":"))},
+                {"name": "PBI_ProTooling", "value": "[\"DevMode\"]"},
+            ],
+            "culture": "ja-JP",
+            "cultures": [{
+                "name": "ja-JP",
+                "linguisticMetadata": {
+                    "content": {"DynamicImprovement": "HighConfidence", "Language": "ja-JP", "Version": "1.0.0"},
+                    "contentType": "json",
+                },
+            }],
+            "dataAccessOptions": {"legacyRedirects": True, "returnErrorValuesAsNull": True},
+            "defaultPowerBIDataSourceVersion": "powerBI_V3",
+            "discourageImplicitMeasures": True,
+            "relationships": [{
+                # Both directions so that filters on オンライン化状況 (visual-level
+                # 都道府県 filters, slicers, page filters) reach 自治体別集計
+                "name": tag("f1000001", 1),
+                "crossFilteringBehavior": "bothDirections",
+                "fromColumn": "コード",
+                "fromTable": FACT,
+                "toColumn": "コード",
+                "toTable": SUMMARY,
+            }],
+            "tables": tables,
+        },
+    }
+
+
+def serialize(model):
+    # Power BI Desktop saves model.bim with CRLF line endings
+    return (json.dumps(model, ensure_ascii=False, indent=2) + "\n").replace("\n", "\r\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate model.bim")
+    ap.add_argument("-o", "--out", default=DEFAULT_OUT, help="output model.bim path")
+    ap.add_argument("--source", choices=SOURCES, default="csv",
+                    help="ingestion output the オンライン化状況 partition reads")
+    ap.add_argument("--history", action="store_true",
+                    help=f"add the {TREND} table read from the history store (history.py)")
+    args = ap.parse_args(argv)
+
+    s = serialize(build_model(args.source, args.history))
+    json.loads(s)  # round-trip check
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8", newline="") as f:
+        f.write(s)
+
+    tables = json.loads(s)["model"]["tables"]
+    n_measures = sum(len(t.get("measures", [])) for t in tables)
+    print(f"OK: {args.out}")
+    print(f"  {len(tables)} tables, {n_measures} measures, source={args.source}, {len(s):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,45 @@
 Generate report.json matching Digital Agency Dashboard Design Template.
 
 Page 1: 都道府県一覧 - Header + summary panel(left) + 47 prefecture cards(right)
+        (--page1 grouped: one matrix keyed on 都道府県 instead of the 47 cards;
+         --page1 regions: the cards grouped by the survey's 6 地域ブロック)
 Page 2: 市区町村詳細 - Header + slicers + KPI cards + matrix
+        (--page2 list: one row per municipality, unfinished first, within --cell-budget)
+--trend-page: 完了率の推移 - national line + 47 prefecture small multiples over
+        the releases in the history store (generate_model.py --history)
+--muni-pages: one tile per municipality, paginated across as many pages as needed
+
+Positions come from the constraint layout in layout.py (regions, grids, pages).
+Titles, measures and page filters follow the report spec (specs.py, by
+default the 26 子育て・介護 procedures); batch.py builds many specs at once.
+
+    python generate_report.py                       # <Report>/report.json
+    python generate_report.py --format pbir         # <Report>/definition/ (PBIR)
+    python generate_report.py -o OUT.Report --stats
+    python generate_report.py --theme-styles        # shared styles in the theme, not in every visual
+    python generate_report.py --profile --profile-json profile.json   # time / memory per phase
 """
 
+import argparse
+import concurrent.futures
+import contextlib
+import filecmp
+import functools
+import hashlib
+import inspect
 import json
 import os
+import shutil
 import sys
+import time
+import tracemalloc
+from types import MappingProxyType
+
+import specs
+from layout import Box, grid, paginate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REPORT_DIR = os.path.join(HERE, "26_administrative_procedures_online.Report")
 
 # ============================================================
 # DA template color constants
@@ -27,9 +60,52 @@ RADIUS_DEFAULT = 20        # デフォルト角丸
 # ============================================================
 # Helper functions
 # ============================================================
-
+# Literals and colors are interned: equal arguments return one
+# shared fragment, so the 47 cards (and 47 more pages with --pref-pages)
+# reuse a few hundred objects instead of building thousands.  Shared
+# fragments must never be modified.  They are slotted report nodes whose
+# sequences are tuples, and the module-level style blocks are read-only
+# mappings.  In debug mode (set_debug, --debug) a node's slots can only be
+# set once, in __init__, so assigning to a shared node raises too.
+
+DEBUG = False
+INTERNED = []   # memo tables of the interned helpers
+
+
+def interned(fn):
+    """Memoize a one-argument fragment helper (argument: a str)."""
+    table = {}
+    INTERNED.append(table)
+
+    @functools.wraps(fn)
+    def wrapper(arg):
+        out = table.get(arg)
+        if out is None:
+            out = table[arg] = fn(arg)
+        return out
+    return wrapper
+
+
+def frozen_setattr(node, name, value):
+    """Node.__setattr__ in debug mode: slots are set once, in __init__."""
+    if hasattr(node, name):
+        raise AttributeError(f"{type(node).__name__}.{name}: report nodes are read-only")
+    object.__setattr__(node, name, value)
+
+
+def set_debug(on):
+    """Turn debug mode on or off: report nodes read-only after __init__, or not."""
+    global DEBUG
+    DEBUG = on
+    if on:
+        Node.__setattr__ = frozen_setattr
+    elif "__setattr__" in vars(Node):
+        del Node.__setattr__
+
+
+@interned
 def lit(val):
-    return {"expr": {"Literal": {"Value": val}}}
+    return Lit(val)
 
 def lit_str(s):
     return lit(f"'{s}'")
@@ -43,239 +119,1176 @@ def lit_int(n):
 def lit_double(n):
     return lit(f"{n}D")
 
+@interned
 def solid_color(c):
-    return {"solid": {"color": lit_str(c)}}
+    return Solid(c)
 
 def position(x, y, z, w, h, tab=0):
     return {"x": x, "y": y, "z": z, "width": w, "height": h, "tabOrder": tab}
 
-def make_vc(config_dict, filters_list, x, y, w, h, z):
+_UNSET = object()
+
+
+class JsonString:
+    """A value report.json stores as an embedded JSON string (config, filters, ...).
+
+    It stays a Python object until the report is written, so it is encoded
+    exactly once and validate() can inspect it without re-parsing.  One made
+    from already-encoded text (a build cache hit, or a page built in a worker
+    process) is only decoded if asked; it carries the visual name so
+    validate() need not decode it.
+
+    value is the object as built (it may hold report model nodes); data is
+    the same as plain JSON data, for readers of the encoded form.
+    """
+    __slots__ = ("_value", "_text", "cached_name")
+
+    def __init__(self, value=_UNSET, text=None, cached_name=None):
+        self._value = value
+        self._text = text
+        self.cached_name = cached_name
+
+    @property
+    def value(self):
+        if self._value is _UNSET:
+            self._value = json.loads(self._text)
+        return self._value
+
+    @property
+    def data(self):
+        if self._value is _UNSET:
+            return self.value
+        return json.loads(self.encode())
+
+    def encode(self):
+        if self._text is None:
+            self._text = json.dumps(self._value, ensure_ascii=False, default=encode_nested)
+        return self._text
+
+    def __repr__(self):
+        if self._value is _UNSET:
+            return f"JsonString(text={self._text!r})"
+        return f"JsonString({self._value!r})"
+
+    def __reduce__(self):
+        # Pickled (to and from page workers) as the encoded text once there is one
+        if self._text is not None:
+            return json_string_from_text, (self._text, self.cached_name)
+        return JsonString, (self._value,)
+
+
+def json_string_from_text(text, cached_name=None):
+    return JsonString(text=text, cached_name=cached_name)
+
+
+def encode_nested(o):
+    """json default hook: embedded JSON strings and report model nodes are encoded on the way out."""
+    if isinstance(o, JsonString):
+        return o.encode()
+    if isinstance(o, Node):
+        return o.to_json()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+# ============================================================
+# Report model
+# ============================================================
+# Builders describe visuals, queries, filters and formatting objects with
+# these slotted nodes instead of hand-built dict trees.  Nodes are not
+# modified once built, so styles used by many visuals are single shared
+# objects below.  encode_nested() is the one encoder: it asks each node for
+# its report JSON (to_json) as the enclosing JsonString is encoded.
+
+FACT_TABLE = "オンライン化状況"
+SUMMARY_TABLE = "自治体別集計"
+TREND_TABLE = "都道府県別推移"
+
+# Query source alias of each table
+SOURCE_ALIASES = {"オンライン化状況": "o", "完了状況": "k", "自治体別集計": "s", "都道府県別推移": "t"}
+
+
+class Node:
+    """Base of the report model."""
+    __slots__ = ()
+
+    def to_json(self):
+        raise NotImplementedError
+
+    def __repr__(self):
+        args = ", ".join(repr(getattr(self, s)) for s in self.__slots__)
+        return f"{type(self).__name__}({args})"
+
+
+class Lit(Node):
+    """A formatting property literal ('text', 12L, 1.5D, true)."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def to_json(self):
+        return {"expr": {"Literal": {"Value": self.value}}}
+
+
+class Solid(Node):
+    __slots__ = ("color",)
+
+    def __init__(self, color):
+        self.color = color
+
+    def to_json(self):
+        return {"solid": {"color": lit_str(self.color)}}
+
+
+class Props(Node):
+    """One formatting object entry: its properties and an optional selector."""
+    __slots__ = ("props", "selector")
+
+    def __init__(self, selector=None, **props):
+        self.props = tuple(props.items())
+        self.selector = selector
+
+    def to_json(self):
+        out = {"properties": dict(self.props)}
+        if self.selector is not None:
+            out["selector"] = self.selector
+        return out
+
+
+class Objects(Node):
+    """objects / vcObjects: entries by object name (a Props or a sequence of them)."""
+    __slots__ = ("entries",)
+
+    def __init__(self, **entries):
+        self.entries = tuple(
+            (name, (v,) if isinstance(v, Props) else tuple(v)) for name, v in entries.items()
+        )
+
+    def to_json(self):
+        return {name: list(v) for name, v in self.entries}
+
+
+class Field(Node):
+    """A column or measure ("Column" / "Measure") of a model table."""
+    __slots__ = ("kind", "prop", "entity")
+
+    def __init__(self, kind, prop, entity=FACT_TABLE):
+        self.kind = kind
+        self.prop = prop
+        self.entity = entity
+
+    @property
+    def name(self):
+        return f"{SOURCE_ALIASES[self.entity]}.{self.prop}"
+
+    def ref(self, by_entity=False):
+        """The field expression, through the query's source alias or the table itself."""
+        source = {"Entity": self.entity} if by_entity else {"Source": SOURCE_ALIASES[self.entity]}
+        return {self.kind: {"Expression": {"SourceRef": source}, "Property": self.prop}}
+
+    def to_json(self):
+        return self.ref()
+
+
+def column_field(prop, entity=FACT_TABLE):
+    return Field("Column", prop, entity)
+
+
+def measure_field(prop, entity=FACT_TABLE):
+    return Field("Measure", prop, entity)
+
+
+def query_sources(fields):
+    """From entries for the tables of fields, in first-use order."""
+    return [{"Name": SOURCE_ALIASES[e], "Entity": e, "Type": 0} for e in dict.fromkeys(f.entity for f in fields)]
+
+
+def query_literal(value):
+    """A query Literal: 'text' or 12L."""
+    if isinstance(value, int):
+        return {"Literal": {"Value": f"{value}L"}}
+    return {"Literal": {"Value": f"'{value}'"}}
+
+
+class Query(Node):
+    """A prototypeQuery: the fields of each projection role (in Select order)
+    and optional (field, direction) sort keys, 1 ascending / 2 descending."""
+    __slots__ = ("roles", "order_by")
+
+    def __init__(self, order_by=(), **roles):
+        self.roles = tuple((role, tuple(fields)) for role, fields in roles.items())
+        self.order_by = tuple(order_by)
+
+    def fields(self):
+        return [f for _, fields in self.roles for f in fields]
+
+    def projections(self):
+        return {role: [{"queryRef": f.name} for f in fields] for role, fields in self.roles}
+
+    def to_json(self):
+        fields = self.fields()
+        q = {
+            "Version": 2,
+            "From": query_sources(fields + [f for f, _ in self.order_by]),
+            "Select": [dict(f.ref(), Name=f.name) for f in fields],
+        }
+        if self.order_by:
+            q["OrderBy"] = [{"Direction": d, "Expression": f.ref()} for f, d in self.order_by]
+        return q
+
+
+class Filter(Node):
+    """A categorical filter on one column: = for one value, In for several."""
+    __slots__ = ("name", "field", "values")
+
+    def __init__(self, name, field, values):
+        self.name = name
+        self.field = field
+        self.values = tuple(values)
+
+    def to_json(self):
+        left = self.field.ref()
+        if len(self.values) == 1:
+            cond = {"Comparison": {"ComparisonKind": 0, "Left": left, "Right": query_literal(self.values[0])}}
+        else:
+            cond = {"In": {"Expressions": [left], "Values": [[query_literal(v)] for v in self.values]}}
+        return {
+            "name": self.name,
+            "expression": self.field.ref(by_entity=True),
+            "type": "Categorical",
+            "filter": {"Version": 2, "From": query_sources([self.field]), "Where": [{"Condition": cond}]},
+            "isHiddenInViewMode": True,
+        }
+
+
+class TopN(Node):
+    """A TopN filter: the first count values of field ordered by the minimum
+    of key, ascending.  Power BI keeps ties, so key should be unique per value."""
+    __slots__ = ("name", "field", "key", "count")
+
+    def __init__(self, name, field, key, count):
+        self.name = name
+        self.field = field
+        self.key = key
+        self.count = count
+
+    def to_json(self):
+        subquery = {
+            "Version": 2,
+            "From": query_sources([self.field, self.key]),
+            "Select": [dict(self.field.ref(), Name="field")],
+            "OrderBy": [{"Direction": 1, "Expression": {"Aggregation": {"Expression": self.key.ref(), "Function": 3}}}],
+            "Top": self.count,
+        }
+        cond = {"In": {"Expressions": [self.field.ref()], "Table": {"SourceRef": {"Source": "subquery"}}}}
+        return {
+            "name": self.name,
+            "expression": self.field.ref(by_entity=True),
+            "type": "TopN",
+            "filter": {
+                "Version": 2,
+                "From": [{"Name": "subquery", "Expression": {"Subquery": {"Query": subquery}}, "Type": 2}]
+                + query_sources([self.field]),
+                "Where": [{"Condition": cond}],
+            },
+            "isHiddenInViewMode": True,
+        }
+
+
+class DataSelector(Node):
+    """Selects the data point whose field equals value (per-point formatting)."""
+    __slots__ = ("field", "value")
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+
+    def to_json(self):
+        return {"data": [{"scopeId": {"Comparison": {
+            "ComparisonKind": 0, "Left": self.field.ref(by_entity=True), "Right": query_literal(self.value),
+        }}}]}
+
+
+class Visual(Node):
+    """A visual container's config: position, type, query and formatting."""
+    __slots__ = ("name", "visual_type", "x", "y", "w", "h", "z", "query", "objects", "vc_objects")
+
+    def __init__(self, name, visual_type, x, y, w, h, z, query=None, objects=None, vc_objects=None):
+        self.name = name
+        self.visual_type = visual_type
+        self.x, self.y, self.w, self.h, self.z = x, y, w, h, z
+        self.query = query
+        self.objects = objects
+        self.vc_objects = vc_objects
+
+    def to_json(self):
+        sv = {"visualType": self.visual_type}
+        if self.query is not None:
+            sv["projections"] = self.query.projections()
+            sv["prototypeQuery"] = self.query
+        if self.objects is not None:
+            sv["objects"] = self.objects
+        if self.vc_objects is not None:
+            sv["vcObjects"] = self.vc_objects
+        return {
+            "name": self.name,
+            "layouts": [{"id": 0, "position": position(self.x, self.y, self.z, self.w, self.h)}],
+            "singleVisual": sv,
+        }
+
+# --- Shared styles ---
+
+HIDE = Props(show=lit_bool(False))
+# Decorations (text boxes, shapes, buttons): no title, background, border or header
+VC_BARE = Objects(title=HIDE, background=HIDE, border=HIDE, visualHeader=HIDE)
+VC_NO_CHROME = Objects(title=HIDE, background=HIDE, border=HIDE)
+VC_NO_TITLE = Objects(title=HIDE)
+PANEL_BACKGROUND = Props(show=lit_bool(True), color=solid_color(BG_VISUAL), transparency=lit_double(0))
+PANEL_BORDER = Props(show=lit_bool(True), color=solid_color(BORDER_VISUAL), radius=lit_int(RADIUS_DEFAULT))
+VC_PANEL = Objects(title=HIDE, background=PANEL_BACKGROUND, border=PANEL_BORDER)
+CARD_PADDING = Props(top=lit_double(8), bottom=lit_double(8), left=lit_double(12), right=lit_double(12))
+NO_SUBTOTALS = Props(rowSubtotals=lit_bool(False), columnSubtotals=lit_bool(False))
+PAGE_OBJECTS = Objects(background=Props(color=solid_color(BG_PAGE), transparency=lit_double(0)))
+# Title font of panel visuals (panel_title)
+PANEL_TITLE_STYLE = MappingProxyType({
+    "fontColor": solid_color(TEXT_PRIMARY),
+    "fontSize": lit_double(13),
+    "fontFamily": lit_str("Arial"),
+    "bold": lit_bool(True),
+})
+SLICER_BORDER = Props(show=lit_bool(True), color=solid_color(NEUTRAL_GRAY), radius=lit_int(RADIUS_DEFAULT))
+SLICER_ITEMS = Props(textSize=lit_double(14), fontFamily=lit_str("Arial"), padding=lit_int(6))
+
+
+@interned
+def panel_title(text):
+    """The bold title of a panel visual (cards, tables and charts with a background)."""
+    return Props(show=lit_bool(True), text=lit_str(text), **PANEL_TITLE_STYLE)
+
+# ============================================================
+# Theme
+# ============================================================
+# With --theme-styles the custom theme's visualStyles state the shared
+# styles above once, for every visual ("*") or per visual type, and each
+# visual keeps only the formatting that differs from the theme: make_vc()
+# drops the rest while THEME holds the theme's defaults.  theme_check()
+# compares the effective formatting of every visual with the full one.
+
+THEME_NAME = "Digital_Agency_Dashboard_Desig3362615343750506.json"
+THEME_REL = os.path.join("StaticResources", "RegisteredResources", THEME_NAME)
+THEME = None    # theme_defaults() of the theme visuals are written against, or None
+THEME_KEY = ""  # a hash of THEME, for build cache keys
+
+THEME_STYLES = MappingProxyType({
+    # Not PANEL_BACKGROUND: visuals that leave transparency to the theme must keep doing so
+    "*": Objects(title=Props(show=lit_bool(True), **PANEL_TITLE_STYLE),
+                 background=Props(show=lit_bool(True), color=solid_color(BG_VISUAL)), border=PANEL_BORDER),
+    "textbox": VC_BARE,
+    "shape": VC_BARE,
+    "actionButton": VC_BARE,
+    "donutChart": Objects(title=HIDE, background=HIDE, border=HIDE, legend=HIDE),
+    "pivotTable": Objects(title=HIDE, subTotals=NO_SUBTOTALS),
+    "slicer": Objects(background=HIDE, border=SLICER_BORDER, items=SLICER_ITEMS),
+    "lineChart": Objects(legend=HIDE),
+})
+
+
+def literal_value(value):
+    """A formatting literal as a theme states it: 'Arial' -> Arial, 12L -> 12, 1.5D -> 1.5, true -> True."""
+    if not isinstance(value, str):
+        return value
+    if value in ("true", "false"):
+        return value == "true"
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1]
+    if value[-1:] in ("L", "D"):
+        try:
+            n = float(value[:-1])
+        except ValueError:
+            return value
+        return int(n) if n.is_integer() else n
+    return value
+
+
+def theme_value(node):
+    """A Lit or Solid as a theme value."""
+    if isinstance(node, Solid):
+        return {"solid": {"color": node.color}}
+    return literal_value(node.value)
+
+
+def data_value(v):
+    """An encoded formatting property ({"expr": ...} / {"solid": ...}) as a theme value."""
+    if isinstance(v, dict):
+        if "Literal" in v.get("expr", {}):
+            return literal_value(v["expr"]["Literal"]["Value"])
+        if "solid" in v:
+            return {"solid": {"color": data_value(v["solid"]["color"])}}
+    return v
+
+
+def load_theme(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def theme_with_styles(theme):
+    """A copy of theme with THEME_STYLES merged into its visualStyles, property by property."""
+    out = json.loads(json.dumps(theme))
+    styles = out.setdefault("visualStyles", {})
+    for vtype, objects in THEME_STYLES.items():
+        target = styles.setdefault(vtype, {}).setdefault("*", {})
+        for name, entries in objects.entries:
+            props = target.setdefault(name, [{}])[0]
+            for e in entries:
+                props.update((k, theme_value(v)) for k, v in e.props)
+    return out
+
+
+def set_theme(defaults):
+    """Write visuals against theme defaults from now on (None: full formatting)."""
+    global THEME, THEME_KEY
+    THEME = defaults
+    THEME_KEY = "" if defaults is None else hashlib.sha1(json.dumps(defaults, sort_keys=True).encode()).hexdigest()
+
+
+def encode_theme(theme):
+    """The theme file's text (compact, as Power BI Desktop saves it)."""
+    return json.dumps(theme, ensure_ascii=False, separators=(",", ":"))
+
+
+def theme_defaults(theme):
+    """{visual type: {object: {property: value}}} of a theme's visualStyles ('*' style only)."""
+    out = {}
+    for vtype, styles in theme.get("visualStyles", {}).items():
+        objects = out[vtype] = {}
+        for name, entries in styles.get("*", {}).items():
+            if isinstance(entries, list):
+                objects[name] = {k: v for e in entries for k, v in e.items() if not k.startswith("$")}
+    return out
+
+
+def theme_default(defaults, vtype, obj, prop):
+    """The theme's value of obj.prop for a visual type, most specific first; _UNSET if it has none."""
+    for t, o in ((vtype, obj), (vtype, "*"), ("*", obj), ("*", "*")):
+        props = defaults.get(t, {}).get(o)
+        if props is not None and prop in props:
+            return props[prop]
+    return _UNSET
+
+
+def without_defaults(objects, vtype, defaults):
+    """objects minus the properties equal to the theme's (entries with a selector are kept whole)."""
+    if objects is None:
+        return None
+    kept = {}
+    for name, entries in objects.entries:
+        out = []
+        for e in entries:
+            if e.selector is None:
+                props = {k: v for k, v in e.props if theme_default(defaults, vtype, name, k) != theme_value(v)}
+                if not props:
+                    continue
+                if len(props) < len(e.props):
+                    e = Props(**props)
+            out.append(e)
+        if out:
+            kept[name] = out
+    return Objects(**kept) if kept else None
+
+
+def themed_visual(v, defaults):
+    """v with only the formatting that differs from the theme defaults."""
+    return Visual(v.name, v.visual_type, v.x, v.y, v.w, v.h, v.z, v.query,
+                  without_defaults(v.objects, v.visual_type, defaults),
+                  without_defaults(v.vc_objects, v.visual_type, defaults))
+
+
+def effective_styles(cfg, defaults):
+    """{(object, property): value} a visual config (JSON data) renders with under theme defaults.
+
+    Entries with a selector count as a whole, keyed by the selector.  An
+    object shown false renders nothing, so only its show counts.
+    """
+    sv = cfg.get("singleVisual", {})
+    vtype = sv.get("visualType")
+    own = {}
+    for key in ("objects", "vcObjects"):
+        for name, entries in sv.get(key, {}).items():
+            for e in entries:
+                if "selector" in e:
+                    own[(name, json.dumps(e["selector"], sort_keys=True))] = e["properties"]
+                else:
+                    own.update(((name, k), data_value(v)) for k, v in e["properties"].items())
+    keys = set(own)
+    for t in ("*", vtype):
+        for name, props in defaults.get(t, {}).items():
+            keys.update((name, k) for k in props)
+    out = {k: own[k] if k in own else theme_default(defaults, vtype, *k) for k in keys}
+    hidden = {name for (name, k), v in out.items() if k == "show" and v is False}
+    return {(name, k): v for (name, k), v in out.items() if name not in hidden or k == "show"}
+
+
+def theme_check(full, themed, full_defaults, defaults):
+    """Errors for visuals of themed (under defaults) that differ from the same visuals of full
+    (under full_defaults): in effective formatting, or in anything but formatting."""
+    errors = []
+    for a, b in zip(full, themed):
+        if len(a["visualContainers"]) != len(b["visualContainers"]):
+            errors.append(f"{b['name']}: {len(b['visualContainers'])} visuals, expected {len(a['visualContainers'])}")
+            continue
+        for va, vb in zip(a["visualContainers"], b["visualContainers"]):
+            ca, cb = va["config"].data, vb["config"].data
+            ea, eb = effective_styles(ca, full_defaults), effective_styles(cb, defaults)
+            diff = sorted(k for k in ea.keys() | eb.keys() if ea.get(k, _UNSET) != eb.get(k, _UNSET))
+            if diff:
+                errors.append(f"{b['name']}/{cb.get('name')}: {len(diff)} properties differ, first "
+                              f"{'.'.join(diff[0])}: {ea.get(diff[0])!r} -> {eb.get(diff[0])!r}")
+            for c in (ca, cb):
+                c.get("singleVisual", {}).pop("objects", None)
+                c.get("singleVisual", {}).pop("vcObjects", None)
+            if ca != cb or va["filters"].encode() != vb["filters"].encode():
+                errors.append(f"{b['name']}/{cb.get('name')}: differs in more than formatting")
+    return errors
+
+# ============================================================
+# Build cache
+# ============================================================
+# Visual builders are keyed by a content hash of their inputs: the builder's
+# bytecode, the module functions and constants it reaches, and its arguments.
+# A hit reuses the encoded config/filters strings from the previous run
+# instead of calling the builder.  Off (None) unless main() turns it on.
+
+CACHE_VERSION = 1
+BUILD_CACHE = None
+
+
+def fingerprint(fn):
+    """Hash of fn's code plus every module function, class and UPPER_CASE constant it reads."""
+    g = fn.__globals__
+    h = hashlib.sha1()
+    seen = set()
+    todo = [fn]
+    while todo:
+        obj = todo.pop()
+        obj = inspect.unwrap(obj)
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, type):
+            for v in vars(obj).values():
+                if isinstance(v, property):
+                    v = v.fget
+                if inspect.isfunction(v):
+                    todo.append(v)
+            continue
+        codes = [obj.__code__]
+        while codes:
+            code = codes.pop()
+            h.update(code.co_code)
+            for c in code.co_consts:
+                if inspect.iscode(c):
+                    codes.append(c)
+                else:
+                    h.update(repr(c).encode())
+            for name in code.co_names:
+                ref = g.get(name)
+                if inspect.isfunction(ref) and ref.__globals__ is g:
+                    todo.append(ref)
+                elif isinstance(ref, type) and ref.__module__ == g["__name__"]:
+                    todo.append(ref)
+                elif name in ("THEME", "SPEC"):
+                    continue    # set per build within a run: BuildCache.key hashes them instead
+                elif name.isupper() and isinstance(ref, (str, int, float, tuple, list, dict, MappingProxyType, Node)):
+                    h.update(f"{name}={ref!r}".encode())
+    return h.hexdigest()
+
+
+class BuildCache:
+    """Encoded visual containers from the previous run, keyed by content hash."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.used = {}
+        self.derived = {}
+        self.derived_used = {}
+        self.prints = {}
+        self.depth = 0
+        self.hits = self.misses = 0
+        self.saved = 0.0
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data["entries"]
+                self.derived = data.get("derived", {})
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def fingerprint(self, fn):
+        fp = self.prints.get(fn)
+        if fp is None:
+            fp = self.prints[fn] = fingerprint(fn)
+        return fp
+
+    def key(self, fn, args, kwargs):
+        # THEME_KEY, SPEC_KEY: fingerprints are memoized, THEME and SPEC can change between builds
+        return hashlib.sha1(
+            f"{self.fingerprint(fn)}{THEME_KEY}{SPEC_KEY}{args!r}{sorted(kwargs.items())!r}".encode()
+        ).hexdigest()
+
+    def visual(self, fn, args, kwargs):
+        t0 = time.perf_counter()
+        key = self.key(fn, args, kwargs)
+        entry = self.entries.get(key)
+        if entry is not None:
+            vc = dict(entry["vc"])
+            vc["config"] = JsonString(text=vc["config"], cached_name=entry["name"])
+            vc["filters"] = JsonString(text=vc["filters"])
+            self.hits += 1
+            self.saved += max(entry["cost"] - (time.perf_counter() - t0), 0.0)
+            self.used[key] = entry
+            return vc
+        self.depth += 1
+        try:
+            vc = fn(*args, **kwargs)
+        finally:
+            self.depth -= 1
+        stored = dict(vc)
+        stored["config"] = vc["config"].encode()
+        stored["filters"] = vc["filters"].encode()
+        self.misses += 1
+        self.used[key] = {"cost": time.perf_counter() - t0, "name": visual_name(vc), "vc": stored}
+        return vc
+
+    def derive(self, fn, vc):
+        """fn(vc) -> str for a built visual container, memoized on its encoded content."""
+        key = hashlib.sha1(
+            f"{self.fingerprint(fn)}\0{vc['config'].encode()}\0{vc['filters'].encode()}".encode()
+        ).hexdigest()
+        text = self.derived.get(key)
+        if text is None:
+            text = fn(vc)
+        self.derived_used[key] = text
+        return text
+
+    def save(self):
+        """Write the entries used by this run (stale ones are dropped)."""
+        if self.used.keys() == self.entries.keys() and self.derived_used.keys() == self.derived.keys():
+            return False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        data = {"version": CACHE_VERSION, "entries": self.used, "derived": self.derived_used}
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        return True
+
+
+VISUAL_BUILDERS = []    # names of the @cached_visual builders
+
+
+def cached_visual(fn):
+    """Route a visual builder through BUILD_CACHE when one is active."""
+    VISUAL_BUILDERS.append(fn.__name__)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache = BUILD_CACHE
+        if cache is None or cache.depth:
+            return fn(*args, **kwargs)
+        return cache.visual(fn, args, kwargs)
+    return wrapper
+
+
+@cached_visual
+def make_vc(visual, filters=()):
+    """The visual container of a Visual, with its visual-level Filters."""
+    if THEME is not None:
+        visual = themed_visual(visual, THEME)
     return {
-        "config": json.dumps(config_dict, ensure_ascii=False),
-        "filters": json.dumps(filters_list, ensure_ascii=False),
-        "height": float(h),
-        "width": float(w),
-        "x": float(x),
-        "y": float(y),
-        "z": float(z),
+        "config": JsonString(visual),
+        "filters": JsonString(list(filters)),
+        "height": float(visual.h),
+        "width": float(visual.w),
+        "x": float(visual.x),
+        "y": float(visual.y),
+        "z": float(visual.z),
     }
 
+
+def visual_name(vc):
+    cfg = vc["config"]
+    if cfg.cached_name is not None:
+        return cfg.cached_name
+    return cfg.value.name if isinstance(cfg.value, Visual) else cfg.value.get("name", "")
+
+# ============================================================
+# Profiling
+# ============================================================
+# --profile: wall time, CPU time and peak traced memory per phase of main()
+# (each page build, build_report, validate, encoding, writing, ...) and call
+# counts / cumulative time per visual builder.  Off (None) unless main()
+# turns it on; then nothing is wrapped and profiled() is a no-op context.
+
+PROFILE = None
+PROFILE_VERSION = 1
+
+
+class Phase:
+    __slots__ = ("name", "depth", "wall", "cpu", "base", "peak")
+
+    def __init__(self, name, depth, base):
+        self.name = name
+        self.depth = depth
+        self.wall = self.cpu = 0.0
+        self.base = base    # traced bytes when the phase started
+        self.peak = base    # highest traced bytes during the phase
+
+    def to_dict(self):
+        return {"name": self.name, "depth": self.depth, "wall_ms": round(self.wall * 1000, 3),
+                "cpu_ms": round(self.cpu * 1000, 3), "peak_kb": round((self.peak - self.base) / 1024, 1)}
+
+
+class Profiler:
+    """Phases of a run, in completion order, and per builder [calls, seconds]."""
+
+    def __init__(self):
+        self.phases = []
+        self.builders = {}
+        self.stack = []
+        self.high = 0       # highest traced bytes of this process seen so far
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the block. Yields its Phase (rename it once the name is known)."""
+        current, peak = tracemalloc.get_traced_memory()
+        for p in self.stack:
+            p.peak = max(p.peak, peak)  # reset_peak() below must not lose the enclosing phases' peak
+        tracemalloc.reset_peak()
+        rec = Phase(name, len(self.stack), current)
+        self.stack.append(rec)
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            rec.wall = time.perf_counter() - w0
+            rec.cpu = time.process_time() - c0
+            self.stack.pop()
+            peak = tracemalloc.get_traced_memory()[1]
+            for p in self.stack + [rec]:
+                p.peak = max(p.peak, peak)
+            self.high = max(self.high, peak)
+            self.phases.append(rec)
+
+    def instrument(self, g):
+        """Count calls to the visual builders and page() by replacing their module globals."""
+        for name in VISUAL_BUILDERS + ["page"]:
+            fn = g[name]
+            if not getattr(fn, "counted", False):
+                g[name] = counted(fn)
+
+    def merge(self, phases, builders):
+        """Add a page worker's phases (Phase.to_dict) and builder counts."""
+        for d in phases:
+            rec = Phase(d["name"], d["depth"], 0)
+            rec.wall, rec.cpu, rec.peak = d["wall_ms"] / 1000, d["cpu_ms"] / 1000, d["peak_kb"] * 1024
+            self.phases.append(rec)
+        for name, (calls, seconds) in builders.items():
+            s = self.builders.setdefault(name, [0, 0.0])
+            s[0] += calls
+            s[1] += seconds
+
+    def peak(self):
+        """Highest traced bytes of this process (page workers not included)."""
+        return max(self.high, tracemalloc.get_traced_memory()[1])
+
+    def to_dict(self, wall, cpu, **info):
+        """The profile as JSON data, for CI trend tracking."""
+        builders = sorted(self.builders.items(), key=lambda kv: -kv[1][1])
+        return {
+            "version": PROFILE_VERSION,
+            **info,
+            "total": {"wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3),
+                      "peak_kb": round(self.peak() / 1024, 1)},
+            "phases": [p.to_dict() for p in self.phases],
+            "builders": [{"name": n, "calls": c, "cumulative_ms": round(t * 1000, 3)} for n, (c, t) in builders],
+        }
+
+
+def counted(fn):
+    """fn, counting calls and cumulative time into PROFILE.builders (nested builders are included)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = PROFILE
+        if profile is None:
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            s = profile.builders.setdefault(fn.__name__, [0, 0.0])
+            s[0] += 1
+            s[1] += time.perf_counter() - t0
+    wrapper.counted = True
+    return wrapper
+
+
+def profiled(name):
+    """PROFILE.phase(name), or a no-op context when profiling is off."""
+    if PROFILE is None:
+        return contextlib.nullcontext()
+    return PROFILE.phase(name)
+
+
+def print_profile(profile, wall, cpu):
+    print("  Profile (tracemalloc on: times include its overhead; peak is above the phase's start)")
+    print(f"    {'phase':<44} {'wall ms':>9} {'cpu ms':>9} {'peak KB':>9}")
+    for p in profile.phases:
+        label = "  " * p.depth + p.name
+        print(f"    {label:<44} {p.wall * 1000:>9.2f} {p.cpu * 1000:>9.2f} {(p.peak - p.base) / 1024:>9,.0f}")
+    print(f"    {'total (this process)':<44} {wall * 1000:>9.2f} {cpu * 1000:>9.2f} {profile.peak() / 1024:>9,.0f}")
+    print(f"    {'builder':<44} {'calls':>9} {'cum ms':>9}")
+    for name, (calls, seconds) in sorted(profile.builders.items(), key=lambda kv: -kv[1][1]):
+        print(f"    {name:<44} {calls:>9,} {seconds * 1000:>9.2f}")
+
+# ============================================================
+# Report spec
+# ============================================================
+# The procedure subset, titles, as-of date and legend thresholds of the
+# report being built (specs.py).  The default is the 26 子育て・介護
+# procedures; batch.py sets one spec per report variant.
+
+SPEC = specs.DEFAULT
+SPEC_KEY = ""   # a hash of SPEC, for build cache keys ("" for the default)
+
+
+def set_spec(spec):
+    """Build the report of spec from now on."""
+    global SPEC, SPEC_KEY
+    SPEC = spec
+    text = repr(spec)
+    SPEC_KEY = "" if text == repr(specs.DEFAULT) else hashlib.sha1(text.encode()).hexdigest()
+
+
+def subset_filters():
+    """Page-level Filters restricting a page to the spec's procedures."""
+    filters = [Filter("filter_subcat", column_field("サブカテゴリ"), list(SPEC.subcategories))]
+    if SPEC.procedures:
+        filters.append(Filter("filter_proc", column_field("手続名"), list(SPEC.procedures)))
+    return filters
+
+
+def date_text(name, x, y, w, h, z, font_size):
+    """The as-of date, right-aligned."""
+    return textbox(name, x, y, w, h, z, {"paragraphs": [{"textRuns": [{
+        "value": SPEC.as_of, "textStyle": {"fontSize": f"{font_size}px", "color": TEXT_MUTED, "fontFamily": "Arial"}}],
+        "horizontalTextAlignment": "right"}]})
+
+
+def percent(r):
+    return f"{r * 100:g}%"
+
 # ============================================================
 # Visual builders
 # ============================================================
 
+@cached_visual
 def textbox(name, x, y, w, h, z, paragraphs):
-    config = {
-        "name": name,
-        "layouts": [{"id": 0, "position": position(x, y, z, w, h)}],
-        "singleVisual": {
-            "visualType": "textbox",
-            "objects": {
-                "general": [{"properties": {
-                    "paragraphs": lit(json.dumps(paragraphs, ensure_ascii=False))
-                }}]
-            },
-            "vcObjects": {
-                "title": [{"properties": {"show": lit_bool(False)}}],
-                "background": [{"properties": {"show": lit_bool(False)}}],
-                "border": [{"properties": {"show": lit_bool(False)}}],
-                "visualHeader": [{"properties": {"show": lit_bool(False)}}],
-            },
-        },
-    }
-    return make_vc(config, [], x, y, w, h, z)
+    # Not interned: every text box has its own paragraphs
+    objects = Objects(general=Props(paragraphs=Lit(JsonString(paragraphs))))
+    return make_vc(Visual(name, "textbox", x, y, w, h, z, objects=objects, vc_objects=VC_BARE))
 
 
+@cached_visual
 def shape_bg(name, x, y, w, h, z, fill=BG_VISUAL, border_color=BORDER_VISUAL, radius=RADIUS_DEFAULT):
-    config = {
-        "name": name,
-        "layouts": [{"id": 0, "position": position(x, y, z, w, h)}],
-        "singleVisual": {
-            "visualType": "shape",
-            "objects": {
-                "line": [{"properties": {
-                    "lineColor": solid_color(border_color),
-                    "weight": lit_double(1),
-                    "roundEdge": lit_int(radius),
-                }}],
-                "fill": [{"properties": {
-                    "fillColor": solid_color(fill),
-                    "transparency": lit_double(0),
-                }}],
-            },
-            "vcObjects": {
-                "title": [{"properties": {"show": lit_bool(False)}}],
-                "background": [{"properties": {"show": lit_bool(False)}}],
-                "border": [{"properties": {"show": lit_bool(False)}}],
-                "visualHeader": [{"properties": {"show": lit_bool(False)}}],
-            },
-        },
-    }
-    return make_vc(config, [], x, y, w, h, z)
+    objects = Objects(
+        line=Props(lineColor=solid_color(border_color), weight=lit_double(1), roundEdge=lit_int(radius)),
+        fill=Props(fillColor=solid_color(fill), transparency=lit_double(0)),
+    )
+    return make_vc(Visual(name, "shape", x, y, w, h, z, objects=objects, vc_objects=VC_BARE))
 
 
+@cached_visual
 def card(name, x, y, w, h, z, measure, *, font_size=None, show_category=False):
     objects = {}
     if font_size is not None:
-        objects["labels"] = [{"properties": {
-            "fontSize": lit_double(font_size),
-            "color": solid_color(TEXT_PRIMARY),
-        }}]
-    objects["categoryLabels"] = [{"properties": {"show": lit_bool(show_category)}}]
-    config = {
-        "name": name,
-        "layouts": [{"id": 0, "position": position(x, y, z, w, h)}],
-        "singleVisual": {
-            "visualType": "card",
-            "projections": {"Values": [{"queryRef": f"o.{measure}"}]},
-            "prototypeQuery": {
-                "Version": 2,
-                "From": [{"Name": "o", "Entity": "オンライン化状況", "Type": 0}],
-                "Select": [{
-                    "Measure": {
-                        "Expression": {"SourceRef": {"Source": "o"}},
-                        "Property": measure,
-                    },
-                    "Name": f"o.{measure}",
-                }],
-            },
-            "objects": objects,
-            "vcObjects": {
-                "title": [{"properties": {"show": lit_bool(False)}}],
-            },
-        },
-    }
-    return make_vc(config, [], x, y, w, h, z)
+        objects["labels"] = Props(fontSize=lit_double(font_size), color=solid_color(TEXT_PRIMARY))
+    objects["categoryLabels"] = Props(show=lit_bool(show_category))
+    query = Query(Values=[measure_field(measure)])
+    return make_vc(Visual(name, "card", x, y, w, h, z, query, Objects(**objects), VC_NO_TITLE))
 
 
+@cached_visual
 def pref_card(name, x, y, w, h, z, pref_name):
     """A card for one prefecture, with title and visual-level filter."""
-    config = {
-        "name": name,
-        "layouts": [{"id": 0, "position": position(x, y, z, w, h)}],
-        "singleVisual": {
-            "visualType": "card",
-            "projections": {"Values": [{"queryRef": "o.子育て介護26手続完了率"}]},
-            "prototypeQuery": {
-                "Version": 2,
-                "From": [{"Name": "o", "Entity": "オンライン化状況", "Type": 0}],
-                "Select": [{
-                    "Measure": {
-                        "Expression": {"SourceRef": {"Source": "o"}},
-                        "Property": "子育て介護26手続完了率",
-                    },
-                    "Name": "o.子育て介護26手続完了率",
-                }],
-            },
-            "objects": {
-                "labels": [{"properties": {
-                    "fontSize": lit_double(28),
-                    "color": solid_color(ACCENT_BLUE),
-                    "fontFamily": lit_str("Arial"),
-                }}],
-                "categoryLabels": [{"properties": {"show": lit_bool(False)}}],
-            },
-            "vcObjects": {
-                "title": [{"properties": {
-                    "show": lit_bool(True),
-                    "text": lit_str(pref_name),
-                    "fontColor": solid_color(TEXT_PRIMARY),
-                    "fontSize": lit_double(13),
-                    "fontFamily": lit_str("Arial"),
-                    "bold": lit_bool(True),
-                }}],
-                "background": [{"properties": {
-                    "show": lit_bool(True),
-                    "color": solid_color(BG_VISUAL),
-                    "transparency": lit_double(0),
-                }}],
-                "border": [{"properties": {
-                    "show": lit_bool(True),
-                    "color": solid_color(BORDER_VISUAL),
-                    "radius": lit_int(RADIUS_DEFAULT),
-                }}],
-                "padding": [{"properties": {
-                    "top": lit_double(8),
-                    "bottom": lit_double(8),
-                    "left": lit_double(12),
-                    "right": lit_double(12),
-                }}],
-            },
-        },
-    }
-    visual_filter = [{
-        "name": f"f_{name}",
-        "expression": {
-            "Column": {
-                "Expression": {"SourceRef": {"Entity": "オンライン化状況"}},
-                "Property": "都道府県",
-            }
-        },
-        "type": "Categorical",
-        "filter": {
-            "Version": 2,
-            "From": [{"Name": "o", "Entity": "オンライン化状況", "Type": 0}],
-            "Where": [{"Condition": {"Comparison": {
-                "ComparisonKind": 0,
-                "Left": {"Column": {
-                    "Expression": {"SourceRef": {"Source": "o"}},
-                    "Property": "都道府県",
-                }},
-                "Right": {"Literal": {"Value": f"'{pref_name}'"}},
-            }}}],
-        },
-        "isHiddenInViewMode": True,
-    }]
-    return make_vc(config, visual_filter, x, y, w, h, z)
-
-
+    query = Query(Values=[measure_field(SPEC.completion_measure)])
+    objects = Objects(
+        labels=Props(fontSize=lit_double(28), color=solid_color(ACCENT_BLUE), fontFamily=lit_str("Arial")),
+        categoryLabels=HIDE,
+    )
+    vc_objects = Objects(
+        title=panel_title(pref_name),
+        background=PANEL_BACKGROUND,
+        border=PANEL_BORDER,
+        padding=CARD_PADDING,
+    )
+    visual_filter = Filter(f"f_{name}", column_field("都道府県"), [pref_name])
+    return make_vc(Visual(name, "card", x, y, w, h, z, query, objects, vc_objects), [visual_filter])
+
+
+@cached_visual
+def pref_matrix(name, x, y, w, h, z):
+    """All prefectures in one matrix keyed on 都道府県 (one query instead of one per card)."""
+    rate = measure_field(SPEC.completion_measure)
+    query = Query(
+        Rows=[column_field("都道府県")],
+        Values=[measure_field("都道府県ラベル"), rate],
+        order_by=[(rate, 2)],
+    )
+    objects = Objects(
+        subTotals=NO_SUBTOTALS,
+        values=Props(fontSize=lit_double(13), fontFamily=lit_str("Arial"), fontColor=solid_color(TEXT_PRIMARY)),
+        columnHeaders=Props(fontSize=lit_double(13), fontFamily=lit_str("Arial"), fontColor=solid_color(TEXT_SECONDARY)),
+    )
+    return make_vc(Visual(name, "pivotTable", x, y, w, h, z, query, objects, VC_PANEL))
+
+
+@cached_visual
+def donut(name, x, y, w, h, z, font_size):
+    """完了 / 未完了 municipalities as a ring, labelled with percent of total."""
+    status = column_field("ステータス", "完了状況")
+    query = Query(
+        Category=[status],
+        Y=[measure_field("完了状況値", "完了状況")],
+        order_by=[(column_field("順序", "完了状況"), 1)],
+    )
+    objects = Objects(
+        legend=HIDE,
+        dataPoint=[
+            Props(fill=solid_color(ACCENT_BLUE), selector=DataSelector(status, "完了")),
+            Props(fill=solid_color(NEUTRAL_GRAY), selector=DataSelector(status, "未完了")),
+        ],
+        labels=Props(
+            show=lit_bool(True),
+            labelStyle=lit_str("Percent of total"),
+            fontSize=lit_double(font_size),
+            color=solid_color(TEXT_PRIMARY),
+            fontFamily=lit_str("Arial"),
+        ),
+        slices=Props(innerRadiusRatio=lit_int(82)),
+    )
+    return make_vc(Visual(name, "donutChart", x, y, w, h, z, query, objects, VC_NO_CHROME))
+
+
+@cached_visual
 def slicer(name, x, y, w, h, z, column, title_text):
-    config = {
+    objects = Objects(
+        general=Props(responsive=lit_bool(True)),
+        data=Props(mode=lit_str("Dropdown")),
+        selection=Props(singleSelect=lit_bool(False)),
+        header=HIDE,
+        items=SLICER_ITEMS,
+    )
+    vc_objects = Objects(
+        title=Props(
+            show=lit_bool(True),
+            text=lit_str(title_text),
+            fontColor=solid_color(TEXT_PRIMARY),
+            fontSize=lit_double(12),
+            fontFamily=lit_str("Arial"),
+        ),
+        background=HIDE,
+        border=SLICER_BORDER,
+    )
+    query = Query(Values=[column_field(column)])
+    return make_vc(Visual(name, "slicer", x, y, w, h, z, query, objects, vc_objects))
+
+
+@cached_visual
+def back_button(name, x, y, w, h, z):
+    """A link back to page 1."""
+    objects = Objects(
+        icon=HIDE,
+        outline=HIDE,
+        text=Props(
+            show=lit_bool(True),
+            text=lit_str("< 都道府県一覧に戻る"),
+            fontColor=solid_color(ACCENT_BLUE),
+            fontSize=lit_double(14),
+            fontFamily=lit_str("Arial"),
+            alignment=lit_str("Left"),
+        ),
+        action=Props(type=lit_str("PageNavigation"), destination=lit_str("ReportSection_page1")),
+    )
+    return make_vc(Visual(name, "actionButton", x, y, w, h, z, objects=objects, vc_objects=VC_BARE))
+
+
+@cached_visual
+def status_matrix(name, x, y, w, h, z):
+    """ステータス表示 of every procedure (rows) for every municipality (columns)."""
+    query = Query(
+        Rows=[column_field("サブカテゴリ"), column_field("手続名")],
+        Columns=[column_field("団体名")],
+        Values=[measure_field("ステータス表示")],
+    )
+    objects = Objects(subTotals=NO_SUBTOTALS)
+    return make_vc(Visual(name, "pivotTable", x, y, w, h, z, query, objects, VC_PANEL))
+
+
+@cached_visual
+def unfinished_table(name, x, y, w, h, z):
+    """The procedures not yet online (状況コード -1), by municipality."""
+    muni = column_field("団体名")
+    query = Query(Values=[muni, column_field("手続名")], order_by=[(muni, 1)])
+    objects = Objects(
+        values=Props(fontSize=lit_double(11), fontFamily=lit_str("Arial"), fontColor=solid_color(TEXT_PRIMARY)),
+        columnHeaders=Props(fontSize=lit_double(11), fontFamily=lit_str("Arial"), fontColor=solid_color(TEXT_SECONDARY)),
+    )
+    vc_objects = Objects(
+        title=panel_title("オンライン手続できない手続"),
+        background=PANEL_BACKGROUND,
+        border=PANEL_BORDER,
+    )
+    visual_filter = Filter(f"f_{name}", column_field("状況コード"), [-1])
+    return make_vc(Visual(name, "tableEx", x, y, w, h, z, query, objects, vc_objects), [visual_filter])
+
+
+# Columns of the page 2 list, from 自治体別集計
+STATUS_LIST_COLUMNS = ("都道府県", "団体名", "未完了手続数", "状況一覧")
+
+
+@cached_visual
+def status_list(name, x, y, w, h, z, cell_budget):
+    """One row per municipality with its 状況一覧 string, unfinished first.
+
+    A TopN on 表示順 keeps the rows x columns of the table within cell_budget
+    (the table's share of the page budget, list_rows) whatever the slicers select.
+    """
+    columns = [column_field(c, SUMMARY_TABLE) for c in STATUS_LIST_COLUMNS]
+    order = column_field("表示順", SUMMARY_TABLE)
+    query = Query(Values=columns, order_by=[(order, 1)])
+    objects = Objects(
+        values=Props(fontSize=lit_double(12), fontFamily=lit_str("Arial"), fontColor=solid_color(TEXT_PRIMARY)),
+        columnHeaders=Props(fontSize=lit_double(12), fontFamily=lit_str("Arial"), fontColor=solid_color(TEXT_SECONDARY)),
+    )
+    top = TopN(f"f_{name}", column_field("コード", SUMMARY_TABLE), order, cell_budget // len(columns))
+    return make_vc(Visual(name, "tableEx", x, y, w, h, z, query, objects, VC_PANEL), [top])
+
+
+@cached_visual
+def trend_line(name, x, y, w, h, z, title_text, pref_name=None, font_size=11):
+    """SPEC.trend_measure (子育て介護26手続完了率_推移) by 公表日 over the history
+    store's releases, nationwide or (pref_name) for one prefecture through a visual-level filter."""
+    date = column_field("公表日", TREND_TABLE)
+    query = Query(
+        Category=[date],
+        Y=[measure_field(SPEC.trend_measure, TREND_TABLE)],
+        order_by=[(date, 1)],
+    )
+    objects = Objects(
+        legend=HIDE,
+        dataPoint=Props(fill=solid_color(ACCENT_BLUE)),
+        lineStyles=Props(strokeWidth=lit_int(3), showMarker=lit_bool(True)),
+        categoryAxis=Props(
+            showAxisTitle=lit_bool(False),
+            fontSize=lit_double(font_size),
+            fontFamily=lit_str("Arial"),
+            labelColor=solid_color(TEXT_SECONDARY),
+        ),
+        valueAxis=Props(
+            showAxisTitle=lit_bool(False),
+            start=lit_double(0),
+            end=lit_double(1),
+            gridlineColor=solid_color(NEUTRAL_GRAY),
+            fontSize=lit_double(font_size),
+            fontFamily=lit_str("Arial"),
+            labelColor=solid_color(TEXT_SECONDARY),
+        ),
+    )
+    vc_objects = Objects(
+        title=panel_title(title_text),
+        background=PANEL_BACKGROUND,
+        border=PANEL_BORDER,
+    )
+    filters = [Filter(f"f_{name}", column_field("都道府県", TREND_TABLE), [pref_name])] if pref_name else []
+    return make_vc(Visual(name, "lineChart", x, y, w, h, z, query, objects, vc_objects), filters)
+
+
+# Page regions (layout.py): a header above y=80, then a side panel and the
+# main area, inside 20px margins
+CANVAS = Box(0, 0, 1920, 1080)
+BODY = CANVAS.inset(20, 80, 20, 20)
+SIDE_W = 440
+
+
+def body_regions():
+    """(side panel, main area) of BODY."""
+    return BODY.split_x(SIDE_W, None, gap=20)
+
+
+# Page 2 and the prefecture pages: no header band, a narrower side column
+# (back button over the panel) and a footer row for the legend and the date
+DETAIL = CANVAS.inset(20, 20, 20, 10)
+DETAIL_SIDE_W = 320
+FOOTER_H = 40
+DATE_W = 280
+
+
+def detail_regions():
+    """(side column, main area, legend, date) of DETAIL."""
+    body, footer = DETAIL.split_y(None, FOOTER_H, gap=10)
+    side, main = body.split_x(DETAIL_SIDE_W, None, gap=20)
+    legend, date = footer.split_x(DETAIL_SIDE_W, None, DATE_W, gap=20)[1:]
+    return side, main, legend.split_y(25, None)[0], date.split_y(None, 25)[1]
+
+
+def kpi_boxes(box, label_h, card_w, slash_w):
+    """(label, completed card, slash, total card) of a KPI block: the label
+    over "completed / total", centered in box."""
+    label, row = box.split_y(label_h, None, gap=6)
+    done, slash, total = row.split_x(None, card_w, slash_w, card_w, None)[1:4]
+    return label, done, slash.inset(0, 6), total
+
+
+@cached_visual
+def muni_tile(name, x, y, w, h, z, code, label):
+    """A small card of one municipality's online rate over the spec's procedures (visual-level filter on コード)."""
+    query = Query(Values=[measure_field(SPEC.online_rate_measure)])
+    objects = Objects(
+        labels=Props(fontSize=lit_double(14), color=solid_color(ACCENT_BLUE), fontFamily=lit_str("Arial")),
+        categoryLabels=HIDE,
+    )
+    vc_objects = Objects(
+        title=Props(
+            show=lit_bool(True),
+            text=lit_str(label),
+            fontColor=solid_color(TEXT_PRIMARY),
+            fontSize=lit_double(9),
+            fontFamily=lit_str("Arial"),
+        ),
+        background=PANEL_BACKGROUND,
+        border=PANEL_BORDER,
+    )
+    visual_filter = Filter(f"f_{name}", column_field("コード"), [code])
+    return make_vc(Visual(name, "card", x, y, w, h, z, query, objects, vc_objects), [visual_filter])
+
+
+def page(name, display_name, ordinal, visuals, filters=()):
+    """A CANVAS-sized report section (fit to page) around visual containers and page-level Filters."""
+    return {
+        "config": JsonString({"objects": PAGE_OBJECTS}),
+        "displayName": display_name,
+        "displayOption": 1,
+        "filters": JsonString(list(filters)),
+        "height": float(CANVAS.h),
         "name": name,
-        "layouts": [{"id": 0, "position": position(x, y, z, w, h)}],
-        "singleVisual": {
-            "visualType": "slicer",
-            "projections": {"Values": [{"queryRef": f"o.{column}"}]},
-            "prototypeQuery": {
-                "Version": 2,
-                "From": [{"Name": "o", "Entity": "オンライン化状況", "Type": 0}],
-                "Select": [{
-                    "Column": {
-                        "Expression": {"SourceRef": {"Source": "o"}},
-                        "Property": column,
-                    },
-                    "Name": f"o.{column}",
-                }],
-            },
-            "objects": {
-                "general": [{"properties": {"responsive": lit_bool(True)}}],
-                "data": [{"properties": {"mode": lit_str("Dropdown")}}],
-                "selection": [{"properties": {"singleSelect": lit_bool(False)}}],
-                "header": [{"properties": {"show": lit_bool(False)}}],
-                "items": [{"properties": {
-                    "textSize": lit_double(14),
-                    "fontFamily": lit_str("Arial"),
-                    "padding": lit_int(6),
-                }}],
-            },
-            "vcObjects": {
-                "title": [{"properties": {
-                    "show": lit_bool(True),
-                    "text": lit_str(title_text),
-                    "fontColor": solid_color(TEXT_PRIMARY),
-                    "fontSize": lit_double(12),
-                    "fontFamily": lit_str("Arial"),
-                }}],
-                "background": [{"properties": {"show": lit_bool(False)}}],
-                "border": [{"properties": {
-                    "show": lit_bool(True),
-                    "color": solid_color(NEUTRAL_GRAY),
-                    "radius": lit_int(RADIUS_DEFAULT),
-                }}],
-            },
-        },
+        "ordinal": ordinal,
+        "visualContainers": visuals,
+        "width": float(CANVAS.w),
     }
-    return make_vc(config, [], x, y, w, h, z)
 
 
 # ============================================================
@@ -298,12 +1311,35 @@ PREFECTURES = [
 # PAGE 1
 # ============================================================
 
-def build_page1():
+PAGE1_LAYOUTS = specs.PAGE1_LAYOUTS
+
+# The survey's 地域ブロック (the model's 地域ブロック column): consecutive
+# runs of PREFECTURES
+REGION_BLOCKS = (
+    ("北海道・東北", 7), ("関東", 7), ("中部", 9),
+    ("近畿", 7), ("中国・四国", 9), ("九州・沖縄", 8),
+)
+
+
+def region_blocks():
+    """(block name, [(prefecture index, prefecture)]) for each 地域ブロック."""
+    start = 0
+    for name, n in REGION_BLOCKS:
+        yield name, list(enumerate(PREFECTURES))[start:start + n]
+        start += n
+
+
+def build_page1(layout="cards"):
+    """Page 1. layout "cards": one card per prefecture, each with its own
+    visual-level filter (47 queries); "grouped": one matrix keyed on 都道府県;
+    "regions": the cards grouped by 地域ブロック (REGION_BLOCKS)."""
     v = []
+    label, n = SPEC.label, SPEC.n
+    low, high = (percent(t) for t in SPEC.thresholds)
 
     # --- Header ---
     v.append(textbox("p1_title", 40, 24, 900, 44, 1, {"paragraphs": [{
-        "textRuns": [{"value": "子育て・介護関係の26手続のオンライン化取組状況",
+        "textRuns": [{"value": SPEC.title or f"{label}関係の{n}手続のオンライン化取組状況",
                       "textStyle": {"fontSize": "22px", "color": TEXT_PRIMARY,
                                     "fontWeight": "bold", "fontFamily": "Arial"}}]
     }]}))
@@ -318,12 +1354,14 @@ def build_page1():
     v.append(shape_bg("p1_header_line", 20, 72, 1880, 2, 0.5, fill=NEUTRAL_GRAY, border_color=NEUTRAL_GRAY, radius=0))
 
     # --- Left summary panel ---
-    panel_x, panel_y, panel_w, panel_h = 20, 80, 440, 780
-    v.append(shape_bg("p1_panel_bg", panel_x, panel_y, panel_w, panel_h, 0))
+    side, main = body_regions()
+    panel = side.split_y(780, None)[0]
+    v.append(shape_bg("p1_panel_bg", *panel, 0))
+    subtitle, donut_row, kpis, legend, _, date = panel.inset(30, 20).split_y(56, 280, 85, 120, None, 24, gap=20)
 
     # Subtitle
-    v.append(textbox("p1_subtitle", 50, 100, 400, 56, 1, {"paragraphs": [
-        {"textRuns": [{"value": "子育て・介護関係の全26手続を",
+    v.append(textbox("p1_subtitle", *subtitle, 1, {"paragraphs": [
+        {"textRuns": [{"value": f"{label}関係の全{n}手続を",
                        "textStyle": {"fontSize": "16px", "color": TEXT_PRIMARY,
                                      "fontWeight": "bold", "fontFamily": "Arial"}}]},
         {"textRuns": [{"value": "オンライン手続できる自治体の割合",
@@ -332,179 +1370,123 @@ def build_page1():
     ]}))
 
     # Donut chart
-    donut_config = {
-        "name": "p1_donut",
-        "layouts": [{"id": 0, "position": position(100, 180, 1, 280, 280)}],
-        "singleVisual": {
-            "visualType": "donutChart",
-            "projections": {
-                "Category": [{"queryRef": "k.ステータス"}],
-                "Y": [{"queryRef": "k.完了状況値"}],
-            },
-            "prototypeQuery": {
-                "Version": 2,
-                "From": [{"Name": "k", "Entity": "完了状況", "Type": 0}],
-                "Select": [
-                    {"Column": {"Expression": {"SourceRef": {"Source": "k"}}, "Property": "ステータス"}, "Name": "k.ステータス"},
-                    {"Measure": {"Expression": {"SourceRef": {"Source": "k"}}, "Property": "完了状況値"}, "Name": "k.完了状況値"},
-                ],
-                "OrderBy": [{"Direction": 1, "Expression": {"Column": {"Expression": {"SourceRef": {"Source": "k"}}, "Property": "順序"}}}],
-            },
-            "objects": {
-                "legend": [{"properties": {"show": lit_bool(False)}}],
-                "dataPoint": [
-                    {"properties": {"fill": solid_color(ACCENT_BLUE)},
-                     "selector": {"data": [{"scopeId": {"Comparison": {"ComparisonKind": 0, "Left": {"Column": {"Expression": {"SourceRef": {"Entity": "完了状況"}}, "Property": "ステータス"}}, "Right": {"Literal": {"Value": "'完了'"}}}}}]}},
-                    {"properties": {"fill": solid_color(NEUTRAL_GRAY)},
-                     "selector": {"data": [{"scopeId": {"Comparison": {"ComparisonKind": 0, "Left": {"Column": {"Expression": {"SourceRef": {"Entity": "完了状況"}}, "Property": "ステータス"}}, "Right": {"Literal": {"Value": "'未完了'"}}}}}]}},
-                ],
-                "labels": [{"properties": {
-                    "show": lit_bool(True),
-                    "labelStyle": lit_str("Percent of total"),
-                    "fontSize": lit_double(36),
-                    "color": solid_color(TEXT_PRIMARY),
-                    "fontFamily": lit_str("Arial"),
-                }}],
-                "slices": [{"properties": {"innerRadiusRatio": lit_int(82)}}],
-            },
-            "vcObjects": {
-                "title": [{"properties": {"show": lit_bool(False)}}],
-                "background": [{"properties": {"show": lit_bool(False)}}],
-                "border": [{"properties": {"show": lit_bool(False)}}],
-            },
-        },
-    }
-    v.append(make_vc(donut_config, [], 100, 180, 280, 280, 1))
+    v.append(donut("p1_donut", *donut_row.split_x(None, 280, None)[1], 1, 36))
 
     # KPI label
-    v.append(textbox("p1_kpi_label", 50, 480, 380, 24, 1, {"paragraphs": [{
+    kpi_label, kpi_done, kpi_slash, kpi_total = kpi_boxes(kpis, 24, 130, 30)
+    v.append(textbox("p1_kpi_label", *kpi_label, 1, {"paragraphs": [{
         "textRuns": [{"value": "オンライン化が完了した自治体数／全自治体数",
                       "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}}]
     }]}))
 
     # KPI completed
-    v.append(card("p1_kpi_done", 80, 510, 130, 55, 1, "子育て介護26手続完了自治体数", font_size=28))
+    v.append(card("p1_kpi_done", *kpi_done, 1, SPEC.completed_measure, font_size=28))
     # Slash
-    v.append(textbox("p1_slash", 210, 516, 30, 42, 1, {"paragraphs": [{
+    v.append(textbox("p1_slash", *kpi_slash, 1, {"paragraphs": [{
         "textRuns": [{"value": "／", "textStyle": {"fontSize": "24px", "color": TEXT_PRIMARY, "fontFamily": "Arial"}}]
     }]}))
     # KPI total
-    v.append(card("p1_kpi_total", 240, 510, 130, 55, 1, "自治体数", font_size=28))
+    v.append(card("p1_kpi_total", *kpi_total, 1, "自治体数", font_size=28))
 
     # Legend
-    v.append(textbox("p1_legend", 50, 590, 380, 120, 1, {"paragraphs": [
+    v.append(textbox("p1_legend", *legend, 1, {"paragraphs": [
         {"textRuns": [{"value": "凡例", "textStyle": {"fontSize": "13px", "color": TEXT_PRIMARY, "fontWeight": "bold", "fontFamily": "Arial"}}]},
         {"textRuns": [{"value": "", "textStyle": {"fontSize": "8px"}}]},
         {"textRuns": [
             {"value": "●", "textStyle": {"fontSize": "13px", "color": ACCENT_BLUE, "fontFamily": "Arial"}},
-            {"value": " 100%（全26手続オンライン化完了）", "textStyle": {"fontSize": "13px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+            {"value": f" {high}（全{n}手続オンライン化完了）" if SPEC.thresholds[1] == 1 else f" {high}以上", "textStyle": {"fontSize": "13px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
         ]},
         {"textRuns": [
             {"value": "●", "textStyle": {"fontSize": "13px", "color": ACCENT_LIGHT, "fontFamily": "Arial"}},
-            {"value": " 80%以上100%未満", "textStyle": {"fontSize": "13px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+            {"value": f" {low}以上{high}未満", "textStyle": {"fontSize": "13px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
         ]},
         {"textRuns": [
             {"value": "●", "textStyle": {"fontSize": "13px", "color": NEUTRAL_GRAY, "fontFamily": "Arial"}},
-            {"value": " 80%未満", "textStyle": {"fontSize": "13px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+            {"value": f" {low}未満", "textStyle": {"fontSize": "13px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
         ]},
     ]}))
 
     # Date
-    v.append(textbox("p1_date", 50, 810, 380, 24, 1, {"paragraphs": [{
-        "textRuns": [{"value": "令和６年度末時点",
-                      "textStyle": {"fontSize": "11px", "color": TEXT_MUTED, "fontFamily": "Arial"}}],
-        "horizontalTextAlignment": "right",
-    }]}))
-
-    # --- 47 prefecture cards (right side) ---
-    cols = 6
-    card_w = 228
-    card_h = 125
-    gap = 6
-    grid_x = 480
-    grid_y = 80
-
-    for i, pref in enumerate(PREFECTURES):
-        col = i % cols
-        row = i // cols
-        cx = grid_x + col * (card_w + gap)
-        cy = grid_y + row * (card_h + gap)
-        v.append(pref_card(f"p1_pref_{i:02d}", cx, cy, card_w, card_h, 0, pref))
-
-    return {
-        "config": json.dumps({"objects": {"background": [{"properties": {
-            "color": solid_color(BG_PAGE),
-            "transparency": lit_double(0),
-        }}]}}, ensure_ascii=False),
-        "displayName": "都道府県一覧",
-        "displayOption": 1,
-        "filters": json.dumps([], ensure_ascii=False),
-        "height": 1080.0,
-        "name": "ReportSection_page1",
-        "ordinal": 0,
-        "visualContainers": v,
-        "width": 1920.0,
-    }
+    v.append(date_text("p1_date", *date, 1, 11))
+
+    # --- 47 prefectures (main area) ---
+    if layout == "grouped":
+        v.append(pref_matrix("p1_pref_matrix", main.x, main.y, main.w, panel.h, 0))
+    elif layout == "regions":
+        # 2 x 3 blocks, each a title over a 5 x 2 grid of its cards (room for the
+        # 9 of the largest blocks; same card size in every block)
+        blocks = grid(main, len(REGION_BLOCKS), cols=2, gap=12)
+        for k, ((region, prefs), block) in enumerate(zip(region_blocks(), blocks)):
+            title, cards = block.split_y(24, None, gap=6)
+            v.append(textbox(f"p1_region_{k}", *title, 1, {"paragraphs": [{"textRuns": [{
+                "value": region,
+                "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontWeight": "bold", "fontFamily": "Arial"}}]}]}))
+            for (i, pref), cell in zip(prefs, grid(cards, len(prefs), cols=5, rows=2, gap=6)):
+                v.append(pref_card(f"p1_pref_{i:02d}", *cell, 0, pref))
+    else:
+        for i, (pref, cell) in enumerate(zip(PREFECTURES, grid(main, len(PREFECTURES), cols=6, gap=6))):
+            v.append(pref_card(f"p1_pref_{i:02d}", *cell, 0, pref))
+
+    return page("ReportSection_page1", "都道府県一覧", 0, v)
 
 
 # ============================================================
 # PAGE 2
 # ============================================================
 
-def build_page2():
-    page_filters = [{
-        "name": "filter_subcat",
-        "expression": {
-            "Column": {
-                "Expression": {"SourceRef": {"Entity": "オンライン化状況"}},
-                "Property": "サブカテゴリ",
-            }
-        },
-        "type": "Categorical",
-        "filter": {
-            "Version": 2,
-            "From": [{"Name": "o", "Entity": "オンライン化状況", "Type": 0}],
-            "Where": [{"Condition": {"In": {
-                "Expressions": [{"Column": {"Expression": {"SourceRef": {"Source": "o"}}, "Property": "サブカテゴリ"}}],
-                "Values": [[{"Literal": {"Value": "'ア.子育て関係'"}}], [{"Literal": {"Value": "'イ.介護関係'"}}]],
-            }}}],
-        },
-        "isHiddenInViewMode": True,
-    }]
+# Page 2 and the prefecture pages show the spec's procedures only (subset_filters)
 
+def matrix_legend():
+    """Paragraphs of the matrix legend (a new dict per text box: text boxes own their paragraphs)."""
+    return {"paragraphs": [{"textRuns": [
+        {"value": "●", "textStyle": {"fontSize": "12px", "color": ACCENT_BLUE, "fontFamily": "Arial"}},
+        {"value": " オンライン手続できる　", "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+        {"value": "●", "textStyle": {"fontSize": "12px", "color": NEUTRAL_GRAY, "fontFamily": "Arial"}},
+        {"value": " オンライン手続できない　", "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+        {"value": "ー 該当する手続がない", "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+    ]}]}
+
+
+PAGE2_LAYOUTS = specs.PAGE2_LAYOUTS
+
+# Cells page 2 may request in the list layout: the fixed visuals plus 611
+# rows of 4 columns, enough for the 580 municipalities with an unfinished
+# procedure in the 2026-01 survey
+CELL_BUDGET = 2500
+
+# Cells the fixed visuals of the list layout request under any selection:
+# the 都道府県 slicer (one value per prefecture), the donut (完了 / 未完了 x
+# category and value) and the 2 KPI cards.  The list layout has no 団体名
+# slicer: its ~1,700 values would exceed the budget on their own, and the
+# list already shows 団体名.
+LIST_FIXED_CELLS = len(PREFECTURES) + 2 * 2 + 2
+
+
+def list_rows(cell_budget):
+    """Rows of the page 2 list: what cell_budget leaves after the fixed visuals."""
+    return (cell_budget - LIST_FIXED_CELLS) // len(STATUS_LIST_COLUMNS)
+
+
+def status_list_legend(rows):
+    text = f"未完了手続数の多い順に最大{rows:,}団体。状況一覧は{SPEC.counts_text}手続の調査票順　"
+    return {"paragraphs": [{"textRuns": [
+        {"value": text, "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+        {"value": "○ オンライン手続できる　× できない　ー 該当する手続がない", "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
+    ]}]}
+
+
+def build_page2(layout="matrix", cell_budget=CELL_BUDGET):
+    """Page 2 with the status of every procedure per municipality as a
+    matrix, or (layout "list") as one row per municipality, the whole page
+    requesting at most cell_budget cells."""
     v = []
+    side, main, legend, date = detail_regions()
+    back, rest = side.split_y(30, None, gap=10)
+    panel = rest.split_y(620, None)[0]
+    sl_pref, sl_muni, subtitle, donut_row, kpis = panel.inset(15).split_y(55, 55, 50, 220, 78, None, gap=15)[:5]
 
     # Back button
-    back_config = {
-        "name": "p2_back",
-        "layouts": [{"id": 0, "position": position(20, 20, 0, 240, 30)}],
-        "singleVisual": {
-            "visualType": "actionButton",
-            "objects": {
-                "icon": [{"properties": {"show": lit_bool(False)}}],
-                "outline": [{"properties": {"show": lit_bool(False)}}],
-                "text": [{"properties": {
-                    "show": lit_bool(True),
-                    "text": lit_str("< 都道府県一覧に戻る"),
-                    "fontColor": solid_color(ACCENT_BLUE),
-                    "fontSize": lit_double(14),
-                    "fontFamily": lit_str("Arial"),
-                    "alignment": lit_str("Left"),
-                }}],
-                "action": [{"properties": {
-                    "type": lit_str("PageNavigation"),
-                    "destination": lit_str("ReportSection_page1"),
-                }}],
-            },
-            "vcObjects": {
-                "title": [{"properties": {"show": lit_bool(False)}}],
-                "background": [{"properties": {"show": lit_bool(False)}}],
-                "border": [{"properties": {"show": lit_bool(False)}}],
-                "visualHeader": [{"properties": {"show": lit_bool(False)}}],
-            },
-        },
-    }
-    v.append(make_vc(back_config, [], 20, 20, 240, 30, 0))
+    v.append(back_button("p2_back", *back.split_x(240, None)[0], 0))
 
     # Org
     v.append(textbox("p2_org", 1740, 24, 160, 36, 0, {"paragraphs": [{
@@ -513,120 +1495,299 @@ def build_page2():
     }]}))
 
     # Left panel bg
-    v.append(shape_bg("p2_panel_bg", 20, 60, 320, 620, 0))
+    v.append(shape_bg("p2_panel_bg", *panel, 0))
 
     # Slicers
-    v.append(slicer("p2_sl_pref", 35, 75, 290, 55, 1, "都道府県", "都道府県で絞り込む"))
-    v.append(slicer("p2_sl_muni", 35, 145, 290, 55, 1, "団体名", "団体名で絞り込む"))
+    v.append(slicer("p2_sl_pref", *sl_pref, 1, "都道府県", "都道府県で絞り込む"))
+    if layout != "list":
+        v.append(slicer("p2_sl_muni", *sl_muni, 1, "団体名", "団体名で絞り込む"))
 
     # Subtitle
-    v.append(textbox("p2_subtitle", 35, 215, 290, 50, 1, {"paragraphs": [
-        {"textRuns": [{"value": "子育て・介護関係の全26手続を", "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontWeight": "bold", "fontFamily": "Arial"}}]},
+    v.append(textbox("p2_subtitle", *subtitle, 1, {"paragraphs": [
+        {"textRuns": [{"value": f"{SPEC.label}関係の全{SPEC.n}手続を", "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontWeight": "bold", "fontFamily": "Arial"}}]},
         {"textRuns": [{"value": "オンライン手続できる自治体の割合", "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontWeight": "bold", "fontFamily": "Arial"}}]},
     ]}))
 
     # Donut
-    donut2 = {
-        "name": "p2_donut",
-        "layouts": [{"id": 0, "position": position(70, 280, 1, 220, 220)}],
-        "singleVisual": {
-            "visualType": "donutChart",
-            "projections": {"Category": [{"queryRef": "k.ステータス"}], "Y": [{"queryRef": "k.完了状況値"}]},
-            "prototypeQuery": {
-                "Version": 2,
-                "From": [{"Name": "k", "Entity": "完了状況", "Type": 0}],
-                "Select": [
-                    {"Column": {"Expression": {"SourceRef": {"Source": "k"}}, "Property": "ステータス"}, "Name": "k.ステータス"},
-                    {"Measure": {"Expression": {"SourceRef": {"Source": "k"}}, "Property": "完了状況値"}, "Name": "k.完了状況値"},
-                ],
-                "OrderBy": [{"Direction": 1, "Expression": {"Column": {"Expression": {"SourceRef": {"Source": "k"}}, "Property": "順序"}}}],
-            },
-            "objects": {
-                "legend": [{"properties": {"show": lit_bool(False)}}],
-                "dataPoint": [
-                    {"properties": {"fill": solid_color(ACCENT_BLUE)}, "selector": {"data": [{"scopeId": {"Comparison": {"ComparisonKind": 0, "Left": {"Column": {"Expression": {"SourceRef": {"Entity": "完了状況"}}, "Property": "ステータス"}}, "Right": {"Literal": {"Value": "'完了'"}}}}}]}},
-                    {"properties": {"fill": solid_color(NEUTRAL_GRAY)}, "selector": {"data": [{"scopeId": {"Comparison": {"ComparisonKind": 0, "Left": {"Column": {"Expression": {"SourceRef": {"Entity": "完了状況"}}, "Property": "ステータス"}}, "Right": {"Literal": {"Value": "'未完了'"}}}}}]}},
-                ],
-                "labels": [{"properties": {"show": lit_bool(True), "labelStyle": lit_str("Percent of total"), "fontSize": lit_double(28), "color": solid_color(TEXT_PRIMARY), "fontFamily": lit_str("Arial")}}],
-                "slices": [{"properties": {"innerRadiusRatio": lit_int(82)}}],
-            },
-            "vcObjects": {"title": [{"properties": {"show": lit_bool(False)}}], "background": [{"properties": {"show": lit_bool(False)}}], "border": [{"properties": {"show": lit_bool(False)}}]},
-        },
-    }
-    v.append(make_vc(donut2, [], 70, 280, 220, 220, 1))
+    v.append(donut("p2_donut", *donut_row.split_x(None, 220, None)[1], 1, 28))
 
     # KPI
-    v.append(textbox("p2_kpi_label", 35, 520, 290, 22, 1, {"paragraphs": [{"textRuns": [{"value": "オンライン化が完了した自治体数／全自治体数", "textStyle": {"fontSize": "11px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}}]}]}))
-    v.append(card("p2_kpi_done", 60, 548, 110, 50, 1, "子育て介護26手続完了自治体数", font_size=24))
-    v.append(textbox("p2_slash", 170, 554, 24, 38, 1, {"paragraphs": [{"textRuns": [{"value": "／", "textStyle": {"fontSize": "20px", "color": TEXT_PRIMARY, "fontFamily": "Arial"}}]}]}))
-    v.append(card("p2_kpi_total", 194, 548, 110, 50, 1, "自治体数", font_size=24))
+    kpi_label, kpi_done, kpi_slash, kpi_total = kpi_boxes(kpis, 22, 110, 24)
+    v.append(textbox("p2_kpi_label", *kpi_label, 1, {"paragraphs": [{"textRuns": [{"value": "オンライン化が完了した自治体数／全自治体数", "textStyle": {"fontSize": "11px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}}]}]}))
+    v.append(card("p2_kpi_done", *kpi_done, 1, SPEC.completed_measure, font_size=24))
+    v.append(textbox("p2_slash", *kpi_slash, 1, {"paragraphs": [{"textRuns": [{"value": "／", "textStyle": {"fontSize": "20px", "color": TEXT_PRIMARY, "fontFamily": "Arial"}}]}]}))
+    v.append(card("p2_kpi_total", *kpi_total, 1, "自治体数", font_size=24))
 
     # Legend
-    v.append(textbox("p2_legend", 360, 1030, 700, 25, 0, {"paragraphs": [{"textRuns": [
-        {"value": "●", "textStyle": {"fontSize": "12px", "color": ACCENT_BLUE, "fontFamily": "Arial"}},
-        {"value": " オンライン手続できる　", "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
-        {"value": "●", "textStyle": {"fontSize": "12px", "color": NEUTRAL_GRAY, "fontFamily": "Arial"}},
-        {"value": " オンライン手続できない　", "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
-        {"value": "ー 該当する手続がない", "textStyle": {"fontSize": "12px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}},
-    ]}]}))
+    if layout == "list":
+        v.append(textbox("p2_legend", *legend, 0, status_list_legend(list_rows(cell_budget))))
+    else:
+        v.append(textbox("p2_legend", *legend, 0, matrix_legend()))
 
     # Date
-    v.append(textbox("p2_date", 1620, 1045, 280, 25, 0, {"paragraphs": [{"textRuns": [{"value": "令和６年度末時点", "textStyle": {"fontSize": "11px", "color": TEXT_MUTED, "fontFamily": "Arial"}}], "horizontalTextAlignment": "right"}]}))
+    v.append(date_text("p2_date", *date, 0, 11))
 
     # Matrix
-    matrix_config = {
-        "name": "p2_matrix",
-        "layouts": [{"id": 0, "position": position(360, 20, 0, 1540, 1000)}],
-        "singleVisual": {
-            "visualType": "pivotTable",
-            "projections": {
-                "Rows": [{"queryRef": "o.サブカテゴリ"}, {"queryRef": "o.手続名"}],
-                "Columns": [{"queryRef": "o.団体名"}],
-                "Values": [{"queryRef": "o.ステータス表示"}],
-            },
-            "prototypeQuery": {
-                "Version": 2,
-                "From": [{"Name": "o", "Entity": "オンライン化状況", "Type": 0}],
-                "Select": [
-                    {"Column": {"Expression": {"SourceRef": {"Source": "o"}}, "Property": "サブカテゴリ"}, "Name": "o.サブカテゴリ"},
-                    {"Column": {"Expression": {"SourceRef": {"Source": "o"}}, "Property": "手続名"}, "Name": "o.手続名"},
-                    {"Column": {"Expression": {"SourceRef": {"Source": "o"}}, "Property": "団体名"}, "Name": "o.団体名"},
-                    {"Measure": {"Expression": {"SourceRef": {"Source": "o"}}, "Property": "ステータス表示"}, "Name": "o.ステータス表示"},
-                ],
-            },
-            "objects": {
-                "subTotals": [{"properties": {"rowSubtotals": lit_bool(False), "columnSubtotals": lit_bool(False)}}],
-            },
-            "vcObjects": {
-                "title": [{"properties": {"show": lit_bool(False)}}],
-                "background": [{"properties": {"show": lit_bool(True), "color": solid_color(BG_VISUAL), "transparency": lit_double(0)}}],
-                "border": [{"properties": {"show": lit_bool(True), "color": solid_color(BORDER_VISUAL), "radius": lit_int(RADIUS_DEFAULT)}}],
-            },
-        },
-    }
-    v.append(make_vc(matrix_config, [], 360, 20, 1540, 1000, 0))
+    if layout == "list":
+        v.append(status_list("p2_list", *main, 0, list_rows(cell_budget) * len(STATUS_LIST_COLUMNS)))
+    else:
+        v.append(status_matrix("p2_matrix", *main, 0))
 
-    return {
-        "config": json.dumps({"objects": {"background": [{"properties": {
-            "color": solid_color(BG_PAGE),
-            "transparency": lit_double(0),
-        }}]}}, ensure_ascii=False),
-        "displayName": "市区町村詳細",
-        "displayOption": 1,
-        "filters": json.dumps(page_filters, ensure_ascii=False),
-        "height": 1080.0,
-        "name": "ReportSection_page2",
-        "ordinal": 1,
-        "visualContainers": v,
-        "width": 1920.0,
-    }
+    return page("ReportSection_page2", "市区町村詳細", 1, v, subset_filters())
+
+
+# ============================================================
+# Prefecture pages
+# ============================================================
+
+def build_pref_page(i, pref):
+    """Detail page of PREFECTURES[i]: page 2 restricted by a page filter to
+    one prefecture, plus the list of procedures its municipalities have not
+    put online."""
+    n = f"pf{i + 1:02d}"
+    v = []
+    side, main, legend, date = detail_regions()
+    back, rest = side.split_y(30, None, gap=10)
+    panel, unfinished = rest.split_y(500, None, gap=20)
+    subtitle, donut_row, kpis, rate = panel.inset(15).split_y(50, 220, 78, 78, gap=12)
+    matrix = main.split_y(30, None, gap=10)[1]
+
+    v.append(back_button(f"{n}_back", *back.split_x(240, None)[0], 0))
+    v.append(textbox(f"{n}_title", 360, 18, 1300, 36, 1, {"paragraphs": [{
+        "textRuns": [{"value": f"{pref}　{SPEC.label}関係の{SPEC.n}手続のオンライン化取組状況",
+                      "textStyle": {"fontSize": "20px", "color": TEXT_PRIMARY,
+                                    "fontWeight": "bold", "fontFamily": "Arial"}}]
+    }]}))
+    v.append(textbox(f"{n}_org", 1740, 24, 160, 36, 0, {"paragraphs": [{
+        "textRuns": [{"value": "デジタル庁", "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontFamily": "Arial"}}],
+        "horizontalTextAlignment": "right",
+    }]}))
+
+    # KPIs
+    v.append(shape_bg(f"{n}_panel_bg", *panel, 0))
+    v.append(textbox(f"{n}_subtitle", *subtitle, 1, {"paragraphs": [
+        {"textRuns": [{"value": f"{SPEC.label}関係の全{SPEC.n}手続を", "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontWeight": "bold", "fontFamily": "Arial"}}]},
+        {"textRuns": [{"value": "オンライン手続できる自治体の割合", "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontWeight": "bold", "fontFamily": "Arial"}}]},
+    ]}))
+    v.append(donut(f"{n}_donut", *donut_row.split_x(None, 220, None)[1], 1, 28))
+    kpi_label, kpi_done, kpi_slash, kpi_total = kpi_boxes(kpis, 22, 110, 24)
+    v.append(textbox(f"{n}_kpi_label", *kpi_label, 1, {"paragraphs": [{"textRuns": [{"value": "オンライン化が完了した自治体数／全自治体数", "textStyle": {"fontSize": "11px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}}]}]}))
+    v.append(card(f"{n}_kpi_done", *kpi_done, 1, SPEC.completed_measure, font_size=24))
+    v.append(textbox(f"{n}_slash", *kpi_slash, 1, {"paragraphs": [{"textRuns": [{"value": "／", "textStyle": {"fontSize": "20px", "color": TEXT_PRIMARY, "fontFamily": "Arial"}}]}]}))
+    v.append(card(f"{n}_kpi_total", *kpi_total, 1, "自治体数", font_size=24))
+    rate_label, rate_card = rate.split_y(22, None, gap=6)
+    v.append(textbox(f"{n}_rate_label", *rate_label, 1, {"paragraphs": [{"textRuns": [{"value": f"{SPEC.label}手続のオンライン化率", "textStyle": {"fontSize": "11px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}}]}]}))
+    v.append(card(f"{n}_rate", *rate_card.split_x(None, 244, None)[1], 1, SPEC.online_rate_measure, font_size=24))
+
+    # Procedures not online yet
+    v.append(unfinished_table(f"{n}_unfinished", *unfinished, 0))
+
+    v.append(status_matrix(f"{n}_matrix", *matrix, 0))
+    v.append(textbox(f"{n}_legend", *legend, 0, matrix_legend()))
+    v.append(date_text(f"{n}_date", *date, 0, 11))
+
+    pref_filter = Filter("filter_pref", column_field("都道府県"), [pref])
+    return page(f"ReportSection_pref{i + 1:02d}", pref, 2 + i, v, subset_filters() + [pref_filter])
+
+
+# ============================================================
+# Trend page
+# ============================================================
+
+def build_trend_page(ordinal):
+    """The spec's completion rate per release: nationwide on the left and one small
+    line chart per prefecture on the right, all on the same 0-100% scale.
+
+    The charts read 都道府県別推移, 47 pre-aggregated rows per release, so
+    each stays cheap however many releases the history store holds.
+    """
+    v = []
+
+    v.append(back_button("tr_back", 20, 20, 240, 30, 0))
+    v.append(textbox("tr_title", 480, 18, 1200, 36, 1, {"paragraphs": [{
+        "textRuns": [{"value": f"{SPEC.label}関係の全{SPEC.n}手続をオンライン手続できる自治体の割合の推移",
+                      "textStyle": {"fontSize": "20px", "color": TEXT_PRIMARY,
+                                    "fontWeight": "bold", "fontFamily": "Arial"}}]
+    }]}))
+    v.append(textbox("tr_org", 1740, 24, 160, 36, 0, {"paragraphs": [{
+        "textRuns": [{"value": "デジタル庁", "textStyle": {"fontSize": "14px", "color": TEXT_PRIMARY, "fontFamily": "Arial"}}],
+        "horizontalTextAlignment": "right",
+    }]}))
+
+    # Nationwide
+    side, main = body_regions()
+    chart, note = side.split_y(780, 50, gap=10)
+    v.append(trend_line("tr_national", *chart, 0, "全国", font_size=13))
+    v.append(textbox("tr_note", *note, 0, {"paragraphs": [{"textRuns": [{
+        "value": f"公表日ごとの、全{SPEC.n}手続のオンライン化が完了した自治体数／全自治体数",
+        "textStyle": {"fontSize": "11px", "color": TEXT_SECONDARY, "fontFamily": "Arial"}}]}]}))
+
+    # --- 47 prefectures ---
+    for i, (pref, cell) in enumerate(zip(PREFECTURES, grid(main, len(PREFECTURES), cols=8, gap=6))):
+        v.append(trend_line(f"tr_pref_{i:02d}", *cell, 0, pref, pref))
+
+    return page("ReportSection_trend", "完了率の推移", ordinal, v)
+
+
+# ============================================================
+# Municipality tile pages
+# ============================================================
+
+DEFAULT_SUMMARY = os.path.join(HERE, "data_municipality_summary.csv")
+TILE_W, TILE_H, TILE_GAP = 180, 64, 6
+
+
+def muni_tiles(path=DEFAULT_SUMMARY):
+    """(コード, label) of every municipality in 自治体別集計, in 表示順 (unfinished first)."""
+    import measures
+    summary = sorted(measures.load_summary(path).values(), key=lambda r: r["表示順"])
+    return [(r["コード"], f"{r['都道府県']} {r['団体名']}") for r in summary]
+
+
+def tile_pages(tiles):
+    """(first, count) of the tiles on each tile page."""
+    return paginate(BODY, len(tiles), TILE_W, TILE_H, TILE_GAP)[1]
+
+
+def build_tile_page(k, n_pages, tiles, ordinal):
+    """Page k of n_pages: one tile per municipality of tiles, placed by paginate()."""
+    v = []
+    v.append(back_button(f"mt{k + 1:03d}_back", 20, 20, 240, 30, 0))
+    v.append(textbox(f"mt{k + 1:03d}_title", 480, 18, 1200, 36, 1, {"paragraphs": [{
+        "textRuns": [{"value": f"市区町村ごとの{SPEC.label}手続のオンライン化率（{k + 1}/{n_pages}）",
+                      "textStyle": {"fontSize": "20px", "color": TEXT_PRIMARY,
+                                    "fontWeight": "bold", "fontFamily": "Arial"}}]
+    }]}))
+    cells = paginate(BODY, len(tiles), TILE_W, TILE_H, TILE_GAP)[0]
+    for i, ((code, label), cell) in enumerate(zip(tiles, cells)):
+        v.append(muni_tile(f"mt{k + 1:03d}_{i:03d}", *cell, 0, code, label))
+    return page(f"ReportSection_muni{k + 1:03d}", f"市区町村 {k + 1}", ordinal, v, subset_filters())
 
 
 # ============================================================
 # Build report
 # ============================================================
 
-def build_report():
+def page_jobs(page1="cards", pref_pages=False, page2="matrix", cell_budget=CELL_BUDGET, trend_page=False,
+              tiles=None):
+    """(page builder, args) for every page, in report order. tiles: muni_tiles() for tile pages."""
+    jobs = [(build_page1, (page1,)), (build_page2, (page2, cell_budget))]
+    if pref_pages:
+        jobs += [(build_pref_page, (i, pref)) for i, pref in enumerate(PREFECTURES)]
+    if trend_page:
+        jobs.append((build_trend_page, (len(jobs),)))
+    if tiles:
+        pages = tile_pages(tiles)
+        jobs += [(build_tile_page, (k, len(pages), tiles[first:first + n], len(jobs) + k))
+                 for k, (first, n) in enumerate(pages)]
+    return jobs
+
+
+def seal_page(sec):
+    """Validate a page and encode its embedded strings. Returns validation errors.
+
+    Its visual configs then carry their names like build cache hits, so the
+    parent only re-checks names across pages and the page pickles as text.
+    """
+    errors = validate({"config": JsonString({}), "sections": [sec]})
+    sec["config"].encode()
+    sec["filters"].encode()
+    for vc in sec["visualContainers"]:
+        vc["config"].cached_name = visual_name(vc)
+        vc["config"].encode()
+        vc["filters"].encode()
+    return errors
+
+
+def init_page_worker(cache_path, debug=False, profile=False, theme=None, spec=specs.DEFAULT):
+    global BUILD_CACHE, PROFILE
+    set_theme(theme)
+    set_spec(spec)
+    if debug != DEBUG:
+        set_debug(debug)
+    if cache_path is None:
+        BUILD_CACHE = None
+    elif BUILD_CACHE is None or BUILD_CACHE.path != cache_path:
+        BUILD_CACHE = BuildCache(cache_path)
+    PROFILE = None
+    if profile:
+        PROFILE = Profiler()
+        PROFILE.instrument(globals())
+
+
+def page_phase_name(fn, sec):
+    return f"{fn.__name__}: {sec['displayName']}"
+
+
+def run_page_job(job):
+    """In a page worker: build, validate and encode one page.
+
+    Returns (page, errors, seconds, build cache entries used, hits, misses,
+    saved, profile): profile is None, or (phases, builder counts) of this
+    page for Profiler.merge.
+    """
+    fn, args = job
+    cache = BUILD_CACHE
+    if cache is not None:
+        cache.used, cache.hits, cache.misses, cache.saved = {}, 0, 0, 0.0
+    profile = PROFILE
+    if profile is not None:
+        profile.phases, profile.builders = [], {}
+    t0 = time.perf_counter()
+    with profiled(fn.__name__) as phase:
+        sec = fn(*args)
+        errors = seal_page(sec)
+    seconds = time.perf_counter() - t0
+    if profile is not None:
+        phase.name = page_phase_name(fn, sec)
+        profile = ([p.to_dict() for p in profile.phases], profile.builders)
+    if cache is None:
+        return sec, errors, seconds, {}, 0, 0, 0.0, profile
+    return sec, errors, seconds, cache.used, cache.hits, cache.misses, cache.saved, profile
+
+
+def build_pages(jobs, workers=1):
+    """Run page jobs, in a process pool when workers > 1.
+
+    Pages come back in job order whatever the worker count, so the output
+    does not depend on scheduling.  Worker build cache use and profiles are
+    merged into BUILD_CACHE and PROFILE.  Returns (pages, seconds per page,
+    validation errors).
+    """
+    if workers <= 1:
+        pages, times = [], []
+        for fn, args in jobs:
+            t0 = time.perf_counter()
+            with profiled(fn.__name__) as phase:
+                pages.append(fn(*args))
+            times.append(time.perf_counter() - t0)
+            if phase is not None:
+                phase.name = page_phase_name(fn, pages[-1])
+        return pages, times, []
+    cache = BUILD_CACHE
+    pages, times, errors = [], [], []
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=init_page_worker,
+        initargs=(cache and cache.path, DEBUG, PROFILE is not None, THEME, SPEC),
+    ) as pool:
+        for sec, errs, seconds, used, hits, misses, saved, profile in pool.map(run_page_job, jobs):
+            pages.append(sec)
+            times.append(seconds)
+            errors.extend(f"{sec['name']}: {e}" for e in errs)
+            if cache is not None:
+                cache.used.update(used)
+                cache.hits += hits
+                cache.misses += misses
+                cache.saved += saved
+            if profile is not None:
+                PROFILE.merge(*profile)
+    return pages, times, errors
+
+
+def build_report(sections=None, page1="cards"):
+    """The report envelope around sections (default: page 1 in the page1 layout and page 2)."""
+    if sections is None:
+        sections = [build_page1(page1), build_page2()]
     report_config = {
         "version": "5.44",
         "themeCollection": {
@@ -647,13 +1808,13 @@ def build_report():
         },
     }
     return {
-        "config": json.dumps(report_config, ensure_ascii=False),
+        "config": JsonString(report_config),
         "layoutOptimization": 0,
         "resourcePackages": [
             {"resourcePackage": {"disabled": False, "items": [{"name": "CY23SU08", "path": "BaseThemes/CY23SU08.json", "type": 202}], "name": "SharedResources", "type": 2}},
             {"resourcePackage": {"disabled": False, "items": [{"name": "Digital_Agency_Dashboard_Desig3362615343750506.json", "path": "Digital_Agency_Dashboard_Desig3362615343750506.json", "type": 201}], "name": "RegisteredResources", "type": 1}},
         ],
-        "sections": [build_page1(), build_page2()],
+        "sections": sections,
         "theme": "Digital_Agency_Dashboard_Desig3362615343750506.json",
     }
 
@@ -662,59 +1823,523 @@ def build_report():
 # Validation & main
 # ============================================================
 
+def check_visual(v):
+    """Type errors in a report model Visual."""
+    errors = []
+    for slot, kind in (("query", Query), ("objects", Objects), ("vc_objects", Objects)):
+        node = getattr(v, slot)
+        if node is not None and not isinstance(node, kind):
+            errors.append(f"{slot}: expected {kind.__name__}, got {type(node).__name__}")
+    if isinstance(v.query, Query):
+        for f in v.query.fields() + [f for f, _ in v.query.order_by]:
+            if not isinstance(f, Field):
+                errors.append(f"query: expected Field, got {type(f).__name__}")
+            elif f.entity not in SOURCE_ALIASES:
+                errors.append(f"query: unknown table '{f.entity}'")
+    for slot in ("objects", "vc_objects"):
+        node = getattr(v, slot)
+        if isinstance(node, Objects):
+            for name, entries in node.entries:
+                if not all(isinstance(e, Props) for e in entries):
+                    errors.append(f"{slot}.{name}: expected Props")
+    return errors
+
+
 def validate(report):
+    """Structural checks on the built report, before anything is encoded.
+
+    Report model visuals and filters are checked by type; configs given as
+    plain JSON data by shape.
+    """
     errors = []
 
-    def check_json(val, path):
-        try:
-            return json.loads(val)
-        except json.JSONDecodeError as e:
-            errors.append(f"{path}: {e}")
+    def check_obj(val, path, kind):
+        v = val.value if isinstance(val, JsonString) else val
+        if not isinstance(v, kind):
+            errors.append(f"{path}: expected {kind.__name__}, got {type(v).__name__}")
             return None
+        return v
+
+    def check_filters(val, path):
+        filters = check_obj(val, path, list)
+        for fi, f in enumerate(filters or []):
+            if not isinstance(f, (Filter, TopN, dict)):
+                errors.append(f"{path}[{fi}]: expected Filter, got {type(f).__name__}")
 
-    check_json(report["config"], "report.config")
+    check_obj(report["config"], "report.config", dict)
 
     names_all = set()
     for si, sec in enumerate(report["sections"]):
         sp = f"sections[{si}]"
-        check_json(sec["config"], f"{sp}.config")
-        check_json(sec["filters"], f"{sp}.filters")
+        check_obj(sec["config"], f"{sp}.config", dict)
+        check_filters(sec["filters"], f"{sp}.filters")
+        bounds = Box(0, 0, sec["width"], sec["height"])
         for vi, vc in enumerate(sec.get("visualContainers", [])):
             vp = f"{sp}.vc[{vi}]"
-            cfg = check_json(vc["config"], f"{vp}.config")
-            check_json(vc["filters"], f"{vp}.filters")
-            if cfg:
+            box = Box(vc["x"], vc["y"], vc["width"], vc["height"])
+            if not bounds.contains(box):
+                errors.append(f"{vp}: {box!r} is outside the {bounds.w:g}x{bounds.h:g} page")
+            name = vc["config"].cached_name if isinstance(vc["config"], JsonString) else None
+            if name is not None:
+                # A build cache hit: checked when it was cached, only the name is new here.
+                if name in names_all:
+                    errors.append(f"{vp}: duplicate name '{name}'")
+                names_all.add(name)
+                continue
+            cfg = vc["config"].value if isinstance(vc["config"], JsonString) else None
+            if isinstance(cfg, Visual):
+                n = cfg.name
+                errors.extend(f"{vp}: {e}" for e in check_visual(cfg))
+            else:
+                cfg = check_obj(vc["config"], f"{vp}.config", dict)
+                if not cfg:
+                    continue
                 n = cfg.get("name", "")
-                if n in names_all:
-                    errors.append(f"{vp}: duplicate name '{n}'")
-                names_all.add(n)
                 pq = cfg.get("singleVisual", {}).get("prototypeQuery")
-                if pq:
-                    if pq.get("Version") != 2:
-                        errors.append(f"{vp}: Version != 2")
+                if pq and pq.get("Version") != 2:
+                    errors.append(f"{vp}: Version != 2")
+            check_filters(vc["filters"], f"{vp}.filters")
+            if n in names_all:
+                errors.append(f"{vp}: duplicate name '{n}'")
+            names_all.add(n)
     return errors
 
 
-def main():
-    out = "/Users/kei/Git/26_administrative_procedures_online/26_administrative_procedures_online.Report/report.json"
-    report = build_report()
-    errs = validate(report)
-    if errs:
-        for e in errs:
-            print(f"  ERROR: {e}")
-        sys.exit(1)
+def encode_report(report):
+    """report.json text, exactly as write_report() puts it on disk."""
+    return json.dumps(report, ensure_ascii=False, indent=2, default=encode_nested)
 
-    s = json.dumps(report, ensure_ascii=False, indent=2)
-    json.loads(s)  # round-trip check
 
+def write_report(report, out):
+    """Stream report.json to out in one encoding pass.
+
+    The file is only replaced when its bytes change, so an unchanged report
+    keeps its mtime.  Returns (bytes written, whether out was replaced).
+    """
     os.makedirs(os.path.dirname(out), exist_ok=True)
-    with open(out, "w", encoding="utf-8") as f:
-        f.write(s)
+    tmp = out + ".tmp"
+    with profiled("serialize + write (streamed)"), open(tmp, "w", encoding="utf-8") as f:
+        for chunk in json.JSONEncoder(ensure_ascii=False, indent=2, default=encode_nested).iterencode(report):
+            f.write(chunk)
+    n = os.path.getsize(tmp)
+    with profiled("compare with the existing file"):
+        unchanged = os.path.exists(out) and filecmp.cmp(tmp, out, shallow=False)
+    if unchanged:
+        os.remove(tmp)
+        return n, False
+    os.replace(tmp, out)
+    return n, True
+
 
-    p1 = len(report["sections"][0]["visualContainers"])
-    p2 = len(report["sections"][1]["visualContainers"])
-    print(f"OK: {out}")
-    print(f"  Page 1: {p1} visuals, Page 2: {p2} visuals, {len(s):,} bytes")
+# ============================================================
+# PBIR (enhanced) folder output
+# ============================================================
+# The same report as definition/ with one file per page and per visual:
+#   definition/version.json, report.json, pages/pages.json
+#   definition/pages/<page>/page.json
+#   definition/pages/<page>/visuals/<visual>/visual.json
+# Only files whose bytes change are rewritten, on a thread pool.
+
+SCHEMA_BASE = "https://developer.microsoft.com/json-schemas/fabric/item/report/definition"
+PBIR_SCHEMAS = {
+    "version": f"{SCHEMA_BASE}/versionMetadata/1.0.0/schema.json",
+    "report": f"{SCHEMA_BASE}/report/1.2.0/schema.json",
+    "pages": f"{SCHEMA_BASE}/pagesMetadata/1.0.0/schema.json",
+    "page": f"{SCHEMA_BASE}/page/1.3.0/schema.json",
+    "visual": f"{SCHEMA_BASE}/visualContainer/1.4.0/schema.json",
+}
+PBIR_PACKAGE_TYPES = {1: "RegisteredResources", 2: "SharedResources"}
+PBIR_ITEM_TYPES = {201: "CustomTheme", 202: "BaseTheme"}
+PBIR_DISPLAY_OPTIONS = {0: "FitToWidth", 1: "FitToPage", 2: "ActualSize"}
+PBIR_EXPORT_DATA_MODES = {0: "None", 1: "AllowSummarized", 2: "AllowSummarizedAndUnderlying"}
+PBIR_DIRECTIONS = {1: "Ascending", 2: "Descending"}
+
+
+def pbir_field(expr, sources):
+    """A prototypeQuery expression with Source aliases resolved to Entity refs."""
+    if isinstance(expr, dict):
+        ref = expr.get("SourceRef")
+        if ref is not None and "Source" in ref:
+            return {**expr, "SourceRef": {"Entity": sources[ref["Source"]]}}
+        return {k: pbir_field(v, sources) for k, v in expr.items()}
+    if isinstance(expr, list):
+        return [pbir_field(v, sources) for v in expr]
+    return expr
+
+
+def pbir_filters(filters):
+    return {"filters": [
+        {"field" if k == "expression" else k: v for k, v in f.items()} for f in filters
+    ]}
+
+
+def pbir_visual(vc):
+    cfg = vc["config"].data
+    sv = cfg["singleVisual"]
+    visual = {"visualType": sv["visualType"]}
+    pq = sv.get("prototypeQuery")
+    if pq:
+        sources = {f["Name"]: f["Entity"] for f in pq["From"]}
+        selects = {s["Name"]: s for s in pq["Select"]}
+        query_state = {}
+        for role, refs in sv["projections"].items():
+            projections = []
+            for r in refs:
+                sel = selects[r["queryRef"]]
+                kind = "Measure" if "Measure" in sel else "Column"
+                projections.append({
+                    "field": pbir_field({kind: sel[kind]}, sources),
+                    "queryRef": r["queryRef"],
+                    "nativeQueryRef": sel[kind]["Property"],
+                })
+            query_state[role] = {"projections": projections}
+        visual["query"] = {"queryState": query_state}
+        if pq.get("OrderBy"):
+            visual["query"]["sortDefinition"] = {"sort": [
+                {"field": pbir_field(o["Expression"], sources), "direction": PBIR_DIRECTIONS[o["Direction"]]}
+                for o in pq["OrderBy"]
+            ]}
+    if "objects" in sv:
+        visual["objects"] = sv["objects"]
+        if sv["visualType"] == "textbox":
+            # Legacy embeds the paragraphs as a JSON string literal; PBIR takes the array.
+            general = [dict(g, properties=dict(g["properties"])) for g in sv["objects"]["general"]]
+            for g in general:
+                para = g["properties"]["paragraphs"]["expr"]["Literal"]["Value"]
+                g["properties"]["paragraphs"] = json.loads(para)["paragraphs"]
+            visual["objects"] = {**sv["objects"], "general": general}
+    if "vcObjects" in sv:
+        visual["visualContainerObjects"] = sv["vcObjects"]
+    out = {
+        "$schema": PBIR_SCHEMAS["visual"],
+        "name": cfg["name"],
+        "position": cfg["layouts"][0]["position"],
+        "visual": visual,
+    }
+    filters = vc["filters"].data
+    if filters:
+        out["filterConfig"] = pbir_filters(filters)
+    return out
+
+
+def pbir_visual_json(vc):
+    return json.dumps(pbir_visual(vc), ensure_ascii=False, indent=2)
+
+
+def pbir_page(sec):
+    page = {
+        "$schema": PBIR_SCHEMAS["page"],
+        "name": sec["name"],
+        "displayName": sec["displayName"],
+        "displayOption": PBIR_DISPLAY_OPTIONS[sec["displayOption"]],
+        "height": sec["height"],
+        "width": sec["width"],
+    }
+    page.update(sec["config"].data)
+    filters = sec["filters"].data
+    if filters:
+        page["filterConfig"] = pbir_filters(filters)
+    return page
+
+
+def pbir_report(report):
+    cfg = report["config"].data
+    themes = {
+        k: {"name": t["name"], "reportVersionAtImport": t["version"], "type": PBIR_PACKAGE_TYPES[t["type"]]}
+        for k, t in cfg["themeCollection"].items()
+    }
+    packages = [{
+        "name": rp["resourcePackage"]["name"],
+        "type": PBIR_PACKAGE_TYPES[rp["resourcePackage"]["type"]],
+        "items": [{"name": it["name"], "path": it["path"], "type": PBIR_ITEM_TYPES[it["type"]]}
+                  for it in rp["resourcePackage"]["items"]],
+    } for rp in report["resourcePackages"]]
+    settings = dict(cfg["settings"])
+    settings["exportDataMode"] = PBIR_EXPORT_DATA_MODES[settings["exportDataMode"]]
+    settings["defaultDrillFilterOtherVisuals"] = cfg["defaultDrillFilterOtherVisuals"]
+    return {
+        "$schema": PBIR_SCHEMAS["report"],
+        "themeCollection": themes,
+        "layoutOptimization": "None",
+        "resourcePackages": packages,
+        "settings": settings,
+    }
+
+
+def pbir_files(report):
+    """(path relative to the Report folder, JSON text) for every PBIR file.
+
+    visual.json texts go through BUILD_CACHE when it is active, so unchanged
+    visuals are not re-encoded.
+    """
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
+    def visual_json(vc):
+        if BUILD_CACHE is None:
+            return pbir_visual_json(vc)
+        return BUILD_CACHE.derive(pbir_visual_json, vc)
+
+    sections = report["sections"]
+    active = report["config"].value.get("activeSectionIndex", 0)
+    files = [
+        ("definition/version.json", dumps({"$schema": PBIR_SCHEMAS["version"], "version": "2.0.0"})),
+        ("definition/report.json", dumps(pbir_report(report))),
+        ("definition/pages/pages.json", dumps({
+            "$schema": PBIR_SCHEMAS["pages"],
+            "pageOrder": [sec["name"] for sec in sections],
+            "activePageName": sections[active]["name"],
+        })),
+    ]
+    for sec in sections:
+        page_dir = f"definition/pages/{sec['name']}"
+        files.append((f"{page_dir}/page.json", dumps(pbir_page(sec))))
+        for vc in sec["visualContainers"]:
+            name = visual_name(vc)
+            files.append((f"{page_dir}/visuals/{name}/visual.json", visual_json(vc)))
+    return files
+
+
+def write_if_changed(path, data):
+    """Write bytes to path unless it already holds exactly them. Returns bytes written."""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return 0
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def write_pbir(report, report_dir, workers=None):
+    """Write the PBIR definition/ folder; stale files from earlier runs are removed.
+
+    Returns (files, files written, bytes written).
+    """
+    with profiled("serialize (PBIR files)"):
+        files = [
+            (os.path.join(report_dir, rel), text.encode("utf-8"))
+            for rel, text in pbir_files(report)
+        ]
+    with profiled("compare + write changed files"), \
+            concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        written = list(pool.map(lambda f: write_if_changed(*f), files))
+
+    keep = {os.path.normpath(path) for path, _ in files}
+    for root, dirs, names in os.walk(os.path.join(report_dir, "definition"), topdown=False):
+        for n in names:
+            path = os.path.normpath(os.path.join(root, n))
+            if path not in keep:
+                os.remove(path)
+        if not os.listdir(root):
+            os.rmdir(root)
+    return len(files), sum(1 for n in written if n), sum(written)
+
+
+def page_counts(section):
+    """(visuals, DAX queries) of a page: each visual with a prototypeQuery issues one query."""
+    queries = 0
+    for vc in section["visualContainers"]:
+        cfg = vc["config"]
+        if cfg.cached_name is not None:
+            queries += '"prototypeQuery":' in cfg.encode()
+        elif isinstance(cfg.value, Visual):
+            queries += cfg.value.query is not None
+        else:
+            queries += "prototypeQuery" in cfg.value.get("singleVisual", {})
+    return len(section["visualContainers"]), queries
+
+
+def page1_layout_counts(built, layout):
+    """page_counts() of page 1 in every layout; the ones not built are built uncached."""
+    global BUILD_CACHE
+    counts = {layout: page_counts(built)}
+    cache, BUILD_CACHE = BUILD_CACHE, None
+    try:
+        for other in PAGE1_LAYOUTS:
+            if other != layout:
+                counts[other] = page_counts(build_page1(other))
+    finally:
+        BUILD_CACHE = cache
+    return counts
+
+
+def remove_other_format(report_dir, fmt):
+    """Power BI refuses a Report folder holding both report.json and definition/."""
+    if fmt == "pbir":
+        legacy = os.path.join(report_dir, "report.json")
+        if os.path.exists(legacy):
+            os.remove(legacy)
+    else:
+        definition = os.path.join(report_dir, "definition")
+        if os.path.isdir(definition):
+            shutil.rmtree(definition)
+
+
+def main(argv=None):
+    global BUILD_CACHE, PROFILE
+    ap = argparse.ArgumentParser(description="Generate the Power BI report definition")
+    ap.add_argument("-o", "--out-dir", default=DEFAULT_REPORT_DIR, help="the .Report folder to write into")
+    ap.add_argument("--format", choices=("legacy", "pbir"), default="legacy",
+                    help="legacy: one report.json; pbir: definition/ with one file per page and visual")
+    ap.add_argument("--page1", choices=PAGE1_LAYOUTS, default="cards",
+                    help="cards: one filtered card per prefecture; grouped: one matrix keyed on 都道府県; "
+                         "regions: the cards grouped by the 6 地域ブロック")
+    ap.add_argument("--page2", choices=PAGE2_LAYOUTS, default="matrix",
+                    help="matrix: procedures x every 団体名; list: one row per municipality, unfinished first")
+    ap.add_argument("--cell-budget", type=int, default=CELL_BUDGET,
+                    help="most cells page 2 requests in the list layout (--page2 list)")
+    ap.add_argument("--pref-pages", action="store_true",
+                    help="add one detail page per prefecture (47 more pages)")
+    ap.add_argument("--trend-page", action="store_true",
+                    help="add the 完了率の推移 page (needs the model built with generate_model.py --history)")
+    ap.add_argument("--muni-pages", nargs="?", const=DEFAULT_SUMMARY, default=None, metavar="SUMMARY_CSV",
+                    help="add pages of one tile per municipality, paginated (reads 自治体別集計 from ingest.py)")
+    ap.add_argument("--theme-styles", action="store_true",
+                    help="write the shared styles into the theme's visualStyles and keep visual-level "
+                         "formatting only where it differs (checked against the full formatting)")
+    ap.add_argument("--page-workers", type=int, default=1,
+                    help="processes building pages (1: build in this process)")
+    ap.add_argument("--workers", type=int, default=None, help="threads for PBIR file writes")
+    ap.add_argument("--stats", action="store_true", help="print build cache hits/misses and timings")
+    ap.add_argument("--no-cache", action="store_true", help="rebuild every visual; leave the cache untouched")
+    ap.add_argument("--profile", action="store_true",
+                    help="print wall/CPU time and peak memory per phase and calls per visual builder")
+    ap.add_argument("--profile-json", default=None, metavar="PATH",
+                    help="also write the profile as JSON (implies --profile)")
+    ap.add_argument("--debug", action="store_true",
+                    help="make report nodes read-only after they are built: any change to one raises")
+    ap.add_argument("--cache", default=None,
+                    help="build cache file (default: .pbi/build_cache.json in the output folder)")
+    args = ap.parse_args(argv)
+    if list_rows(args.cell_budget) < 1:
+        ap.error(f"--cell-budget must be at least {LIST_FIXED_CELLS + len(STATUS_LIST_COLUMNS)} "
+                 f"(the fixed visuals of page 2 and one row)")
+
+    if args.debug:
+        set_debug(True)
+    if args.profile or args.profile_json:
+        PROFILE = Profiler()
+        PROFILE.instrument(globals())
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    if not args.no_cache:
+        with profiled("load build cache"):
+            BUILD_CACHE = BuildCache(args.cache or os.path.join(args.out_dir, ".pbi", "build_cache.json"))
+    tiles = None
+    if args.muni_pages:
+        if not os.path.exists(args.muni_pages):
+            print(f"  ERROR: {args.muni_pages} not found (run ingest.py first)")
+            sys.exit(1)
+        tiles = muni_tiles(args.muni_pages)
+    theme = None
+    if args.theme_styles:
+        base_path = os.path.join(args.out_dir, THEME_REL)
+        if not os.path.exists(base_path):
+            base_path = os.path.join(DEFAULT_REPORT_DIR, THEME_REL)
+        base = load_theme(base_path)
+        theme = theme_with_styles(base)
+        set_theme(theme_defaults(theme))
+    jobs = page_jobs(args.page1, args.pref_pages, args.page2, args.cell_budget, args.trend_page, tiles)
+    sections, page_times, errs = build_pages(jobs, args.page_workers)
+    with profiled("build_report"):
+        report = build_report(sections)
+    with profiled("validate"):
+        errs += validate(report)
+    if theme is not None:
+        set_theme(None)
+        with profiled("build with full formatting (theme check)"):
+            full, _, _ = build_pages(jobs, args.page_workers)
+        set_theme(theme_defaults(theme))
+        with profiled("theme check"):
+            errs += theme_check(full, sections, theme_defaults(base), THEME)
+            full_size = len(encode_report(build_report(full)).encode("utf-8"))
+            themed_size = len(encode_report(report).encode("utf-8"))
+    if errs:
+        for e in errs:
+            print(f"  ERROR: {e}")
+        sys.exit(1)
+    t_build = time.perf_counter() - t0
+
+    if args.format == "pbir":
+        out = os.path.join(args.out_dir, "definition")
+        n_files, n_written, size = write_pbir(report, args.out_dir, args.workers)
+        changed = n_written > 0
+        detail = f"{n_files} files, {size:,} bytes written"
+        written = f"{n_written} of {n_files} files rewritten"
+    else:
+        out = os.path.join(args.out_dir, "report.json")
+        size, changed = write_report(report, out)
+        detail = f"{size:,} bytes"
+        written = f"report.json {'rewritten' if changed else 'not rewritten'}"
+    remove_other_format(args.out_dir, args.format)
+    if theme is not None:
+        theme_path = os.path.join(args.out_dir, THEME_REL)
+        theme_written = write_if_changed(theme_path, encode_theme(theme).encode("utf-8"))
+    if BUILD_CACHE is not None:
+        with profiled("save build cache"):
+            BUILD_CACHE.save()
+    t_total = time.perf_counter() - t0
+    cpu_total = time.process_time() - c0
+
+    layouts = page1_layout_counts(report["sections"][0], args.page1)
+    p1 = layouts[args.page1]
+    p2 = page_counts(report["sections"][1])
+    print(f"OK: {out}" if changed else f"OK (unchanged): {out}")
+    print(f"  Page 1 ({args.page1}): {p1[0]} visuals / {p1[1]} queries, "
+          f"Page 2 ({args.page2}): {p2[0]} visuals / {p2[1]} queries, {detail}")
+    print("  Page 1 layouts: " + ", ".join(
+        f"{k} {layouts[k][0]} visuals / {layouts[k][1]} queries" for k in PAGE1_LAYOUTS))
+    if args.pref_pages:
+        counts = [page_counts(sec) for sec in report["sections"][2:2 + len(PREFECTURES)]]
+        print(f"  Prefecture pages: {len(counts)} pages, {sum(c[0] for c in counts)} visuals / "
+              f"{sum(c[1] for c in counts)} queries")
+    if args.trend_page:
+        n_visuals, n_queries = page_counts(report["sections"][2 + len(PREFECTURES) * args.pref_pages])
+        print(f"  Trend page: {n_visuals} visuals / {n_queries} queries")
+    if tiles:
+        counts = [page_counts(sec) for sec in report["sections"][-len(tile_pages(tiles)):]]
+        print(f"  Municipality pages: {len(counts)} pages, {len(tiles):,} tiles, "
+              f"{sum(c[0] for c in counts):,} visuals / {sum(c[1] for c in counts):,} queries")
+    if theme is not None:
+        print(f"OK: {theme_path}" if theme_written else f"OK (unchanged): {theme_path}")
+        n_visuals = sum(len(sec["visualContainers"]) for sec in sections)
+        print(f"  Theme styles: {n_visuals} visuals render as with full formatting; report.json "
+              f"{themed_size:,} bytes instead of {full_size:,} ({themed_size / full_size - 1:+.0%})")
+    slowest = max(range(len(page_times)), key=page_times.__getitem__)
+    print(f"  Page build: {len(page_times)} pages, {args.page_workers} worker(s), "
+          f"{sum(page_times) / len(page_times) * 1000:.2f} ms/page, "
+          f"slowest {report['sections'][slowest]['displayName']} {page_times[slowest] * 1000:.2f} ms")
+    if args.stats:
+        c = BUILD_CACHE
+        if c is None:
+            print("  cache: off")
+        else:
+            n = c.hits + c.misses
+            rate = c.hits / n if n else 0.0
+            print(f"  cache: {c.hits} hits, {c.misses} misses ({rate:.0%}), "
+                  f"~{c.saved * 1000:.1f} ms saved, {len(c.entries) - (len(c.used) - c.misses)} stale dropped")
+        print(f"  build+validate {t_build * 1000:.1f} ms, total {t_total * 1000:.1f} ms, {written}")
+        for sec, seconds in zip(report["sections"], page_times):
+            print(f"    {sec['displayName']}: {seconds * 1000:.2f} ms")
+    if PROFILE is not None:
+        print_profile(PROFILE, t_total, cpu_total)
+        if args.profile_json:
+            data = PROFILE.to_dict(
+                t_total, cpu_total,
+                args={k: v for k, v in vars(args).items() if k not in ("profile", "profile_json")},
+                pages=len(report["sections"]),
+                visuals=sum(len(sec["visualContainers"]) for sec in report["sections"]),
+                bytes=size,
+            )
+            with open(args.profile_json, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"OK: {args.profile_json}")
+        tracemalloc.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Append-only history of the survey releases, one Parquet partition per release.
+
+    history/release=20260120/municipalities.parquet   1 row per municipality
+    history/release=20260120/prefectures.parquet      1 row per prefecture
+
+Both carry 公表日 (the release date).  prefectures.parquet is the
+pre-aggregated 都道府県別推移 table of model.bim (generate_model.py
+--history): 自治体数, 子育て・介護26手続の完了自治体数 and 未完了手続数 per
+prefecture, so a trend visual reads 47 rows per release instead of the
+releases' long tables.
+
+A partition is computed from its release's bitsets.py snapshot alone and
+written once: adding a release never reads or rewrites the others.
+snapshots.py --history appends the release it ingests.
+
+    python history.py                              # releases and national completion
+    python history.py --append snapshots/20260420.npz
+
+Requires NumPy and pyarrow.
+"""
+
+import argparse
+import datetime
+import os
+import re
+import shutil
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # the history store is optional
+    pa = pq = None
+
+import bitsets
+
+np = bitsets.np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.path.join(HERE, "history")
+
+MUNICIPALITIES = "municipalities.parquet"
+PREFECTURES = "prefectures.parquet"
+
+# ============================================================
+# Partitions
+# ============================================================
+
+def release_date(release):
+    """'20260120' -> date(2026, 1, 20)."""
+    return datetime.datetime.strptime(release, "%Y%m%d").date()
+
+
+def partition_dir(release, folder=DEFAULT_DIR):
+    return os.path.join(folder, f"release={release}")
+
+
+def releases(folder=DEFAULT_DIR):
+    """Releases in the store, oldest first."""
+    if not os.path.isdir(folder):
+        return []
+    return sorted(m.group(1) for m in (re.fullmatch(r"release=(\d{8})", n) for n in os.listdir(folder)) if m)
+
+
+def partition_tables(bits, release):
+    """(municipalities, prefectures) Arrow tables of one release's snapshot."""
+    care = bits.mask(bits.care_procedures())
+    unfinished_bits = ~(bits.online | bits.na) & care
+    unfinished = bitsets.unpack(unfinished_bits, len(bits.procedures)).sum(axis=1)
+    done = (unfinished == 0).astype(np.int64)
+    date = release_date(release)
+
+    munis = pa.table({
+        "公表日": pa.array([date] * len(bits), pa.date32()),
+        "コード": pa.array(bits.codes.tolist(), pa.string()),
+        "都道府県": pa.array(bits.prefectures.tolist(), pa.string()).dictionary_encode(),
+        "団体名": pa.array(bits.names.tolist(), pa.string()),
+        "未完了手続数": pa.array(unfinished, pa.int64()),
+        "完了フラグ": pa.array(done, pa.int64()),
+    })
+
+    # Prefectures in first-seen (survey) order
+    prefs, first, group = np.unique(bits.prefectures, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    n = len(prefs)
+    prefs_table = pa.table({
+        "公表日": pa.array([date] * n, pa.date32()),
+        "都道府県": pa.array(prefs[order].tolist(), pa.string()),
+        "自治体数": pa.array(np.bincount(group, minlength=n)[order], pa.int64()),
+        "完了自治体数": pa.array(np.bincount(group, weights=done, minlength=n)[order].astype(np.int64), pa.int64()),
+        "未完了手続数": pa.array(np.bincount(group, weights=unfinished, minlength=n)[order].astype(np.int64), pa.int64()),
+    })
+    return munis, prefs_table
+
+
+def append(bits, release, folder=DEFAULT_DIR):
+    """Write release's partition. Raises FileExistsError if the store already has it.
+
+    The partition is written to a temporary folder and renamed into place,
+    so a reader never sees half of it.
+    """
+    final = partition_dir(release, folder)
+    if os.path.exists(final):
+        raise FileExistsError(final)
+    tmp = os.path.join(folder, f".release={release}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    munis, prefs = partition_tables(bits, release)
+    pq.write_table(munis, os.path.join(tmp, MUNICIPALITIES), compression="snappy")
+    pq.write_table(prefs, os.path.join(tmp, PREFECTURES), compression="snappy")
+    os.rename(tmp, final)
+    return final
+
+
+def read(name=PREFECTURES, folder=DEFAULT_DIR):
+    """One table of every partition, oldest release first."""
+    parts = [pq.read_table(os.path.join(partition_dir(r, folder), name)) for r in releases(folder)]
+    return pa.concat_tables(parts, promote_options="permissive") if parts else None
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Append-only per-release history store")
+    ap.add_argument("--history", default=DEFAULT_DIR, help="history folder")
+    ap.add_argument("--append", metavar="SNAPSHOT", help="add the release of a snapshots/<release>.npz")
+    args = ap.parse_args(argv)
+
+    if np is None or pa is None:
+        print("  ERROR: history.py requires numpy and pyarrow (pip install numpy pyarrow)")
+        sys.exit(1)
+
+    if args.append:
+        m = re.fullmatch(r"(\d{8})\.npz", os.path.basename(args.append))
+        if m is None or not os.path.exists(args.append):
+            print(f"  ERROR: {args.append}: not a snapshots/<YYYYMMDD>.npz file")
+            sys.exit(1)
+        try:
+            path = append(bitsets.load(args.append), m.group(1), args.history)
+        except FileExistsError:
+            print(f"  ERROR: release {m.group(1)} is already in {args.history} (partitions are never rewritten)")
+            sys.exit(1)
+        print(f"OK: {path}")
+
+    prefs = read(PREFECTURES, args.history)
+    if prefs is None:
+        print(f"  {args.history}: no releases")
+        return
+    rows = prefs.group_by("公表日").aggregate([("自治体数", "sum"), ("完了自治体数", "sum")]).sort_by("公表日").to_pylist()
+    for r in rows:
+        rate = r["完了自治体数_sum"] / r["自治体数_sum"] if r["自治体数_sum"] else 0.0
+        print(f"  {r['公表日']}: {r['完了自治体数_sum']:,} / {r['自治体数_sum']:,} completed ({rate:.1%})")
+
+
+if __name__ == "__main__":
+    main()
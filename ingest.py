@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Ingest the policies workbook into data_unpivoted.csv.
+
+Streams the 地方公共団体のデジタル化の取組に関する情報 sheet row by row and
+unpivots each municipality's procedure columns into the long format read by
+the semantic model's オンライン化状況 partition.  Besides the 12 survey
+columns each row carries 状況コード, the status as an integer (○ 1, ー 0,
+未対応 -1), so that measures can filter on it without string comparisons.
+
+The workbook is read directly from its zip container with iterparse, so memory
+stays flat regardless of how many municipalities x procedures it holds.
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = pq = None
+
+import bitsets
+from measures import CARE_SUBCATEGORIES, STATUS_CHARS, STATUS_CODES, STATUS_NONE, SUMMARY_COLUMNS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_XLSX = os.path.join(HERE, "20260120_policies_administrative_procedures_online_01_.xlsx")
+DEFAULT_CSV = os.path.join(HERE, "data_unpivoted.csv")
+DEFAULT_PARQUET = os.path.join(HERE, "data_unpivoted.parquet")
+DEFAULT_SUMMARY = os.path.join(HERE, "data_municipality_summary.csv")
+DEFAULT_BITS = bitsets.DEFAULT_BITS
+
+# ============================================================
+# Output schema (matches the オンライン化状況 partition)
+# ============================================================
+COLUMNS = [
+    "コード", "地域ブロック", "都道府県", "団体名", "団体名フリガナ", "団体区分",
+    "大カテゴリ", "サブカテゴリ", "手続名", "重点手続", "オンライン化状況", "その他手続数",
+    "状況コード",
+]
+INT_COLUMNS = {"その他手続数", "状況コード"}
+
+# 団体区分 column of the sheet: "政令市：1 中核市：2 特別区：3"
+MUNI_TYPES = {"1": "政令市", "2": "中核市", "3": "特別区"}
+
+# Status variants seen in the source mapped to the values used by the measures
+STATUS_NORMALIZE = {"○": "○", "〇": "○", "ー": "ー", "－": "ー", "-": "ー"}
+
+CHUNK_ROWS = 5000  # long-format rows buffered per csv.writerows call
+ROW_GROUP_ROWS = 128 * 1024  # long-format rows per Parquet row group
+
+# Repeating text columns stored as Arrow dictionary<int32, string>.  コード,
+# 団体名 and 団体名フリガナ are unique per municipality and stay plain strings
+# (Parquet still dictionary-encodes their pages within a row group).
+DICTIONARY_COLUMNS = {
+    "地域ブロック", "都道府県", "団体区分", "大カテゴリ", "サブカテゴリ",
+    "手続名", "重点手続", "オンライン化状況",
+}
+
+# ============================================================
+# Streaming xlsx reader
+# ============================================================
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_CELL_REF = re.compile(r"([A-Z]+)")
+
+
+def col_index(ref):
+    """'AB12' -> 27 (0-based column index)."""
+    letters = _CELL_REF.match(ref).group(1)
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+
+def _text(el):
+    """Concatenate <t> runs of a <si>/<is> element, skipping phonetic (rPh) runs."""
+    parts = []
+    for child in el:
+        if child.tag == NS_MAIN + "t":
+            parts.append(child.text or "")
+        elif child.tag == NS_MAIN + "r":
+            for t in child.iter(NS_MAIN + "t"):
+                parts.append(t.text or "")
+    return "".join(parts)
+
+
+def read_shared_strings(zf):
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == NS_MAIN + "si":
+                strings.append(_text(el))
+                el.clear()
+    return strings
+
+
+def first_sheet_path(zf):
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    sheet = workbook.find(f"{NS_MAIN}sheets/{NS_MAIN}sheet")
+    rid = sheet.get(NS_REL + "id")
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(NS_PKG_REL + "Relationship"):
+        if rel.get("Id") == rid:
+            target = rel.get("Target").lstrip("/")
+            return target if target.startswith("xl/") else "xl/" + target
+    raise ValueError(f"sheet relationship {rid} not found")
+
+
+def iter_sheet_rows(path):
+    """Yield (row_number, [cell text, ...]) for the first sheet, one row at a time."""
+    with zipfile.ZipFile(path) as zf:
+        shared = read_shared_strings(zf)
+        with zf.open(first_sheet_path(zf)) as f:
+            sheet_data = None
+            for event, el in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if el.tag == NS_MAIN + "sheetData":
+                        sheet_data = el
+                    continue
+                if el.tag != NS_MAIN + "row":
+                    continue
+                values = []
+                for c in el.iter(NS_MAIN + "c"):
+                    idx = col_index(c.get("r"))
+                    t = c.get("t")
+                    if t == "inlineStr":
+                        is_el = c.find(NS_MAIN + "is")
+                        val = _text(is_el) if is_el is not None else ""
+                    else:
+                        v = c.find(NS_MAIN + "v")
+                        val = v.text if v is not None and v.text is not None else ""
+                        if t == "s" and val:
+                            val = shared[int(val)]
+                    if idx >= len(values):
+                        values.extend([""] * (idx + 1 - len(values)))
+                    values[idx] = val
+                yield int(el.get("r")), values
+                # Drop processed rows so the tree never grows past one row
+                sheet_data.clear()
+
+# ============================================================
+# Header layout
+# ============================================================
+
+def clean_header(s):
+    return s.replace("\r", "").replace("\n", "").strip()
+
+
+def _cell(values, idx):
+    return values[idx] if idx < len(values) else ""
+
+
+def parse_layout(header_rows):
+    """Work out the procedure columns from the five header rows.
+
+    Rows are, in order: column titles (コード … その他), 大カテゴリ, サブカテゴリ,
+    重点手続 marker (●) and 手続名.  Category cells are merged across their
+    procedures, so they are filled forward; a new 大カテゴリ resets サブカテゴリ.
+    """
+    titles, categories, subcategories, priority, names = header_rows
+    other_col = next(i for i, v in enumerate(titles) if clean_header(v).startswith("その他"))
+    first_col = COLUMNS.index("大カテゴリ")  # procedures start after the 6 identity columns
+    procedures = []
+    cat = sub = ""
+    for idx in range(first_col, other_col):
+        if clean_header(_cell(categories, idx)):
+            cat, sub = clean_header(_cell(categories, idx)), ""
+        if clean_header(_cell(subcategories, idx)):
+            sub = clean_header(_cell(subcategories, idx))
+        procedures.append((
+            idx, cat, sub,
+            clean_header(_cell(names, idx)),
+            "●" if clean_header(_cell(priority, idx)) else "",
+        ))
+    return procedures, other_col
+
+# ============================================================
+# Unpivot
+# ============================================================
+
+def normalize_code(s):
+    s = s.strip()
+    if s.endswith(".0"):
+        s = s[:-2]
+    # 全国地方公共団体コード is 6 digits; Excel drops the leading zero of 01xxxx
+    return s.zfill(6) if s.isdigit() else s
+
+
+def normalize_count(s):
+    """その他手続数: '約1,000' -> '1000'; '不明' or blank -> '' (null in the model)."""
+    digits = re.sub(r"[約,，\s]", "", s)
+    if digits.endswith(".0"):
+        digits = digits[:-2]
+    return digits if digits.isdigit() else ""
+
+
+def iter_long_rows(path):
+    """Yield one long-format tuple per municipality x procedure, streaming the sheet."""
+    rows = iter_sheet_rows(path)
+    for _, values in rows:
+        if values and clean_header(values[0]) == "コード":
+            header = [values] + [next(rows)[1] for _ in range(4)]
+            break
+    else:
+        raise ValueError(f"{path}: header row starting with 'コード' not found")
+    procedures, other_col = parse_layout(header)
+
+    for _, values in rows:
+        code = normalize_code(_cell(values, 0))
+        if not code:
+            continue
+        ident = (
+            code,
+            clean_header(_cell(values, 1)),
+            _cell(values, 2).strip(),
+            _cell(values, 3).strip(),
+            _cell(values, 4).strip(),
+            MUNI_TYPES.get(_cell(values, 5).strip(), ""),
+        )
+        others = normalize_count(_cell(values, other_col))
+        for idx, cat, sub, name, priority in procedures:
+            status = STATUS_NORMALIZE.get(_cell(values, idx).strip(), "")
+            yield ident + (cat, sub, name, priority, status, others, STATUS_CODES[status])
+
+
+def parquet_schema():
+    fields = []
+    for name in COLUMNS:
+        if name in INT_COLUMNS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def record_batch(rows, schema):
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if field.name in INT_COLUMNS:
+            arrays.append(pa.array([int(v) if v != "" else None for v in values], pa.int64()))
+        elif pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, pa.string()))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_outputs(rows, csv_out, parquet_out=None, chunk_rows=CHUNK_ROWS):
+    """Write long rows to csv_out (and parquet_out) in chunks.
+
+    Returns the number of data rows written.
+    """
+    n = 0
+    buf = []
+    schema = parquet_schema() if parquet_out else None
+    writer = pq.ParquetWriter(parquet_out, schema, compression="snappy") if parquet_out else None
+    pending, pending_rows = [], 0
+
+    def flush_row_group():
+        nonlocal pending, pending_rows
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema))
+        pending, pending_rows = [], 0
+
+    try:
+        with open(csv_out, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(COLUMNS)
+            for row in rows:
+                buf.append(row)
+                if len(buf) < chunk_rows:
+                    continue
+                w.writerows(buf)
+                if writer is not None:
+                    pending.append(record_batch(buf, schema))
+                    pending_rows += len(buf)
+                    if pending_rows >= ROW_GROUP_ROWS:
+                        flush_row_group()
+                n += len(buf)
+                buf = []
+            w.writerows(buf)
+            if writer is not None:
+                if buf:
+                    pending.append(record_batch(buf, schema))
+                flush_row_group()
+            n += len(buf)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n
+
+
+def write_csv(rows, out, chunk_rows=CHUNK_ROWS):
+    return write_outputs(rows, out, None, chunk_rows)
+
+
+# ============================================================
+# Per-municipality summary (自治体別集計)
+# ============================================================
+
+def tally_care(rows, summary):
+    """Pass rows through, tallying the childcare/care procedures per コード:
+    the unfinished count and the 状況一覧 characters, in row order."""
+    code_i, pref_i, name_i = COLUMNS.index("コード"), COLUMNS.index("都道府県"), COLUMNS.index("団体名")
+    sub_i, status_i = COLUMNS.index("サブカテゴリ"), COLUMNS.index("オンライン化状況")
+    for row in rows:
+        s = summary.get(row[code_i])
+        if s is None:
+            s = summary[row[code_i]] = [row[code_i], row[pref_i], 0, row[name_i], []]
+        if row[sub_i] in CARE_SUBCATEGORIES:
+            s[4].append(STATUS_CHARS[row[status_i]])
+            if row[status_i] == STATUS_NONE:
+                s[2] += 1
+        yield row
+
+
+def summary_parquet_path(summary_out):
+    return os.path.splitext(summary_out)[0] + ".parquet"
+
+
+def write_summary(summary, csv_out, parquet_out=None):
+    # 表示順: most unfinished procedures first, then by コード, so a TopN on it has no ties
+    order = sorted(summary.values(), key=lambda s: (-s[2], s[0]))
+    rank = {s[0]: n for n, s in enumerate(order, 1)}
+    rows = [(code, pref, unfinished, 1 if unfinished == 0 else 0, name, "".join(chars), rank[code])
+            for code, pref, unfinished, name, chars in summary.values()]
+    with open(csv_out, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(SUMMARY_COLUMNS)
+        w.writerows(rows)
+    if parquet_out:
+        code, pref, unfinished, done, name, statuses, order = zip(*rows) if rows else ([],) * 7
+        table = pa.table({
+            "コード": pa.array(code, pa.string()),
+            "都道府県": pa.array(pref, pa.string()).dictionary_encode(),
+            "未完了手続数": pa.array(unfinished, pa.int64()),
+            "完了フラグ": pa.array(done, pa.int64()),
+            "団体名": pa.array(name, pa.string()),
+            "状況一覧": pa.array(statuses, pa.string()),
+            "表示順": pa.array(order, pa.int64()),
+        })
+        pq.write_table(table, parquet_out, compression="snappy")
+    return len(rows)
+
+
+# ============================================================
+# Status bitsets (bitsets.py)
+# ============================================================
+
+def collect_status(rows, collector):
+    """Pass rows through, adding each status to a bitsets.Collector."""
+    idx = [COLUMNS.index(c) for c in ("コード", "都道府県", "団体名", "サブカテゴリ", "手続名", "オンライン化状況")]
+    for row in rows:
+        collector.add(*(row[i] for i in idx))
+        yield row
+
+
+def ingest(xlsx, out, chunk_rows=CHUNK_ROWS, parquet_out=None, summary_out=None, bits_out=None):
+    """Unpivot xlsx into out (and parquet_out); optionally write the summary
+    table and the status bitsets.
+
+    The summary's Parquet copy goes next to summary_out when parquet_out is set.
+    Returns the number of long rows written.
+    """
+    return ingest_rows(iter_long_rows(xlsx), out, chunk_rows, parquet_out, summary_out, bits_out)
+
+
+def ingest_rows(rows, out, chunk_rows=CHUNK_ROWS, parquet_out=None, summary_out=None, bits_out=None):
+    """ingest() for long-format tuples from another source (synthetic.py)."""
+    for path in (out, parquet_out, summary_out, bits_out):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    summary = {}
+    if summary_out:
+        rows = tally_care(rows, summary)
+    collector = bitsets.Collector() if bits_out else None
+    if collector is not None:
+        rows = collect_status(rows, collector)
+    n = write_outputs(rows, out, parquet_out, chunk_rows)
+    if summary_out:
+        write_summary(summary, summary_out, summary_parquet_path(summary_out) if parquet_out else None)
+    if collector is not None:
+        bitsets.save(collector.build(), bits_out)
+    return n
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Unpivot the policies workbook into data_unpivoted.csv")
+    ap.add_argument("xlsx", nargs="?", default=DEFAULT_XLSX, help="source workbook")
+    ap.add_argument("-o", "--out", default=DEFAULT_CSV, help="output CSV path")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                    help="long-format rows buffered per write")
+    ap.add_argument("--parquet", nargs="?", const=DEFAULT_PARQUET, default=None, metavar="PATH",
+                    help="also write a dictionary-encoded Parquet file "
+                         "(read by model.bim generated with --source parquet)")
+    ap.add_argument("--summary", default=DEFAULT_SUMMARY, metavar="PATH",
+                    help="per-municipality summary table (自治体別集計) output path")
+    ap.add_argument("--bitsets", nargs="?", const=DEFAULT_BITS, default=None, metavar="PATH",
+                    help="also write per-municipality status bitmasks (read by bitsets.py)")
+    args = ap.parse_args(argv)
+
+    if args.parquet and pa is None:
+        print("  ERROR: --parquet requires pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    if args.bitsets and bitsets.np is None:
+        print("  ERROR: --bitsets requires numpy (pip install numpy)")
+        sys.exit(1)
+
+    if not os.path.exists(args.xlsx):
+        print(f"  ERROR: {args.xlsx} not found")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    n = ingest(args.xlsx, args.out, args.chunk_rows, args.parquet, args.summary, args.bitsets)
+    elapsed = time.perf_counter() - t0
+
+    print(f"OK: {args.out}")
+    if args.parquet:
+        print(f"OK: {args.parquet}")
+    print(f"OK: {args.summary}")
+    if args.bitsets:
+        print(f"OK: {args.bitsets}")
+    print(f"  {n:,} rows, {elapsed:.2f}s ({n / elapsed if elapsed else 0:,.0f} rows/s)")
+    print(f"  csv: {os.path.getsize(args.out):,} bytes")
+    if args.parquet:
+        print(f"  parquet: {os.path.getsize(args.parquet):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Positions of report visuals computed from constraints.
+
+A Box is a rectangle on the page canvas.  Regions are carved out of the
+canvas by splitting boxes into fixed and flexible parts (split_x /
+split_y), and repeated visuals are placed with grid() or, past one page,
+paginate().  Both compute every cell in one pass, in time linear in the
+number of tiles.  Positions stay integers (report.json prints 480, not
+480.0).  check() reports boxes that leave their bounds or overlap each
+other, also in linear time:
+
+    python layout.py --check        # random splits and grids: in bounds, no overlap
+"""
+
+import argparse
+import random
+import sys
+
+# ============================================================
+# Boxes
+# ============================================================
+
+class Box:
+    """x, y, width, height on the canvas; unpacks as (x, y, w, h)."""
+    __slots__ = ("x", "y", "w", "h")
+
+    def __init__(self, x, y, w, h):
+        self.x, self.y, self.w, self.h = x, y, w, h
+
+    @property
+    def right(self):
+        return self.x + self.w
+
+    @property
+    def bottom(self):
+        return self.y + self.h
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.w, self.h))
+
+    def __eq__(self, other):
+        return isinstance(other, Box) and tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"Box({self.x}, {self.y}, {self.w}, {self.h})"
+
+    def inset(self, left, top=None, right=None, bottom=None):
+        """The box shrunk by margins (CSS order; one value: all sides)."""
+        top = left if top is None else top
+        right = left if right is None else right
+        bottom = top if bottom is None else bottom
+        return Box(self.x + left, self.y + top, self.w - left - right, self.h - top - bottom)
+
+    def contains(self, other):
+        return self.x <= other.x and self.y <= other.y and other.right <= self.right and other.bottom <= self.bottom
+
+    def overlaps(self, other):
+        """Whether the interiors intersect (boxes that only touch do not overlap)."""
+        return self.x < other.right and other.x < self.right and self.y < other.bottom and other.y < self.bottom
+
+    def split_x(self, *widths, gap=0):
+        """Side-by-side parts: a number is a fixed width, None shares what is left."""
+        return [Box(x, self.y, w, self.h) for x, w in _split(self.x, self.w, widths, gap)]
+
+    def split_y(self, *heights, gap=0):
+        """Stacked parts: a number is a fixed height, None shares what is left."""
+        return [Box(self.x, y, self.w, h) for y, h in _split(self.y, self.h, heights, gap)]
+
+
+def _split(start, length, sizes, gap):
+    """(offset, size) of each part; flexible parts share the rest, the first ones 1px more."""
+    flex = sum(s is None for s in sizes)
+    free = length - sum(s for s in sizes if s is not None) - gap * (len(sizes) - 1)
+    if free < 0 or (flex and free < flex):
+        raise ValueError(f"parts {sizes} with gap {gap} do not fit in {length}")
+    share, extra = divmod(free, flex) if flex else (0, 0)
+    out = []
+    pos = start
+    for s in sizes:
+        if s is None:
+            s = share + (extra > 0)
+            extra -= 1
+        out.append((pos, s))
+        pos += s + gap
+    return out
+
+# ============================================================
+# Grids
+# ============================================================
+
+def grid_shape(box, n, cols=None, rows=None, gap=0, aspect=None):
+    """(cols, rows, cell width, cell height) of n equal cells filling box.
+
+    cols and/or rows fix the shape; otherwise the column count whose cells
+    come closest to the aspect ratio (width / height, default square) wins.
+    """
+    if n < 1:
+        raise ValueError("a grid needs at least one cell")
+    if cols is None and rows is None:
+        aspect = aspect or 1.0
+        best = None
+        for c in range(1, n + 1):
+            r = -(-n // c)
+            w, h = (box.w - gap * (c - 1)) / c, (box.h - gap * (r - 1)) / r
+            if w < 1 or h < 1:
+                continue
+            score = abs(w / h - aspect) / aspect
+            if best is None or score < best[0]:
+                best = (score, c)
+        if best is None:
+            raise ValueError(f"{n} cells do not fit in {box}")
+        cols = best[1]
+    if cols is None:
+        cols = -(-n // rows)
+    if rows is None:
+        rows = -(-n // cols)
+    if cols * rows < n:
+        raise ValueError(f"{cols}x{rows} grid has fewer than {n} cells")
+    w = (box.w - gap * (cols - 1)) // cols
+    h = (box.h - gap * (rows - 1)) // rows
+    if w < 1 or h < 1:
+        raise ValueError(f"{cols}x{rows} cells with gap {gap} do not fit in {box}")
+    return cols, rows, w, h
+
+
+def grid(box, n, cols=None, rows=None, gap=0, aspect=None):
+    """n equal cells filling box, row by row (see grid_shape)."""
+    cols, _, w, h = grid_shape(box, n, cols, rows, gap, aspect)
+    return [Box(box.x + (i % cols) * (w + gap), box.y + (i // cols) * (h + gap), w, h) for i in range(n)]
+
+
+def paginate(box, n, cell_w, cell_h, gap=0):
+    """n tiles of cell_w x cell_h across as many pages of box as needed.
+
+    Returns (cells, pages): the cells of one full page, row by row, and
+    per page the (first, count) of the tiles it shows, so tile i is drawn
+    at cells[i - first] of its page.  Every page has the same cells.
+    """
+    cols = (box.w + gap) // (cell_w + gap)
+    rows = (box.h + gap) // (cell_h + gap)
+    if cols < 1 or rows < 1:
+        raise ValueError(f"a {cell_w}x{cell_h} tile does not fit in {box}")
+    per_page = cols * rows
+    cells = [Box(box.x + (i % cols) * (cell_w + gap), box.y + (i // cols) * (cell_h + gap), cell_w, cell_h)
+             for i in range(min(n, per_page))]
+    return cells, [(first, min(per_page, n - first)) for first in range(0, n, per_page)]
+
+# ============================================================
+# Checks
+# ============================================================
+
+def check(boxes, bounds=None):
+    """Errors for boxes outside bounds and for pairs of boxes that overlap.
+
+    Boxes are hashed into buckets the size of the median box and only boxes
+    sharing a bucket are compared: linear time for tiles of similar size.
+    """
+    errors = []
+    if bounds is not None:
+        errors += [f"{b!r} is outside {bounds!r}" for b in boxes if not bounds.contains(b)]
+    sized = [b for b in boxes if b.w > 0 and b.h > 0]
+    if not sized:
+        return errors
+    bw = max(sorted(b.w for b in sized)[len(sized) // 2], 1)
+    bh = max(sorted(b.h for b in sized)[len(sized) // 2], 1)
+    buckets = {}
+    for i, b in enumerate(sized):
+        for gx in range(int(b.x // bw), int(-(-b.right // bw))):
+            for gy in range(int(b.y // bh), int(-(-b.bottom // bh))):
+                buckets.setdefault((gx, gy), []).append(i)
+    for (gx, gy), members in buckets.items():
+        for k, i in enumerate(members):
+            a = sized[i]
+            for j in members[k + 1:]:
+                b = sized[j]
+                # Report a pair once: in the first bucket both boxes cover
+                if a.overlaps(b) and (gx, gy) == (int(max(a.x, b.x) // bw), int(max(a.y, b.y) // bh)):
+                    errors.append(f"{a!r} overlaps {b!r}")
+    return errors
+
+
+def self_check(trials=500, seed=0):
+    """Random splits, grids and pages checked for bounds and overlap. Returns (errors, trials)."""
+    rnd = random.Random(seed)
+    errors = []
+    for t in range(trials):
+        box = Box(rnd.randrange(0, 100), rnd.randrange(0, 100), rnd.randrange(200, 2000), rnd.randrange(200, 1200))
+        gap = rnd.randrange(0, 13)
+        n = rnd.randrange(1, 400)
+        parts = [rnd.choice([None, rnd.randrange(1, 80)]) for _ in range(rnd.randrange(1, 6))]
+        cases = []
+        try:
+            cases.append(("split_x", box.split_x(*parts, gap=gap)))
+            cases.append(("split_y", box.split_y(*parts, gap=gap)))
+        except ValueError:
+            pass
+        cols = rnd.choice([None, rnd.randrange(1, 40)])
+        try:
+            cases.append(("grid", grid(box, n, cols=cols, gap=gap, aspect=rnd.uniform(0.5, 3))))
+        except ValueError:
+            pass
+        try:
+            cells, pages = paginate(box, n * 5, rnd.randrange(20, 300), rnd.randrange(20, 200), gap)
+            cases.append(("paginate", cells))
+            if sum(c for _, c in pages) != n * 5 or any(c > len(cells) for _, c in pages):
+                errors.append(f"trial {t}: paginate: pages do not cover the {n * 5} tiles")
+        except ValueError:
+            pass
+        for kind, boxes in cases:
+            errors += [f"trial {t}: {kind}: {e}" for e in check(boxes, box)]
+            if kind == "grid" and len(boxes) != n:
+                errors.append(f"trial {t}: grid: {len(boxes)} cells for {n}")
+    return errors, trials
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Constraint layout of report visuals")
+    ap.add_argument("--check", action="store_true", help="check random layouts for bounds and overlap")
+    ap.add_argument("--trials", type=int, default=500)
+    args = ap.parse_args(argv)
+    if not args.check:
+        ap.error("--check is required")
+    errors, n = self_check(args.trials)
+    if errors:
+        for e in errors[:50]:
+            print(f"  ERROR: {e}")
+        sys.exit(1)
+    print(f"OK: {n} random layouts in bounds without overlap")
+
+
+if __name__ == "__main__":
+    main()
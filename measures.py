@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Reference implementation of the model.bim measures over data_unpivoted.csv.
+
+Each function evaluates one measure the way the DAX does, for a filter
+context given as {column: set of allowed values} over the オンライン化状況
+long table.  It is deliberately row-level and unoptimized: it is the yardstick
+that precomputed tables and faster engines are checked against.
+
+    python measures.py [--data-dir DIR] [--model model.bim]
+
+checks the ingestion's per-municipality summary and the DAX emitted in
+model.bim (evaluated by dax.py) against the row-level rules.
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(HERE, "data_unpivoted.csv")
+DEFAULT_SUMMARY = os.path.join(HERE, "data_municipality_summary.csv")
+
+# ============================================================
+# Semantics shared by ingestion, model.bim and the checks
+# ============================================================
+CARE_SUBCATEGORIES = ("ア.子育て関係", "イ.介護関係")
+
+STATUS_ONLINE = "○"   # オンライン手続が可能
+STATUS_NA = "ー"       # 該当する手続がない
+STATUS_NONE = ""       # 未対応
+
+# 状況コード materialized by ingest.py; the sign matches ステータスコード
+STATUS_CODES = {STATUS_ONLINE: 1, STATUS_NA: 0, STATUS_NONE: -1}
+
+# 状況一覧 of 自治体別集計: one character per 子育て・介護 procedure, in survey order
+STATUS_CHARS = {STATUS_ONLINE: "○", STATUS_NA: "ー", STATUS_NONE: "×"}
+
+SUMMARY_COLUMNS = ["コード", "都道府県", "未完了手続数", "完了フラグ", "団体名", "状況一覧", "表示順"]
+
+# ============================================================
+# Loading
+# ============================================================
+
+def load_rows(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def load_summary(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return {
+            r["コード"]: {**r, "未完了手続数": int(r["未完了手続数"]), "完了フラグ": int(r["完了フラグ"]),
+                          "表示順": int(r["表示順"])}
+            for r in csv.DictReader(f)
+        }
+
+
+def apply_filters(rows, filters):
+    """Rows visible under filters ({column: allowed values}; None = no filter)."""
+    if not filters:
+        return rows
+    items = list(filters.items())
+    return [r for r in rows if all(r[c] in allowed for c, allowed in items)]
+
+# ============================================================
+# Measures
+# ============================================================
+
+def online_count(rows, filters=None):
+    """オンライン対応数"""
+    return sum(1 for r in apply_filters(rows, filters) if r["オンライン化状況"] != STATUS_NONE)
+
+
+def na_count(rows, filters=None):
+    """該当なし数"""
+    return sum(1 for r in apply_filters(rows, filters) if r["オンライン化状況"] == STATUS_NA)
+
+
+def not_online_count(rows, filters=None):
+    """未対応数"""
+    return sum(1 for r in apply_filters(rows, filters) if r["オンライン化状況"] == STATUS_NONE)
+
+
+def divide(a, b):
+    """DAX DIVIDE: BLANK (None) on a zero denominator."""
+    return a / b if b else None
+
+
+def online_rate(rows, filters=None):
+    """オンライン化率"""
+    online = online_count(rows, filters)
+    return divide(online, online + not_online_count(rows, filters))
+
+
+def procedure_count(rows, filters=None):
+    """手続数"""
+    return len(apply_filters(rows, filters))
+
+
+def municipality_count(rows, filters=None):
+    """自治体数"""
+    return len({r["コード"] for r in apply_filters(rows, filters)})
+
+
+def _care_context(filters):
+    # CALCULATE ( ..., 'オンライン化状況'[サブカテゴリ] IN {...} ) replaces any
+    # outer filter on サブカテゴリ and keeps the others
+    ctx = dict(filters or {})
+    ctx["サブカテゴリ"] = set(CARE_SUBCATEGORIES)
+    return ctx
+
+
+def care_completed_municipalities(rows, filters=None):
+    """子育て介護26手続完了自治体数: SUMX over visible コード of IF(no unfinished care row)."""
+    visible = {r["コード"] for r in apply_filters(rows, filters)}
+    unfinished = {r["コード"] for r in apply_filters(rows, _care_context(filters))
+                  if r["オンライン化状況"] == STATUS_NONE}
+    return len(visible - unfinished)
+
+
+def care_completion_rate(rows, filters=None):
+    """子育て介護26手続完了率"""
+    return divide(care_completed_municipalities(rows, filters), municipality_count(rows, filters))
+
+
+def care_online_rate(rows, filters=None):
+    """子育て介護オンライン化率_自治体別"""
+    care = apply_filters(rows, _care_context(filters))
+    online = sum(1 for r in care if r["オンライン化状況"] != STATUS_NONE)
+    return divide(online, len(care))
+
+
+def pref_label(rows, filters=None):
+    """都道府県ラベル: '都道府県名(完了数 / 全自治体数)'."""
+    prefs = {r["都道府県"] for r in apply_filters(rows, filters)}
+    pref = prefs.pop() if len(prefs) == 1 else ""
+    return f"{pref}({care_completed_municipalities(rows, filters)} / {municipality_count(rows, filters)})"
+
+
+def status_text(rows, filters=None):
+    """ステータス表示: SELECTEDVALUE(オンライン化状況, "")."""
+    values = {r["オンライン化状況"] for r in apply_filters(rows, filters)}
+    return values.pop() if len(values) == 1 else ""
+
+
+def status_code(rows, filters=None):
+    """ステータスコード as first defined: SWITCH(SELECTEDVALUE(オンライン化状況),
+    "○", 1, "ー", 1, "", -1, BLANK()).
+
+    ○/ー -> 1, '' -> -1.  Several values or none also give -1: SELECTEDVALUE
+    is BLANK there and BLANK() = "" is true in DAX.
+    """
+    values = {r["オンライン化状況"] for r in apply_filters(rows, filters)}
+    value = values.pop() if len(values) == 1 else STATUS_NONE
+    if value in (STATUS_ONLINE, STATUS_NA):
+        return 1
+    return -1 if value == STATUS_NONE else None
+
+
+def completion_status_value(status, rows, filters=None):
+    """完了状況値 for the 完了状況[ステータス] row 完了 / 未完了."""
+    completed = care_completed_municipalities(rows, filters)
+    if status == "完了":
+        return completed
+    if status == "未完了":
+        return municipality_count(rows, filters) - completed
+    return None
+
+# ============================================================
+# Per-municipality summary (自治体別集計)
+# ============================================================
+
+def summarize(rows):
+    """{コード: summary row} computed from the long rows."""
+    summary = {}
+    for r in rows:
+        s = summary.get(r["コード"])
+        if s is None:
+            s = summary[r["コード"]] = {"コード": r["コード"], "都道府県": r["都道府県"], "未完了手続数": 0,
+                                        "団体名": r["団体名"], "状況一覧": ""}
+        if r["サブカテゴリ"] in CARE_SUBCATEGORIES:
+            s["状況一覧"] += STATUS_CHARS[r["オンライン化状況"]]
+            if r["オンライン化状況"] == STATUS_NONE:
+                s["未完了手続数"] += 1
+    for s in summary.values():
+        s["完了フラグ"] = 1 if s["未完了手続数"] == 0 else 0
+    for n, code in enumerate(display_order(summary), 1):
+        summary[code]["表示順"] = n
+    return summary
+
+
+def display_order(summary):
+    """コード by 表示順: most unfinished procedures first, then by コード (no ties)."""
+    return sorted(summary, key=lambda code: (-summary[code]["未完了手続数"], code))
+
+
+def summary_completed(summary, codes):
+    """子育て介護26手続完了自治体数 as the model computes it: SUM(完了フラグ)."""
+    return sum(summary[c]["完了フラグ"] for c in codes)
+
+# ============================================================
+# Checks
+# ============================================================
+
+# Measures whose precomputed form (自治体別集計) ignores filters below コード
+# level, so they are only compared in contexts that filter whole municipalities
+COMPLETION_MEASURES = {
+    "自治体数", "子育て介護26手続完了自治体数", "子育て介護26手続完了率", "都道府県ラベル", "完了状況値",
+}
+
+# Row-level reference for every measure on the fact table
+REFERENCE = {
+    "オンライン対応数": online_count,
+    "該当なし数": na_count,
+    "未対応数": not_online_count,
+    "オンライン化率": online_rate,
+    "手続数": procedure_count,
+    "自治体数": municipality_count,
+    "子育て介護26手続完了自治体数": care_completed_municipalities,
+    "子育て介護26手続完了率": care_completion_rate,
+    "子育て介護オンライン化率_自治体別": care_online_rate,
+    "都道府県ラベル": pref_label,
+    "ステータス表示": status_text,
+    "ステータスコード": status_code,
+}
+
+
+def dashboard_contexts(rows, sample_every=25):
+    """(label, filters) for the contexts the report evaluates measures in.
+
+    National, each 都道府県 and 地域ブロック (page 1 cards), the page-2
+    サブカテゴリ page filter alone and with each 都道府県 / sampled 団体名
+    slicer selection.
+    """
+    care = set(CARE_SUBCATEGORIES)
+    prefs = sorted({r["都道府県"] for r in rows})
+    blocks = sorted({r["地域ブロック"] for r in rows})
+    munis = sorted({r["団体名"] for r in rows})[::sample_every]
+    yield "全国", {}
+    for p in prefs:
+        yield f"都道府県={p}", {"都道府県": {p}}
+    for b in blocks:
+        yield f"地域ブロック={b}", {"地域ブロック": {b}}
+    yield "page2", {"サブカテゴリ": care}
+    for p in prefs:
+        yield f"page2 都道府県={p}", {"サブカテゴリ": care, "都道府県": {p}}
+    for m in munis:
+        yield f"page2 団体名={m}", {"サブカテゴリ": care, "団体名": {m}}
+
+
+def matrix_cell_contexts(rows, sample_every=25):
+    """(label, filters) for sampled p2_matrix cells: one municipality x procedure."""
+    codes = sorted({r["コード"] for r in rows})[::sample_every]
+    names = sorted({r["手続名"] for r in rows})
+    for c in codes:
+        for n in names:
+            yield f"{c} x {n}", {"コード": {c}, "手続名": {n}}
+
+
+class _Narrowed:
+    """Pre-slices rows by one identity column so the reference scans less.
+
+    Only filters other than サブカテゴリ are used for slicing, because the
+    completion measures replace that filter inside CALCULATE.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.groups = {}
+
+    def __call__(self, filters):
+        for col in ("コード", "団体名", "都道府県", "地域ブロック"):
+            if col in filters and len(filters[col]) == 1:
+                g = self.groups.setdefault(col, {})
+                if not g:
+                    for r in self.rows:
+                        g.setdefault(r[col], []).append(r)
+                return g.get(next(iter(filters[col])), [])
+        return self.rows
+
+
+def same(a, b):
+    """Equality as the dashboard sees it: BLANK and 0 render alike for counts."""
+    if isinstance(a, str) or isinstance(b, str):
+        return a == b
+    a, b = a or 0, b or 0
+    return abs(a - b) <= 1e-9 * max(1, abs(a), abs(b))
+
+
+def check_summary(rows, summary):
+    """Compare the precomputed summary with the row-level measures. Returns errors."""
+    errors = []
+    expected = summarize(rows)
+    if set(expected) != set(summary):
+        errors.append(f"コード mismatch: {len(set(expected) ^ set(summary))} codes differ")
+    for code in sorted(set(expected) & set(summary)):
+        e, s = expected[code], summary[code]
+        for col in SUMMARY_COLUMNS[1:]:
+            if e[col] != s[col]:
+                errors.append(f"{code}: {col} {s[col]!r} != {e[col]!r}")
+
+    narrow = _Narrowed(rows)
+    n = 0
+    for label, filters in dashboard_contexts(rows):
+        base = narrow(filters)
+        codes = {r["コード"] for r in apply_filters(base, filters)}
+        ref = care_completed_municipalities(base, filters)
+        got = summary_completed(summary, codes)
+        if ref != got:
+            errors.append(f"{label}: 子育て介護26手続完了自治体数 {got} != {ref}")
+        n += 1
+    return errors, n
+
+
+def check_dax(rows, model):
+    """Evaluate every measure of a dax.Model and compare with REFERENCE. Returns errors."""
+    from dax import FACT_TABLE_DEFAULT as fact
+
+    def dax_filters(filters):
+        return {(fact, c): v for c, v in filters.items()}
+
+    errors = []
+    narrow = _Narrowed(rows)
+    n = 0
+    contexts = [(label, f, True) for label, f in dashboard_contexts(rows)]
+    contexts += [(label, f, False) for label, f in matrix_cell_contexts(rows)]
+    for label, filters, whole_municipalities in contexts:
+        base = narrow(filters)
+        for name, ref_fn in REFERENCE.items():
+            if name in COMPLETION_MEASURES and not whole_municipalities:
+                continue
+            got, ref = model.evaluate(name, dax_filters(filters)), ref_fn(base, filters)
+            n += 1
+            if not same(got, ref):
+                errors.append(f"{label}: {name} {got!r} != {ref!r}")
+        if whole_municipalities:
+            for status in ("完了", "未完了"):
+                f = dax_filters(filters)
+                f[("完了状況", "ステータス")] = {status}
+                got, ref = model.evaluate("完了状況値", f), completion_status_value(status, base, filters)
+                n += 1
+                if not same(got, ref):
+                    errors.append(f"{label} {status}: 完了状況値 {got!r} != {ref!r}")
+    return errors, n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Check precomputed tables and model.bim measures "
+                                             "against the reference measures")
+    ap.add_argument("--data-dir", default=HERE,
+                    help="directory holding data_unpivoted.csv and data_municipality_summary.csv")
+    ap.add_argument("--model", default=None, help="model.bim to evaluate (default: the repo's)")
+    args = ap.parse_args(argv)
+
+    import dax
+    csv_path = os.path.join(args.data_dir, os.path.basename(DEFAULT_CSV))
+    summary_path = os.path.join(args.data_dir, os.path.basename(DEFAULT_SUMMARY))
+    rows = load_rows(csv_path)
+    summary = load_summary(summary_path)
+
+    errs, n_summary = check_summary(rows, summary)
+    model = dax.load_model(args.model or dax.DEFAULT_MODEL, args.data_dir)
+    dax_errs, n_dax = check_dax(rows, model)
+    errs += dax_errs
+    if errs:
+        for e in errs[:50]:
+            print(f"  ERROR: {e}")
+        if len(errs) > 50:
+            print(f"  ... {len(errs) - 50} more")
+        sys.exit(1)
+    completed = summary_completed(summary, summary)
+    print(f"OK: {summary_path}")
+    print(f"  {len(summary):,} municipalities, {completed:,} completed, {n_summary} contexts checked")
+    print(f"OK: {args.model or dax.DEFAULT_MODEL}")
+    print(f"  {len(model.measures)} measures, {n_dax:,} evaluations match the reference")
+
+
+if __name__ == "__main__":
+    main()
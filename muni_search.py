@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Prefix search of municipalities by name, reading or romaji.
+
+Users look a municipality up by its reading, not its kanji: the index holds,
+for each of the ~1,700 municipalities, its 団体名, 都道府県+団体名, コード,
+its 団体名フリガナ as hiragana, and two romaji spellings of the reading
+(Hepburn, and Hepburn with long vowels shortened: toukyou / tokyo).  Keys
+and queries go through the same normalize(): NFKC, katakana to hiragana,
+lower case, and kunrei / nihon-shiki romaji (si, tu, hu, sya, ...) to
+Hepburn, so ｴﾘﾓ, エリモ, えりも, erimo all find えりも町.  The keys are one
+sorted list: a lookup is a binary search for the first key >= the query
+and a walk over the keys it prefixes, microseconds per query.
+
+muni_search.py --build writes the index to data_muni_search.json;
+searches read it (or build it from the long table when it is missing).
+
+    python muni_search.py えりも
+    python muni_search.py sappo --limit 20
+    python muni_search.py --build           # data_muni_search.json from data_unpivoted.csv
+    python muni_search.py --check           # every prefix of every key vs a linear scan
+
+export_html.py renders the index as muni_index.html (every municipality
+by the 50音 row of its reading) and api.py serves /search.
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(HERE, "data_unpivoted.csv")
+DEFAULT_INDEX = os.path.join(HERE, "data_muni_search.json")
+INDEX_VERSION = 1
+DEFAULT_LIMIT = 10
+
+# ============================================================
+# Normalization
+# ============================================================
+
+_KATAKANA = "".join(chr(c) for c in range(ord("ァ"), ord("ヶ") + 1))
+_TO_HIRAGANA = str.maketrans(_KATAKANA, "".join(chr(ord(c) - 0x60) for c in _KATAKANA))
+
+_ROMAJI = dict(zip(
+    "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわゐゑをん"
+    "がぎぐげござじずぜぞだぢづでどばびぶべぼぱぴぷぺぽぁぃぅぇぉゔ",
+    "a i u e o ka ki ku ke ko sa shi su se so ta chi tsu te to na ni nu ne no ha hi fu he ho "
+    "ma mi mu me mo ya yu yo ra ri ru re ro wa i e o n "
+    "ga gi gu ge go za ji zu ze zo da ji zu de do ba bi bu be bo pa pi pu pe po a i u e o vu".split(),
+))
+_SMALL_Y = {"ゃ": "a", "ゅ": "u", "ょ": "o"}
+
+# Kunrei / nihon-shiki and IME spellings to Hepburn, matched left to right
+# (sh, ch and ts first, so shu never reads as s + hu)
+_HEPBURN = {
+    "sh": "sh", "ch": "ch", "ts": "ts", "si": "shi", "ti": "chi", "tu": "tsu", "hu": "fu", "zi": "ji",
+    "di": "ji", "du": "zu", "sy": "sh", "ty": "ch", "zy": "j", "jy": "j", "cy": "ch", "mb": "nb", "mp": "np",
+}
+_HEPBURN_RE = re.compile("|".join(_HEPBURN))
+
+# 50音 rows, by their first kana
+GOJUON_ROWS = {
+    "あ": "あいうえおぁぃぅぇぉゔ", "か": "かきくけこ", "さ": "さしすせそ", "た": "たちつてとっ",
+    "な": "なにぬねの", "は": "はひふへほ", "ま": "まみむめも", "や": "やゆよゃゅょ", "ら": "らりるれろ",
+    "わ": "わゐゑをん",
+}
+_ROW_OF = {k: row for row, kana in GOJUON_ROWS.items() for k in kana}
+
+
+def to_hiragana(text):
+    return text.translate(_TO_HIRAGANA)
+
+
+def normalize(text):
+    """The form keys and queries are compared in: NFKC, hiragana, lower case, Hepburn romaji."""
+    s = to_hiragana(unicodedata.normalize("NFKC", text)).lower()
+    s = "".join(s.split())
+    if s.isascii():
+        s = _HEPBURN_RE.sub(lambda m: _HEPBURN[m.group()], s)
+    return s
+
+
+def romaji(kana):
+    """Hepburn romaji of a hiragana reading (っ doubles the next consonant, ー repeats the vowel)."""
+    out = []
+    double = False
+    i = 0
+    while i < len(kana):
+        c = kana[i]
+        i += 1
+        if c == "っ":
+            double = True
+            continue
+        r = _ROMAJI.get(c)
+        if r is None:
+            r = out[-1][-1] if c == "ー" and out else c
+        if i < len(kana) and kana[i] in _SMALL_Y and r.endswith("i") and len(r) > 1:
+            v = _SMALL_Y[kana[i]]
+            r = r[:-1] + v if r in ("shi", "chi", "ji") else r[:-1] + "y" + v
+            i += 1
+        if double:
+            r = r[0] + r
+            double = False
+        out.append(r)
+    return "".join(out)
+
+
+def short_vowels(r):
+    """Romaji with long vowels written once: toukyou -> tokyo, oosaka -> osaka."""
+    return re.sub(r"o[ou]|uu", lambda m: m.group()[0], r)
+
+
+def gojuon_row(reading):
+    """The 50音 row (あ, か, ... わ) of a reading; voiced kana count as their plain row."""
+    first = unicodedata.normalize("NFD", to_hiragana(unicodedata.normalize("NFKC", reading))[:1])[:1]
+    return _ROW_OF.get(first, "他")
+
+
+def search_keys(code, pref, name, reading):
+    """The normalized keys one municipality is found by."""
+    kana = to_hiragana(unicodedata.normalize("NFKC", reading))
+    r = romaji(kana)
+    return {normalize(k) for k in (code, name, pref + name, kana, r, short_vowels(r)) if k}
+
+# ============================================================
+# Index
+# ============================================================
+
+class MuniIndex:
+    """Every municipality's (コード, 都道府県, 団体名, 団体名フリガナ) and its
+    search keys as one sorted list, each key with the entry it belongs to."""
+
+    def __init__(self, entries, keys=None, ids=None):
+        self.entries = [tuple(e) for e in entries]
+        if keys is None:
+            pairs = sorted({(k, i) for i, e in enumerate(self.entries) for k in search_keys(*e)})
+            keys = [k for k, _ in pairs]
+            ids = [i for _, i in pairs]
+        self.keys = keys
+        self.ids = ids
+        self._entry_keys = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """Entries with a key starting with text, at most limit, in key order (an exact match first)."""
+        q = normalize(text)
+        if not q:
+            return []
+        keys, ids = self.keys, self.ids
+        found = {}
+        for i in range(bisect.bisect_left(keys, q), len(keys)):
+            if not keys[i].startswith(q):
+                break
+            found.setdefault(ids[i], None)
+            if len(found) >= limit:
+                break
+        return [self.entries[i] for i in found]
+
+    def scan(self, text, limit=DEFAULT_LIMIT):
+        """search() by a linear scan of every entry's keys (the reference for --check and benchmarks)."""
+        q = normalize(text)
+        if not q:
+            return []
+        if self._entry_keys is None:
+            self._entry_keys = [[] for _ in self.entries]
+            for k, i in zip(self.keys, self.ids):
+                self._entry_keys[i].append(k)
+        hits = []
+        for i, keys in enumerate(self._entry_keys):
+            matched = [k for k in keys if k.startswith(q)]
+            if matched:
+                hits.append((min(matched), i))
+        hits.sort()
+        return [self.entries[i] for _, i in hits[:limit]]
+
+    def by_row(self):
+        """{50音 row: entries sorted by reading}, rows in あ..わ order."""
+        rows = {}
+        for e in sorted(self.entries, key=lambda e: (to_hiragana(unicodedata.normalize("NFKC", e[3])), e[0])):
+            rows.setdefault(gojuon_row(e[3]), []).append(e)
+        order = list(GOJUON_ROWS) + ["他"]
+        return {row: rows[row] for row in order if row in rows}
+
+
+def from_rows(rows):
+    """MuniIndex of long-table rows (dicts), one entry per コード."""
+    entries = {}
+    for r in rows:
+        if r["コード"] not in entries:
+            entries[r["コード"]] = (r["コード"], r["都道府県"], r["団体名"], r["団体名フリガナ"])
+    return MuniIndex(entries.values())
+
+
+def from_csv(path=DEFAULT_CSV):
+    with open(path, encoding="utf-8", newline="") as f:
+        return from_rows(csv.DictReader(f))
+
+
+def from_table(t):
+    """MuniIndex of a vectorized.Table (api.py, export_html.py)."""
+    import vectorized as vz
+    _, _, keys = vz.group_index(t, ("コード", "都道府県", "団体名", "団体名フリガナ"))
+    return MuniIndex(keys)
+
+
+def save(index, path=DEFAULT_INDEX):
+    data = {"version": INDEX_VERSION, "entries": index.entries, "keys": index.keys, "ids": index.ids}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load(path=DEFAULT_INDEX):
+    """The saved index, or None when it is missing or from another version."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    if data.get("version") != INDEX_VERSION:
+        return None
+    return MuniIndex(data["entries"], data["keys"], data["ids"])
+
+# ============================================================
+# Check
+# ============================================================
+
+def check(index):
+    """search() against scan() for every prefix of every key. Returns (errors, n)."""
+    errors = []
+    queries = sorted({k[:n] for k in index.keys for n in range(1, len(k) + 1)})
+    for q in queries:
+        got, ref = index.search(q, limit=len(index)), index.scan(q, limit=len(index))
+        if got != ref:
+            errors.append(f"{q!r}: {len(got)} entries, expected {len(ref)}")
+    # spellings of one reading find the same municipalities
+    for spellings in (("えりも", "ｴﾘﾓ", "エリモ", "erimo", "ERIMO"), ("さっぽろ", "sapporo", "ｻｯﾎﾟﾛ"),
+                      ("しべつ", "shibetsu", "sibetu"), ("ちゅう", "chuu", "tyuu")):
+        ref = set(index.search(spellings[0], limit=len(index)))
+        if not ref:
+            errors.append(f"{spellings[0]!r}: no entries")
+        for text in spellings[1:]:
+            if set(index.search(text, limit=len(index))) != ref:
+                errors.append(f"{text!r}: not the entries of {spellings[0]!r}")
+    return errors, len(queries)
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Prefix search of municipalities by name, reading or romaji")
+    ap.add_argument("query", nargs="?", help="a partial 団体名, reading (kana or romaji) or コード")
+    ap.add_argument("--index", default=DEFAULT_INDEX, help="index written by --build")
+    ap.add_argument("--csv", default=DEFAULT_CSV, help="long table the index is built from")
+    ap.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    ap.add_argument("--build", action="store_true", help="(re)build the index file from --csv")
+    ap.add_argument("--check", action="store_true", help="compare every prefix lookup with a linear scan")
+    args = ap.parse_args(argv)
+    if not (args.query or args.build or args.check):
+        ap.error("give a query, --build or --check")
+
+    t0 = time.perf_counter()
+    index = None if args.build else load(args.index)
+    built = index is None
+    if built:
+        if not os.path.exists(args.csv):
+            print(f"  ERROR: {args.csv} not found (run ingest.py first)")
+            sys.exit(1)
+        index = from_csv(args.csv)
+        save(index, args.index)
+    t_load = time.perf_counter() - t0
+    if args.build or args.check:
+        print(f"OK: {args.index}" if built else f"OK (loaded): {args.index}")
+        print(f"  {len(index):,} municipalities, {len(index.keys):,} keys, {t_load * 1000:.1f} ms")
+
+    if args.check:
+        errs, n = check(index)
+        if errs:
+            for e in errs[:50]:
+                print(f"  ERROR: {e}")
+            sys.exit(1)
+        print(f"OK: {n:,} prefixes match a linear scan")
+    if args.query:
+        t0 = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        us = (time.perf_counter() - t0) * 1e6
+        for code, pref, name, reading in hits:
+            print(f"{code}  {pref}  {name}  {reading}")
+        print(f"  {len(hits)} match(es) for {args.query!r} ({normalize(args.query)!r}) in {us:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Estimate what each visual in report.json costs to query, without Power BI.
+
+For every visual with a prototypeQuery, the query (From/Select) and the
+visual- and page-level filters are turned into a dax.py filter context
+(a TopN filter's subquery is evaluated in the context of the filters before it).
+Like SUMMARIZECOLUMNS, the query groups by the selected columns (the
+combinations present in the filtered table) and evaluates every selected
+measure per group.  Groups whose measures are all BLANK are dropped.
+OrderBy only reorders the result and is not evaluated.
+
+Reported per visual: groups (result rows), cells (rows x columns, or the
+rows x columns x values grid for a matrix) and evaluation time.  The
+first visual to touch a column also pays for building its index; use
+--repeat 2 for warm timings.
+
+    python query_cost.py
+    python query_cost.py --report OUT.Report/report.json --visual p2_matrix
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import dax
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REPORT = os.path.join(HERE, "26_administrative_procedures_online.Report", "report.json")
+
+# QueryComparisonKind -> dax.py comparison operator
+COMPARISON_KINDS = {0: "=", 1: ">", 2: ">=", 3: "<", 4: "<="}
+
+# QueryAggregateFunction -> Python aggregate
+AGGREGATES = {0: sum, 3: min, 4: max}
+
+# ============================================================
+# Reading report.json
+# ============================================================
+
+def _json(v):
+    """report.json embeds config/filters as JSON strings."""
+    return json.loads(v) if isinstance(v, str) else v
+
+
+def literal(value):
+    """A query literal ('text', 12L, 1.5D, true, null) as a Python value."""
+    if value.startswith("'") and value.endswith("'"):
+        return value[1:-1].replace("''", "'")
+    if value in ("true", "false"):
+        return value == "true"
+    if value == "null":
+        return None
+    if value[-1] in "LD":
+        n = value[:-1]
+        return int(n) if value[-1] == "L" else float(n)
+    raise NotImplementedError(f"literal {value!r}")
+
+
+def column_ref(expr, sources):
+    """(table, column) of a Column expression using Source aliases or Entity refs."""
+    col = expr["Column"]
+    ref = col["Expression"]["SourceRef"]
+    return (sources[ref["Source"]] if "Source" in ref else ref["Entity"]), col["Property"]
+
+
+def condition(cond, sources, ctx, tables=None):
+    """Add one Where condition to ctx ({(table, column): conditions}).
+
+    tables holds the values of evaluated subqueries by source name.
+    """
+    if "In" in cond:
+        inn = cond["In"]
+        if len(inn["Expressions"]) != 1:
+            raise NotImplementedError("In over several columns")
+        key = column_ref(inn["Expressions"][0], sources)
+        if "Table" in inn:
+            values = tables[inn["Table"]["SourceRef"]["Source"]]
+        else:
+            values = frozenset(literal(row[0]["Literal"]["Value"]) for row in inn["Values"])
+        ctx[key] = ctx.get(key, ()) + (("in", values),)
+    elif "Comparison" in cond:
+        cmp = cond["Comparison"]
+        key = column_ref(cmp["Left"], sources)
+        value = literal(cmp["Right"]["Literal"]["Value"])
+        op = COMPARISON_KINDS[cmp["ComparisonKind"]]
+        c = ("in", frozenset([value])) if op == "=" else ("cmp", op, value)
+        ctx[key] = ctx.get(key, ()) + (c,)
+    elif "And" in cond:
+        condition(cond["And"]["Left"], sources, ctx, tables)
+        condition(cond["And"]["Right"], sources, ctx, tables)
+    else:
+        raise NotImplementedError(f"filter condition {next(iter(cond))}")
+
+
+def top_values(q, ctx, model):
+    """The values a TopN subquery selects under ctx: its one column, grouped
+    and ordered by an aggregate of a column of the same table.  Ties are cut
+    at Top (Power BI would keep them)."""
+    if model is None:
+        raise NotImplementedError("TopN filter without a model")
+    sources = {s["Name"]: s["Entity"] for s in q["From"]}
+    (sel,) = q["Select"]
+    table, col = column_ref(sel, sources)
+    (order,) = q["OrderBy"]
+    agg = order["Expression"]["Aggregation"]
+    key_table, key_col = column_ref(agg["Expression"], sources)
+    if key_table != table or agg["Function"] not in AGGREGATES:
+        raise NotImplementedError("TopN order other than Sum/Min/Max of a column of the same table")
+    groups = {}
+    for r in model.rows(table, ctx):
+        groups.setdefault(r[col], []).append(r[key_col])
+    fn = AGGREGATES[agg["Function"]]
+    ranked = sorted(groups, key=lambda v: fn(groups[v]), reverse=order["Direction"] == 2)
+    return frozenset(ranked[:q["Top"]])
+
+
+def filter_context(filters, ctx=None, model=None):
+    """Filter context from visual/page filter definitions (model evaluates TopN subqueries)."""
+    ctx = dict(ctx or {})
+    for f in filters:
+        q = f.get("filter")
+        if not q:
+            continue
+        sources, tables = {}, {}
+        for s in q["From"]:
+            if "Entity" in s:
+                sources[s["Name"]] = s["Entity"]
+            else:
+                tables[s["Name"]] = top_values(s["Expression"]["Subquery"]["Query"], ctx, model)
+        for w in q.get("Where", []):
+            condition(w["Condition"], sources, ctx, tables)
+    return ctx
+
+
+def iter_queries(report, model=None):
+    """(page, visual name, visual type, projections, prototypeQuery, filter context)."""
+    report_ctx = filter_context(_json(report.get("filters", "[]")), model=model)
+    for sec in report["sections"]:
+        page_ctx = filter_context(_json(sec.get("filters", "[]")), report_ctx, model)
+        for vc in sec["visualContainers"]:
+            cfg = _json(vc["config"])
+            sv = cfg.get("singleVisual", {})
+            pq = sv.get("prototypeQuery")
+            if pq:
+                ctx = filter_context(_json(vc.get("filters", "[]")), page_ctx, model)
+                yield sec["displayName"], cfg["name"], sv["visualType"], sv.get("projections", {}), pq, ctx
+
+# ============================================================
+# Evaluation
+# ============================================================
+
+def run_query(model, pq, projections, ctx):
+    """Evaluate one prototypeQuery. Returns (result rows, cells)."""
+    sources = {s["Name"]: s["Entity"] for s in pq["From"]}
+    groups, measures, names = [], [], {}
+    for sel in pq["Select"]:
+        if "Column" in sel:
+            groups.append(column_ref(sel, sources))
+            names[sel["Name"]] = groups[-1]
+        elif "Measure" in sel:
+            measures.append(sel["Measure"]["Property"])
+        else:
+            raise NotImplementedError(f"select {next(iter(sel))}")
+
+    tables = {t for t, _ in groups}
+    if len(tables) > 1:
+        raise NotImplementedError("group-by columns from several tables")
+    if groups:
+        table = tables.pop()
+        cols = [c for _, c in groups]
+        keys = {tuple(r[c] for c in cols) for r in model.rows(table, ctx)}
+    else:
+        keys = {()}
+
+    result = []
+    for key in keys:
+        inner = dict(ctx)
+        for g, v in zip(groups, key):
+            inner[g] = inner.get(g, ()) + (("in", frozenset([v])),)
+        values = [model.eval(("measure", m), inner, {}) for m in measures]
+        if measures and all(v is None for v in values):
+            continue
+        result.append(key + tuple(values))
+
+    row_refs = [names[p["queryRef"]] for p in projections.get("Rows", []) if p["queryRef"] in names]
+    col_refs = [names[p["queryRef"]] for p in projections.get("Columns", []) if p["queryRef"] in names]
+    if col_refs:
+        # A matrix renders every row header x column header intersection
+        ri = [groups.index(g) for g in row_refs]
+        ci = [groups.index(g) for g in col_refs]
+        n_rows = len({tuple(r[i] for i in ri) for r in result})
+        n_cols = len({tuple(r[i] for i in ci) for r in result})
+        cells = n_rows * n_cols * max(len(measures), 1)
+    else:
+        cells = len(result) * (len(groups) + len(measures))
+    return len(result), cells
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-visual query cost of report.json against the ingestion output")
+    ap.add_argument("--report", default=DEFAULT_REPORT)
+    ap.add_argument("--model", default=dax.DEFAULT_MODEL)
+    ap.add_argument("--data-dir", default=HERE)
+    ap.add_argument("--visual", action="append", default=[], metavar="NAME", help="only these visuals")
+    ap.add_argument("--repeat", type=int, default=1,
+                    help="best of N runs per visual (the first run also builds column indexes)")
+    args = ap.parse_args(argv)
+
+    with open(args.report, encoding="utf-8") as f:
+        report = json.load(f)
+    t0 = time.perf_counter()
+    try:
+        model = dax.load_model(args.model, args.data_dir)
+    except FileNotFoundError as e:
+        print(f"  ERROR: {e.filename} not found (run ingest.py first)")
+        sys.exit(1)
+    print(f"model loaded in {time.perf_counter() - t0:.2f}s")
+
+    results = []
+    for page, name, vtype, projections, pq, ctx in iter_queries(report, model):
+        if args.visual and name not in args.visual:
+            continue
+        best = float("inf")
+        try:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                rows, cells = run_query(model, pq, projections, ctx)
+                best = min(best, time.perf_counter() - t0)
+        except NotImplementedError as e:
+            print(f"  WARNING: {name}: {e}")
+            continue
+        results.append((page, name, vtype, rows, cells, best))
+
+    total = sum(r[5] for r in results) or 1.0
+    print(f"{'visual':<20} {'type':<12} {'rows':>8} {'cells':>10} {'ms':>9} {'share':>6}")
+    for page, name, vtype, rows, cells, t in sorted(results, key=lambda r: -r[5]):
+        print(f"{name:<20} {vtype:<12} {rows:>8,} {cells:>10,} {t * 1000:>9.1f} {t / total:>6.1%}")
+    for page in dict.fromkeys(r[0] for r in results):
+        rs = [r for r in results if r[0] == page]
+        print(f"  {page}: {len(rs)} queries, {sum(r[4] for r in rs):,} cells, {sum(r[5] for r in rs) * 1000:,.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
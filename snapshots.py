@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Ingest a survey release and rebuild only what changed since the previous one.
+
+Every release (the YYYYMMDD prefix of the workbook name) is kept as a
+bitsets.py snapshot in snapshots/<release>.npz, 28 KB for 1,741
+municipalities x 50 procedures.  Against the previous release's snapshot
+the run computes the municipality x procedure delta, then:
+
+  - rewrites data_municipality_summary.csv (自治体別集計) from the new
+    snapshot, unless no municipality changed;
+  - appends the release's newly completed municipalities to
+    data_newly_completed.csv (for a trend page);
+  - with --html DIR, re-renders index.html and the pages of the changed
+    prefectures and municipalities only (export_html.py);
+  - with --history, appends the release's partition to history/ (history.py).
+
+The report definition itself (generate_report.py) holds no data and is not
+affected by a release.  The long table is always re-ingested: it is the
+source every derived output is computed from.  The first release, or
+--full, rebuilds everything.
+
+    python snapshots.py                            # the default workbook
+    python snapshots.py 20260420_policies_....xlsx --html html
+    python snapshots.py NEW.xlsx --full
+
+The derived outputs in place are assumed to be those of the previous
+release, as this command leaves them.  Requires NumPy.
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+import bitsets
+import history
+import ingest
+from measures import STATUS_CHARS, STATUS_NA, STATUS_NONE, STATUS_ONLINE
+
+np = bitsets.np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.path.join(HERE, "snapshots")
+DEFAULT_NEWLY = os.path.join(HERE, "data_newly_completed.csv")
+
+NEWLY_COLUMNS = ["公表日", "コード", "都道府県", "団体名"]
+
+# ============================================================
+# Releases
+# ============================================================
+
+def release_id(path):
+    """'20260120' from 20260120_policies_....xlsx."""
+    m = re.match(r"(\d{8})_", os.path.basename(path))
+    if m is None:
+        raise ValueError(f"{path}: the file name does not start with a YYYYMMDD_ release date")
+    return m.group(1)
+
+
+def snapshot_path(release, folder=DEFAULT_DIR):
+    return os.path.join(folder, f"{release}.npz")
+
+
+def previous_release(release, folder=DEFAULT_DIR):
+    """The latest snapshot older than release, or None."""
+    if not os.path.isdir(folder):
+        return None
+    older = [n[:8] for n in os.listdir(folder) if re.fullmatch(r"\d{8}\.npz", n) and n[:8] < release]
+    return max(older, default=None)
+
+# ============================================================
+# Delta
+# ============================================================
+
+def status_of(online, na):
+    return STATUS_ONLINE if online else STATUS_NA if na else STATUS_NONE
+
+
+def align(old, new):
+    """old's masks in new's row and procedure order, and which new rows old has.
+
+    Rows new added are zero; procedures old did not survey count as not
+    online.  One dict of old コード and one pass over each snapshot.
+    """
+    pos = {c: i for i, c in enumerate(old.codes.tolist())}
+    rows = np.fromiter((pos.get(c, -1) for c in new.codes.tolist()), dtype=np.int64, count=len(new))
+    present = rows >= 0
+    online, na = old.online, old.na
+    if old.procedures.tolist() != new.procedures.tolist():
+        cols = [old.index.get(p, -1) for p in new.procedures.tolist()]
+        remapped = []
+        for words in (online, na):
+            flags = bitsets.unpack(words, len(old.procedures))
+            out = np.zeros((len(old), len(cols)), dtype=bool)
+            for j, c in enumerate(cols):
+                if c >= 0:
+                    out[:, j] = flags[:, c]
+            remapped.append(bitsets.pack(out))
+        online, na = remapped
+    aligned = []
+    for words in (online, na):
+        out = np.zeros_like(new.online)
+        out[present] = words[rows[present]]
+        aligned.append(out)
+    return aligned[0], aligned[1], present
+
+
+class Delta:
+    """What changed from one release's snapshot to the next."""
+
+    def __init__(self, old_release, new_release):
+        self.old_release = old_release
+        self.new_release = new_release
+        self.changes = []           # (コード, 手続名, old status, new status)
+        self.added = []             # コード only in the new release
+        self.removed = []           # (コード, 都道府県) only in the old release
+        self.newly_completed = []   # コード completed in new, not in old
+        self.prefectures = set()    # 都道府県 with any change
+
+    def codes(self):
+        """コード whose rows changed, were added or were removed."""
+        return {c for c, _, _, _ in self.changes} | set(self.added) | {c for c, _ in self.removed}
+
+    def __bool__(self):
+        return bool(self.changes or self.added or self.removed)
+
+
+def diff(old, new, old_release=None, new_release=None):
+    """Delta between two StatusBits, linear in municipalities x mask words."""
+    d = Delta(old_release, new_release)
+    online, na, present = align(old, new)
+    changed = present & ((online ^ new.online) | (na ^ new.na)).any(axis=1)
+    # Only the changed rows are unpacked to one flag per procedure
+    p = len(new.procedures)
+    idx = np.flatnonzero(changed)
+    b_on, b_na = bitsets.unpack(online[idx], p), bitsets.unpack(na[idx], p)
+    a_on, a_na = bitsets.unpack(new.online[idx], p), bitsets.unpack(new.na[idx], p)
+    procedures, codes = new.procedures.tolist(), new.codes[idx].tolist()
+    for r, j in zip(*(a.tolist() for a in np.nonzero((b_on != a_on) | (b_na != a_na)))):
+        d.changes.append((codes[r], procedures[j],
+                          status_of(b_on[r, j], b_na[r, j]), status_of(a_on[r, j], a_na[r, j])))
+    d.added = new.codes[~present].tolist()
+    new_codes = set(new.codes.tolist())
+    d.removed = [(c, pref) for c, pref in zip(old.codes.tolist(), old.prefectures.tolist()) if c not in new_codes]
+
+    care = new.mask(new.care_procedures())
+    done_new = ~(~(new.online | new.na) & care).any(axis=1)
+    done_old = ~(~(online | na) & care).any(axis=1)
+    d.newly_completed = new.codes[present & done_new & ~done_old].tolist()
+
+    d.prefectures = set(new.prefectures[changed | ~present].tolist()) | {pref for _, pref in d.removed}
+    return d
+
+# ============================================================
+# Derived outputs
+# ============================================================
+
+def summary_entries(bits):
+    """ingest.tally_care entries ([コード, 都道府県, 未完了手続数, 団体名, 状況一覧
+    characters]) of every municipality, from its snapshot.
+
+    Always all of them: 表示順 is a rank over every municipality, so one
+    changed count can move every row, and the snapshot gives all rows in a
+    few milliseconds (less than reading the previous file back).
+    """
+    care = [bits.index[p] for p in bits.care_procedures()]
+    p = len(bits.procedures)
+    online = bitsets.unpack(bits.online, p)[:, care]
+    na = bitsets.unpack(bits.na, p)[:, care]
+    chars = np.where(online, STATUS_CHARS[STATUS_ONLINE], np.where(na, STATUS_CHARS[STATUS_NA], STATUS_CHARS[STATUS_NONE]))
+    unfinished = (~online & ~na).sum(axis=1).tolist()
+    return {
+        code: [code, pref, u, name, c]
+        for code, pref, u, name, c in zip(bits.codes.tolist(), bits.prefectures.tolist(), unfinished,
+                                          bits.names.tolist(), chars.tolist())
+    }
+
+
+def write_newly_completed(delta, bits, path=DEFAULT_NEWLY):
+    """Replace the release's rows of the newly completed municipalities table. Returns rows written."""
+    rows = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = [r for r in csv.reader(f)][1:]
+    rows = [r for r in rows if r[0] != delta.new_release]
+    where = {c: i for i, c in enumerate(bits.codes.tolist())}
+    for code in delta.newly_completed:
+        i = where[code]
+        rows.append([delta.new_release, code, str(bits.prefectures[i]), str(bits.names[i])])
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(NEWLY_COLUMNS)
+        w.writerows(rows)
+    return len(rows)
+
+
+def update_html(out_dir, data, delta=None, page1="cards"):
+    """Re-render the HTML bundle from the long table at data (only delta's
+    pages when given and the bundle exists). Returns (pages rendered, files written)."""
+    import export_html
+    if delta is not None and not delta:
+        return 0, 0
+    t = export_html.vz.load(data)
+    if delta is None or not os.path.exists(os.path.join(out_dir, "index.html")):
+        files = export_html.bundle_files(t, page1)
+        n_written, _ = export_html.write_bundle(files, out_dir)
+    else:
+        codes = delta.codes()
+        files = export_html.bundle_files(t, page1, delta.prefectures, codes)
+        gone = [f"muni/{c}.html" for c, _ in delta.removed]
+        n_written, _ = export_html.write_bundle(files, out_dir, remove=gone)
+    return len(files) - 1, n_written
+
+# ============================================================
+# Main
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Ingest a release and rebuild what changed since the previous one")
+    ap.add_argument("xlsx", nargs="?", default=ingest.DEFAULT_XLSX, help="release workbook (YYYYMMDD_....xlsx)")
+    ap.add_argument("--snapshots", default=DEFAULT_DIR, help="folder of per-release snapshots")
+    ap.add_argument("--parquet", nargs="?", const=ingest.DEFAULT_PARQUET, default=None, metavar="PATH",
+                    help="also write the long table as Parquet (see ingest.py)")
+    ap.add_argument("--html", default=None, metavar="DIR", help="also update the static HTML bundle in DIR")
+    ap.add_argument("--history", nargs="?", const=history.DEFAULT_DIR, default=None, metavar="DIR",
+                    help="append the release to the history store (needs pyarrow)")
+    ap.add_argument("--full", action="store_true", help="rebuild every derived output")
+    args = ap.parse_args(argv)
+
+    if np is None:
+        print("  ERROR: snapshots.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    if not os.path.exists(args.xlsx):
+        print(f"  ERROR: {args.xlsx} not found")
+        sys.exit(1)
+    try:
+        release = release_id(args.xlsx)
+    except ValueError as e:
+        print(f"  ERROR: {e}")
+        sys.exit(1)
+    if args.history:
+        if history.pa is None:
+            print("  ERROR: --history requires pyarrow (pip install pyarrow)")
+            sys.exit(1)
+        if release in history.releases(args.history):
+            print(f"  ERROR: release {release} is already in {args.history} (partitions are never rewritten)")
+            sys.exit(1)
+    previous = None if args.full else previous_release(release, args.snapshots)
+    if previous is not None and not os.path.exists(ingest.DEFAULT_SUMMARY):
+        previous = None
+
+    t0 = time.perf_counter()
+    snap = snapshot_path(release, args.snapshots)
+    n = ingest.ingest(args.xlsx, ingest.DEFAULT_CSV, parquet_out=args.parquet, bits_out=snap)
+    new = bitsets.load(snap)
+    t_ingest = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    delta = diff(bitsets.load(snapshot_path(previous, args.snapshots)), new, previous, release) if previous else None
+    t_diff = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if delta is None or delta:
+        summary_parquet = ingest.summary_parquet_path(ingest.DEFAULT_SUMMARY) if args.parquet else None
+        ingest.write_summary(summary_entries(new), ingest.DEFAULT_SUMMARY, summary_parquet)
+    if delta is not None:
+        write_newly_completed(delta, new)
+    t_summary = time.perf_counter() - t0
+
+    if args.history:
+        partition = history.append(new, release, args.history)
+
+    t0 = time.perf_counter()
+    pages = None
+    if args.html:
+        pages, n_written = update_html(args.html, args.parquet or ingest.DEFAULT_CSV, delta)
+    t_html = time.perf_counter() - t0
+
+    print(f"OK: {snap}")
+    print(f"  release {release}: {n:,} rows, {len(new):,} municipalities x {len(new.procedures)} procedures")
+    if delta is None:
+        print("  full rebuild" + ("" if args.full else " (no earlier snapshot)"))
+    else:
+        print(f"  delta from {previous}: {len(delta.changes):,} cells changed, {len(delta.added)} added, "
+              f"{len(delta.removed)} removed; {len(delta.codes()):,} municipalities in {len(delta.prefectures)} prefectures; "
+              f"{len(delta.newly_completed)} newly completed")
+        print(f"OK: {DEFAULT_NEWLY}")
+    print(f"OK: {ingest.DEFAULT_SUMMARY}" if delta is None or delta else f"OK (unchanged): {ingest.DEFAULT_SUMMARY}")
+    if args.history:
+        print(f"OK: {partition}")
+    if args.html:
+        print(f"OK: {args.html} ({pages:,} pages rendered, {n_written:,} files written)")
+    print(f"  ingest {t_ingest:.2f}s, diff {t_diff * 1000:.1f} ms, summary {t_summary * 1000:.1f} ms"
+          + (f", html {t_html:.2f}s" if args.html else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Report specs: which procedures a dashboard covers and how it is titled.
+
+generate_report.py and generate_model.py were written for one report, the
+26 子育て・介護 procedures.  A Spec names the procedure subset (サブカテゴリ,
+optionally narrowed to some 手続名), the label the titles are built from,
+the as-of date and the legend thresholds; the default Spec is that original
+report, and builds from it are byte-identical to the ones before specs.
+
+The procedure count in titles and measure names ("26手続") comes from the
+data: counts() of the subset in the long rows (batch.py fills it in).
+
+A spec file is JSON: shared "defaults" and a list of "reports", each merged
+over the defaults.
+
+    {
+      "defaults": {"as_of": "令和６年度末時点", "thresholds": [0.8, 1.0]},
+      "reports": [
+        {"id": "care"},
+        {"id": "disaster", "subcategories": ["ウ.被災者支援関係"]},
+        {"id": "moving", "subcategories": ["エ.転出・転入手続関係"], "label": "転出・転入",
+         "data_dir": "data_2025"}
+      ]
+    }
+
+    python specs.py reports.json            # check a spec file
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from measures import CARE_SUBCATEGORIES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# The original report: 子育て15・介護11 procedures of the 2026-01 survey
+DEFAULT_COUNTS = (("ア.子育て関係", 15), ("イ.介護関係", 11))
+DEFAULT_AS_OF = "令和６年度末時点"
+DEFAULT_THRESHOLDS = (0.8, 1.0)
+
+PAGE1_LAYOUTS = ("cards", "grouped", "regions")
+PAGE2_LAYOUTS = ("matrix", "list")
+
+_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def short_name(subcategory):
+    """'ア.子育て関係' -> '子育て' (the word the titles use)."""
+    name = subcategory.split(".", 1)[-1]
+    return name[:-2] if name.endswith("関係") else name
+
+
+class Spec:
+    """One report variant. Derived names (label, measure names) are properties."""
+    __slots__ = ("id", "subcategories", "procedures", "counts", "title", "as_of", "thresholds",
+                 "data_dir", "page1", "page2", "pref_pages", "muni_pages", "_label", "_prefix")
+
+    def __init__(self, id="care", subcategories=CARE_SUBCATEGORIES, procedures=None, counts=DEFAULT_COUNTS,
+                 label=None, measure_prefix=None, title=None, as_of=DEFAULT_AS_OF,
+                 thresholds=DEFAULT_THRESHOLDS, data_dir=HERE, page1="cards", page2="matrix",
+                 pref_pages=False, muni_pages=False):
+        self.id = id
+        self.subcategories = tuple(subcategories)
+        self.procedures = tuple(procedures) if procedures else None
+        self.counts = tuple((s, n) for s, n in counts)
+        self._label = label
+        self._prefix = measure_prefix
+        self.title = title
+        self.as_of = as_of
+        self.thresholds = tuple(thresholds)
+        self.data_dir = data_dir
+        self.page1 = page1
+        self.page2 = page2
+        self.pref_pages = pref_pages
+        self.muni_pages = muni_pages
+
+    def __repr__(self):
+        # Part of the build cache key (generate_report.set_spec): every field
+        return f"Spec({', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__)})"
+
+    @classmethod
+    def from_dict(cls, d, base_dir=HERE):
+        """A Spec from one merged spec file entry. Raises ValueError."""
+        d = dict(d)
+        known = {"id", "subcategories", "procedures", "label", "measure_prefix", "title", "as_of",
+                 "thresholds", "data_dir", "page1", "page2", "pref_pages", "muni_pages"}
+        unknown = sorted(set(d) - known)
+        if unknown:
+            raise ValueError(f"unknown key(s) {', '.join(unknown)}")
+        if not _ID.match(str(d.get("id", ""))):
+            raise ValueError(f"id {d.get('id')!r}: letters, digits, '_' and '-' only")
+        subs = d.get("subcategories", CARE_SUBCATEGORIES)
+        if isinstance(subs, str) or not subs:
+            raise ValueError(f"{d['id']}: subcategories must be a non-empty list")
+        thresholds = d.get("thresholds", DEFAULT_THRESHOLDS)
+        if len(thresholds) != 2 or not 0 < thresholds[0] < thresholds[1] <= 1:
+            raise ValueError(f"{d['id']}: thresholds must be [low, high] with 0 < low < high <= 1")
+        if d.get("page1", "cards") not in PAGE1_LAYOUTS:
+            raise ValueError(f"{d['id']}: page1 must be one of {', '.join(PAGE1_LAYOUTS)}")
+        if d.get("page2", "matrix") not in PAGE2_LAYOUTS:
+            raise ValueError(f"{d['id']}: page2 must be one of {', '.join(PAGE2_LAYOUTS)}")
+        if "data_dir" in d:
+            d["data_dir"] = os.path.normpath(os.path.join(base_dir, d["data_dir"]))
+        d["counts"] = [(s, 0) for s in subs]
+        return cls(**d)
+
+    def with_counts(self, counts):
+        """A copy with the per-サブカテゴリ procedure counts of the data."""
+        spec = Spec.__new__(Spec)
+        for k in self.__slots__:
+            setattr(spec, k, getattr(self, k))
+        spec.counts = tuple(counts)
+        return spec
+
+    @property
+    def n(self):
+        """Procedures in the subset."""
+        return sum(n for _, n in self.counts)
+
+    @property
+    def label(self):
+        """'子育て・介護' for ア.子育て関係 + イ.介護関係."""
+        return self._label or "・".join(short_name(s) for s in self.subcategories)
+
+    @property
+    def measure_prefix(self):
+        return self._prefix or self.label.replace("・", "")
+
+    # Measure names of the subset, e.g. 子育て介護26手続完了率
+    @property
+    def completed_measure(self):
+        return f"{self.measure_prefix}{self.n}手続完了自治体数"
+
+    @property
+    def completion_measure(self):
+        return f"{self.measure_prefix}{self.n}手続完了率"
+
+    @property
+    def online_rate_measure(self):
+        return f"{self.measure_prefix}オンライン化率_自治体別"
+
+    @property
+    def trend_measure(self):
+        return f"{self.measure_prefix}{self.n}手続完了率_推移"
+
+    @property
+    def counts_text(self):
+        """'子育て15・介護11' for the page 2 list legend."""
+        return "・".join(f"{short_name(s)}{n}" for s, n in self.counts)
+
+    def is_default_subset(self):
+        """Whether the subset is the one ingest.py summarizes (自治体別集計 can be reused)."""
+        return self.subcategories == tuple(CARE_SUBCATEGORIES) and self.procedures is None
+
+    def includes(self, subcategory, procedure):
+        return subcategory in self.subcategories and (self.procedures is None or procedure in self.procedures)
+
+
+DEFAULT = Spec()
+
+
+def load(path):
+    """[Spec] of a spec file. Raises ValueError on a malformed file."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("reports"), list) or not data["reports"]:
+        raise ValueError(f"{path}: expected {{\"defaults\": {{...}}, \"reports\": [...]}}")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = data.get("defaults", {})
+    specs = []
+    for i, entry in enumerate(data["reports"]):
+        try:
+            specs.append(Spec.from_dict({**defaults, **entry}, base_dir))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{path}: reports[{i}]: {e}") from None
+    ids = [s.id for s in specs]
+    dup = sorted({i for i in ids if ids.count(i) > 1})
+    if dup:
+        raise ValueError(f"{path}: duplicate id(s) {', '.join(dup)}")
+    return specs
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Check a report spec file")
+    ap.add_argument("spec", help="spec file (JSON)")
+    args = ap.parse_args(argv)
+    try:
+        specs = load(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"  ERROR: {e}")
+        sys.exit(1)
+    print(f"OK: {args.spec}")
+    for s in specs:
+        print(f"  {s.id}: {s.label} ({', '.join(s.subcategories)}"
+              f"{f', {len(s.procedures)} 手続名' if s.procedures else ''}), {s.as_of}, data {s.data_dir}")
+
+
+if __name__ == "__main__":
+    main()
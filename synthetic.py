@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic survey data in the long format of data_unpivoted.csv, at
+any number of municipalities and procedures.
+
+Scale questions (10x municipalities, 100 procedures, ...) cannot be asked of
+the one real workbook, so this writes the files ingest.py would for a
+made-up survey: municipalities spread over the 47 prefectures in the real
+proportions (with 政令市 / 中核市 / 特別区, JIS-style コード with a check
+digit, kanji names and half-width katakana readings), procedures split
+over the real 大カテゴリ / サブカテゴリ in the real proportions (50
+procedures: 14 a), 15 ア.子育て関係, 11 イ.介護関係, 8 ウ.被災者支援関係, 2
+エ.転出・転入手続関係), and statuses drawn per municipality:
+
+  - --complete of the municipalities have every 子育て・介護 procedure online
+    (a few not applicable); the others have each online with their own
+    probability, uniform over 0..1, so the unfinished counts spread over 1..26
+  - the other procedures are online / not applicable at the rates of their
+    サブカテゴリ in the 2026-01 survey (--online / --na override them)
+
+The rows go through ingest.ingest_rows, so the outputs are the same files:
+data_unpivoted.csv, data_municipality_summary.csv and, with --bitsets,
+data_status_bits.npz, in --out-dir.  The same --seed gives the same bytes.
+
+    python synthetic.py                                 # 1,741 x 50, like the survey
+    python synthetic.py --municipalities 17410 --procedures 100 --out-dir data_synthetic
+    python generate_report.py --muni-pages data_synthetic/data_municipality_summary.csv
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import unicodedata
+
+import ingest
+from measures import CARE_SUBCATEGORIES, STATUS_CODES, STATUS_NA, STATUS_NONE, STATUS_ONLINE
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT_DIR = os.path.join(HERE, "data_synthetic")
+DEFAULT_MUNICIPALITIES = 1741
+DEFAULT_PROCEDURES = 50
+DEFAULT_COMPLETE = 0.67
+
+# ============================================================
+# Survey layout
+# ============================================================
+
+# (都道府県, 地域ブロック, municipalities in the 2026-01 survey), in JIS order
+PREFECTURES = [
+    ("北海道", "北海道・東北", 179), ("青森県", "北海道・東北", 40), ("岩手県", "北海道・東北", 33),
+    ("宮城県", "北海道・東北", 35), ("秋田県", "北海道・東北", 25), ("山形県", "北海道・東北", 35),
+    ("福島県", "北海道・東北", 59), ("茨城県", "関東", 44), ("栃木県", "関東", 25), ("群馬県", "関東", 35),
+    ("埼玉県", "関東", 63), ("千葉県", "関東", 54), ("東京都", "関東", 62), ("神奈川県", "関東", 33),
+    ("新潟県", "中部", 30), ("富山県", "中部", 15), ("石川県", "中部", 19), ("福井県", "中部", 17),
+    ("山梨県", "中部", 27), ("長野県", "中部", 77), ("岐阜県", "中部", 42), ("静岡県", "中部", 35),
+    ("愛知県", "中部", 54), ("三重県", "近畿", 29), ("滋賀県", "近畿", 19), ("京都府", "近畿", 26),
+    ("大阪府", "近畿", 43), ("兵庫県", "近畿", 41), ("奈良県", "近畿", 39), ("和歌山県", "近畿", 30),
+    ("鳥取県", "中国・四国", 19), ("島根県", "中国・四国", 19), ("岡山県", "中国・四国", 27),
+    ("広島県", "中国・四国", 23), ("山口県", "中国・四国", 19), ("徳島県", "中国・四国", 24),
+    ("香川県", "中国・四国", 17), ("愛媛県", "中国・四国", 20), ("高知県", "中国・四国", 34),
+    ("福岡県", "九州・沖縄", 60), ("佐賀県", "九州・沖縄", 20), ("長崎県", "九州・沖縄", 21),
+    ("熊本県", "九州・沖縄", 45), ("大分県", "九州・沖縄", 18), ("宮崎県", "九州・沖縄", 26),
+    ("鹿児島県", "九州・沖縄", 43), ("沖縄県", "九州・沖縄", 41),
+]
+SPECIAL_WARDS = 23      # 特別区 of 東京都 in the survey
+
+CATEGORY_A = "a)処理件数が多く、オンライン化の推進による住民等の利便性の向上や業務の効率化効果が高いと考えられる手続"
+CATEGORY_B = "b)住民のライフイベントに際し、多数存在する手続をワンストップで行うために必要と考えられる手続"
+
+# (大カテゴリ, サブカテゴリ, procedures of 50, 重点手続 of them, online rate, not applicable rate);
+# the rates of the procedures outside 子育て・介護 are those of the 2026-01 survey
+SUBCATEGORIES = [
+    (CATEGORY_A, "", 14, 0, 0.41, 0.06),
+    (CATEGORY_B, "ア.子育て関係", 15, 15, None, 0.006),
+    (CATEGORY_B, "イ.介護関係", 11, 11, None, 0.002),
+    (CATEGORY_B, "ウ.被災者支援関係", 8, 1, 0.12, 0.03),
+    (CATEGORY_B, "エ.転出・転入手続関係", 2, 0, 1.0, 0.0),
+]
+
+# Kanji of the made-up names, with their readings
+NAME_PARTS = [
+    ("山", "ヤマ"), ("川", "カワ"), ("田", "タ"), ("中", "ナカ"), ("野", "ノ"), ("原", "ハラ"), ("東", "ヒガシ"),
+    ("西", "ニシ"), ("北", "キタ"), ("南", "ミナミ"), ("大", "オオ"), ("小", "コ"), ("高", "タカ"), ("松", "マツ"),
+    ("島", "シマ"), ("本", "モト"), ("井", "イ"), ("石", "イシ"), ("岡", "オカ"), ("森", "モリ"), ("宮", "ミヤ"),
+    ("木", "キ"), ("沢", "サワ"), ("浜", "ハマ"), ("長", "ナガ"), ("清", "キヨ"), ("豊", "トヨ"), ("富", "トミ"),
+    ("美", "ミ"), ("津", "ツ"), ("坂", "サカ"), ("橋", "ハシ"), ("崎", "サキ"), ("谷", "ヤ"), ("瀬", "セ"),
+    ("鶴", "ツル"), ("白", "シラ"), ("桜", "サクラ"), ("江", "エ"), ("吉", "ヨシ"),
+]
+SUFFIXES = {"市": "シ", "町": "チョウ", "村": "ムラ", "区": "ク"}
+
+_HALF_WIDTH = {unicodedata.normalize("NFKC", chr(c)): chr(c) for c in range(0xFF66, 0xFF9E)}
+_HALF_WIDTH.update({"゙": "ﾞ", "゚": "ﾟ"})
+
+
+def halfwidth(katakana):
+    """Half-width katakana, as 団体名フリガナ is written in the survey (ダ -> ﾀﾞ)."""
+    return "".join(_HALF_WIDTH.get(c, c) for c in unicodedata.normalize("NFD", katakana))
+
+
+def check_digit(code5):
+    """The sixth digit of a 全国地方公共団体コード."""
+    s = sum(int(d) * w for d, w in zip(code5, (6, 5, 4, 3, 2)))
+    return str((11 - s % 11) % 10)
+
+
+def apportion(total, weights):
+    """total split in proportion to weights, by largest remainder."""
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    order = sorted(range(len(weights)), key=lambda i: (counts[i] - weights[i] * scale, i))
+    for i in order[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+# ============================================================
+# Generation
+# ============================================================
+
+def procedures(n):
+    """(大カテゴリ, サブカテゴリ, 手続名, 重点手続) of n procedures in survey order.
+    子育て・介護 get at least one each, so their measures are defined."""
+    counts = apportion(n, [s[2] for s in SUBCATEGORIES])
+    for i, s in enumerate(SUBCATEGORIES):
+        while s[1] in CARE_SUBCATEGORIES and counts[i] == 0:
+            counts[counts.index(max(counts))] -= 1
+            counts[i] += 1
+    out = []
+    for (cat, sub, base, priority, _, _), k in zip(SUBCATEGORIES, counts):
+        label = sub.split(".", 1)[1] if sub else "その他"
+        for j in range(k):
+            out.append((cat, sub, f"{label}手続{j + 1:02d}", "●" if j < round(priority * k / base) else ""))
+    return out
+
+
+def municipalities(n, rnd):
+    """(コード, 地域ブロック, 都道府県, 団体名, 団体名フリガナ, 団体区分) of n municipalities."""
+    counts = apportion(n, [p[2] for p in PREFECTURES])
+    wards = round(SPECIAL_WARDS * n / DEFAULT_MUNICIPALITIES)
+    out = []
+    for k, ((pref, block, _), count) in enumerate(zip(PREFECTURES, counts)):
+        width = max(3, len(str(200 + count)))
+        seen = set()
+        for i in range(count):
+            if pref == "東京都" and i < wards:
+                suffix, kind = "区", "特別区"
+            else:
+                suffix = rnd.choices(("市", "町", "村"), (45, 43, 12))[0]
+                kind = ""
+                if suffix == "市":
+                    kind = rnd.choices(("", "中核市", "政令市"), (89, 8, 3))[0]
+            parts = 2
+            while True:
+                picked = [rnd.choice(NAME_PARTS) for _ in range(parts)]
+                name = "".join(p[0] for p in picked) + suffix
+                if name not in seen:
+                    break
+                parts += 1
+            seen.add(name)
+            reading = halfwidth("".join(p[1] for p in picked) + SUFFIXES[suffix])
+            code5 = f"{k + 1:02d}{200 + i:0{width}d}"
+            out.append((code5 + check_digit(code5[-5:]), block, pref, name, reading, kind))
+    return out
+
+
+def other_count(rnd):
+    """その他手続数: half the municipalities none, a few unknown (blank)."""
+    r = rnd.random()
+    if r < 0.5:
+        return "0"
+    if r < 0.505:
+        return ""
+    return str(int(rnd.lognormvariate(1.5, 1.2)) + 1)
+
+
+def iter_long_rows(n_municipalities=DEFAULT_MUNICIPALITIES, n_procedures=DEFAULT_PROCEDURES, seed=0,
+                   complete=DEFAULT_COMPLETE, online=None, na=None):
+    """One long-format tuple per municipality x procedure, as ingest.iter_long_rows yields them."""
+    rnd = random.Random(seed)
+    procs = procedures(n_procedures)
+    rates = {sub: (rate if online is None else online, na_rate if na is None else na)
+             for _, sub, _, _, rate, na_rate in SUBCATEGORIES}
+    for ident in municipalities(n_municipalities, rnd):
+        others = other_count(rnd)
+        care = 1.0 if rnd.random() < complete else rnd.random()
+        for cat, sub, name, priority in procs:
+            p_online, p_na = rates[sub]
+            if sub in CARE_SUBCATEGORIES:
+                p_online = care * (1 - p_na)
+            r = rnd.random()
+            status = STATUS_NA if r < p_na else STATUS_ONLINE if r < p_na + p_online else STATUS_NONE
+            yield ident + (cat, sub, name, priority, status, others, STATUS_CODES[status])
+
+
+def generate(out_dir, n_municipalities=DEFAULT_MUNICIPALITIES, n_procedures=DEFAULT_PROCEDURES, seed=0,
+             complete=DEFAULT_COMPLETE, online=None, na=None, parquet=False, bitsets=False):
+    """Write the ingest.py outputs of a synthetic survey into out_dir. Returns {output: path}."""
+    paths = {
+        "csv": os.path.join(out_dir, os.path.basename(ingest.DEFAULT_CSV)),
+        "summary": os.path.join(out_dir, os.path.basename(ingest.DEFAULT_SUMMARY)),
+    }
+    if parquet:
+        paths["parquet"] = os.path.join(out_dir, os.path.basename(ingest.DEFAULT_PARQUET))
+    if bitsets:
+        paths["bitsets"] = os.path.join(out_dir, os.path.basename(ingest.DEFAULT_BITS))
+    rows = iter_long_rows(n_municipalities, n_procedures, seed, complete, online, na)
+    paths["rows"] = ingest.ingest_rows(rows, paths["csv"], parquet_out=paths.get("parquet"),
+                                       summary_out=paths["summary"], bits_out=paths.get("bitsets"))
+    return paths
+
+# ============================================================
+# Main
+# ============================================================
+
+def rate(text):
+    v = float(text)
+    if not 0 <= v <= 1:
+        raise argparse.ArgumentTypeError("must be between 0 and 1")
+    return v
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a seeded synthetic survey in the data_unpivoted.csv format")
+    ap.add_argument("-o", "--out-dir", default=DEFAULT_OUT_DIR)
+    ap.add_argument("--municipalities", type=int, default=DEFAULT_MUNICIPALITIES)
+    ap.add_argument("--procedures", type=int, default=DEFAULT_PROCEDURES)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--complete", type=rate, default=DEFAULT_COMPLETE,
+                    help="share of municipalities with every 子育て・介護 procedure online")
+    ap.add_argument("--online", type=rate, default=None,
+                    help="online rate of the other procedures (default: their サブカテゴリ's in the survey)")
+    ap.add_argument("--na", type=rate, default=None, help="not applicable (ー) rate of every procedure")
+    ap.add_argument("--parquet", action="store_true", help="also write data_unpivoted.parquet (pyarrow)")
+    ap.add_argument("--bitsets", action="store_true", help="also write data_status_bits.npz (numpy)")
+    args = ap.parse_args(argv)
+    if args.municipalities < 1 or args.procedures < len(CARE_SUBCATEGORIES):
+        ap.error(f"--municipalities must be at least 1 and --procedures at least {len(CARE_SUBCATEGORIES)}")
+
+    if args.parquet and ingest.pa is None:
+        print("  ERROR: --parquet requires pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    if args.bitsets and ingest.bitsets.np is None:
+        print("  ERROR: --bitsets requires numpy (pip install numpy)")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    paths = generate(args.out_dir, args.municipalities, args.procedures, args.seed, args.complete,
+                     args.online, args.na, args.parquet, args.bitsets)
+    elapsed = time.perf_counter() - t0
+    for key in ("csv", "parquet", "summary", "bitsets"):
+        if key in paths:
+            print(f"OK: {paths[key]}")
+    print(f"  {args.municipalities:,} municipalities x {args.procedures} procedures = {paths['rows']:,} rows, "
+          f"{elapsed:.2f}s, csv {os.path.getsize(paths['csv']):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+layout.py: splits, grids and pages stay inside their box without overlap,
+including the edge cases (no tile, one tile, tiles larger than the box).
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from layout import Box, check, grid, paginate, self_check  # noqa: E402
+
+CANVAS = Box(0, 0, 1280, 720)
+BODY = CANVAS.inset(10, 70, 10, 10)
+
+
+def assert_tiled(boxes, bounds):
+    assert check(boxes, bounds) == []
+    assert all(b.w > 0 and b.h > 0 for b in boxes)
+
+
+# ------------------------------------------------------------
+# check() itself
+# ------------------------------------------------------------
+
+def test_check_reports_overlap_and_bounds():
+    a, b = Box(0, 0, 100, 100), Box(50, 50, 100, 100)
+    errors = check([a, b], Box(0, 0, 120, 120))
+    assert f"{b!r} is outside {Box(0, 0, 120, 120)!r}" in errors
+    assert f"{a!r} overlaps {b!r}" in errors
+
+
+def test_check_touching_boxes_do_not_overlap():
+    assert check([Box(0, 0, 10, 10), Box(10, 0, 10, 10), Box(0, 10, 10, 10)]) == []
+
+
+# ------------------------------------------------------------
+# split_x / split_y
+# ------------------------------------------------------------
+
+def test_split_fixed_and_flexible_parts_fill_the_box():
+    left, mid, right = BODY.split_x(200, None, 300, gap=12)
+    assert (left.w, right.w) == (200, 300)
+    assert left.x == BODY.x and right.right == BODY.right
+    assert mid.w == BODY.w - 200 - 300 - 2 * 12
+    assert_tiled([left, mid, right], BODY)
+
+
+def test_split_flexible_parts_share_the_rest():
+    parts = BODY.split_y(None, None, None, gap=5)
+    assert parts[-1].bottom == BODY.bottom
+    assert max(p.h for p in parts) - min(p.h for p in parts) <= 1
+    assert_tiled(parts, BODY)
+
+
+def test_split_one_part_is_the_box():
+    assert BODY.split_x(None) == [BODY]
+    assert BODY.split_y(BODY.h) == [BODY]
+
+
+def test_split_larger_than_the_box_raises():
+    with pytest.raises(ValueError):
+        BODY.split_x(BODY.w + 1)
+    with pytest.raises(ValueError):
+        BODY.split_y(BODY.h // 2, BODY.h // 2, gap=1)
+    with pytest.raises(ValueError):
+        Box(0, 0, 2, 10).split_x(None, None, None)
+
+
+# ------------------------------------------------------------
+# grid
+# ------------------------------------------------------------
+
+@pytest.mark.parametrize("n", [1, 8, 47, 1741])
+def test_grid_cells_in_bounds_without_overlap(n):
+    cells = grid(BODY, n, gap=4)
+    assert len(cells) == n
+    assert_tiled(cells, BODY)
+
+
+def test_grid_prefecture_cards():
+    cells = grid(BODY, 47, cols=6, gap=6)
+    assert len({c.y for c in cells}) == 8
+    assert len({(c.w, c.h) for c in cells}) == 1
+    assert_tiled(cells, BODY)
+
+
+def test_grid_one_cell_fills_the_box():
+    assert grid(BODY, 1) == [BODY]
+
+
+def test_grid_no_cell_raises():
+    with pytest.raises(ValueError):
+        grid(BODY, 0)
+
+
+def test_grid_cells_that_do_not_fit_raise():
+    with pytest.raises(ValueError):
+        grid(Box(0, 0, 10, 10), 4, cols=4, gap=4)
+    with pytest.raises(ValueError):
+        grid(BODY, 10, cols=2, rows=2)
+
+
+# ------------------------------------------------------------
+# paginate
+# ------------------------------------------------------------
+
+def test_paginate_pages_cover_every_tile():
+    cells, pages = paginate(BODY, 1741, 120, 44, gap=4)
+    assert_tiled(cells, BODY)
+    assert pages[0] == (0, len(cells))
+    assert sum(count for _, count in pages) == 1741
+    assert all(first == i * len(cells) for i, (first, _) in enumerate(pages))
+    assert all(0 < count <= len(cells) for _, count in pages)
+
+
+def test_paginate_one_tile():
+    cells, pages = paginate(BODY, 1, 120, 44)
+    assert cells == [Box(BODY.x, BODY.y, 120, 44)]
+    assert pages == [(0, 1)]
+
+
+def test_paginate_no_tile():
+    assert paginate(BODY, 0, 120, 44) == ([], [])
+
+
+def test_paginate_tile_larger_than_the_box_raises():
+    with pytest.raises(ValueError):
+        paginate(BODY, 10, BODY.w + 1, 44)
+    with pytest.raises(ValueError):
+        paginate(BODY, 10, 120, BODY.h + 1)
+
+
+def test_paginate_tile_exactly_the_box():
+    cells, pages = paginate(BODY, 3, BODY.w, BODY.h, gap=8)
+    assert cells == [BODY]
+    assert pages == [(0, 1), (1, 1), (2, 1)]
+
+
+# ------------------------------------------------------------
+# Page regions of generate_report.py
+# ------------------------------------------------------------
+
+def test_page_regions():
+    import generate_report as gr
+    side, main = gr.body_regions()
+    assert_tiled([side, main], gr.BODY)
+    regions = gr.detail_regions()
+    assert_tiled(list(regions), gr.CANVAS)
+    assert regions[0].bottom == regions[1].bottom
+
+
+def test_region_blocks_are_the_survey_blocks():
+    import csv
+    import generate_report as gr
+    import synthetic
+    blocks = [(name, [pref for _, pref in prefs]) for name, prefs in gr.region_blocks()]
+    survey = {}
+    for pref, block, _ in synthetic.PREFECTURES:
+        survey.setdefault(block, []).append(pref)
+    assert blocks == list(survey.items())
+    with open(os.path.join(ROOT, "tests", "fixtures", "data_unpivoted.csv"), encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            assert r["都道府県"] in survey[r["地域ブロック"]]
+
+
+def test_kpi_boxes_centered():
+    import generate_report as gr
+    box = Box(35, 500, 290, 78)
+    label, done, slash, total = gr.kpi_boxes(box, 22, 110, 24)
+    assert_tiled([label, done, slash, total], box)
+    assert done.x - box.x == box.right - total.right
+
+
+# ------------------------------------------------------------
+# Random layouts
+# ------------------------------------------------------------
+
+def test_random_layouts():
+    errors, _ = self_check(trials=200, seed=1)
+    assert errors == []
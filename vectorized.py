@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Vectorized evaluation of every model.bim measure for a whole grouping at once.
+
+The long table is held as dictionary-encoded NumPy columns (int32 codes plus
+a category list).  evaluate() computes all measures for every group of a
+grouping — national, 都道府県, 地域ブロック, 団体名 or any fact columns —
+in one pass of np.unique / np.bincount over the rows, with the same
+semantics as the DAX: completion comes from the per-municipality 完了フラグ
+(as 自治体別集計 does), 自治体数 counts the municipalities visible through
+the relationship, and BLANK is NaN for rates, 0 for counts, None for text.
+
+    python vectorized.py --by 都道府県
+    python vectorized.py --by 地域ブロック --csv out.csv
+    python vectorized.py --check          # compare with measures.py
+
+Requires NumPy; reads data_unpivoted.parquet with pyarrow when available.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # the engine is optional; measures.py needs nothing
+    np = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+from measures import CARE_SUBCATEGORIES, STATUS_CODES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(HERE, "data_unpivoted.csv")
+DEFAULT_PARQUET = os.path.join(HERE, "data_unpivoted.parquet")
+
+GROUPINGS = {
+    "national": (),
+    "都道府県": ("都道府県",),
+    "地域ブロック": ("地域ブロック",),
+    "団体名": ("団体名",),
+}
+
+COMPLETION_STATUSES = ("完了", "未完了")
+
+# Result columns in model.bim order; 完了状況値 is split by 完了状況[ステータス]
+MEASURES = [
+    "オンライン対応数", "該当なし数", "未対応数", "オンライン化率", "手続数", "自治体数",
+    "子育て介護26手続完了自治体数", "子育て介護26手続完了率", "子育て介護オンライン化率_自治体別",
+    "都道府県ラベル", "ステータス表示", "ステータスコード",
+] + [f"完了状況値[{s}]" for s in COMPLETION_STATUSES]
+
+# ============================================================
+# Loading
+# ============================================================
+
+class Table:
+    """The オンライン化状況 long table as dictionary-encoded NumPy columns."""
+
+    def __init__(self, columns, status, done=None):
+        self.columns = columns          # name -> (int32 codes, list of categories)
+        self.status = status            # int8 状況コード: 1 ○, 0 ー, -1 未対応
+        self.n = len(status)
+        codes, cats = columns["サブカテゴリ"]
+        care_cats = np.array([c in CARE_SUBCATEGORIES for c in cats], dtype=bool)
+        self.care = care_cats[codes]
+        if done is None:
+            # 完了フラグ per コード, as ingest.py writes 自治体別集計
+            muni, n_muni = self.codes("コード"), len(self.categories("コード"))
+            unfinished = np.bincount(muni[self.care & (status == -1)], minlength=n_muni)
+            done = (unfinished == 0).astype(np.int64)
+        self.done = done
+
+    def codes(self, column):
+        return self.columns[column][0]
+
+    def categories(self, column):
+        return self.columns[column][1]
+
+    def mask(self, filters):
+        """Rows visible under {column: allowed values} (all rows for no filters)."""
+        m = np.ones(self.n, dtype=bool)
+        for column, allowed in (filters or {}).items():
+            codes, cats = self.columns[column]
+            m &= np.array([c in allowed for c in cats], dtype=bool)[codes]
+        return m
+
+    def take(self, mask):
+        """The rows where mask is set (or the row numbers it lists), with the
+        same categories and 完了フラグ: completion belongs to the whole
+        municipality, not to the rows taken."""
+        columns = {name: (codes[mask], cats) for name, (codes, cats) in self.columns.items()}
+        return Table(columns, self.status[mask], self.done)
+
+    def tile(self, k):
+        """The table repeated k times as k times as many municipalities (for benchmarks)."""
+        columns = {}
+        for name, (codes, cats) in self.columns.items():
+            if name in ("コード", "団体名"):
+                n = len(cats)
+                columns[name] = (
+                    np.concatenate([codes + i * n for i in range(k)]).astype(np.int32),
+                    [f"{c}#{i}" if i else c for i in range(k) for c in cats],
+                )
+            else:
+                columns[name] = (np.tile(codes, k), cats)
+        return Table(columns, np.tile(self.status, k))
+
+
+def factorize(values):
+    """(int32 codes, categories) for a sequence of hashable values."""
+    index = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int32, count=len(values))
+    return codes, list(index)
+
+
+def load_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        cols = list(zip(*reader))
+    data = dict(zip(header, cols))
+    status = data.pop("状況コード", None)
+    if status is None:
+        status = [STATUS_CODES[s] for s in data["オンライン化状況"]]
+    columns = {name: factorize(values) for name, values in data.items()}
+    return Table(columns, np.array([int(s) for s in status], dtype=np.int8))
+
+
+def load_parquet(path):
+    table = pq.read_table(path).unify_dictionaries()
+    columns = {}
+    status = None
+    for name in table.column_names:
+        arr = table.column(name).combine_chunks()
+        if name == "状況コード":
+            status = arr.to_numpy(zero_copy_only=False).astype(np.int8)
+        elif hasattr(arr, "indices"):
+            columns[name] = (arr.indices.to_numpy(zero_copy_only=False).astype(np.int32), arr.dictionary.to_pylist())
+        else:
+            columns[name] = factorize(arr.to_pylist())
+    return Table(columns, status)
+
+
+def load(path=None):
+    """Table from data_unpivoted.parquet (pyarrow) or data_unpivoted.csv."""
+    if path is None:
+        path = DEFAULT_PARQUET if pq is not None and os.path.exists(DEFAULT_PARQUET) else DEFAULT_CSV
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ImportError("reading Parquet requires pyarrow")
+        return load_parquet(path)
+    return load_csv(path)
+
+# ============================================================
+# Evaluation
+# ============================================================
+
+def group_index(t, by):
+    """(group id per row, number of groups, key tuples) for the by columns."""
+    if not by:
+        return np.zeros(t.n, dtype=np.int64), 1, [()]
+    key = np.zeros(t.n, dtype=np.int64)
+    sizes = []
+    for column in by:
+        k = len(t.categories(column))
+        key = key * k + t.codes(column)
+        sizes.append(k)
+    uniq, g = np.unique(key, return_inverse=True)
+    parts = []
+    for column, k in zip(reversed(by), reversed(sizes)):
+        parts.append(np.asarray(t.categories(column), dtype=object)[uniq % k])
+        uniq = uniq // k
+    return g, len(parts[0]), list(zip(*reversed(parts)))
+
+
+def _selected(g, n, values, k, visible):
+    """SELECTEDVALUE per group: the value code when exactly one is visible, else -1."""
+    pairs = np.unique(g[visible] * k + values[visible])
+    pg = pairs // k
+    counts = np.bincount(pg, minlength=n)
+    out = np.full(n, -1, dtype=np.int64)
+    first = np.unique(pg, return_index=True)[1]
+    single = counts[pg[first]] == 1
+    out[pg[first][single]] = (pairs[first] % k)[single]
+    return out
+
+
+def _divide(a, b):
+    """DAX DIVIDE: BLANK (NaN) on a zero denominator."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b != 0, a / np.where(b != 0, b, 1), np.nan)
+
+
+def evaluate(t, by=(), filters=None):
+    """All MEASURES for each group of by under filters ({column: allowed values}).
+
+    Returns {"keys": [tuple per group], measure: array or list per group};
+    only groups with visible rows are returned (as SUMMARIZECOLUMNS does).
+    """
+    filters = filters or {}
+    visible = t.mask(filters)
+    # CALCULATE ( ..., サブカテゴリ IN {care} ) replaces an outer サブカテゴリ filter
+    care = t.mask({c: v for c, v in filters.items() if c != "サブカテゴリ"}) & t.care
+    g, n, keys = group_index(t, by)
+    status = t.status
+
+    def count(m):
+        return np.bincount(g[m], minlength=n)
+
+    rows = count(visible)
+    online = count(visible & (status >= 0))
+    none = count(visible & (status == -1))
+    care_rows = count(care)
+    care_online = count(care & (status >= 0))
+
+    # Municipalities visible per group (自治体別集計 filtered through the relationship)
+    muni = t.codes("コード")
+    n_muni = len(t.categories("コード"))
+    pairs = np.unique(g[visible] * n_muni + muni[visible])
+    pg, pm = pairs // n_muni, pairs % n_muni
+    munis = np.bincount(pg, minlength=n)
+    completed = np.bincount(pg, weights=t.done[pm], minlength=n).astype(np.int64)
+
+    prefs = t.categories("都道府県")
+    pref = _selected(g, n, t.codes("都道府県"), len(prefs), visible)
+    texts = t.categories("オンライン化状況")
+    text = _selected(g, n, t.codes("オンライン化状況"), len(texts), visible)
+    code = _selected(g, n, status.astype(np.int64) + 1, 3, visible)
+
+    keep = np.flatnonzero(rows > 0)
+    result = {
+        "keys": [keys[i] for i in keep],
+        "オンライン対応数": online[keep],
+        "該当なし数": count(visible & (status == 0))[keep],
+        "未対応数": none[keep],
+        "オンライン化率": _divide(online, online + none)[keep],
+        "手続数": rows[keep],
+        "自治体数": munis[keep],
+        "子育て介護26手続完了自治体数": completed[keep],
+        "子育て介護26手続完了率": _divide(completed, munis)[keep],
+        "子育て介護オンライン化率_自治体別": _divide(care_online, care_rows)[keep],
+        "都道府県ラベル": [
+            f"{prefs[pref[i]] if pref[i] >= 0 else ''}({completed[i]} / {munis[i]})" for i in keep
+        ],
+        "ステータス表示": [texts[text[i]] if text[i] >= 0 else "" for i in keep],
+        # BLANK SELECTEDVALUE (several statuses or none) is -1 as well, like the measure
+        "ステータスコード": np.where(code <= 0, -1, 1)[keep],
+        "完了状況値[完了]": completed[keep],
+        "完了状況値[未完了]": (munis - completed)[keep],
+    }
+    return result
+
+
+def value(result, measure, i):
+    """One measure of group i as a Python value, BLANK as None."""
+    v = result[measure][i]
+    if isinstance(v, np.floating):
+        return None if np.isnan(v) else float(v)
+    if isinstance(v, np.integer):
+        return int(v)
+    return v
+
+
+def rows_of(result):
+    """Result as a list of {column: value} dicts, BLANK as None."""
+    out = []
+    for i, key in enumerate(result["keys"]):
+        row = {"keys": key}
+        for m in MEASURES:
+            row[m] = value(result, m, i)
+        out.append(row)
+    return out
+
+
+def write_csv(result, by, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(list(by) + MEASURES)
+        for row in rows_of(result):
+            w.writerow(list(row["keys"]) + ["" if row[m] is None else row[m] for m in MEASURES])
+
+# ============================================================
+# Check against measures.py
+# ============================================================
+
+def check(t, rows):
+    """Compare every grouping with the row-level reference. Returns (errors, n).
+
+    Each grouping is checked alone and under the page-2 サブカテゴリ filter.
+    """
+    import measures
+
+    errors = []
+    n = 0
+    care = set(CARE_SUBCATEGORIES)
+    for label, by in GROUPINGS.items():
+        # Every grouping holds whole municipalities, so a group's own rows are
+        # all the reference needs, including for the completion measures
+        parts = {}
+        for r in rows:
+            parts.setdefault(tuple(r[c] for c in by), []).append(r)
+        for filters in ({}, {"サブカテゴリ": care}):
+            for got in rows_of(evaluate(t, by, filters)):
+                key = got["keys"]
+                sub = parts[key]
+                f = dict(filters, **{c: {v} for c, v in zip(by, key)})
+                refs = {name: fn(sub, f) for name, fn in measures.REFERENCE.items()}
+                for s in COMPLETION_STATUSES:
+                    refs[f"完了状況値[{s}]"] = measures.completion_status_value(s, sub, f)
+                for name, ref in refs.items():
+                    n += 1
+                    if not measures.same(got[name], ref):
+                        errors.append(f"{label}={key} {sorted(filters)}: {name} {got[name]!r} != {ref!r}")
+            n_groups = len({k for k, sub in parts.items() if measures.apply_filters(sub, filters)})
+            if n_groups != len(evaluate(t, by, filters)["keys"]):
+                errors.append(f"{label} {sorted(filters)}: {n_groups} groups expected")
+    return errors, n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Evaluate every measure per group in one vectorized pass")
+    ap.add_argument("--data", default=None, help="data_unpivoted.parquet or .csv (default: whichever exists)")
+    ap.add_argument("--by", default="national", help=f"{' / '.join(GROUPINGS)} or comma-separated fact columns")
+    ap.add_argument("--filter", action="append", default=[], metavar="COLUMN=VALUE")
+    ap.add_argument("--csv", default=None, metavar="PATH", help="write the result as CSV")
+    ap.add_argument("--check", action="store_true", help="compare every grouping with measures.py")
+    args = ap.parse_args(argv)
+
+    if np is None:
+        print("  ERROR: vectorized.py requires numpy (pip install numpy)")
+        sys.exit(1)
+    t0 = time.perf_counter()
+    t = load(args.data)
+    t_load = time.perf_counter() - t0
+
+    if args.check:
+        import measures
+        errs, n = check(t, measures.load_rows(DEFAULT_CSV if args.data is None else args.data))
+        if errs:
+            for e in errs[:50]:
+                print(f"  ERROR: {e}")
+            sys.exit(1)
+        print(f"OK: {n:,} group values match measures.py")
+        return
+
+    by = GROUPINGS.get(args.by, tuple(c for c in args.by.split(",") if c))
+    filters = {}
+    for f in args.filter:
+        col, _, val = f.partition("=")
+        filters.setdefault(col, set()).add(val)
+    t0 = time.perf_counter()
+    result = evaluate(t, by, filters)
+    t_eval = time.perf_counter() - t0
+    if args.csv:
+        write_csv(result, by, args.csv)
+        print(f"OK: {args.csv}")
+    else:
+        for row in rows_of(result)[:60]:
+            print(" ".join(map(str, row["keys"])) or "全国", {m: row[m] for m in MEASURES})
+    print(f"  {t.n:,} rows, {len(result['keys']):,} groups, load {t_load:.2f}s, evaluate {t_eval * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()